@@ -44,6 +44,12 @@ OBJECT_STORAGE_AUDIT_BACKEND_URI = os.environ.get("OBJECT_STORAGE_AUDIT_BACKEND_
 OBJECT_STORAGE_AUDIT_BACKEND_DATABASE = os.environ.get("OBJECT_STORAGE_AUDIT_BACKEND_DATABASE")
 OBJECT_STORAGE_AUDIT_BACKEND_COLLECTION = os.environ.get("OBJECT_STORAGE_AUDIT_BACKEND_COLLECTION")
 
+# audit records are queued and written to the backend in batches; if a Redis URL is given the queue is shared
+# between processes, otherwise each process buffers in memory
+OBJECT_STORAGE_AUDIT_QUEUE_URL = os.environ.get("OBJECT_STORAGE_AUDIT_QUEUE_URL")
+OBJECT_STORAGE_AUDIT_BATCH_SIZE = int(os.environ.get("OBJECT_STORAGE_AUDIT_BATCH_SIZE", 200))
+OBJECT_STORAGE_AUDIT_FLUSH_INTERVAL = float(os.environ.get("OBJECT_STORAGE_AUDIT_FLUSH_INTERVAL", 5))
+
 
 # OBJECT BUCKETS
 
@@ -59,6 +65,9 @@ _base_storage_options = {
     "audit_database": OBJECT_STORAGE_AUDIT_BACKEND_DATABASE,
     "audit_collection": OBJECT_STORAGE_AUDIT_BACKEND_COLLECTION,
     "audit_backend": OBJECT_STORAGE_AUDIT_BACKEND_URI,
+    "audit_queue": OBJECT_STORAGE_AUDIT_QUEUE_URL,
+    "audit_batch_size": OBJECT_STORAGE_AUDIT_BATCH_SIZE,
+    "audit_flush_interval": OBJECT_STORAGE_AUDIT_FLUSH_INTERVAL,
 }
 
 # -- ASSETS BUCKET
@@ -328,6 +328,8 @@ def create_app():
     tasks.register_data_export_tasks(celery)
     tasks.register_allocation_export_tasks(celery)
     tasks.register_object_store_backup_tasks(celery)
+    tasks.register_workload_tasks(celery)
+    tasks.register_ai_calibration_tasks(celery)
 
     use_pyinstrument = app.config.get("PROFILE_PYINSTRUMENT")
     if use_pyinstrument:
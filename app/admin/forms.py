@@ -1192,6 +1192,14 @@ class ScheduledTaskMixin:
             "app.tasks.object_store_backup.prune_object_store_tombstones",
             "Prune expired ObjectStore tombstones",
         ),
+        (
+            "app.tasks.workload.recompute_faculty_workload",
+            "Recompute precomputed faculty workload aggregates",
+        ),
+        (
+            "app.tasks.ai_calibration.recompute_ai_calibration_statistics",
+            "Recompute AI calibration sufficient statistics",
+        ),
     ]
 
     task = SelectField("Task", choices=tasks_available)
@@ -11,6 +11,7 @@
 import json
 from datetime import date, datetime, timedelta
 from math import pi
+from threading import BoundedSemaphore, Lock
 
 from bokeh.embed import components
 from bokeh.models import Label
@@ -75,6 +76,7 @@ from ..shared.context.matching import (
 from ..shared.context.rollover import get_rollover_data
 from ..shared.formatters import format_size
 from ..shared.internal_redis import get_redis
+from ..shared.notification_stream import get_stream_cursor, read_notifications, get_task_progress as get_user_task_progress
 from ..shared.utils import (
     get_current_year,
     get_main_config,
@@ -86,7 +88,7 @@ from ..shared.validators import (
 )
 from ..shared.forms.forms import ConfirmActionForm
 from ..shared.workflow_logging import log_db_commit
-from ..task_queue import progress_update, register_task
+from ..task_queue import get_task_progress, progress_update, register_task
 from ..tools import ServerSideSQLHandler
 from . import admin
 from .forms import (
@@ -1863,8 +1865,15 @@ def background_ajax():
         "message": message,
     }
 
+    def row_formatter(tasks):
+        tasks = list(tasks)
+
+        # overlay live progress held in Redis, which is written back to the TaskRecord only periodically
+        live = get_task_progress(t.id for t in tasks)
+        return ajax.site.background_task_data(tasks, live=live)
+
     with ServerSideSQLHandler(request, base_query, columns) as handler:
-        return handler.build_payload(ajax.site.background_task_data)
+        return handler.build_payload(row_formatter)
 
 
 @admin.route("/terminate_background_task/<string:id>")
@@ -1939,12 +1948,34 @@ def delete_background_task(id):
     return redirect(redirect_url())
 
 
-@admin.route("/notifications_ajax")
+_long_poll_semaphore = None
+_long_poll_semaphore_lock = Lock()
+
+
+def _long_poll_slots() -> BoundedSemaphore:
+    global _long_poll_semaphore
+
+    with _long_poll_semaphore_lock:
+        if _long_poll_semaphore is None:
+            _long_poll_semaphore = BoundedSemaphore(max(1, current_app.config.get("NOTIFICATIONS_MAX_LONG_POLLS", 4)))
+        return _long_poll_semaphore
+
+
+@admin.route("/notifications_poll")
 @limiter.exempt
-def notifications_ajax():
+def notifications_poll():
     """
-    Retrieve all notifications for the current user and take care of keep-alive tasks;
-    must exit as quickly as possible
+    Long-poll endpoint for live notifications. Blocks on the current user's Redis notification stream
+    until a new notification is published or the poll timeout expires, so that idle browser tabs
+    generate no database load.
+
+    On the first request (no cursor supplied) the response contains the user's durable notifications
+    from the database together with a snapshot of in-flight task progress from Redis. Each response
+    carries a cursor that should be passed to the following request.
+
+    Each blocked request occupies a web server thread, so at most NOTIFICATIONS_MAX_LONG_POLLS requests
+    per process are allowed to block. Once these are in use, further requests return at once with a
+    'retry' interval, and the browser falls back to polling at that interval.
     :return:
     """
     # return empty JSON if not logged in; we don't want this endpoint to require that the user is logged in,
@@ -1953,18 +1984,43 @@ def notifications_ajax():
     if not current_user.is_authenticated:
         return jsonify({})
 
-    # get timestamp that client wants messages from, if provided
+    cursor = request.args.get("cursor", None)
     since = request.args.get("since", 0, type=int)
 
+    max_wait = current_app.config.get("NOTIFICATIONS_LONG_POLL_TIMEOUT", 15)
+    wait = min(max(request.args.get("wait", max_wait, type=int), 0), max_wait)
+
+    # record activity for process_pings(); this touches only Redis
     redis = get_redis()
     redis.hset("_pings", str(current_user.id), str((datetime.now().isoformat(), since)))
 
-    # query for all notifications associated with the current user
-    notifications = current_user.notifications.filter(Notification.timestamp >= since).order_by(Notification.timestamp.asc()).all()
+    if cursor is None:
+        # capture the stream position *before* querying, so nothing published in between is lost;
+        # any overlap is harmless because the browser handles repeated notifications idempotently
+        cursor = get_stream_cursor(current_user.id)
+
+        notifications = current_user.notifications.filter(Notification.timestamp >= since).order_by(Notification.timestamp.asc()).all()
+        data = [{"uuid": n.uuid, "type": n.type, "payload": n.payload, "timestamp": n.timestamp} for n in notifications]
+        data.extend(get_user_task_progress(current_user.id))
+        data.sort(key=lambda n: n["timestamp"])
+
+        return jsonify({"cursor": cursor, "notifications": data})
 
-    data = [{"uuid": n.uuid, "type": n.type, "payload": n.payload, "timestamp": n.timestamp} for n in notifications]
+    # release the database connection checked out while loading current_user, so that it is not held
+    # for the duration of the blocking read
+    user_id = current_user.id
+    db.session.close()
+
+    if wait == 0 or not _long_poll_slots().acquire(blocking=False):
+        cursor, data = read_notifications(user_id, cursor, timeout=0)
+        return jsonify({"cursor": cursor, "notifications": data, "retry": current_app.config.get("NOTIFICATIONS_SHORT_POLL_INTERVAL", 5)})
+
+    try:
+        cursor, data = read_notifications(user_id, cursor, timeout=wait)
+    finally:
+        _long_poll_slots().release()
 
-    return jsonify(data)
+    return jsonify({"cursor": cursor, "notifications": data})
 
 
 def _compute_allowed_matching_years(current_year):
@@ -61,6 +61,7 @@ from ..models import (
     User,
 )
 from ..models.submissions import SubmissionRoleTypesMixin
+from ..shared.asset_download import serve_asset
 from ..shared.asset_tools import AssetCloudAdapter, AssetUploadManager
 from ..shared.backup import (
     create_new_backup_labels,
@@ -383,14 +384,8 @@ def download_generated_asset(asset_id):
         object_store,
         audit_data=f"download_generated_asset (asset id #{asset_id})",
     )
-    return_data = BytesIO()
     try:
-        with storage.download_to_scratch() as scratch_path:
-            file_path = scratch_path.path
-
-            with open(file_path, "rb") as f:
-                return_data.write(f.read())
-            return_data.seek(0)
+        return serve_asset(storage, asset.mimetype, filename if filename else asset.target_name)
     except Exception as e:
         current_app.logger.exception("Storage error downloading generated asset #%s", asset_id, exc_info=e)
         flash(
@@ -399,13 +394,6 @@ def download_generated_asset(asset_id):
         )
         return redirect(redirect_url())
 
-    return send_file(
-        return_data,
-        mimetype=asset.mimetype,
-        download_name=filename if filename else asset.target_name,
-        as_attachment=True,
-    )
-
 
 @admin.route("/download_submitted_asset/<int:asset_id>")
 @login_required
@@ -469,14 +457,8 @@ def download_submitted_asset(asset_id):
         current_app.config["OBJECT_STORAGE_ASSETS"],
         audit_data=f"download_submitted_asset (asset id #{asset_id})",
     )
-    return_data = BytesIO()
     try:
-        with storage.download_to_scratch() as scratch_path:
-            file_path = scratch_path.path
-
-            with open(file_path, "rb") as f:
-                return_data.write(f.read())
-            return_data.seek(0)
+        return serve_asset(storage, asset.mimetype, filename if filename else asset.target_name)
     except Exception as e:
         current_app.logger.exception("Storage error downloading submitted asset #%s", asset_id, exc_info=e)
         flash(
@@ -485,13 +467,6 @@ def download_submitted_asset(asset_id):
         )
         return redirect(redirect_url())
 
-    return send_file(
-        return_data,
-        mimetype=asset.mimetype,
-        download_name=filename if filename else asset.target_name,
-        as_attachment=True,
-    )
-
 
 @admin.route("/download_backup/<int:backup_id>")
 @roles_required("root")
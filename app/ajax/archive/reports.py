@@ -780,6 +780,8 @@ def avd_dashboard_rows(records: List[SubmissionRecord]):
     grade_templ: Template = _build_grade_templ()
     details_templ: Template = _build_details_templ()
 
+    SubmissionRecord.preload_language_analysis(SubmissionRecord.id.in_([r.id for r in records]))
+
     data = []
     for record in records:
         report_grade = float(record.report_grade) if record.report_grade is not None else None
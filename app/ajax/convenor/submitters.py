@@ -11,7 +11,7 @@
 from flask import current_app, get_template_attribute, jsonify, render_template
 from jinja2 import Template
 
-from ...models import ProjectClassConfig
+from ...models import ProjectClassConfig, SubmissionRecord
 
 # language=jinja2
 _cohort = """
@@ -196,6 +196,9 @@ def submitters_data(students, config, show_name, show_number, sort_number):
     periods_templ: Template = _build_periods_templ()
     menu_templ: Template = _build_menu_templ()
 
+    # project_tag() reads the language analysis of every record
+    SubmissionRecord.preload_language_analysis(SubmissionRecord.owner_id.in_([s.id for s in students]))
+
     data = [
         {
             "name": {
@@ -8,7 +8,7 @@
 # Contributors: David Seery <D.Seery@sussex.ac.uk>
 #
 
-from typing import List
+from typing import Dict, List
 
 from flask import current_app, get_template_attribute, jsonify, render_template
 from jinja2 import Environment, Template
@@ -16,9 +16,11 @@ from jinja2 import Environment, Template
 from ...models import (
     EnrollmentRecord,
     FacultyData,
+    FacultyWorkload,
     ProjectClassConfig,
 )
 from ...shared.sqlalchemy import get_count
+from ...shared.workload import faculty_workload_by_config
 
 # language=jinja2
 _name = """
@@ -412,6 +414,9 @@ def _element_base(
     enrolment_template: Template,
     allocation_template: Template,
     workload_template: Template,
+    pclass_configs: Dict[int, ProjectClassConfig],
+    workload: Dict[int, FacultyWorkload],
+    load_assigned: bool,
 ):
     CATS_workload = {}
 
@@ -439,10 +444,17 @@ def _element_base(
     for record in enrolments:
         record: EnrollmentRecord
 
-        supv, mark, mod, pres = f.CATS_assignment(record.pclass)
-
         pclass_id = record.pclass_id
 
+        config: ProjectClassConfig = pclass_configs[pclass_id]
+        configs[pclass_id] = config
+
+        # CATS and assignment counts are read from the precomputed FacultyWorkload table;
+        # a missing row means there are no assignments
+        wkld: FacultyWorkload = workload.get(pclass_id)
+
+        supv, mark, mod, pres = wkld.CATS if wkld is not None else (0, 0, 0, 0)
+
         CATS_total = supv + mark + mod + pres
         CATS_workload[pclass_id] = CATS_total
         total_workload += CATS_total
@@ -452,28 +464,22 @@ def _element_base(
         CATS_moderating[pclass_id] = mod
         CATS_presentations[pclass_id] = pres
 
-        config: ProjectClassConfig = record.pclass.most_recent_config
-        configs[pclass_id] = config
-
+        # the full display lists individual assignments, so these still need to be loaded
         if config.uses_supervisor:
-            data = f.supervisor_assignments(config=config)
-            assigned_supervising[pclass_id] = data.all()
-            num_supervising[pclass_id] = get_count(data)
+            num_supervising[pclass_id] = wkld.num_supervising if wkld is not None else 0
+            assigned_supervising[pclass_id] = f.supervisor_assignments(config=config).all() if load_assigned else []
 
         if config.uses_marker:
-            data = f.marker_assignments(config=config)
-            assigned_marking[pclass_id] = data.all()
-            num_marking[pclass_id] = get_count(data)
+            num_marking[pclass_id] = wkld.num_marking if wkld is not None else 0
+            assigned_marking[pclass_id] = f.marker_assignments(config=config).all() if load_assigned else []
 
         if config.uses_moderator:
-            data = f.moderator_assignments(config=config)
-            assigned_moderating[pclass_id] = data.all()
-            num_moderating[pclass_id] = get_count(data)
+            num_moderating[pclass_id] = wkld.num_moderating if wkld is not None else 0
+            assigned_moderating[pclass_id] = f.moderator_assignments(config=config).all() if load_assigned else []
 
         if config.uses_presentations:
-            data = f.presentation_assignments(config=config)
-            assigned_presentations[pclass_id] = data.all()
-            num_presentations[pclass_id] = get_count(data)
+            num_presentations[pclass_id] = wkld.num_presentations if wkld is not None else 0
+            assigned_presentations[pclass_id] = f.presentation_assignments(config=config).all() if load_assigned else []
 
     total_supervising = sum(num_supervising.values())
     total_marking = sum(num_marking.values())
@@ -554,26 +560,36 @@ def _element_base(
     }
 
 
-def _element_full(f: FacultyData):
-    enrolment_templ: Template = _build_full_enrolment_templ()
-    allocation_templ: Template = _build_full_allocation_templ()
-    workload_templ: Template = _build_full_workload_templ()
-
-    return _element_base(f, enrolment_templ, allocation_templ, workload_templ)
-
-
-def _element_simple(f: FacultyData):
-    enrolment_templ: Template = _build_simple_enrolment_templ()
-    allocation_templ: Template = _build_simple_allocation_templ()
-    workload_templ: Template = _build_simple_workload_templ()
-
-    return _element_base(f, enrolment_templ, allocation_templ, workload_templ)
-
-
 def workload_data(fac_list: List[FacultyData], simple_display: bool):
     if simple_display:
-        data = [_element_simple(f) for f in fac_list]
+        enrolment_templ: Template = _build_simple_enrolment_templ()
+        allocation_templ: Template = _build_simple_allocation_templ()
+        workload_templ: Template = _build_simple_workload_templ()
     else:
-        data = [_element_full(f) for f in fac_list]
+        enrolment_templ: Template = _build_full_enrolment_templ()
+        allocation_templ: Template = _build_full_allocation_templ()
+        workload_templ: Template = _build_full_workload_templ()
+
+    # resolve the current config for each enrolled project class once, rather than once per faculty member
+    pclass_configs: Dict[int, ProjectClassConfig] = {}
+    for f in fac_list:
+        for record in f.enrollments:
+            if record.pclass_id not in pclass_configs:
+                pclass_configs[record.pclass_id] = record.pclass.most_recent_config
+
+    workload = faculty_workload_by_config([f.id for f in fac_list], pclass_configs)
+
+    data = [
+        _element_base(
+            f,
+            enrolment_templ,
+            allocation_templ,
+            workload_templ,
+            pclass_configs,
+            workload.get(f.id, {}),
+            not simple_display,
+        )
+        for f in fac_list
+    ]
 
     return jsonify(data)
@@ -32,7 +32,7 @@ _menu = """
         Actions
     </button>
     <div class="dropdown-menu dropdown-menu-dark mx-0 border-0 dropdown-menu-end">
-        {% if t.status == t.PENDING or t.status == t.RUNNING %}
+        {% if state == t.PENDING or state == t.RUNNING %}
             <a class="dropdown-item d-flex gap-2" href="{{ url_for('admin.terminate_background_task', id=t.id) }}">
                 <i class="fas fa-hand-paper fa-fw"></i> Terminate
             </a>
@@ -46,7 +46,19 @@ _menu = """
 """
 
 
-def background_task_data(tasks):
+def background_task_data(tasks, live=None):
+    """
+    :param tasks: TaskRecord instances to format
+    :param live: optional dict of live task state, as returned by task_queue.get_task_progress(); where present
+        this overrides the (possibly coalesced) status, progress and message stored on the TaskRecord
+    """
+    if live is None:
+        live = {}
+
+    def _field(t, name):
+        state = live.get(t.id)
+        return state[name] if state is not None else getattr(t, name)
+
     data = [
         {
             "id": t.id,
@@ -56,10 +68,10 @@ def background_task_data(tasks):
             "name": t.name,
             "description": t.description,
             "start_at": t.start_date.strftime("%a %d %b %Y %H:%M:%S"),
-            "status": render_template_string(_state, state=t.status),
-            "progress": "{c}%".format(c=t.progress),
-            "message": t.message,
-            "menu": render_template_string(_menu, t=t),
+            "status": render_template_string(_state, state=_field(t, "status")),
+            "progress": "{c}%".format(c=_field(t, "progress")),
+            "message": _field(t, "message"),
+            "menu": render_template_string(_menu, t=t, state=_field(t, "status")),
         }
         for t in tasks
     ]
@@ -1265,6 +1265,9 @@ def perform_close_selections(configid):
 
     notify_convenor = bool(int(request.args.get("notify_convenor", 0)))
 
+    # in dry-run mode the task only reports what closing selections would do
+    dry_run = bool(int(request.args.get("dry_run", 0)))
+
     # reject user if not a convenor for this project class
     if not validate_is_convenor(config.project_class):
         return redirect(url)
@@ -1285,7 +1288,7 @@ def perform_close_selections(configid):
 
     # register as new background task and push to celery scheduler
     task_id = register_task(
-        'Close selections for "{proj}" {yra}-{yrb}'.format(proj=config.name, yra=year, yrb=year + 1),
+        '{dry}Close selections for "{proj}" {yra}-{yrb}'.format(dry="Dry run: " if dry_run else "", proj=config.name, yra=year, yrb=year + 1),
         owner=current_user,
         description='Close selections for "{proj}"'.format(proj=config.name),
     )
@@ -1293,6 +1296,7 @@ def perform_close_selections(configid):
     # pclass_close task posts a user message if the close logic proceeds correctly.
     close.apply_async(
         args=(task_id, config.id, current_user.id, notify_convenor),
+        kwargs={"dry_run": dry_run},
         task_id=task_id,
         link_error=close_fail.si(task_id, current_user.id),
     )
@@ -18,7 +18,7 @@ from flask_login import current_user, login_required
 from flask_security import roles_accepted
 from sqlalchemy import and_, distinct, func, or_
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import aliased
+from sqlalchemy.orm import aliased, selectinload
 
 import app.ajax as ajax
 
@@ -2080,6 +2080,7 @@ def submitter_reports_ajax(workflow_id):
         .join(StudentData, StudentData.id == SubmittingStudent.student_id)
         .join(User, User.id == StudentData.id)
         .filter(SubmitterReport.workflow_id == workflow_id)
+        .options(selectinload(SubmitterReport.record).undefer(SubmissionRecord.language_analysis))
     )
 
     S = SubmitterReportWorkflowStates
@@ -226,6 +226,8 @@ def submitters(id):
     total_submitters = len(submitters)
     page_start = (page - 1) * per_page
     paged_submitters = submitters[page_start : page_start + per_page]
+    # the submitter cards read the language analysis of every record
+    SubmissionRecord.preload_language_analysis(SubmissionRecord.owner_id.in_([s.id for s in paged_submitters]))
     allow_delete = config.submitter_lifecycle <= ProjectClassConfig.SUBMITTER_LIFECYCLE_PROJECT_ACTIVITY
 
     data = get_convenor_dashboard_data(pclass, config)
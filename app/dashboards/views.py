@@ -8,7 +8,6 @@
 # Contributors: David Seery <D.Seery@sussex.ac.uk>
 #
 
-import json
 from collections import OrderedDict
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
@@ -20,13 +19,14 @@ from bokeh.plotting import figure
 from flask import current_app, flash, jsonify, redirect, request, session, url_for
 from flask_security import current_user, login_required, roles_accepted
 from scipy.stats import gaussian_kde
-from sqlalchemy import func
+from sqlalchemy import and_, case, func, or_
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import aliased
 
 from . import dashboards
 from .forms import MarkingExportForm, ResolveSimilarityConcernForm
 from ..ajax.archive import avd_dashboard_rows
+from ..cache import cache
 from ..database import db
 from ..models import (
     DegreeProgramme,
@@ -35,6 +35,7 @@ from ..models import (
     ProjectClass,
     ProjectClassConfig,
     ResearchGroup,
+    SubmissionLanguageMetrics,
     SubmissionPeriodRecord,
     SubmissionRecord,
     SubmissionRole,
@@ -54,7 +55,7 @@ from ..models.students import StudentData
 from ..models.users import User as UserModel
 from ..shared.context.global_context import render_template_context
 from ..shared.conversions import is_integer
-from ..shared.scraped_text_store import delete_similarity_chunks, get_similarity_chunks
+from ..shared.scraped_text_store import delete_similarity_chunks_bulk, get_similarity_chunks_bulk
 from ..shared.utils import redirect_url
 from ..shared.workflow_logging import log_db_commit
 from ..task_queue import register_task
@@ -77,6 +78,7 @@ from ..tasks.llm_orchestration import (
     launch_similarity_only_pipeline,
     set_pipeline_paused,
 )
+from ..tasks.pipeline_metrics import summarise_pipeline_metrics
 from ..tasks.pipeline_tracking import get_pipeline_redis
 from ..tasks.similarity_analysis import CHUNK_SIMILARITY_THRESHOLD, CHUNK_TYPES
 from ..tools import ServerSideSQLHandler
@@ -145,6 +147,22 @@ METRIC_CONFIGS = [
 ]
 
 HISTOGRAM_THRESHOLD = 25  # minimum N to render a Bokeh histogram
+HISTOGRAM_CACHE_TIMEOUT = 86400  # lifetime (in seconds) of cached per-period and per-cycle histograms
+
+# pipeline-state counters reported by _aggregate_period_counters()
+_COUNTER_KEYS = [
+    "n_total",
+    "n_missing",
+    "n_stuck",
+    "n_ai_flagged",
+    "n_analysis_failed",
+    "n_feedback_failed",
+    "n_chunking_failed",
+    "n_stats_missing",
+    "n_grading_missing",
+    "n_feedback_missing",
+    "n_chunks_missing",
+]
 
 # State-machine progress percentages for SubmitterReport workflow states
 _SR_STATE_PCT: Dict[int, int] = {
@@ -641,120 +659,135 @@ def _marking_summary_for_user() -> Dict:
 # ---------------------------------------------------------------------------
 
 
-def _aggregate_records(records: List[SubmissionRecord], inflight_ids: set = None) -> Dict:
+def _aggregate_period_counters(period_ids: List[int], inflight_ids: set = None) -> Dict[int, Dict[str, int]]:
     """
-    Compute descriptive statistics for a collection of SubmissionRecords.
-
-    Returns a dict with per-metric stats (n, mean, std, min, max, q25, q75, iqr)
-    plus n_total, n_missing, n_complete, n_ai_flagged.
+    Count pipeline states for the SubmissionRecords (with an uploaded report) in each of *period_ids*.
+    The counts are computed in SQL from the record flag columns and the typed metrics table, so none of
+    the JSON blobs are loaded. Returns a dict keyed by period id.
     """
-    metric_values: Dict[str, List[float]] = {
-        "mattr": [],
-        "mtld": [],
-        "burstiness": [],
-        "sentence_cv": [],
-        "word_count": [],
-        "reference_count": [],
-        "page_count": [],
+    if not period_ids:
+        return {}
+
+    SR = SubmissionRecord
+    complete = SR.language_analysis_complete.is_(True)
+    not_complete = SR.language_analysis_complete.is_(False)
+
+    stuck = and_(
+        not_complete,
+        SR.language_analysis_started.is_(True),
+        SR.llm_analysis_failed.is_(False),
+        or_(SR.llm_feedback_failed.is_(None), SR.llm_feedback_failed.is_(False)),
+    )
+    if inflight_ids:
+        stuck = and_(stuck, SR.id.notin_(list(inflight_ids)))
+
+    def _count(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+    columns = {
+        "n_total": func.count(SR.id),
+        "n_missing": _count(not_complete),
+        "n_stuck": _count(stuck),
+        "n_ai_flagged": _count(and_(complete, SubmissionLanguageMetrics.ai_use_flagged.is_(True))),
+        "n_analysis_failed": _count(SR.llm_analysis_failed.is_(True)),
+        "n_feedback_failed": _count(SR.llm_feedback_failed.is_(True)),
+        "n_chunking_failed": _count(SR.llm_chunking_failed.is_(True)),
+        "n_stats_missing": _count(and_(complete, SR.stats_present.is_(False))),
+        "n_grading_missing": _count(and_(complete, SR.llm_grading_present.is_(False))),
+        "n_feedback_missing": _count(and_(complete, SR.llm_feedback_present.is_(False))),
+        "n_chunks_missing": _count(and_(complete, SR.chunks_present.is_(False), SR.llm_chunking_failed.is_(False))),
     }
-    _inflight = inflight_ids if inflight_ids is not None else set()
-    n_missing = 0
-    n_stuck = 0
-    n_ai_flagged = 0
-    n_analysis_failed = 0
-    n_feedback_failed = 0
-    n_chunking_failed = 0
-    n_stats_missing = 0
-    n_grading_missing = 0
-    n_feedback_missing = 0
-    n_chunks_missing = 0
-
-    for record in records:
-        if record.llm_analysis_failed:
-            n_analysis_failed += 1
-        if record.llm_feedback_failed:
-            n_feedback_failed += 1
-        if record.llm_chunking_failed:
-            n_chunking_failed += 1
-
-        if not record.language_analysis_complete:
-            n_missing += 1
-            if record.language_analysis_started and not record.llm_analysis_failed and not record.llm_feedback_failed and record.id not in _inflight:
-                n_stuck += 1
-            continue
 
-        # Count fine-grained missing outputs for complete records
-        if not record.stats_present:
-            n_stats_missing += 1
-        if not record.llm_grading_present:
-            n_grading_missing += 1
-        if not record.llm_feedback_present:
-            n_feedback_missing += 1
-        if not record.chunks_present and not record.llm_chunking_failed:
-            n_chunks_missing += 1
-
-        la = record.language_analysis_data
-        metrics = la.get("metrics", {})
-
-        for key in [
-            "mattr",
-            "mtld",
-            "burstiness",
-            "sentence_cv",
-            "word_count",
-            "reference_count",
-        ]:
-            val = metrics.get(key)
-            if val is not None:
-                try:
-                    metric_values[key].append(float(val))
-                except (TypeError, ValueError):
-                    pass
-
-        pc = la.get("_page_count")
-        if pc is not None:
-            try:
-                metric_values["page_count"].append(float(pc))
-            except (TypeError, ValueError):
-                pass
+    rows = (
+        db.session.query(SR.period_id, *columns.values())
+        .outerjoin(SubmissionLanguageMetrics, SubmissionLanguageMetrics.record_id == SR.id)
+        .filter(SR.period_id.in_(period_ids), SR.report_id.isnot(None))
+        .group_by(SR.period_id)
+        .all()
+    )
 
-        ai_use = record.risk_factors_data.get(record.RISK_AI_USE, {})
-        if ai_use.get("present", False):
-            n_ai_flagged += 1
+    return {row[0]: {key: int(value or 0) for key, value in zip(columns.keys(), row[1:])} for row in rows}
 
-    def _stats(values: List[float]) -> Optional[Dict]:
-        if not values:
-            return None
-        arr = np.array(values, dtype=float)
-        q25, q75 = np.percentile(arr, [25, 75])
-        return {
-            "n": len(values),
-            "mean": float(np.mean(arr)),
-            "std": float(np.std(arr, ddof=1)) if len(arr) > 1 else 0.0,
-            "min": float(np.min(arr)),
-            "max": float(np.max(arr)),
-            "q25": float(q25),
-            "q75": float(q75),
-            "iqr": float(q75 - q25),
-            "values": values,
-        }
 
-    result = {
-        "n_total": len(records),
-        "n_missing": n_missing,
-        "n_stuck": n_stuck,
-        "n_complete": len(records) - n_missing,
-        "n_ai_flagged": n_ai_flagged,
-        "n_analysis_failed": n_analysis_failed,
-        "n_feedback_failed": n_feedback_failed,
-        "n_chunking_failed": n_chunking_failed,
-        "n_stats_missing": n_stats_missing,
-        "n_grading_missing": n_grading_missing,
-        "n_feedback_missing": n_feedback_missing,
-        "n_chunks_missing": n_chunks_missing,
+def _load_period_metric_values(period_ids: List[int]) -> Dict[int, Dict]:
+    """
+    Fetch the typed metric values for completed SubmissionRecords in each of *period_ids*.
+    Returns a dict keyed by period id; each entry holds the lists of non-null values for every metric,
+    the number of records, and the most recent metrics timestamp (used as a cache version stamp).
+    """
+    if not period_ids:
+        return {}
+
+    M = SubmissionLanguageMetrics
+    keys = [cfg["key"] for cfg in METRIC_CONFIGS]
+
+    rows = (
+        db.session.query(M.period_id, M.updated_at, *[getattr(M, key) for key in keys])
+        .join(SubmissionRecord, SubmissionRecord.id == M.record_id)
+        .filter(
+            M.period_id.in_(period_ids),
+            SubmissionRecord.report_id.isnot(None),
+            SubmissionRecord.language_analysis_complete.is_(True),
+        )
+        .all()
+    )
+
+    result: Dict[int, Dict] = {}
+    for row in rows:
+        period_id, updated_at = row[0], row[1]
+        entry = result.setdefault(period_id, {"values": {key: [] for key in keys}, "n": 0, "updated_at": None})
+
+        entry["n"] += 1
+        if updated_at is not None and (entry["updated_at"] is None or updated_at > entry["updated_at"]):
+            entry["updated_at"] = updated_at
+
+        for key, value in zip(keys, row[2:]):
+            if value is not None:
+                entry["values"][key].append(float(value))
+
+    return result
+
+
+def _metric_stats(values: List[float]) -> Optional[Dict]:
+    if not values:
+        return None
+    arr = np.array(values, dtype=float)
+    q25, q75 = np.percentile(arr, [25, 75])
+    return {
+        "n": len(values),
+        "mean": float(np.mean(arr)),
+        "std": float(np.std(arr, ddof=1)) if len(arr) > 1 else 0.0,
+        "min": float(np.min(arr)),
+        "max": float(np.max(arr)),
+        "q25": float(q25),
+        "q75": float(q75),
+        "iqr": float(q75 - q25),
+        "values": values,
     }
-    for key in metric_values:
-        result[key] = _stats(metric_values[key])
+
+
+def _build_aggregate(counters: List[Optional[Dict]], metric_values: List[Optional[Dict]]) -> Dict:
+    """
+    Combine per-period counters (from _aggregate_period_counters) and metric values (from
+    _load_period_metric_values) into a single aggregation dict.
+
+    Returns a dict with per-metric stats (n, mean, std, min, max, q25, q75, iqr)
+    plus n_total, n_missing, n_complete, n_ai_flagged and the pipeline-state counters.
+    """
+    result = {key: 0 for key in _COUNTER_KEYS}
+    for item in counters:
+        if item is not None:
+            for key in _COUNTER_KEYS:
+                result[key] += item.get(key, 0)
+    result["n_complete"] = result["n_total"] - result["n_missing"]
+
+    for cfg in METRIC_CONFIGS:
+        key = cfg["key"]
+        values = []
+        for item in metric_values:
+            if item is not None:
+                values.extend(item["values"][key])
+        result[key] = _metric_stats(values)
 
     return result
 
@@ -853,7 +886,7 @@ def _build_histograms_for_agg(
     agg: Dict,
 ) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
     """
-    Given an aggregation dict (from _aggregate_records), build Bokeh
+    Given an aggregation dict (from _build_aggregate), build Bokeh
     histograms for all metrics.  Returns a dict keyed by metric key.
     """
     result = {}
@@ -874,6 +907,30 @@ def _build_histograms_for_agg(
     return result
 
 
+def _cached_histograms_for_agg(
+    agg: Dict,
+    scope: str,
+    metric_values: List[Optional[Dict]],
+) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    """
+    As _build_histograms_for_agg(), but reuse previously rendered histograms for the same *scope*
+    (a period or a cycle) while its metric data are unchanged. The cache key includes the number of
+    records and the latest metrics timestamp, so any new or refreshed analysis invalidates it.
+    """
+    n = sum(item["n"] for item in metric_values if item is not None)
+    stamps = [item["updated_at"] for item in metric_values if item is not None and item["updated_at"] is not None]
+    latest = max(stamps).isoformat() if stamps else "none"
+
+    key = f"ai_dashboard_histograms:{scope}:{n}:{latest}"
+
+    histograms = cache.get(key)
+    if histograms is None:
+        histograms = _build_histograms_for_agg(agg)
+        cache.set(key, histograms, timeout=HISTOGRAM_CACHE_TIMEOUT)
+
+    return histograms
+
+
 # ---------------------------------------------------------------------------
 # Dashboard summary stats (for landing page card)
 # ---------------------------------------------------------------------------
@@ -1058,33 +1115,60 @@ def ai_dashboard():
     _total_records = sum((j.completed_count or 0) + (j.failed_count or 0) for j in recent_completed)
     avg_seconds_per_record: Optional[float] = _total_seconds / _total_records if _total_records > 0 else None
 
+    # ---- per-stage pipeline metrics for the selected tenant ----------------
+    pipeline_metrics = _load_pipeline_metrics([selected_tenant_id], PIPELINE_METRICS_PANEL_HOURS) if _can_view_pipeline_metrics() else None
+
     # ---- build per-cycle sections ------------------------------------------
-    # Pre-build a lookup: pclass_id → ProjectClass
-    pclass_map = {p.id for p in accessible_pclasses}
     selected_pclasses = [p for p in accessible_pclasses if p.id in selected_pclass_ids]
 
+    # Load configurations and periods for every selected cycle up-front, rather than
+    # issuing one query per (year, project class) combination
+    configs: List[ProjectClassConfig] = (
+        db.session.query(ProjectClassConfig)
+        .filter(
+            ProjectClassConfig.pclass_id.in_(selected_pclass_ids),
+            ProjectClassConfig.year.in_(sorted_years),
+        )
+        .all()
+    )
+    config_map = {(c.pclass_id, c.year): c for c in configs}
+
+    periods_by_config: Dict[int, List[SubmissionPeriodRecord]] = {}
+    if configs:
+        all_periods: List[SubmissionPeriodRecord] = (
+            db.session.query(SubmissionPeriodRecord)
+            .filter(SubmissionPeriodRecord.config_id.in_([c.id for c in configs]))
+            .order_by(SubmissionPeriodRecord.submission_period)
+            .all()
+        )
+        for period in all_periods:
+            periods_by_config.setdefault(period.config_id, []).append(period)
+
+    # Aggregate counters in SQL, and fetch typed metric values, for all periods at once
+    all_period_ids = [p.id for periods in periods_by_config.values() for p in periods]
+    period_counters = _aggregate_period_counters(all_period_ids, inflight_ids)
+    period_values = _load_period_metric_values(all_period_ids)
+
     sections = []
 
     for year in sorted_years:
-        cycle_records = []  # accumulate all records in this cycle
         period_subsections = []
 
         for pclass in selected_pclasses:
-            # Find the ProjectClassConfig for this pclass and year
-            config: Optional[ProjectClassConfig] = db.session.query(ProjectClassConfig).filter_by(pclass_id=pclass.id, year=year).first()
+            config: Optional[ProjectClassConfig] = config_map.get((pclass.id, year))
             if config is None:
                 continue
 
-            periods: List[SubmissionPeriodRecord] = config.periods.order_by(SubmissionPeriodRecord.submission_period).all()
+            can_launch = _can_launch_orchestration(pclass)
 
-            for period in periods:
-                records: List[SubmissionRecord] = period.submissions.filter(SubmissionRecord.report_id.isnot(None)).all()
-                if not records:
+            for period in periods_by_config.get(config.id, []):
+                counters = period_counters.get(period.id)
+                if counters is None or counters["n_total"] == 0:
                     continue
 
-                agg = _aggregate_records(records, inflight_ids)
-                histograms = _build_histograms_for_agg(agg)
-                can_launch = _can_launch_orchestration(pclass)
+                values = period_values.get(period.id)
+                agg = _build_aggregate([counters], [values])
+                histograms = _cached_histograms_for_agg(agg, f"period:{period.id}", [values])
 
                 period_subsections.append(
                     {
@@ -1096,14 +1180,21 @@ def ai_dashboard():
                         "can_launch": can_launch,
                     }
                 )
-                cycle_records.extend(records)
 
         if not period_subsections:
             continue
 
         # Cycle-level aggregate
-        cycle_agg = _aggregate_records(cycle_records, inflight_ids)
-        cycle_histograms = _build_histograms_for_agg(cycle_agg)
+        cycle_period_ids = [sub["period"].id for sub in period_subsections]
+        cycle_counters = [period_counters.get(pid) for pid in cycle_period_ids]
+        cycle_values = [period_values.get(pid) for pid in cycle_period_ids]
+
+        cycle_agg = _build_aggregate(cycle_counters, cycle_values)
+        cycle_histograms = _cached_histograms_for_agg(
+            cycle_agg,
+            f"cycle:{year}:{','.join(str(pid) for pid in sorted(cycle_period_ids))}",
+            cycle_values,
+        )
         can_launch_cycle = current_user.has_role("root") or current_user.has_role("admin")
 
         sections.append(
@@ -1130,6 +1221,8 @@ def ai_dashboard():
         active_jobs=active_jobs,
         pipeline_paused=pipeline_paused,
         avg_seconds_per_record=avg_seconds_per_record,
+        pipeline_metrics=pipeline_metrics,
+        pipeline_metrics_hours=PIPELINE_METRICS_PANEL_HOURS,
         metric_configs=METRIC_CONFIGS,
         histogram_threshold=HISTOGRAM_THRESHOLD,
         can_launch_global=current_user.has_role("root") or current_user.has_role("admin"),
@@ -1673,6 +1766,76 @@ def active_jobs_status():
     return jsonify({"just_finished": finished_count > 0, "active_count": active_count, "jobs": jobs_data})
 
 
+# ---------------------------------------------------------------------------
+# Per-stage pipeline metrics
+# ---------------------------------------------------------------------------
+
+# window (hours) summarised by the pipeline metrics panel on the AI dashboard
+PIPELINE_METRICS_PANEL_HOURS = 168
+
+# longest window accepted by the JSON endpoint; older hourly buckets will usually have expired
+PIPELINE_METRICS_MAX_HOURS = 24 * 90
+
+
+def _can_view_pipeline_metrics() -> bool:
+    return current_user.has_role("root") or current_user.has_role("admin") or current_user.has_role("data_dashboard_AI")
+
+
+def _load_pipeline_metrics(tenant_ids: Optional[List[int]], hours: int, **kwargs) -> Optional[dict]:
+    """Summarise pipeline metrics, or return None if Redis is unavailable."""
+    try:
+        return summarise_pipeline_metrics(get_pipeline_redis(), hours=hours, tenant_ids=tenant_ids, **kwargs)
+    except Exception as exc:
+        current_app.logger.warning(f"pipeline metrics: could not read from Redis: {exc}")
+        return None
+
+
+@dashboards.route("/ai/pipeline_metrics")
+@login_required
+@roles_accepted("root", "admin", "data_dashboard_AI")
+def pipeline_metrics():
+    """
+    Return per-stage pipeline metrics as JSON.
+
+    Query parameters (all optional):
+      ``hours``      window to summarise, ending now (default 168)
+      ``tenant_id``  restrict to these tenants (repeatable); defaults to all accessible tenants
+      ``stage``      restrict to one pipeline stage
+      ``model``      restrict to one LLM model
+      ``by_tenant``  ``0`` to combine the series for different tenants (default ``1``)
+    """
+    try:
+        hours = min(max(int(request.args.get("hours", PIPELINE_METRICS_PANEL_HOURS)), 1), PIPELINE_METRICS_MAX_HOURS)
+    except (ValueError, TypeError):
+        hours = PIPELINE_METRICS_PANEL_HOURS
+
+    accessible_tenant_ids = {t.id for t in _get_accessible_tenants()}
+    try:
+        requested = {int(x) for x in request.args.getlist("tenant_id")}
+    except (ValueError, TypeError):
+        requested = set()
+
+    if requested:
+        tenant_ids = sorted(requested & accessible_tenant_ids)
+    elif current_user.has_role("root"):
+        # root sees every tenant, including records whose tenant could not be determined
+        tenant_ids = None
+    else:
+        tenant_ids = sorted(accessible_tenant_ids)
+
+    result = _load_pipeline_metrics(
+        tenant_ids,
+        hours,
+        stage=request.args.get("stage") or None,
+        model=request.args.get("model") or None,
+        by_tenant=request.args.get("by_tenant", "1") != "0",
+    )
+    if result is None:
+        return jsonify({"error": "pipeline metrics are unavailable"}), 503
+
+    return jsonify(result)
+
+
 # ---------------------------------------------------------------------------
 # Pipeline pause / resume routes
 # ---------------------------------------------------------------------------
@@ -1767,6 +1930,33 @@ def resume_job(uuid: str):
     return redirect(redirect_url())
 
 
+@dashboards.route("/ai/set_job_priority/<uuid>/<int:priority>")
+@roles_accepted("admin", "root")
+def set_job_priority(uuid: str, priority: int):
+    """Change the scheduling priority of an active LLMOrchestrationJob (root/admin only)."""
+    job: LLMOrchestrationJob = db.session.query(LLMOrchestrationJob).filter_by(uuid=uuid).first_or_404()
+    if priority not in LLMOrchestrationJob.ALL_PRIORITIES:
+        flash(f"Unknown job priority {priority}.", "error")
+        return redirect(redirect_url())
+    if not job.is_active:
+        flash("This job has already finished.", "info")
+        return redirect(redirect_url())
+    job.set_priority(priority)
+    try:
+        db.session.commit()
+    except SQLAlchemyError as exc:
+        db.session.rollback()
+        current_app.logger.exception("set_job_priority: SQLAlchemyError", exc_info=exc)
+        flash("Could not change the job priority — please try again.", "error")
+        return redirect(redirect_url())
+    try:
+        _dispatch_global_coordinator()
+    except Exception as exc:
+        current_app.logger.warning(f"set_job_priority: could not dispatch coordinator after priority change: {exc}")
+    flash(f"Job priority set to {job.priority_label}.", "success")
+    return redirect(redirect_url())
+
+
 @dashboards.route("/ai/cancel_job/<uuid>")
 @roles_accepted("faculty", "admin", "root")
 def cancel_job(uuid: str):
@@ -3066,14 +3256,14 @@ def _recompute_similarity_flag(record_id: int) -> None:
     record = db.session.get(SubmissionRecord, record_id)
     if record is None:
         return
-    rf = record.risk_factors_data or {}
+    rf = record.risk_factors_for_update() or {}
     sim = rf.get(SubmissionRecord.RISK_SIMILARITY_FLAGGED)
     if open_count == 0 and sim is not None and sim.get("present", False):
         sim["resolved"] = True
         sim["resolved_by_id"] = current_user.id
         sim["resolved_at"] = datetime.now().isoformat()
         rf[SubmissionRecord.RISK_SIMILARITY_FLAGGED] = sim
-        record.risk_factors = json.dumps(rf)
+        record.set_risk_factors_data(rf)
 
 
 # ---------------------------------------------------------------------------
@@ -3314,8 +3504,9 @@ def similarity_concern_detail(concern_id: int):
     record_b = concern.record_b
 
     # Load chunk texts from MongoDB
-    chunks_a = get_similarity_chunks(concern.record_a_id) or {}
-    chunks_b = get_similarity_chunks(concern.record_b_id) or {}
+    chunks = get_similarity_chunks_bulk([concern.record_a_id, concern.record_b_id]) or {}
+    chunks_a = chunks.get(concern.record_a_id, {})
+    chunks_b = chunks.get(concern.record_b_id, {})
     chunk_text_a = chunks_a.get("sections", {}).get(concern.chunk_type, {}).get("text")
     chunk_text_b = chunks_b.get("sections", {}).get(concern.chunk_type, {}).get("text")
 
@@ -3512,8 +3703,7 @@ def resubmit_chunking_errors_global():
         flash("An error occurred while clearing chunking error flags.", "error")
         return redirect(url_for("dashboards.similarity_dashboard"))
 
-    for rid in record_ids:
-        delete_similarity_chunks(rid)
+    delete_similarity_chunks_bulk(record_ids)
 
     try:
         _dispatch_global_coordinator()
@@ -3607,8 +3797,7 @@ def resubmit_all_global():
         flash("An error occurred while resetting similarity state.", "error")
         return redirect(url_for("dashboards.similarity_dashboard"))
 
-    for rid in record_ids:
-        delete_similarity_chunks(rid)
+    delete_similarity_chunks_bulk(record_ids)
 
     try:
         _dispatch_global_coordinator()
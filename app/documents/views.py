@@ -12,7 +12,7 @@ from datetime import datetime, timedelta
 from functools import partial
 
 import requests as http_requests
-from celery import chain, chord
+from celery import chain
 from flask import (
     Response,
     abort,
@@ -314,8 +314,9 @@ def clear_language_analysis(sid):
     if not is_deletable(record, message=True):
         return redirect(redirect_url())
 
-    # Load the relationship before mutating the record to prevent autoflush during lazy-load.
+    # Load the relationships before mutating the record to prevent autoflush during lazy-load.
     existing_report = record.processed_report
+    existing_metrics = record.language_metrics
 
     record.language_analysis = None
     record.language_analysis_started = False
@@ -325,6 +326,8 @@ def clear_language_analysis(sid):
     record.llm_feedback_failed = None  # None = feedback not yet attempted on this run
     record.llm_feedback_failure_reason = None
     record.risk_factors = None
+    if existing_metrics is not None:
+        record.language_metrics = None
 
     # Clear the processed report since it embeds LLM outputs; it will be regenerated
     # automatically after analysis completes.
@@ -881,9 +884,7 @@ def pull_all_reports_from_canvas(pid):
     # set up asynchronous task to pull this report
     celery = current_app.extensions["celery"]
 
-    process = celery.tasks["app.tasks.canvas.pull_report"]
-    finalize_batch = celery.tasks["app.tasks.canvas.pull_report_finalize_batch"]
-    error = celery.tasks["app.tasks.canvas.pull_report_error"]
+    pull_batch = celery.tasks["app.tasks.canvas.pull_reports_batch"]
     summary = celery.tasks["app.tasks.canvas.pull_all_reports_summary"]
 
     available = (
@@ -898,14 +899,9 @@ def pull_all_reports_from_canvas(pid):
         .all()
     )
 
-    work = chord(
-        [
-            chain(
-                process.s(record.id, None),
-                finalize_batch.s(record.id, None).on_error(error.si(record.id, current_user.id)),
-            )
-            for record in available
-        ],
+    # the submission list is read once and attachments are downloaded concurrently within a single task
+    work = chain(
+        pull_batch.si(period.id, [record.id for record in available], current_user.id),
         summary.s(current_user.id, period.id),
     )
     work.apply_async()
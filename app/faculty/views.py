@@ -16,6 +16,7 @@ from flask_security import current_user, roles_accepted, roles_required
 from flask_wtf import FlaskForm
 from sqlalchemy import and_, or_
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import undefer
 from werkzeug.local import LocalProxy
 from wtforms import DecimalField, SubmitField, TextAreaField
 from wtforms.validators import InputRequired, NumberRange
@@ -2070,7 +2071,7 @@ def my_students():
         )
 
     total_records = base_q.count()
-    records = base_q.offset((page - 1) * per_page).limit(per_page).all()
+    records = base_q.options(undefer(SubmissionRecord.language_analysis)).offset((page - 1) * per_page).limit(per_page).all()
     total_pages = max(1, (total_records + per_page - 1) // per_page)
     page_start_idx = (page - 1) * per_page + 1
     page_end_idx = min(page * per_page, total_records)
@@ -17,3 +17,14 @@ CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL")
 
 # default timeout = 86400 seconds = 24 hours
 CACHE_DEFAULT_TIMEOUT = 86400
+
+# maximum time (in seconds) for which a live-notification long-poll request blocks waiting for new notifications
+NOTIFICATIONS_LONG_POLL_TIMEOUT = int(os.environ.get("NOTIFICATIONS_LONG_POLL_TIMEOUT", 15))
+
+# each blocked long-poll request holds a web server thread, so only this many may block at once in each web server
+# process; it must be comfortably smaller than the thread count (WEB_SERVER_THREADS, or GUNICORN_THREADS under gunicorn)
+# so that open browser tabs can never starve ordinary page requests
+NOTIFICATIONS_MAX_LONG_POLLS = int(os.environ.get("NOTIFICATIONS_MAX_LONG_POLLS", 4))
+
+# interval (in seconds) at which a browser tab polls instead when no long-poll slot is free
+NOTIFICATIONS_SHORT_POLL_INTERVAL = int(os.environ.get("NOTIFICATIONS_SHORT_POLL_INTERVAL", 5))
@@ -24,3 +24,11 @@ CELERY = {
     "chord_unlock_max_retries": 100,
     "result_expires": 86400,
 }
+
+# minimum interval (in seconds) between write-backs of intermediate task progress from Redis to the TaskRecord table;
+# final task states are always written back immediately. Set to 0 to write back on every progress update
+TASK_PROGRESS_WRITEBACK_INTERVAL = int(os.environ.get("TASK_PROGRESS_WRITEBACK_INTERVAL", 30))
+
+# perform academic-year rollover using set-based UPDATE/DELETE statements within each phase, rather than dispatching
+# one Celery task per selector, submitter, enrolment record or project description
+ROLLOVER_SET_BASED = bool(int(os.environ.get("ROLLOVER_SET_BASED", 1)))
@@ -27,3 +27,7 @@ DEFAULT_SHOW_POPULARITY = True
 DEFAULT_DONT_CLASH_PRESENTATIONS = True
 
 DEFAULT_USE_ACADEMIC_TITLE = True
+
+# number of assets handled by each generate_thumbnails_batch task during a thumbnail backfill
+
+THUMBNAIL_BACKFILL_BATCH_SIZE = 25
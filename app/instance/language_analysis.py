@@ -13,3 +13,8 @@ import os
 LANGUAGE_ANALYSIS_MONGO_URL = os.environ.get("LANGUAGE_ANALYSIS_MONGO_URL")
 LANGUAGE_ANALYSIS_DATABASE = os.environ.get("LANGUAGE_ANALYSIS_DATABASE")
 LANGUAGE_ANALYSIS_SCRAPED_TEXT_COLLECTION = os.environ.get("LANGUAGE_ANALYSIS_SCRAPED_TEXT_COLLECTION")
+
+# PDF text extraction: documents longer than one page range are split into ranges of this many pages, which are
+# extracted by up to PDF_EXTRACTION_WORKERS worker processes (1 = extract in the Celery worker process itself)
+PDF_EXTRACTION_WORKERS = int(os.environ.get("PDF_EXTRACTION_WORKERS", 4))
+PDF_EXTRACTION_PAGES_PER_RANGE = int(os.environ.get("PDF_EXTRACTION_PAGES_PER_RANGE", 16))
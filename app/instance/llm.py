@@ -8,11 +8,29 @@
 # Contributors: David Seery <D.Seery@sussex.ac.uk>
 #
 
+import json
 import os
 
 # Base URL for the Ollama REST API
 OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
 
+# Optional pool of Ollama servers to spread requests across, as a comma-separated list of URLs, each optionally
+# followed by "=N" to limit it to N concurrent requests, e.g. "http://gpu1:11434=2,http://gpu2:11434=1".
+# If empty, all requests go to OLLAMA_BASE_URL.  See app/shared/llm_endpoints.py.
+# OLLAMA_BATCH_SIZE should normally equal the total capacity of the pool.
+OLLAMA_ENDPOINTS = os.environ.get("OLLAMA_ENDPOINTS", "")
+
+# Concurrency limit for endpoints that do not specify one (0 = unlimited).
+OLLAMA_ENDPOINT_MAX_CONCURRENCY = int(os.environ.get("OLLAMA_ENDPOINT_MAX_CONCURRENCY", "0"))
+
+# Interval (seconds) between health checks of each endpoint, and the time for which an endpoint is avoided
+# after a network error, timeout, or server error.
+OLLAMA_HEALTH_CHECK_SECONDS = int(os.environ.get("OLLAMA_HEALTH_CHECK_SECONDS", "30"))
+OLLAMA_ENDPOINT_COOLDOWN_SECONDS = int(os.environ.get("OLLAMA_ENDPOINT_COOLDOWN_SECONDS", "60"))
+
+# Maximum time (seconds) a request waits for a free endpoint slot before it is sent to the least-loaded endpoint.
+OLLAMA_ENDPOINT_WAIT_SECONDS = int(os.environ.get("OLLAMA_ENDPOINT_WAIT_SECONDS", "600"))
+
 # Model identifier to use for language analysis LLM submission
 # OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama3.1:8b")
 # OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "qwen2.5:32b")
@@ -26,6 +44,23 @@ OLLAMA_CONTEXT_SIZE = int(os.environ.get("OLLAMA_CONTEXT_SIZE", "18432"))
 # For running on a desktop-scale Mac Studio, we can probably only process 1 at once.
 OLLAMA_BATCH_SIZE = int(os.environ.get("OLLAMA_BATCH_SIZE", "1"))
 
+# Extra slots, above OLLAMA_BATCH_SIZE, that only interactive (single-record) jobs may use.
+# Set to 0 if the LLM server cannot accept any requests beyond OLLAMA_BATCH_SIZE.
+LLM_FAST_LANE_SLOTS = int(os.environ.get("LLM_FAST_LANE_SLOTS", "1"))
+
+# Upper limit on the estimated content tokens of all in-flight bulk records (0 = no limit; admit by count only).
+# Records that do not fit wait, and smaller records from other jobs may overtake them for at most
+# LLM_ADMISSION_MAX_BYPASS_SECONDS.
+LLM_INFLIGHT_TOKEN_BUDGET = int(os.environ.get("LLM_INFLIGHT_TOKEN_BUDGET", "0"))
+LLM_ADMISSION_MAX_BYPASS_SECONDS = int(os.environ.get("LLM_ADMISSION_MAX_BYPASS_SECONDS", "900"))
+
+# Weighted fair sharing between tenants and job types (app/tasks/llm_scheduling.py).  Weights are relative;
+# unlisted tenants have weight 1, and unlisted workloads use the defaults in llm_scheduling.py.  Workloads are "interactive", "similarity", or a job scope
+# ("period", "pclass", "cycle", "global").  Dispatched cost is forgotten with the given half-life (seconds).
+LLM_SCHEDULER_TENANT_WEIGHTS = json.loads(os.environ.get("LLM_SCHEDULER_TENANT_WEIGHTS", "{}"))
+LLM_SCHEDULER_WORKLOAD_WEIGHTS = json.loads(os.environ.get("LLM_SCHEDULER_WORKLOAD_WEIGHTS", "{}"))
+LLM_FAIR_SHARE_HALF_LIFE = int(os.environ.get("LLM_FAIR_SHARE_HALF_LIFE", "3600"))
+
 # TCP connect timeout (seconds) when opening a connection to the Ollama server.
 OLLAMA_CONNECT_TIMEOUT = int(os.environ.get("OLLAMA_CONNECT_TIMEOUT", "30"))
 
@@ -41,3 +76,6 @@ OLLAMA_STREAMING_READ_TIMEOUT = int(os.environ.get("OLLAMA_STREAMING_READ_TIMEOU
 # With _LLM_RETRY_ATTEMPTS=3 the worst-case total is 3× this value plus
 # _LLM_RETRY_DELAY between attempts.  Default: 1800 s (30 min).
 OLLAMA_MAX_REQUEST_SECONDS = int(os.environ.get("OLLAMA_MAX_REQUEST_SECONDS", "1800"))
+
+# Retention (days) of the hourly per-stage pipeline metrics held in Redis (app/tasks/pipeline_metrics.py).
+PIPELINE_METRICS_RETENTION_DAYS = int(os.environ.get("PIPELINE_METRICS_RETENTION_DAYS", "35"))
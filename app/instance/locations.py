@@ -12,3 +12,17 @@ import os
 
 INSTANCE_FOLDER = os.environ.get("INSTANCE_FOLDER")
 SCRATCH_FOLDER = os.environ.get("SCRATCH_FOLDER")
+
+# cache of decrypted object-store assets served to the browser by nginx via X-Accel-Redirect;
+# DOWNLOAD_CACHE_FOLDER must be readable by nginx and mapped onto DOWNLOAD_ACCEL_REDIRECT_PREFIX by an 'internal' location.
+# If either is unset, decrypted downloads are served from a scratch file by the web application itself
+DOWNLOAD_CACHE_FOLDER = os.environ.get("DOWNLOAD_CACHE_FOLDER")
+DOWNLOAD_ACCEL_REDIRECT_PREFIX = os.environ.get("DOWNLOAD_ACCEL_REDIRECT_PREFIX")
+DOWNLOAD_CACHE_TTL = int(os.environ.get("DOWNLOAD_CACHE_TTL", 600))
+
+# local folder of font files (e.g. Inter-Regular.ttf, LibreBaskerville-Italic.ttf) used when rendering feedback PDFs;
+# families not found here fall back to fonts installed on the system. The default is the folder populated by
+# docker-celery-worker/fetch_feedback_fonts.py when the worker image is built. Remote resources referenced by feedback
+# templates are only fetched if FEEDBACK_PDF_ALLOW_NETWORK is set
+FEEDBACK_PDF_FONT_FOLDER = os.environ.get("FEEDBACK_PDF_FONT_FOLDER", "/mpsproject/fonts")
+FEEDBACK_PDF_ALLOW_NETWORK = int(os.environ.get("FEEDBACK_PDF_ALLOW_NETWORK", 0))
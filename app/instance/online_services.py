@@ -12,3 +12,9 @@ import os
 # Box OAuth2 credentials
 BOX_CLIENT_ID = os.environ.get("BOX_CLIENT_ID")
 BOX_CLIENT_SECRET = os.environ.get("BOX_CLIENT_SECRET")
+
+# Canvas synchronisation: maximum concurrent requests per task, page size requested from Canvas, and
+# lifetime (in seconds) of the stored ETags/fingerprints used to skip unchanged modules
+CANVAS_SYNC_MAX_WORKERS = int(os.environ.get("CANVAS_SYNC_MAX_WORKERS", 4))
+CANVAS_SYNC_PER_PAGE = int(os.environ.get("CANVAS_SYNC_PER_PAGE", 100))
+CANVAS_SYNC_STATE_TTL = int(os.environ.get("CANVAS_SYNC_STATE_TTL", 86400))
@@ -11,3 +11,7 @@
 import os
 
 ORCHESTRATION_REDIS_URL = os.environ.get("ORCHESTRATION_REDIS_URL")
+
+# feedback PDF generation: number of concurrent rendering tasks, and the number of reports rendered by each task
+PDF_BATCH_SIZE = int(os.environ.get("PDF_BATCH_SIZE", 5))
+PDF_RECORDS_PER_TASK = int(os.environ.get("PDF_RECORDS_PER_TASK", 10))
@@ -45,6 +45,10 @@ def register_user(**kwargs):
     # pop ask_confirm value before kwargs is presented to create_user()
     ask_confirm = kwargs.pop("ask_confirm", False)
 
+    # if commit is False, the new User is flushed but not committed, so that callers can create many
+    # accounts inside a single transaction
+    commit = kwargs.pop("commit", True)
+
     # generate a User record and commit it
     kwargs["active"] = True
     roles = kwargs.get("roles", [])
@@ -57,7 +61,9 @@ def register_user(**kwargs):
     user = User(**kwargs)
 
     db.session.add(user)
-    log_db_commit("Register new user account", user=user)
+    if not commit:
+        db.session.flush()
+    log_db_commit("Register new user account", user=user, _commit=commit)
 
     # send confirmation email if we have been asked to
     if ask_confirm:
@@ -77,6 +83,6 @@ def register_user(**kwargs):
 
     else:
         user.confirmed_at = datetime.now()
-        log_db_commit("Confirm new user account registration", user=user)
+        log_db_commit("Confirm new user account registration", user=user, _commit=commit)
 
     return user
@@ -14,7 +14,7 @@ from functools import partial
 from pathlib import Path
 from typing import List
 
-from celery import chain, group
+from celery import chain
 from flask import current_app, flash, redirect, request, session, url_for
 from flask_security import current_user, roles_accepted, roles_required
 from flask_security.confirmable import generate_confirmation_link
@@ -1778,12 +1778,11 @@ def import_student_batch(batch_id):
     final = celery.tasks["app.tasks.user_launch.mark_user_task_ended"]
     error = celery.tasks["app.tasks.user_launch.mark_user_task_failed"]
 
-    import_batch_item = celery.tasks["app.tasks.batch_create.import_student_batch_item"]
+    import_batch = celery.tasks["app.tasks.batch_create.import_student_batch"]
     import_finalize = celery.tasks["app.tasks.batch_create.import_student_finalize"]
     import_error = celery.tasks["app.tasks.batch_create.import_student_error"]
     backup = celery.tasks["app.tasks.backup.backup"]
 
-    work_group = group(import_batch_item.si(item.id, current_user.id) for item in record.items)
     work = chain(
         backup.si(
             current_user.id,
@@ -1791,7 +1790,7 @@ def import_student_batch(batch_id):
             tag="batch_import",
             description='Rollback snapshot for student account creation "{name}"'.format(name=record.name),
         ),
-        work_group,
+        import_batch.si(record.id, current_user.id),
         import_finalize.s(record.id, current_user.id),
     ).on_error(import_error.si(current_user.id))
 
@@ -1816,17 +1815,16 @@ def import_faculty_batch(batch_id):
     final = celery.tasks["app.tasks.user_launch.mark_user_task_ended"]
     error = celery.tasks["app.tasks.user_launch.mark_user_task_failed"]
 
-    import_batch_item = celery.tasks.get("app.tasks.batch_create.import_faculty_batch_item")
+    import_batch = celery.tasks.get("app.tasks.batch_create.import_faculty_batch")
     import_finalize = celery.tasks.get("app.tasks.batch_create.import_faculty_finalize")
     import_error = celery.tasks.get("app.tasks.batch_create.import_faculty_error")
 
-    if import_batch_item is None or import_finalize is None or import_error is None:
+    if import_batch is None or import_finalize is None or import_error is None:
         flash("The faculty batch import tasks are not yet implemented.", "error")
         return redirect(redirect_url())
 
     backup = celery.tasks["app.tasks.backup.backup"]
 
-    work_group = group(import_batch_item.si(item.id, current_user.id) for item in record.items)
     work = chain(
         backup.si(
             current_user.id,
@@ -1834,7 +1832,7 @@ def import_faculty_batch(batch_id):
             tag="faculty_batch_import",
             description='Rollback snapshot for faculty account creation "{name}"'.format(name=record.name),
         ),
-        work_group,
+        import_batch.si(record.id, current_user.id),
         import_finalize.s(record.id, current_user.id),
     ).on_error(import_error.si(current_user.id))
 
@@ -99,3 +99,39 @@ class TenantAICalibration(db.Model):
             sibling_ids = set(json.loads(sibling.included_pclass_ids or "[]"))
             conflicts.extend(my_ids & sibling_ids)
         return conflicts
+
+
+class AICalibrationStatistics(db.Model):
+    """
+    Sufficient statistics for fitting a TenantAICalibration, for the completed SubmissionRecords belonging to one
+    ProjectClass in one academic year: the number of complete feature vectors, their sum, and the sum of their
+    outer products. A calibration for any selection of project classes and years is assembled by adding these
+    together (see app/shared/ai_calibration.py compute_calibration()), without revisiting the records.
+    Maintained by app/shared/ai_calibration_statistics.py.
+    """
+
+    __tablename__ = "ai_calibration_statistics"
+
+    pclass_id = db.Column(db.Integer(), db.ForeignKey("project_classes.id"), primary_key=True)
+    year = db.Column(db.Integer(), primary_key=True)
+
+    # "lexical" or "full"; see app/shared/ai_calibration.py for the features in each set
+    feature_set = db.Column(db.String(32, collation="utf8_bin"), primary_key=True)
+
+    n_samples = db.Column(db.Integer(), nullable=False, default=0)
+
+    # JSON list: sum of the feature vectors
+    sum_x = db.Column(db.Text(collation="utf8_bin"), nullable=False)
+
+    # JSON row-major matrix: sum of the outer products of the feature vectors
+    sum_xx = db.Column(db.Text(collation="utf8_bin"), nullable=False)
+
+    updated_at = db.Column(db.DateTime())
+
+    @property
+    def sum_x_data(self) -> list:
+        return json.loads(self.sum_x)
+
+    @property
+    def sum_xx_data(self) -> list:
+        return json.loads(self.sum_xx)
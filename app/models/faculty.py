@@ -1352,6 +1352,61 @@ def _EnrollmentRecord_delete_handler(mapper, connection, target):
         _delete_EnrollmentRecord_cache(target.owner_id)
 
 
+class FacultyWorkload(db.Model):
+    """
+    Precomputed CATS workload for one faculty member in one ProjectClassConfig, i.e. for one project class in one
+    year. Holds the same totals as FacultyData.CATS_assignment(), together with the number of assignments in
+    each role, so that workload reports can read a single indexed table rather than walking every faculty
+    member's SubmissionRole records.
+    Maintained incrementally by app/shared/workload.py whenever SubmissionRole, SubmissionRecord or
+    ProjectClassConfig records change, and rebuilt in full by the app.tasks.workload.recompute_faculty_workload task
+    """
+
+    __tablename__ = "faculty_workload"
+
+    # faculty member
+    faculty_id = db.Column(db.Integer(), db.ForeignKey("faculty_data.id"), primary_key=True)
+    faculty = db.relationship("FacultyData", foreign_keys=[faculty_id], uselist=False)
+
+    # ProjectClassConfig of the submitters to which these assignments belong
+    config_id = db.Column(db.Integer(), db.ForeignKey("project_class_config.id"), primary_key=True)
+    config = db.relationship("ProjectClassConfig", foreign_keys=[config_id], uselist=False)
+
+    # denormalized copies of ProjectClassConfig.pclass_id and ProjectClassConfig.year, so that reports can select
+    # by project class or by year using an index on this table
+    pclass_id = db.Column(db.Integer(), db.ForeignKey("project_classes.id"), index=True)
+    year = db.Column(db.Integer(), index=True)
+
+    # CATS totals for each role
+    supervising_CATS = db.Column(db.Integer(), nullable=False, default=0)
+    marking_CATS = db.Column(db.Integer(), nullable=False, default=0)
+    moderation_CATS = db.Column(db.Integer(), nullable=False, default=0)
+    presentation_CATS = db.Column(db.Integer(), nullable=False, default=0)
+
+    # number of assignments in each role
+    num_supervising = db.Column(db.Integer(), nullable=False, default=0)
+    num_marking = db.Column(db.Integer(), nullable=False, default=0)
+    num_moderating = db.Column(db.Integer(), nullable=False, default=0)
+    num_presentations = db.Column(db.Integer(), nullable=False, default=0)
+
+    # time of last refresh
+    updated_at = db.Column(db.DateTime())
+
+    __table_args__ = (db.Index("ix_faculty_workload_faculty_id_year", "faculty_id", "year"),)
+
+    @property
+    def CATS(self):
+        """
+        Return (supervising CATS, marking CATS, moderation CATS, presentation CATS), matching the tuple
+        returned by FacultyData.CATS_assignment()
+        """
+        return self.supervising_CATS, self.marking_CATS, self.moderation_CATS, self.presentation_CATS
+
+    @property
+    def total_CATS(self):
+        return self.supervising_CATS + self.marking_CATS + self.moderation_CATS + self.presentation_CATS
+
+
 class Supervisor(db.Model, ColouredLabelMixin, EditingMetadataMixin):
     """
     Model a supervision team member
@@ -74,6 +74,23 @@ class LLMOrchestrationJob(db.Model):
 
     ALL_SCOPES = [SCOPE_PERIOD, SCOPE_PCLASS, SCOPE_CYCLE, SCOPE_GLOBAL]
 
+    # ------------------------------------------------------------------
+    # Priority constants – the coordinator serves higher priorities first
+    # (see app/tasks/llm_scheduling.py)
+    # ------------------------------------------------------------------
+
+    PRIORITY_BULK = 0  # cycle-wide and global re-runs
+    PRIORITY_NORMAL = 10  # period and project-class submissions
+    PRIORITY_INTERACTIVE = 20  # single records submitted by a user who is waiting for the result
+
+    ALL_PRIORITIES = [PRIORITY_BULK, PRIORITY_NORMAL, PRIORITY_INTERACTIVE]
+
+    PRIORITY_LABELS = {
+        PRIORITY_BULK: "Bulk",
+        PRIORITY_NORMAL: "Normal",
+        PRIORITY_INTERACTIVE: "Interactive",
+    }
+
     # ------------------------------------------------------------------
     # Log-size caps
     # ------------------------------------------------------------------
@@ -128,8 +145,16 @@ class LLMOrchestrationJob(db.Model):
     # pipeline steps are skipped.  Records must already have language_analysis_complete=True.
     similarity_only = db.Column(db.Boolean(), nullable=False, default=False)
 
+    # Scheduling priority; one of ALL_PRIORITIES.
+    priority = db.Column(db.Integer(), nullable=False, default=PRIORITY_NORMAL, index=True)
+
+    # Tenant that owns every record in this job, used for fair sharing between tenants.
+    # NULL for jobs whose records span several tenants.
+    tenant_id = db.Column(db.Integer(), db.ForeignKey("tenants.id"), nullable=True, index=True)
+    tenant = db.relationship("Tenant", foreign_keys=[tenant_id], uselist=False)
+
     # Whether this job is paused (no new records dispatched until resumed).
-    # In-flight records continue to completion; only the round-robin dispatch
+    # In-flight records continue to completion; only the coordinator's dispatch
     # skips this job while paused is True.
     paused = db.Column(db.Boolean(), nullable=False, default=False)
 
@@ -163,10 +188,16 @@ class LLMOrchestrationJob(db.Model):
         similarity_only: bool = False,
         owner=None,
         description: Optional[str] = None,
+        priority: Optional[int] = None,
+        tenant_id: Optional[int] = None,
     ) -> "LLMOrchestrationJob":
         """
         Factory: create and return (but do not add/commit) a new job instance.
+        If *priority* is not given, cycle-wide and global jobs are created at PRIORITY_BULK
+        and all others at PRIORITY_NORMAL.
         """
+        if priority is None:
+            priority = cls.PRIORITY_BULK if scope in (cls.SCOPE_CYCLE, cls.SCOPE_GLOBAL) else cls.PRIORITY_NORMAL
         job = cls(
             uuid=str(uuid4()),
             scope=scope,
@@ -176,6 +207,8 @@ class LLMOrchestrationJob(db.Model):
             similarity_only=similarity_only,
             owner=owner,
             description=description,
+            priority=priority,
+            tenant_id=tenant_id,
             created_at=datetime.now(),
             status=cls.STATUS_PENDING,
             completed_count=0,
@@ -204,6 +237,11 @@ class LLMOrchestrationJob(db.Model):
         """
         return f"llm_inflight:{self.uuid}"
 
+    @property
+    def redis_cost_key(self) -> str:
+        """Redis hash key mapping each queued SubmissionRecord ID to its estimated token cost."""
+        return f"llm_cost:{self.uuid}"
+
     @property
     def is_active(self) -> bool:
         """True while the job is pending or running (i.e. has not yet terminated)."""
@@ -232,6 +270,15 @@ class LLMOrchestrationJob(db.Model):
         }
         return labels.get(self.scope, self.scope)
 
+    @property
+    def is_interactive(self) -> bool:
+        """True if this job is served in the interactive fast lane."""
+        return (self.priority or 0) >= self.PRIORITY_INTERACTIVE
+
+    @property
+    def priority_label(self) -> str:
+        return self.PRIORITY_LABELS.get(self.priority, str(self.priority))
+
     @property
     def status_label(self) -> str:
         labels = {
@@ -279,6 +326,11 @@ class LLMOrchestrationJob(db.Model):
         """Clear the paused flag so the coordinator will dispatch records again."""
         self.paused = False
 
+    def set_priority(self, priority: int) -> None:
+        if priority not in self.ALL_PRIORITIES:
+            raise ValueError(f"LLMOrchestrationJob: unknown priority {priority}")
+        self.priority = priority
+
     # ------------------------------------------------------------------
     # Error log helpers
     # ------------------------------------------------------------------
@@ -784,7 +784,7 @@ class StudentBatchItem(db.Model):
             return True
 
         if self.programme_id is not None:
-            programme = db.session.query(DegreeProgramme).filter_by(id=self.programme_id).first()
+            programme = db.session.get(DegreeProgramme, self.programme_id)
             if programme is not None and programme.foundation_year:
                 return True
 
@@ -808,7 +808,7 @@ class StudentBatchItem(db.Model):
             parent_year = self.parent.academic_year
 
         elif self.parent_id is not None:
-            parent = db.session.query(StudentBatch).filter_by(id=self.parent_id).first()
+            parent = db.session.get(StudentBatch, self.parent_id)
             if parent is not None:
                 parent_year = parent.academic_year
 
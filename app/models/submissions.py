@@ -29,6 +29,7 @@ from ..shared.llm_thresholds import (
     SENT_CV_NOTE_LOW,
     SIMILARITY_INLINE_MIN_COSINE,
 )
+from ..shared import fast_json
 from ..shared.sqlalchemy import get_count
 from .associations import (
     submission_record_to_feedback_report,
@@ -793,7 +794,10 @@ class SubmissionRecord(db.Model, SubmissionFeedbackStatesMixin):
 
     # JSON blob storing all language analysis results: metrics, flags, patterns, llm_result, errors.
     # Uses Text rather than a native JSON column, consistent with the existing project pattern.
-    language_analysis = db.Column(db.Text(length=16777215), default=None)
+    # The blob can run to several megabytes, so it is deferred: it is loaded only when accessed, or when a
+    # query requests it with undefer(SubmissionRecord.language_analysis). Headline metrics are available
+    # without loading it from the SubmissionLanguageMetrics table.
+    language_analysis = orm.deferred(db.Column(db.Text(length=16777215), default=None))
 
     # has the language analysis workflow been started?
     language_analysis_started = db.Column(db.Boolean(), nullable=False, default=False)
@@ -967,12 +971,18 @@ class SubmissionRecord(db.Model, SubmissionFeedbackStatesMixin):
         self._errors = False
         self._warnings = False
 
+        self._language_analysis_cache = None
+        self._risk_factors_cache = None
+
     @orm.reconstructor
     def _reconstruct(self):
         self._validated = False
         self._errors = False
         self._warnings = False
 
+        self._language_analysis_cache = None
+        self._risk_factors_cache = None
+
     @property
     def report_processing_failed(self) -> bool:
         """True if the report was uploaded but processing crashed without generating a processed_report."""
@@ -1918,26 +1928,60 @@ class SubmissionRecord(db.Model, SubmissionFeedbackStatesMixin):
 
     # LANGUAGE ANALYSIS HELPERS
 
+    @staticmethod
+    def _parse_json_blob(raw, cache):
+        """
+        Deserialise a JSON blob, reusing the value held in *cache* if the raw string is unchanged.
+        Returns a (value, cache) pair. The cache is keyed on the identity of the raw string, so it is
+        invalidated by any assignment to the column and when the attribute is reloaded after expiry.
+        """
+        if raw is None:
+            return {}, None
+
+        if cache is not None and cache[0] is raw:
+            return cache[1], cache
+
+        try:
+            value = fast_json.loads(raw)
+        except (fast_json.JSONDecodeError, TypeError):
+            value = {}
+
+        return value, (raw, value)
+
     @property
     def language_analysis_data(self) -> dict:
         """
         Deserialise the language_analysis JSON blob.
         Returns an empty dict if no analysis has been stored.
+        The blob is parsed at most once per change and the same dict is returned to every caller, so it must be
+        treated as read-only. Callers that modify the analysis should use language_analysis_for_update().
         """
-        import json
+        value, self._language_analysis_cache = self._parse_json_blob(self.language_analysis, getattr(self, "_language_analysis_cache", None))
+        return value
 
-        if self.language_analysis is None:
-            return {}
-        try:
-            return json.loads(self.language_analysis)
-        except (json.JSONDecodeError, TypeError):
-            return {}
+    @staticmethod
+    def preload_language_analysis(criterion) -> None:
+        """
+        Load the deferred language_analysis column for every SubmissionRecord matching *criterion* with a single
+        query. List views that read language_analysis_data for each row should call this first, otherwise every
+        row issues its own SELECT for the blob. The records stay in the session identity map, so they are
+        returned with the column already loaded when they are reached again through a relationship.
+        """
+        db.session.query(SubmissionRecord).options(orm.undefer(SubmissionRecord.language_analysis)).filter(criterion).all()
+
+    def language_analysis_for_update(self) -> dict:
+        """
+        Deserialise the language_analysis JSON blob into a new dict that the caller may modify, and then store
+        with set_language_analysis_data().
+        """
+        value, _ = self._parse_json_blob(self.language_analysis, None)
+        return value
 
     def set_language_analysis_data(self, data: dict) -> None:
         """Serialise *data* and store it in the language_analysis column."""
-        import json
-
-        self.language_analysis = json.dumps(data)
+        self.language_analysis = fast_json.dumps(data)
+        self._language_analysis_cache = None
+        self.update_language_metrics(language_analysis=data)
 
     # RISK FACTOR HELPERS
 
@@ -1962,21 +2006,56 @@ class SubmissionRecord(db.Model, SubmissionFeedbackStatesMixin):
 
     @property
     def risk_factors_data(self) -> dict:
-        """Deserialise the risk_factors JSON blob. Returns an empty dict if nothing stored."""
-        import json
+        """
+        Deserialise the risk_factors JSON blob. Returns an empty dict if nothing stored.
+        As for language_analysis_data, the parsed dict is shared and must be treated as read-only; callers that
+        modify it should use risk_factors_for_update().
+        """
+        value, self._risk_factors_cache = self._parse_json_blob(self.risk_factors, getattr(self, "_risk_factors_cache", None))
+        return value
 
-        if self.risk_factors is None:
-            return {}
-        try:
-            return json.loads(self.risk_factors)
-        except (json.JSONDecodeError, TypeError):
-            return {}
+    def risk_factors_for_update(self) -> dict:
+        """Deserialise the risk_factors JSON blob into a new dict that the caller may modify."""
+        value, _ = self._parse_json_blob(self.risk_factors, None)
+        return value
 
     def set_risk_factors_data(self, data: dict) -> None:
         """Serialise *data* and store in the risk_factors column."""
-        import json
+        self.risk_factors = fast_json.dumps(data)
+        self._risk_factors_cache = None
+        self.update_language_metrics(risk_factors=data)
+
+    def update_language_metrics(self, language_analysis: dict = None, risk_factors: dict = None) -> None:
+        """
+        Refresh the SubmissionLanguageMetrics row for this record from the language_analysis and risk_factors
+        JSON blobs. Either blob may be supplied already deserialised; otherwise it is read from the record.
+        The row is removed if neither blob holds any data.
+        """
+        if language_analysis is None:
+            language_analysis = self.language_analysis_data
+        if risk_factors is None:
+            risk_factors = self.risk_factors_data
 
-        self.risk_factors = json.dumps(data)
+        with db.session.no_autoflush:
+            row: Optional[SubmissionLanguageMetrics] = self.language_metrics
+
+            if not language_analysis and not risk_factors:
+                if row is not None:
+                    self.language_metrics = None
+                return
+
+            if row is None:
+                row = SubmissionLanguageMetrics()
+                self.language_metrics = row
+
+        metrics = language_analysis.get("metrics", {})
+        for key in SubmissionLanguageMetrics.METRIC_KEYS:
+            setattr(row, key, SubmissionLanguageMetrics.as_float(metrics.get(key)))
+        row.page_count = SubmissionLanguageMetrics.as_float(language_analysis.get("_page_count"))
+
+        row.ai_use_flagged = bool(risk_factors.get(self.RISK_AI_USE, {}).get("present", False))
+        row.period_id = self.period_id
+        row.updated_at = datetime.now()
 
     @property
     def has_unresolved_risk_factors(self) -> bool:
@@ -2007,7 +2086,7 @@ class SubmissionRecord(db.Model, SubmissionFeedbackStatesMixin):
         """
         from datetime import datetime
 
-        data = self.risk_factors_data
+        data = self.risk_factors_for_update()
         factor = data.get(factor_type, {})
         if factor:
             factor["resolved"] = True
@@ -2388,7 +2467,7 @@ class SubmissionRecord(db.Model, SubmissionFeedbackStatesMixin):
 
         return items
 
-    def compute_risk_factors(self, config) -> None:
+    def compute_risk_factors(self, config, similarity_flagged: Optional[bool] = None) -> None:
         """
         Evaluate all risk conditions against current analysis data and configuration,
         then update the risk_factors JSON blob.
@@ -2397,8 +2476,43 @@ class SubmissionRecord(db.Model, SubmissionFeedbackStatesMixin):
         factors that remain present after re-evaluation.
 
         :param config: ProjectClassConfig instance providing word/page limit settings
+        :param similarity_flagged: whether this record has unreviewed similarity concerns; queried if not supplied
         """
-        la = self.language_analysis_data
+        self.set_risk_factors_data(self.evaluate_risk_factors(config, similarity_flagged=similarity_flagged))
+
+    @staticmethod
+    def records_with_unreviewed_similarity(record_ids) -> Set[int]:
+        """
+        Return the subset of *record_ids* that are party to at least one unreviewed SimilarityConcern.
+        Used to evaluate the similarity risk factor for many records with a single query.
+        """
+        from .similarity import SimilarityConcern
+
+        record_ids = list(record_ids)
+        if not record_ids:
+            return set()
+
+        rows = (
+            db.session.query(SimilarityConcern.record_a_id, SimilarityConcern.record_b_id)
+            .filter(
+                db.or_(
+                    SimilarityConcern.record_a_id.in_(record_ids),
+                    SimilarityConcern.record_b_id.in_(record_ids),
+                ),
+                SimilarityConcern.reviewed == False,  # noqa: E712
+            )
+            .all()
+        )
+
+        return {record_id for row in rows for record_id in row}.intersection(record_ids)
+
+    def evaluate_risk_factors(self, config, language_analysis: dict = None, similarity_flagged: Optional[bool] = None) -> dict:
+        """
+        Evaluate all risk conditions and return the new risk_factors dict, without storing it.
+        *language_analysis* may be supplied already deserialised; otherwise it is read from the record.
+        See compute_risk_factors() for the other parameters.
+        """
+        la = language_analysis if language_analysis is not None else self.language_analysis_data
         metrics = la.get("metrics", {})
         flags = la.get("flags", {})
         llm_result = la.get("llm_result", {})
@@ -2518,20 +2632,22 @@ class SubmissionRecord(db.Model, SubmissionFeedbackStatesMixin):
         new_data[self.RISK_WORD_COUNT_DISCREPANCY] = discrepancy_factor
 
         # --- SIMILARITY FLAGGED ---
-        from .similarity import SimilarityConcern
-
-        has_unresolved_concerns = (
-            db.session.query(SimilarityConcern.id)
-            .filter(
-                db.or_(
-                    SimilarityConcern.record_a_id == self.id,
-                    SimilarityConcern.record_b_id == self.id,
-                ),
-                SimilarityConcern.reviewed == False,  # noqa: E712
+        if similarity_flagged is None:
+            from .similarity import SimilarityConcern
+
+            similarity_flagged = (
+                db.session.query(SimilarityConcern.id)
+                .filter(
+                    db.or_(
+                        SimilarityConcern.record_a_id == self.id,
+                        SimilarityConcern.record_b_id == self.id,
+                    ),
+                    SimilarityConcern.reviewed == False,  # noqa: E712
+                )
+                .first()
+                is not None
             )
-            .first()
-            is not None
-        )
+        has_unresolved_concerns = bool(similarity_flagged)
         similarity_factor = {"present": has_unresolved_concerns}
         if has_unresolved_concerns:
             similarity_factor = _carry_resolution(self.RISK_SIMILARITY_FLAGGED, similarity_factor)
@@ -2548,7 +2664,7 @@ class SubmissionRecord(db.Model, SubmissionFeedbackStatesMixin):
             chunking_factor.update({"resolved": False, "resolved_by_id": None, "resolved_at": None, "annotation": None})
         new_data[self.RISK_SIMILARITY_CHUNKING_FAILED] = chunking_factor
 
-        self.set_risk_factors_data(new_data)
+        return new_data
 
     @property
     def validate_documents(self):
@@ -2620,6 +2736,61 @@ class SubmissionRecord(db.Model, SubmissionFeedbackStatesMixin):
         return [c for c in self.open_similarity_concerns if c.transformer_cosine is not None and c.transformer_cosine >= SIMILARITY_INLINE_MIN_COSINE]
 
 
+class SubmissionLanguageMetrics(db.Model):
+    """
+    Typed copy of the headline language-analysis metrics for a SubmissionRecord.
+    Maintained by SubmissionRecord.update_language_metrics() whenever the language_analysis or risk_factors
+    JSON blobs are written, so that dashboards can aggregate across periods without deserialising the blobs
+    """
+
+    __tablename__ = "submission_language_metrics"
+
+    # metrics copied from language_analysis['metrics']; page_count is copied from language_analysis['_page_count']
+    METRIC_KEYS = ["mattr", "mtld", "burstiness", "sentence_cv", "mean_nll", "nll_cv", "word_count", "reference_count"]
+
+    # owning SubmissionRecord; one row per record
+    record_id = db.Column(db.Integer(), db.ForeignKey("submission_records.id"), primary_key=True)
+    record = db.relationship(
+        "SubmissionRecord",
+        foreign_keys=[record_id],
+        uselist=False,
+        backref=db.backref("language_metrics", uselist=False, cascade="all, delete, delete-orphan"),
+    )
+
+    # denormalized copy of SubmissionRecord.period_id, so that per-period aggregates can use an index on this table
+    period_id = db.Column(db.Integer(), db.ForeignKey("submission_periods.id"), index=True)
+
+    # lexical diversity and sentence-structure metrics
+    mattr = db.Column(db.Float(), default=None)
+    mtld = db.Column(db.Float(), default=None)
+    burstiness = db.Column(db.Float(), default=None)
+    sentence_cv = db.Column(db.Float(), default=None)
+
+    # LLM negative log-likelihood metrics; only available once the LLM stage has run
+    mean_nll = db.Column(db.Float(), default=None)
+    nll_cv = db.Column(db.Float(), default=None)
+
+    # document size metrics
+    word_count = db.Column(db.Float(), default=None)
+    reference_count = db.Column(db.Float(), default=None)
+    page_count = db.Column(db.Float(), default=None)
+
+    # is the AI-use risk factor present?
+    ai_use_flagged = db.Column(db.Boolean(), nullable=False, default=False)
+
+    # last refresh from the JSON blobs; used as a version stamp when caching derived data such as histograms
+    updated_at = db.Column(db.DateTime(), index=True)
+
+    @staticmethod
+    def as_float(value) -> Optional[float]:
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+
 @listens_for(SubmissionRecord, "before_update")
 def _SubmissionRecord_update_handler(mapper, connection, target):
     target._validated = False
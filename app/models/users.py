@@ -307,8 +307,15 @@ class User(db.Model, UserMixin):
         :param payload:
         :return:
         """
+        from ..shared.notification_stream import publish_task_progress
         from .utilities import Notification
 
+        # intermediate progress ticks are held only in Redis; just the final state (which is flagged
+        # for removal on the next page load) is persisted to the database
+        publish_task_progress(self.id, Notification.TASK_PROGRESS, uuid, payload, final=remove_on_load)
+        if not remove_on_load:
+            return
+
         # remove any previous notifications intended for this user with this uuid
         self.notifications.filter_by(uuid=uuid).delete()
 
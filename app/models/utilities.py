@@ -21,6 +21,7 @@ if TYPE_CHECKING:
 
 from flask import current_app
 from sqlalchemy import orm
+from sqlalchemy.event import listens_for
 from sqlalchemy.orm import validates
 from url_normalize import url_normalize
 
@@ -1137,6 +1138,41 @@ class Notification(db.Model, NotificationTypesMixin):
         self.payload_json = json.dumps(obj)
 
 
+# session.info key for notifications inserted in the current transaction, which are published once it commits
+_UNPUBLISHED_NOTIFICATIONS = "_unpublished_notifications"
+
+
+@listens_for(Notification, "after_insert")
+def _Notification_insert_handler(mapper, connection, target):
+    # task progress notifications are published by User.post_task_update() itself
+    if target.type == Notification.TASK_PROGRESS:
+        return
+
+    session = orm.object_session(target)
+    if session is None:
+        return
+
+    # publishing now would deliver a notification that a later rollback removes from the database
+    session.info.setdefault(_UNPUBLISHED_NOTIFICATIONS, []).append((target.user_id, target.type, target.uuid, target.payload, target.timestamp))
+
+
+@listens_for(db.session, "after_commit")
+def _Notification_after_commit_handler(session):
+    pending = session.info.pop(_UNPUBLISHED_NOTIFICATIONS, None)
+    if not pending:
+        return
+
+    from ..shared.notification_stream import publish_notification
+
+    for user_id, ntype, uuid, payload, timestamp in pending:
+        publish_notification(user_id, ntype, uuid, payload, timestamp=timestamp)
+
+
+@listens_for(db.session, "after_rollback")
+def _Notification_after_rollback_handler(session):
+    session.info.pop(_UNPUBLISHED_NOTIFICATIONS, None)
+
+
 class PopularityRecord(db.Model):
     __tablename__ = "popularity_record"
 
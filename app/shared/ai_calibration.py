@@ -14,11 +14,16 @@ AI concern calibration utilities.
 This module provides:
 
   compute_calibration()     — fit a Mahalanobis centroid from historical
-                              SubmissionRecord data for a given tenant
+                              SubmissionRecord data for a given tenant, by
+                              combining per-(project class, year) sufficient
+                              statistics
 
   mahalanobis_distance()    — evaluate sigma and chi² p-value for a new
                               observation given a TenantAICalibration object
 
+  mahalanobis_distances()   — vectorised form of mahalanobis_distance() for
+                              a matrix of observations, one per row
+
 Feature sets
 ------------
   "lexical"  — 3D: (MATTR, MTLD, sentence_cv)
@@ -60,16 +65,25 @@ def compute_calibration(
     feature_set: str = "lexical",
 ) -> dict:
     """
-    Collect feature-vector rows from completed SubmissionRecords belonging to
-    *tenant_id*, optionally filtered to specific project class IDs and/or
-    academic years (ProjectClassConfig.year values).
+    Fit a Mahalanobis centroid to the feature vectors of completed
+    SubmissionRecords belonging to *tenant_id*, optionally filtered to specific
+    project class IDs and/or academic years (ProjectClassConfig.year values).
 
-    feature_set controls which metrics are extracted:
+    feature_set controls which metrics are used:
 
       "lexical"  — (MATTR, MTLD, sentence_cv) triples  [default]
       "full"     — (MATTR, MTLD, sentence_cv, mean_nll, nll_cv) 5-tuples
                    Records missing either mean_nll or nll_cv are skipped.
 
+    The records are not revisited.  Instead, the precomputed sufficient
+    statistics (count n, sum s = Σx and sum of outer products S = Σxxᵀ) for
+    each selected (project class, year) cell are added together, and
+
+        μ = s / n,    Σ = (S - n μμᵀ) / (n - 1)
+
+    which is the same unbiased estimate returned by numpy.cov.  The statistics
+    are maintained by app/shared/ai_calibration_statistics.py.
+
     Returns a dict::
 
         {
@@ -86,48 +100,11 @@ def compute_calibration(
     available after filtering.
     """
     # Import here to avoid circular imports at module load time.
-    from ..database import db
-    from ..models import ProjectClass, ProjectClassConfig, SubmissionPeriodRecord, SubmissionRecord
-
-    # Build query joining through the tenant → pclass → config → period → record chain.
-    q = (
-        db.session.query(SubmissionRecord)
-        .join(SubmissionPeriodRecord, SubmissionRecord.period_id == SubmissionPeriodRecord.id)
-        .join(ProjectClassConfig, SubmissionPeriodRecord.config_id == ProjectClassConfig.id)
-        .join(ProjectClass, ProjectClassConfig.pclass_id == ProjectClass.id)
-        .filter(ProjectClass.tenant_id == tenant_id)
-        .filter(SubmissionRecord.language_analysis_complete == True)  # noqa: E712
-    )
-
-    if pclass_ids:
-        q = q.filter(ProjectClass.id.in_(pclass_ids))
-
-    if years:
-        q = q.filter(ProjectClassConfig.year.in_(years))
-
-    records = q.all()
-
-    # Extract complete feature rows, skipping records with any None value.
-    rows: list[tuple] = []
-    for rec in records:
-        la = rec.language_analysis_data
-        metrics = la.get("metrics", {})
-        mattr = metrics.get("mattr")
-        mtld = metrics.get("mtld")
-        sentence_cv = metrics.get("sentence_cv")
-        if mattr is None or mtld is None or sentence_cv is None:
-            continue
-
-        if feature_set == "full":
-            mean_nll = metrics.get("mean_nll")
-            nll_cv = metrics.get("nll_cv")
-            if mean_nll is None or nll_cv is None:
-                continue
-            rows.append((float(mattr), float(mtld), float(sentence_cv), float(mean_nll), float(nll_cv)))
-        else:
-            rows.append((float(mattr), float(mtld), float(sentence_cv)))
-
-    n_samples = len(rows)
+    from .ai_calibration_statistics import load_calibration_statistics
+
+    cells = [c for c in load_calibration_statistics(tenant_id, feature_set, pclass_ids=pclass_ids, years=years) if c.n_samples > 0]
+
+    n_samples = sum(c.n_samples for c in cells)
     if n_samples < CALIBRATION_MIN_SAMPLES:
         raise ValueError(
             f"Only {n_samples} complete feature rows found "
@@ -135,32 +112,59 @@ def compute_calibration(
             f"project class or year selection."
         )
 
-    X = np.array(rows, dtype=float)  # shape (n_samples, d)
-
-    mu = X.mean(axis=0)  # shape (d,)
+    sum_x = np.sum([np.asarray(c.sum_x_data, dtype=float) for c in cells], axis=0)  # shape (d,)
+    sum_xx = np.sum([np.asarray(c.sum_xx_data, dtype=float) for c in cells], axis=0)  # shape (d, d)
 
-    # numpy.cov expects variables in rows, observations in columns.
-    Sigma = np.cov(X.T)  # shape (d, d)
+    mu = sum_x / n_samples  # shape (d,)
+    Sigma = (sum_xx - n_samples * np.outer(mu, mu)) / (n_samples - 1)  # shape (d, d)
 
     # Use Moore-Penrose pseudoinverse to handle the near-singular case that
     # arises because MATTR and MTLD are strongly correlated.
     Sigma_inv = np.linalg.pinv(Sigma)
 
-    # Collect metadata about which project classes and years were used.
-    included_pclass_ids = sorted({rec.period.config.pclass_id for rec in records if rec.period and rec.period.config})
-    included_years = sorted({rec.period.config.year for rec in records if rec.period and rec.period.config and rec.period.config.year is not None})
-
     return {
         "feature_set": feature_set,
         "mu": mu.tolist(),
         "sigma_inv": Sigma_inv.tolist(),
         "calibrated_at": datetime.now().isoformat(),
-        "included_pclass_ids": included_pclass_ids,
-        "included_years": included_years,
+        "included_pclass_ids": sorted({c.pclass_id for c in cells}),
+        "included_years": sorted({c.year for c in cells}),
         "n_samples": n_samples,
     }
 
 
+def mahalanobis_distances(
+    X: np.ndarray,
+    calibration: "TenantAICalibration",
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorised form of mahalanobis_distance().  *X* is an (n, d) matrix whose
+    rows are feature vectors, where d must match calibration.n_features.
+
+    Returns ``(sigma, p_value)`` as arrays of length n.  The quadratic forms
+    (x - μ)ᵀ Σ⁻¹ (x - μ) for all rows are evaluated together, so recalculating
+    flags for every submission belonging to a tenant costs one matrix product
+    per calibration rather than one per submission.
+    """
+    mu = np.asarray(calibration.mu_data, dtype=float)
+    Sigma_inv = np.asarray(calibration.sigma_inv_data, dtype=float)
+
+    X = np.atleast_2d(np.asarray(X, dtype=float))
+
+    d = mu.shape[0]
+    if X.shape[1] != d or Sigma_inv.shape != (d, d):
+        raise ValueError(f"Feature matrix of shape {X.shape} is incompatible with a calibration of dimension {d}")
+
+    diff = X - mu
+
+    # row-wise diff[i] @ Sigma_inv @ diff[i]
+    D_sq = np.einsum("ij,jk,ik->i", diff, Sigma_inv, diff)
+    # Guard against tiny negative values from floating-point rounding.
+    D_sq = np.maximum(D_sq, 0.0)
+
+    return np.sqrt(D_sq), chi2.sf(D_sq, df=calibration.n_features)
+
+
 def mahalanobis_distance(
     features: list[float],
     calibration: "TenantAICalibration",
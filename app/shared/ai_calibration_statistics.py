@@ -0,0 +1,254 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+"""
+Maintenance of the AICalibrationStatistics sufficient statistics.
+
+Each AICalibrationStatistics row holds, for one ProjectClass, one academic year and one feature set, the number
+of completed SubmissionRecords with a complete feature vector, the sum of those vectors, and the sum of their
+outer products. The statistics for a (project class, year) cell are computed by a single grouped aggregate query
+over the typed SubmissionLanguageMetrics columns, so the language_analysis JSON blobs are never parsed.
+
+Rows are kept up to date incrementally. Mapper event handlers record which SubmissionPeriodRecords are affected
+when a SubmissionLanguageMetrics row changes one of the calibration features, or when a SubmissionRecord
+completes (or is reset), and just before the session commits the statistics for the affected cells are
+recomputed inside the same transaction. Changes made with bulk SQL statements bypass these handlers; they are
+picked up by the full recomputation performed by app.tasks.ai_calibration.recompute_ai_calibration_statistics.
+"""
+
+import json
+from datetime import datetime
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, insert, inspect, select, tuple_
+from sqlalchemy.event import listens_for
+from sqlalchemy.orm import object_session
+
+from ..database import db
+from ..models import (
+    AICalibrationStatistics,
+    ProjectClass,
+    ProjectClassConfig,
+    SubmissionLanguageMetrics,
+    SubmissionPeriodRecord,
+    SubmissionRecord,
+)
+
+# feature columns of SubmissionLanguageMetrics used by each calibration feature set, in feature-vector order
+FEATURE_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "lexical": ("mattr", "mtld", "sentence_cv"),
+    "full": ("mattr", "mtld", "sentence_cv", "mean_nll", "nll_cv"),
+}
+
+_ALL_FEATURE_COLUMNS = tuple(sorted(set(chain.from_iterable(FEATURE_COLUMNS.values()))))
+
+# session.info key for SubmissionPeriodRecord ids whose statistics need to be recomputed before commit
+_DIRTY_PERIODS = "ai_calibration_statistics_dirty_periods"
+
+_INSERT_BATCH_SIZE = 500
+
+Cell = Tuple[int, int]
+
+
+def compute_calibration_statistics(connection, cells: Optional[Iterable[Cell]] = None) -> List[Dict]:
+    """
+    Compute AICalibrationStatistics rows for the given (pclass_id, year) cells, or for every cell if *cells* is
+    None. Cells without any complete feature vector produce no row. Returns a list of column dicts.
+    """
+    cells = list(cells) if cells is not None else None
+    if cells is not None and not cells:
+        return []
+
+    metrics = SubmissionLanguageMetrics.__table__
+    now = datetime.now()
+    rows = []
+
+    for feature_set, names in FEATURE_COLUMNS.items():
+        columns = [metrics.c[name] for name in names]
+        d = len(columns)
+
+        pairs = [(i, j) for i in range(d) for j in range(i, d)]
+
+        stmt = (
+            select(
+                ProjectClassConfig.pclass_id,
+                ProjectClassConfig.year,
+                func.count(),
+                *[func.sum(c) for c in columns],
+                *[func.sum(columns[i] * columns[j]) for i, j in pairs],
+            )
+            .select_from(metrics)
+            .join(SubmissionRecord, SubmissionRecord.id == metrics.c.record_id)
+            .join(SubmissionPeriodRecord, SubmissionPeriodRecord.id == SubmissionRecord.period_id)
+            .join(ProjectClassConfig, ProjectClassConfig.id == SubmissionPeriodRecord.config_id)
+            .where(
+                SubmissionRecord.language_analysis_complete == True,  # noqa: E712
+                and_(*[c.isnot(None) for c in columns]),
+            )
+            .group_by(ProjectClassConfig.pclass_id, ProjectClassConfig.year)
+        )
+        if cells is not None:
+            stmt = stmt.where(tuple_(ProjectClassConfig.pclass_id, ProjectClassConfig.year).in_(cells))
+
+        for pclass_id, year, n_samples, *sums in connection.execute(stmt):
+            if pclass_id is None or year is None or not n_samples:
+                continue
+
+            sum_x = [float(v) for v in sums[:d]]
+
+            sum_xx = [[0.0] * d for _ in range(d)]
+            for (i, j), value in zip(pairs, sums[d:]):
+                sum_xx[i][j] = sum_xx[j][i] = float(value)
+
+            rows.append(
+                {
+                    "pclass_id": pclass_id,
+                    "year": year,
+                    "feature_set": feature_set,
+                    "n_samples": int(n_samples),
+                    "sum_x": json.dumps(sum_x),
+                    "sum_xx": json.dumps(sum_xx),
+                    "updated_at": now,
+                }
+            )
+
+    return rows
+
+
+def refresh_calibration_statistics(connection, cells: Optional[Iterable[Cell]] = None) -> int:
+    """
+    Replace the AICalibrationStatistics rows for the given (pclass_id, year) cells with freshly computed values,
+    or rebuild the whole table if *cells* is None. Executes on *connection* and does not commit.
+    Returns the number of rows written.
+    """
+    cells = list(cells) if cells is not None else None
+    if cells is not None and not cells:
+        return 0
+
+    rows = compute_calibration_statistics(connection, cells=cells)
+
+    table = AICalibrationStatistics.__table__
+    stmt = delete(table)
+    if cells is not None:
+        stmt = stmt.where(tuple_(table.c.pclass_id, table.c.year).in_(cells))
+    connection.execute(stmt)
+
+    for i in range(0, len(rows), _INSERT_BATCH_SIZE):
+        connection.execute(insert(table), rows[i : i + _INSERT_BATCH_SIZE])
+
+    return len(rows)
+
+
+def load_calibration_statistics(
+    tenant_id: int,
+    feature_set: str,
+    pclass_ids: Optional[List[int]] = None,
+    years: Optional[List[int]] = None,
+) -> List[AICalibrationStatistics]:
+    """
+    Return the AICalibrationStatistics records for *feature_set* belonging to *tenant_id*, optionally restricted
+    to the given project class ids and/or academic years.
+    """
+    q = (
+        db.session.query(AICalibrationStatistics)
+        .join(ProjectClass, ProjectClass.id == AICalibrationStatistics.pclass_id)
+        .filter(
+            ProjectClass.tenant_id == tenant_id,
+            AICalibrationStatistics.feature_set == feature_set,
+        )
+    )
+
+    if pclass_ids:
+        q = q.filter(AICalibrationStatistics.pclass_id.in_(pclass_ids))
+
+    if years:
+        q = q.filter(AICalibrationStatistics.year.in_(years))
+
+    return q.all()
+
+
+def _cells_for_periods(connection, period_ids: Iterable[int]) -> List[Cell]:
+    period_ids = list(period_ids)
+    if not period_ids:
+        return []
+
+    rows = connection.execute(
+        select(ProjectClassConfig.pclass_id, ProjectClassConfig.year)
+        .select_from(SubmissionPeriodRecord)
+        .join(ProjectClassConfig, ProjectClassConfig.id == SubmissionPeriodRecord.config_id)
+        .where(SubmissionPeriodRecord.id.in_(period_ids))
+        .distinct()
+    )
+
+    return [(pclass_id, year) for pclass_id, year in rows if pclass_id is not None and year is not None]
+
+
+def _mark_periods(session, *period_ids) -> None:
+    if session is None:
+        return
+
+    dirty = session.info.setdefault(_DIRTY_PERIODS, set())
+    dirty.update(pid for pid in period_ids if pid is not None)
+
+
+@listens_for(SubmissionLanguageMetrics, "after_insert")
+def _calibration_SubmissionLanguageMetrics_insert_handler(mapper, connection, target):
+    _mark_periods(object_session(target), target.period_id)
+
+
+@listens_for(SubmissionLanguageMetrics, "after_update")
+def _calibration_SubmissionLanguageMetrics_update_handler(mapper, connection, target):
+    # metrics rows are rewritten at every stage of the language analysis pipeline; only changes to a
+    # calibration feature, or a move to a different period, affect the statistics
+    state = inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in _ALL_FEATURE_COLUMNS + ("period_id",)):
+        return
+
+    _mark_periods(object_session(target), target.period_id, *state.attrs.period_id.history.deleted)
+
+
+@listens_for(SubmissionLanguageMetrics, "after_delete")
+def _calibration_SubmissionLanguageMetrics_delete_handler(mapper, connection, target):
+    _mark_periods(object_session(target), target.period_id)
+
+
+@listens_for(SubmissionRecord, "after_update")
+def _calibration_SubmissionRecord_update_handler(mapper, connection, target):
+    state = inspect(target)
+    if not (state.attrs.language_analysis_complete.history.has_changes() or state.attrs.period_id.history.has_changes()):
+        return
+
+    _mark_periods(object_session(target), target.period_id, *state.attrs.period_id.history.deleted)
+
+
+def _has_pending_statistics_changes(session) -> bool:
+    tracked = (SubmissionLanguageMetrics, SubmissionRecord)
+    return any(isinstance(obj, tracked) for obj in chain(session.new, session.dirty, session.deleted))
+
+
+@listens_for(db.session, "before_commit")
+def _calibration_before_commit_handler(session):
+    # pending changes are only flushed (and our mapper handlers only run) after before_commit has been
+    # dispatched, so flush here if there is anything that could affect the statistics
+    if _has_pending_statistics_changes(session):
+        session.flush()
+
+    period_ids = session.info.pop(_DIRTY_PERIODS, None)
+    if not period_ids:
+        return
+
+    connection = session.connection()
+    refresh_calibration_statistics(connection, cells=_cells_for_periods(connection, sorted(period_ids)))
+
+
+@listens_for(db.session, "after_rollback")
+def _calibration_after_rollback_handler(session):
+    session.info.pop(_DIRTY_PERIODS, None)
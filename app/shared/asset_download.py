@@ -0,0 +1,175 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+"""
+Serve object-store assets to the browser without buffering them in gunicorn worker memory.
+
+Three strategies are used, in order of preference:
+
+1. Unencrypted, uncompressed objects are streamed directly from the object store in chunks using
+   ranged reads, so at most one chunk is held in memory at a time.
+
+2. Objects that must be decrypted or decompressed are written once to a download cache folder, and the
+   response hands the transfer to nginx using an X-Accel-Redirect header. Cached copies are reused for
+   repeat downloads until they expire. The cache folder must be exposed by nginx only through an
+   ``internal`` location, so a cached file can be reached only after the view has performed its access
+   checks and issued the redirect.
+
+3. If X-Accel-Redirect is not configured, the decrypted object is written to a scratch file and served
+   from disk by send_file(), and the scratch file is removed when the response closes.
+
+Configuration:
+    DOWNLOAD_CACHE_FOLDER: folder holding decrypted copies, shared with nginx
+    DOWNLOAD_ACCEL_REDIRECT_PREFIX: internal nginx location that maps onto DOWNLOAD_CACHE_FOLDER
+    DOWNLOAD_CACHE_TTL: lifetime (in seconds) of a cached decrypted copy
+"""
+
+import os
+from hashlib import sha256
+from pathlib import Path
+from time import time
+from urllib.parse import quote
+from uuid import uuid4
+
+from flask import Response, current_app, send_file, stream_with_context
+
+from .asset_tools import AssetCloudAdapter
+
+
+def _content_disposition(download_name: str) -> str:
+    # RFC 6266/5987 encoding, so that non-ASCII filenames survive the round trip
+    ascii_name = download_name.encode("ascii", "replace").decode("ascii").replace('"', "")
+    return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(download_name)}"
+
+
+def _cache_folder() -> Path | None:
+    folder = current_app.config.get("DOWNLOAD_CACHE_FOLDER")
+    prefix = current_app.config.get("DOWNLOAD_ACCEL_REDIRECT_PREFIX")
+
+    if not folder or not prefix:
+        return None
+
+    path = Path(folder)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _cache_name(storage: AssetCloudAdapter) -> str:
+    # cache entries are keyed by bucket and object key; object keys are never re-used for different content
+    bucket = getattr(storage.record(), "bucket", "")
+    return sha256(f"{bucket}:{storage.key}".encode("utf-8")).hexdigest()
+
+
+def _cached_copy(storage: AssetCloudAdapter) -> Path:
+    """
+    Return the path of a decrypted copy of the asset in the download cache, creating it if it is absent
+    or has expired. Writes go through a temporary file and an atomic rename, so concurrent requests never
+    observe a partially-written copy.
+    """
+    folder = _cache_folder()
+    path = folder / _cache_name(storage)
+    ttl = current_app.config.get("DOWNLOAD_CACHE_TTL", 600)
+
+    try:
+        if time() - path.stat().st_mtime < ttl:
+            return path
+    except FileNotFoundError:
+        pass
+
+    tmp_path = folder / f".{uuid4()}.tmp"
+    try:
+        storage.download_to_path(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    # the cache lives on the web container's filesystem, so expired entries are pruned here whenever a new
+    # entry is created, rather than by a Celery task that may run elsewhere
+    prune_download_cache()
+
+    return path
+
+
+def serve_asset(storage: AssetCloudAdapter, mimetype: str, download_name: str) -> Response:
+    """
+    Build a response that delivers the asset wrapped by *storage* as an attachment.
+    The caller is responsible for all access checks and download logging before calling this function.
+    Exceptions raised by the object store while preparing a decrypted copy propagate to the caller; once
+    streaming has begun, errors can only truncate the response.
+    """
+    headers = {"Content-Disposition": _content_disposition(download_name)}
+
+    if storage.can_stream:
+        # probe the first chunk eagerly, so that storage errors surface while the caller can still
+        # redirect rather than after the response headers have been sent
+        chunks = storage.stream()
+        first = next(chunks, b"")
+
+        def generate():
+            yield first
+            yield from chunks
+
+        if storage.size is not None:
+            headers["Content-Length"] = str(storage.size)
+
+        return Response(stream_with_context(generate()), mimetype=mimetype, headers=headers, direct_passthrough=True)
+
+    if _cache_folder() is not None:
+        path = _cached_copy(storage)
+
+        prefix = current_app.config.get("DOWNLOAD_ACCEL_REDIRECT_PREFIX").rstrip("/")
+        headers["X-Accel-Redirect"] = f"{prefix}/{path.name}"
+        headers["X-Accel-Buffering"] = "yes"
+        headers["Cache-Control"] = "private, no-store"
+
+        return Response(status=200, mimetype=mimetype, headers=headers)
+
+    scratch_path = Path(current_app.config.get("SCRATCH_FOLDER")) / str(uuid4())
+    try:
+        storage.download_to_path(scratch_path)
+        response = send_file(scratch_path, mimetype=mimetype, download_name=download_name, as_attachment=True)
+    except Exception:
+        scratch_path.unlink(missing_ok=True)
+        raise
+
+    response.call_on_close(lambda: scratch_path.unlink(missing_ok=True))
+    return response
+
+
+def prune_download_cache() -> int:
+    """
+    Remove expired decrypted copies (and abandoned temporary files) from the download cache.
+    Files already handed to nginx remain readable until the transfer completes, even if unlinked.
+    Returns the number of files removed.
+    """
+    folder = current_app.config.get("DOWNLOAD_CACHE_FOLDER")
+    if not folder:
+        return 0
+
+    path = Path(folder)
+    if not path.exists():
+        return 0
+
+    ttl = current_app.config.get("DOWNLOAD_CACHE_TTL", 600)
+    now = time()
+
+    removed = 0
+    for item in path.iterdir():
+        # temporary files may belong to a download that is still being written
+        limit = max(ttl, 3600) if item.name.startswith(".") else ttl
+
+        try:
+            if item.is_file() and now - item.stat().st_mtime >= limit:
+                item.unlink(missing_ok=True)
+                removed += 1
+        except FileNotFoundError:
+            continue
+
+    return removed
@@ -104,7 +104,10 @@ class AssetCloudAdapter:
         download_to_scratch(self) -> AssetCloudScratchContextManager:
             Downloads the asset to a scratch file for temporary use.
 
-        stream(self, chunksize=_DEFAULT_STREAMING_CHUNKSIZE, no_encryption=False):
+        download_to_path(self, path: Path):
+            Writes the decrypted, decompressed asset to the given path, streaming it in chunks where possible.
+
+        stream(self, chunksize=_DEFAULT_STREAMING_CHUNKSIZE):
             Streams the asset from the object store.
     """
 
@@ -167,6 +170,28 @@ class AssetCloudAdapter:
     def record(self):
         return self._asset
 
+    @property
+    def key(self) -> str:
+        return self._key
+
+    @property
+    def size(self) -> Optional[int]:
+        return self._size
+
+    @property
+    def can_stream(self) -> bool:
+        """
+        True if the asset can be delivered in chunks by stream(), i.e. it is stored without encryption or
+        compression and its size is known
+        """
+        return (
+            self._encryption == encryptions.ENCRYPTION_NONE
+            and not self._compressed
+            and not self._storage_compressed
+            and self._size is not None
+            and self._size > 0
+        )
+
     def exists(self) -> bool:
         try:
             self._storage.head(self._key, audit_data=self._audit_data)
@@ -219,17 +244,26 @@ class AssetCloudAdapter:
 
         return new_key, put_result
 
+    def download_to_path(self, path: Path) -> None:
+        if self.can_stream:
+            with open(path, "wb") as f:
+                for chunk in self.stream():
+                    f.write(chunk)
+            return
+
+        with open(path, "wb") as f:
+            f.write(self.get())
+
     def download_to_scratch(self) -> AssetCloudScratchContextManager:
         scratch_folder = Path(current_app.config.get("SCRATCH_FOLDER"))
         scratch_file = str(uuid4())
         scratch_path = scratch_folder / scratch_file
 
-        with open(scratch_path, "wb") as f:
-            f.write(self.get())
+        self.download_to_path(scratch_path)
 
         return AssetCloudScratchContextManager(scratch_path)
 
-    def stream(self, chunksize=_DEFAULT_STREAMING_CHUNKSIZE, no_encryption=False):
+    def stream(self, chunksize=_DEFAULT_STREAMING_CHUNKSIZE):
         # no need to check if storage is encrypted; if it isn't, and we are set to ENCRYPTION_NONE, an exception
         # will have been raised in the constructor
         if self._encryption != encryptions.ENCRYPTION_NONE:
@@ -255,7 +289,8 @@ class AssetCloudAdapter:
             offset += length
             total_bytes -= length
 
-            yield self._storage.get_range(self._key, audit_data=self._audit_data, start=start, length=length)
+            # the asset itself is unencrypted, even if it lives in an encrypted store
+            yield self._storage.get_range(self._key, audit_data=self._audit_data, start=start, length=length, no_encryption=True)
 
 
 class AssetUploadManager:
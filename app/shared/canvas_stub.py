@@ -0,0 +1,226 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+"""
+Local HTTP stand-in for the subset of the Canvas REST API used by MPS-Project.
+
+CanvasStubServer runs a threaded http.server on a loopback port and serves course enrolments, assignment
+submissions and file downloads from in-memory data, with Canvas-style Link header pagination and ETag
+handling. It can be used to exercise CanvasSyncEngine and the Canvas Celery tasks without access to a real
+Canvas instance, e.g. by pointing MainConfig.canvas_root_API at CanvasStubServer.api_root:
+
+    with CanvasStubServer(token="test") as canvas:
+        canvas.add_user(101, {"id": 1, "name": "A Student", "email": "as123@sussex.ac.uk"})
+        attachment = canvas.add_file(b"%PDF-1.4 ...", filename="report.pdf")
+        canvas.add_submission(101, 7, {"user_id": 1, "workflow_state": "submitted", "attachments": [attachment]})
+
+        engine = CanvasSyncEngine("test")
+        users = engine.fetch_collection(build_api_url(canvas.api_root, "courses/101/users"))
+
+Request counts per path are recorded in CanvasStubServer.requests, so that callers can check that unchanged
+collections were answered with 304 Not Modified, or that pages were fetched only once.
+"""
+
+import json
+import re
+import threading
+from collections import Counter
+from hashlib import sha256
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+_USERS = re.compile(r"^/api/v1/courses/(\d+)/users/?$")
+_SUBMISSIONS = re.compile(r"^/api/v1/courses/(\d+)/assignments/(\d+)/submissions/?$")
+_SUBMISSION = re.compile(r"^/api/v1/courses/(\d+)/assignments/(\d+)/submissions/(\d+)/?$")
+_FILE = re.compile(r"^/files/(\d+)/download/?$")
+
+
+class CanvasStubServer:
+    """
+    In-memory Canvas stand-in. Use as a context manager, or call start() and stop().
+
+    Parameters
+    ----------
+    token : str | None
+        If supplied, requests must carry "Authorization: Bearer <token>"; others receive 401.
+    default_per_page : int
+        Page size used when the request does not specify per_page. Canvas defaults to 10.
+    bookmark_pagination : bool
+        If True, emit opaque bookmark page values and omit the "last" link, as Canvas does for collections
+        that are expensive to count.
+    """
+
+    def __init__(self, token: Optional[str] = None, default_per_page: int = 10, bookmark_pagination: bool = False):
+        self.token = token
+        self.default_per_page = default_per_page
+        self.bookmark_pagination = bookmark_pagination
+
+        self.users: Dict[int, List[Dict]] = {}
+        self.submissions: Dict[tuple, List[Dict]] = {}
+        self.files: Dict[int, Dict] = {}
+
+        self.requests: Counter = Counter()
+
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+        return False
+
+    def start(self) -> None:
+        stub = self
+
+        class _Handler(_CanvasStubHandler):
+            server_stub = stub
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="canvas-stub", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @property
+    def api_root(self) -> str:
+        return self.base_url + "api/v1/"
+
+    def add_user(self, course_id: int, user: Dict) -> None:
+        with self._lock:
+            self.users.setdefault(int(course_id), []).append(dict(user))
+
+    def add_submission(self, course_id: int, assignment_id: int, submission: Dict) -> None:
+        with self._lock:
+            self.submissions.setdefault((int(course_id), int(assignment_id)), []).append(dict(submission))
+
+    def add_file(self, content: bytes, filename: str = "report.pdf", content_type: str = "application/pdf") -> Dict:
+        """
+        Register a downloadable file and return a Canvas attachment object referring to it.
+        """
+        with self._lock:
+            file_id = len(self.files) + 1
+            self.files[file_id] = {"content": content, "content_type": content_type}
+
+        return {
+            "id": file_id,
+            "filename": filename,
+            "display_name": filename,
+            "content-type": content_type,
+            "size": len(content),
+            "url": self.base_url + f"files/{file_id}/download",
+        }
+
+
+class _CanvasStubHandler(BaseHTTPRequestHandler):
+    server_stub: CanvasStubServer = None
+
+    def log_message(self, format, *args):
+        # keep test output quiet
+        pass
+
+    def do_GET(self):
+        stub = self.server_stub
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+
+        with stub._lock:
+            stub.requests[parts.path] += 1
+
+        if stub.token is not None and self.headers.get("Authorization") != f"Bearer {stub.token}":
+            return self._send_json(401, {"errors": [{"message": "Invalid access token."}]})
+
+        match = _FILE.match(parts.path)
+        if match:
+            record = stub.files.get(int(match.group(1)))
+            if record is None:
+                return self._send_json(404, {"errors": [{"message": "The specified resource does not exist."}]})
+            return self._send(200, record["content"], record["content_type"])
+
+        match = _SUBMISSION.match(parts.path)
+        if match:
+            course_id, assignment_id, user_id = (int(g) for g in match.groups())
+            for submission in stub.submissions.get((course_id, assignment_id), []):
+                if submission.get("user_id") == user_id:
+                    return self._send_json(200, submission)
+            return self._send_json(200, {"user_id": user_id, "workflow_state": "unsubmitted", "attachments": []})
+
+        match = _USERS.match(parts.path)
+        if match:
+            return self._send_collection(parts.path, query, stub.users.get(int(match.group(1)), []))
+
+        match = _SUBMISSIONS.match(parts.path)
+        if match:
+            key = (int(match.group(1)), int(match.group(2)))
+            return self._send_collection(parts.path, query, stub.submissions.get(key, []))
+
+        return self._send_json(404, {"errors": [{"message": "The specified resource does not exist."}]})
+
+    def _send_collection(self, path: str, query: Dict, items: List[Dict]):
+        stub = self.server_stub
+
+        per_page = int(query.get("per_page", [stub.default_per_page])[0])
+        raw_page = query.get("page", ["1"])[0]
+        page = int(raw_page.removeprefix("bookmark:"))
+
+        num_pages = max((len(items) + per_page - 1) // per_page, 1)
+        body = items[(page - 1) * per_page : page * per_page]
+
+        def _link(target: int) -> str:
+            value = f"bookmark:{target}" if stub.bookmark_pagination else str(target)
+            other = {k: v[0] for k, v in query.items() if k != "page"}
+            other["page"] = value
+            other["per_page"] = per_page
+            return f"{stub.base_url.rstrip('/')}{path}?{urlencode(other)}"
+
+        links = [f'<{_link(page)}>; rel="current"', f'<{_link(1)}>; rel="first"']
+        if page < num_pages:
+            links.append(f'<{_link(page + 1)}>; rel="next"')
+        if page > 1:
+            links.append(f'<{_link(page - 1)}>; rel="prev"')
+        if not stub.bookmark_pagination:
+            links.append(f'<{_link(num_pages)}>; rel="last"')
+
+        payload = json.dumps(body, sort_keys=True).encode("utf-8")
+        etag = '"{digest}"'.format(digest=sha256(payload).hexdigest()[:32])
+
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, b"", None, {"ETag": etag})
+
+        return self._send(200, payload, "application/json", {"ETag": etag, "Link": ", ".join(links)})
+
+    def _send_json(self, status: int, data):
+        return self._send(status, json.dumps(data).encode("utf-8"), "application/json")
+
+    def _send(self, status: int, payload: bytes, content_type: Optional[str], headers: Optional[Dict] = None):
+        self.send_response(status)
+        if content_type is not None:
+            self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if payload:
+            self.wfile.write(payload)
@@ -0,0 +1,418 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+"""
+Concurrent, incremental Canvas synchronisation engine.
+
+CanvasSyncEngine fetches paginated Canvas collections and file attachments using a bounded thread pool.
+When Canvas reports the number of pages in the Link header (numeric "last" link), pages 2..N are requested
+concurrently; when Canvas uses opaque bookmark pagination the "next" links are followed sequentially, since
+the URL of each page is known only after the previous one has been read.
+
+Each collection can be associated with a sync key. The engine remembers the ETag and a fingerprint of the
+content returned for that key in a CanvasSyncState store and reports whether the collection has changed, so that callers can skip the database work for modules whose
+Canvas data has not moved since the last successful synchronisation. The stored state is updated only when
+the caller confirms that the data was processed, by calling mark_synced().
+
+Canvas computes ETags per response, i.e. per page, so If-None-Match is sent only for collections that fitted
+on a single page at the last sync; a 304 for the first page of a longer collection would say nothing about
+the later pages. Multi-page collections are always re-read, and are compared by content fingerprint.
+
+Like canvas_api, this module has no Flask, SQLAlchemy or Celery dependencies. CanvasAPIError is the sole
+exception type raised by the public methods.
+"""
+
+import json
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from hashlib import sha256
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+from .canvas_api import CanvasAPIError, make_session
+
+
+@dataclass
+class CanvasCollection:
+    """
+    Result of CanvasSyncEngine.fetch_collection().
+
+    Attributes
+    ----------
+    key : str | None
+        Sync key supplied to fetch_collection().
+    items : list | None
+        Concatenated items from every page, or None if Canvas returned 304 Not Modified.
+    changed : bool
+        False if the collection is identical (by ETag or content fingerprint) to the one recorded by the last
+        call to mark_synced() for this key.
+    etag : str | None
+        ETag of the first page, if Canvas supplied one.
+    fingerprint : str | None
+        SHA-256 digest of the canonical JSON serialization of *items*.
+    pages : int
+        Number of pages fetched.
+    state : dict
+        Sync state recorded for *key* by the last successful sync (empty if none).
+    """
+
+    key: Optional[str]
+    items: Optional[list]
+    changed: bool
+    etag: Optional[str] = None
+    fingerprint: Optional[str] = None
+    pages: int = 0
+    state: Dict = field(default_factory=dict)
+
+
+class CanvasSyncState:
+    """
+    Store for per-collection synchronisation state (ETag, content fingerprint, local fingerprint and the time
+    of the last successful sync). Entries expire after *ttl* seconds, so that every module is periodically
+    re-synchronised in full even if Canvas reports no changes.
+
+    If *redis_client* is None, state is held in process memory, which is sufficient for tests that run against
+    the local stand-in server (app/shared/canvas_stub.py).
+    """
+
+    def __init__(self, redis_client=None, prefix: str = "canvas_sync", ttl: int = 86400):
+        self._redis = redis_client
+        self._prefix = prefix
+        self._ttl = int(ttl)
+
+        self._local: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, key: str) -> str:
+        return f"{self._prefix}:{key}"
+
+    def get(self, key: str) -> Dict:
+        if self._redis is None:
+            with self._lock:
+                return dict(self._local.get(key, {}))
+
+        try:
+            raw = self._redis.get(self._key(key))
+        except Exception:
+            # a Redis outage should degrade to a full sync, not abort it
+            return {}
+
+        if raw is None:
+            return {}
+
+        try:
+            return json.loads(raw)
+        except (TypeError, ValueError):
+            return {}
+
+    def set(self, key: str, state: Dict) -> None:
+        if self._redis is None:
+            with self._lock:
+                self._local[key] = dict(state)
+            return
+
+        try:
+            self._redis.set(self._key(key), json.dumps(state), ex=self._ttl if self._ttl > 0 else None)
+        except Exception:
+            pass
+
+    def clear(self, key: str) -> None:
+        if self._redis is None:
+            with self._lock:
+                self._local.pop(key, None)
+            return
+
+        try:
+            self._redis.delete(self._key(key))
+        except Exception:
+            pass
+
+
+def fingerprint(data) -> str:
+    """
+    SHA-256 digest of the canonical JSON serialization of *data*. Used both for Canvas payloads and for
+    summaries of the local database state that a sync depends on.
+    """
+    payload = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _numeric_page(url: str) -> Optional[int]:
+    # Canvas uses numeric page parameters for most collections, but opaque "bookmark:..." values for
+    # collections where counting is expensive; only numeric pages can be requested out of order
+    for name, value in parse_qsl(urlsplit(url).query, keep_blank_values=True):
+        if name == "page":
+            try:
+                return int(value)
+            except ValueError:
+                return None
+
+    return None
+
+
+def _with_page(url: str, page: int) -> str:
+    parts = urlsplit(url)
+    query = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True) if name != "page"]
+    query.append(("page", str(page)))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
+
+
+class CanvasSyncEngine:
+    """
+    Fetch Canvas collections and attachments with bounded parallelism.
+
+    Each worker thread uses its own requests.Session, because Session objects are not guaranteed to be
+    thread-safe. Use as a context manager, or call close() when finished, to release the thread pool.
+
+    Parameters
+    ----------
+    api_token : str
+        Canvas API token.
+    max_workers : int
+        Maximum number of concurrent HTTP requests.
+    per_page : int
+        Page size requested from Canvas (Canvas caps this at 100 for most collections).
+    state : CanvasSyncState | None
+        Store for ETags and fingerprints. If None, every fetch is reported as changed.
+    timeout : float
+        Timeout in seconds for each HTTP request.
+    session_factory : callable | None
+        Zero-argument callable returning a configured requests.Session. Defaults to make_session(api_token).
+    """
+
+    def __init__(
+        self,
+        api_token: str,
+        max_workers: int = 4,
+        per_page: int = 100,
+        state: Optional[CanvasSyncState] = None,
+        timeout: float = 60.0,
+        session_factory: Optional[Callable[[], requests.Session]] = None,
+    ):
+        self._api_token = api_token
+        self._max_workers = max(int(max_workers), 1)
+        self._per_page = max(int(per_page), 1)
+        self._state = state
+        self._timeout = timeout
+        self._session_factory = session_factory if session_factory is not None else (lambda: make_session(api_token))
+
+        self._local = threading.local()
+        self._sessions: List[requests.Session] = []
+        self._sessions_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+        with self._sessions_lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions = []
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        requests.Session for the calling thread.
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._session_factory()
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+
+        return session
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="canvas-sync")
+        return self._executor
+
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        try:
+            response = self.session.get(url, timeout=self._timeout, **kwargs)
+        except requests.RequestException as e:
+            raise CanvasAPIError("Canvas API request failed: {err}".format(err=e)) from e
+
+        if response.status_code == 304:
+            return response
+
+        if not response.ok:
+            raise CanvasAPIError(
+                "Canvas API returned error status {code}".format(code=response.status_code),
+                status_code=response.status_code,
+                response_body=response.text[:500],
+            )
+
+        return response
+
+    def _get_json(self, url: str) -> list:
+        return self._get(url).json()
+
+    def fetch_collection(
+        self,
+        url: str,
+        params: Optional[Dict] = None,
+        key: Optional[str] = None,
+        conditional: bool = True,
+    ) -> CanvasCollection:
+        """
+        GET a paginated Canvas collection and return every item.
+
+        Parameters
+        ----------
+        url : str
+            Fully-qualified Canvas API URL.
+        params : dict | None
+            Query parameters for the first page. per_page is added if not present.
+        key : str | None
+            Sync key for this collection. If supplied and a CanvasSyncState store is attached, the result
+            reports whether the collection has changed, and the stored ETag is sent as If-None-Match if the
+            collection occupied a single page at the last sync.
+        conditional : bool
+            If False, do not send If-None-Match. Use when the items are needed even if Canvas is unchanged,
+            e.g. because the local database state has changed.
+
+        Raises
+        ------
+        CanvasAPIError
+            If any page cannot be fetched.
+        """
+        state = self._state.get(key) if (self._state is not None and key is not None) else {}
+
+        params = dict(params) if params is not None else {}
+        params.setdefault("per_page", self._per_page)
+
+        headers = {}
+        if conditional and state.get("etag") and state.get("pages") == 1:
+            headers["If-None-Match"] = state["etag"]
+
+        first = self._get(url, params=params, headers=headers)
+        if first.status_code == 304:
+            return CanvasCollection(
+                key=key,
+                items=None,
+                changed=False,
+                etag=state.get("etag"),
+                fingerprint=state.get("fingerprint"),
+                pages=1,
+                state=state,
+            )
+
+        etag = first.headers.get("ETag")
+        pages = [first.json()]
+
+        links = first.links
+        last_url = links.get("last", {}).get("url")
+        next_url = links.get("next", {}).get("url")
+
+        last_page = _numeric_page(last_url) if last_url else None
+        next_page = _numeric_page(next_url) if next_url else None
+
+        if next_url is not None and last_page is not None and next_page is not None and last_page >= next_page:
+            # page count is known: fetch the remaining pages concurrently, preserving their order
+            urls = [_with_page(next_url, page) for page in range(next_page, last_page + 1)]
+            pages.extend(self.executor.map(self._get_json, urls))
+        else:
+            while next_url is not None:
+                response = self._get(next_url)
+                pages.append(response.json())
+                next_url = response.links.get("next", {}).get("url")
+
+        items = [item for page in pages for item in page]
+        digest = fingerprint(items)
+
+        changed = not state or state.get("fingerprint") != digest
+        return CanvasCollection(key=key, items=items, changed=changed, etag=etag, fingerprint=digest, pages=len(pages), state=state)
+
+    def mark_synced(self, collection: CanvasCollection, local_fingerprint: Optional[str] = None) -> None:
+        """
+        Record that *collection* has been processed successfully. *local_fingerprint* summarizes the database
+        state the sync produced; a later sync can compare it with the current database state to detect local
+        changes (e.g. new submitters) that require reprocessing even if Canvas is unchanged.
+        """
+        if self._state is None or collection.key is None:
+            return
+
+        self._state.set(
+            collection.key,
+            {
+                "etag": collection.etag,
+                "fingerprint": collection.fingerprint,
+                "pages": collection.pages,
+                "local_fingerprint": local_fingerprint,
+                "synced_at": datetime.now().isoformat(),
+            },
+        )
+
+    def is_unchanged(self, collection: CanvasCollection, local_fingerprint: Optional[str] = None) -> bool:
+        """
+        True if neither the Canvas collection nor the local database state summarized by *local_fingerprint*
+        has changed since the last call to mark_synced() for this key.
+        """
+        if collection.changed:
+            return False
+
+        return collection.state.get("local_fingerprint") == local_fingerprint
+
+    def _download(self, url: str) -> bytes:
+        response = self._get(url)
+        return response.content
+
+    def iter_downloads(self, downloads: Iterable[Tuple[object, str]]) -> Iterator[Tuple[object, Optional[bytes], Optional[CanvasAPIError]]]:
+        """
+        Download attachments concurrently, yielding (tag, content, error) tuples in completion order.
+        Exactly one of *content* and *error* is None.
+
+        At most 2 * max_workers downloads are in flight or held in memory at any time, so the caller can
+        process (and discard) each attachment as it arrives without buffering the whole batch.
+
+        Parameters
+        ----------
+        downloads : iterable of (tag, url)
+            *tag* is an arbitrary caller-supplied value used to identify each download.
+        """
+        pending = iter(downloads)
+        in_flight = {}
+        window = 2 * self._max_workers
+
+        def _refill():
+            while len(in_flight) < window:
+                try:
+                    tag, url = next(pending)
+                except StopIteration:
+                    return
+                in_flight[self.executor.submit(self._download, url)] = tag
+
+        _refill()
+        while in_flight:
+            done, _ = wait(in_flight.keys(), return_when=FIRST_COMPLETED)
+            for future in done:
+                tag = in_flight.pop(future)
+                try:
+                    yield tag, future.result(), None
+                except CanvasAPIError as e:
+                    yield tag, None, e
+
+            _refill()
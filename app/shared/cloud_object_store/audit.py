@@ -8,6 +8,7 @@
 # Contributors: David Seery <D.Seery@sussex.ac.uk>
 #
 from datetime import datetime
+from typing import Dict, Hashable, List, Optional
 from urllib.parse import SplitResult
 
 from pandas import DataFrame
@@ -17,6 +18,31 @@ class AuditBackend:
     def __init__(self, uri: SplitResult):
         pass
 
+    @staticmethod
+    def make_audit_record(
+        type: str,
+        audit_data: str,
+        driver: str = None,
+        bucket: str = None,
+        host_uri: str = None,
+    ) -> Dict:
+        return {
+            "timestamp": datetime.now(),
+            "type": type,
+            "data": audit_data,
+            "driver": driver,
+            "bucket": bucket,
+            "uri": host_uri,
+        }
+
+    @property
+    def cache_key(self) -> Optional[Hashable]:
+        """
+        Key identifying the audit destination. Object stores whose backends share a key also share a single
+        buffered writer. Backends that return None are never shared.
+        """
+        return None
+
     def store_audit_record(
         self,
         type: str,
@@ -27,6 +53,9 @@ class AuditBackend:
     ) -> None:
         raise NotImplementedError("The store_audit_record() method should be implemented by concrete AuditBackend instances")
 
+    def store_audit_records(self, records: List[Dict]) -> None:
+        raise NotImplementedError("The store_audit_records() method should be implemented by concrete AuditBackend instances")
+
     def get_audit_records(self, latest: datetime = None) -> DataFrame:
         raise NotImplementedError("The get_audit_records() method should be implemented by concrete AuditBackend instances")
 
@@ -8,8 +8,9 @@
 # Contributors: ds283$ <$>
 #
 
+import os
 from datetime import datetime
-from typing import Dict
+from typing import Dict, List
 from urllib.parse import SplitResult, urlunsplit
 
 from pandas import DataFrame
@@ -28,9 +29,24 @@ class MongoDBAuditBackend(AuditBackend):
         if "audit_collection" in data:
             del data["audit_collection"]
 
-        self._client = MongoClient(urlunsplit(mongodb_uri))
-        self._db = self._client[self._db_name]
-        self._collection = self._db[self._collection_name]
+        self._uri = urlunsplit(mongodb_uri)
+
+        # backends are usually constructed when the app configuration is imported, before web or worker
+        # processes fork, so the client is created lazily in the process that uses it
+        self._client = None
+        self._client_pid = None
+
+    @property
+    def cache_key(self):
+        return "mongodb", self._uri, self._db_name, self._collection_name
+
+    @property
+    def _collection(self):
+        if self._client is None or self._client_pid != os.getpid():
+            self._client = MongoClient(self._uri)
+            self._client_pid = os.getpid()
+
+        return self._client[self._db_name][self._collection_name]
 
     def store_audit_record(
         self,
@@ -40,18 +56,16 @@ class MongoDBAuditBackend(AuditBackend):
         bucket: str = None,
         host_uri: str = None,
     ) -> None:
-        now = datetime.now()
-        audit_record = {
-            "timestamp": now,
-            "type": type,
-            "data": audit_data,
-            "driver": driver,
-            "bucket": bucket,
-            "uri": host_uri,
-        }
-
+        audit_record = self.make_audit_record(type, audit_data, driver=driver, bucket=bucket, host_uri=host_uri)
         self._collection.insert_one(audit_record)
 
+    def store_audit_records(self, records: List[Dict]) -> None:
+        if not records:
+            return
+
+        # insert_many() adds an _id to each document; pass copies so that a retried batch is not mutated
+        self._collection.insert_many([dict(record) for record in records], ordered=False)
+
     def get_audit_records(self, latest: datetime = None) -> DataFrame:
         filter_data = {}
         if latest is not None:
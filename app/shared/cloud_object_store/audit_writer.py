@@ -0,0 +1,421 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+"""
+Buffered writer for cloud API audit records.
+
+ObjectStore operations enqueue audit records here rather than writing them to the audit backend
+synchronously. Queued records are written in batches with AuditBackend.store_audit_records() when either
+the batch size or the flush interval is reached, by a background thread that is started lazily in each
+process.
+
+Records are queued either in process memory (the default) or, if a Redis URL is supplied, in a Redis list
+shared by every process. The Redis queue survives a worker being killed and can be drained by any process,
+including the telemetry export task.
+
+The telemetry export reads queued records that cannot be flushed to the backend directly from the queue. These
+records are claimed when they are read: they are moved out of the queue (for Redis, into a separate
+'exporting' list) and are removed for good by delete_audit_records(), or returned to the queue by
+release_audit_records() if the export fails, so that each record is exported exactly once. Records left in the
+Redis 'exporting' list by an export that was killed are included again in the next export.
+
+The writer is fork-safe: a process that finds it was forked from the process that created the queue
+discards the inherited in-memory buffer (it still belongs to the parent, which will flush it) and starts
+its own flush thread. Pending records are flushed on interpreter exit, and flush_audit_writers() can be
+called from worker shutdown hooks where atexit handlers do not run.
+"""
+
+import atexit
+import json
+import os
+import threading
+import weakref
+from datetime import datetime
+from time import monotonic
+from typing import Dict, List, Optional
+
+from pandas import DataFrame, concat
+
+from .audit import AuditBackend
+
+_writers: "weakref.WeakSet[BufferedAuditWriter]" = weakref.WeakSet()
+
+
+class BufferedAuditWriter:
+    def __init__(
+        self,
+        backend: AuditBackend,
+        batch_size: int = 200,
+        flush_interval: float = 5.0,
+        max_backlog: int = 20000,
+        redis_url: Optional[str] = None,
+        redis_key: str = "cloud_api_audit:queue",
+    ):
+        self._backend = backend
+
+        self._batch_size = max(int(batch_size), 1)
+        self._flush_interval = max(float(flush_interval), 0.1)
+        self._max_backlog = max(int(max_backlog), self._batch_size)
+
+        self._redis_url = redis_url
+        self._redis_key = redis_key
+        self._redis_exporting_key = f"{redis_key}:exporting"
+
+        self._reset()
+        _writers.add(self)
+
+    def _reset(self) -> None:
+        # (re)initialize per-process state; called at construction and after a fork
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._redis = None
+
+        self._buffer: List[Dict] = []
+
+        # records read from the in-process buffer by get_audit_records() that have not yet been acknowledged
+        self._claimed: List[Dict] = []
+
+        self._enqueued = 0
+        self._flushed = 0
+        self._dropped = 0
+        self._failed_flushes = 0
+        self._last_flush_at: Optional[datetime] = None
+        self._last_flush_duration: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._started_at = monotonic()
+
+    def _check_pid(self) -> None:
+        if self._pid != os.getpid():
+            self._reset()
+
+    def _get_redis(self):
+        if self._redis is None:
+            from redis import Redis
+
+            self._redis = Redis.from_url(self._redis_url)
+
+        return self._redis
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._thread = threading.Thread(target=self._run, name="cloud-api-audit-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+
+            try:
+                self.flush()
+            except Exception:
+                # flush() records its own failures; the thread must survive them
+                pass
+
+    @property
+    def uses_redis(self) -> bool:
+        return self._redis_url is not None
+
+    def enqueue(
+        self,
+        type: str,
+        audit_data: str,
+        driver: str = None,
+        bucket: str = None,
+        host_uri: str = None,
+    ) -> None:
+        """
+        Queue an audit record for asynchronous storage. Does not perform I/O against the audit backend.
+        """
+        self._check_pid()
+
+        record = AuditBackend.make_audit_record(type, audit_data, driver=driver, bucket=bucket, host_uri=host_uri)
+
+        if self.uses_redis:
+            try:
+                r = self._get_redis()
+                backlog = r.rpush(self._redis_key, json.dumps(record, default=_encode_datetime))
+            except Exception as e:
+                # fall back to the in-process buffer if Redis is unavailable, so that the record is not lost
+                self._last_error = f"Redis enqueue failed: {e}"
+                backlog = self._append(record)
+        else:
+            backlog = self._append(record)
+
+        with self._lock:
+            self._enqueued += 1
+
+        self._ensure_thread()
+        if backlog >= self._batch_size:
+            self._wakeup.set()
+
+    def _append(self, record: Dict) -> int:
+        with self._lock:
+            self._buffer.append(record)
+
+            # if the backend is unavailable for long enough, shed the oldest records rather than grow without bound
+            overflow = len(self._buffer) - self._max_backlog
+            if overflow > 0:
+                del self._buffer[:overflow]
+                self._dropped += overflow
+
+            return len(self._buffer)
+
+    def _take_local(self) -> List[Dict]:
+        with self._lock:
+            batch = self._buffer[: self._batch_size]
+            del self._buffer[: self._batch_size]
+            return batch
+
+    def _restore_local(self, batch: List[Dict]) -> None:
+        with self._lock:
+            self._buffer[:0] = batch
+
+            overflow = len(self._buffer) - self._max_backlog
+            if overflow > 0:
+                del self._buffer[:overflow]
+                self._dropped += overflow
+
+    def _take_redis(self) -> List[Dict]:
+        r = self._get_redis()
+
+        pipe = r.pipeline(transaction=True)
+        pipe.lrange(self._redis_key, 0, self._batch_size - 1)
+        pipe.ltrim(self._redis_key, self._batch_size, -1)
+        raw_batch, _ = pipe.execute()
+
+        return [json.loads(raw, object_hook=_decode_datetime) for raw in raw_batch]
+
+    def _restore_redis(self, batch: List[Dict]) -> None:
+        r = self._get_redis()
+        r.lpush(self._redis_key, *[json.dumps(record, default=_encode_datetime) for record in reversed(batch)])
+
+    def flush(self) -> int:
+        """
+        Write all queued records to the audit backend in batches. Returns the number of records written.
+        On a backend error the failed batch is returned to the queue for the next attempt.
+        """
+        self._check_pid()
+
+        written = 0
+        with self._flush_lock:
+            start = monotonic()
+
+            sources = [(self._take_local, self._restore_local)]
+            if self.uses_redis:
+                sources.append((self._take_redis, self._restore_redis))
+
+            for take, restore in sources:
+                while True:
+                    try:
+                        batch = take()
+                    except Exception as e:
+                        self._last_error = f"Could not read audit queue: {e}"
+                        break
+
+                    if not batch:
+                        break
+
+                    try:
+                        self._backend.store_audit_records(batch)
+                    except Exception as e:
+                        with self._lock:
+                            self._failed_flushes += 1
+                        self._last_error = str(e)
+
+                        try:
+                            restore(batch)
+                        except Exception:
+                            with self._lock:
+                                self._dropped += len(batch)
+                        return written
+
+                    written += len(batch)
+                    with self._lock:
+                        self._flushed += len(batch)
+
+            if written > 0:
+                self._last_flush_at = datetime.now()
+                self._last_flush_duration = monotonic() - start
+
+        return written
+
+    def backlog(self) -> int:
+        """
+        Number of records queued but not yet written to the audit backend.
+        """
+        self._check_pid()
+
+        with self._lock:
+            pending = len(self._buffer)
+
+        if self.uses_redis:
+            try:
+                pending += self._get_redis().llen(self._redis_key)
+            except Exception:
+                pass
+
+        return pending
+
+    def stats(self) -> Dict:
+        """
+        Throughput and backlog metrics for this process.
+        """
+        self._check_pid()
+
+        elapsed = monotonic() - self._started_at
+        with self._lock:
+            flushed = self._flushed
+            data = {
+                "enqueued": self._enqueued,
+                "flushed": flushed,
+                "dropped": self._dropped,
+                "failed_flushes": self._failed_flushes,
+                "last_flush_at": self._last_flush_at,
+                "last_flush_duration": self._last_flush_duration,
+                "last_error": self._last_error,
+            }
+
+        data["backlog"] = self.backlog()
+        data["flushed_per_second"] = flushed / elapsed if elapsed > 0 else 0.0
+        data["queue"] = "redis" if self.uses_redis else "memory"
+        return data
+
+    def get_audit_records(self, latest: datetime = None) -> DataFrame:
+        """
+        Return audit records older than *latest*, including records that are still queued. Queued records
+        visible to this process are flushed to the backend first, so that a subsequent
+        delete_audit_records() call with the same *latest* removes exactly the records that were returned.
+        Records that cannot be flushed (e.g. because the backend is unavailable) are claimed from the queue and
+        returned too. They must be acknowledged with delete_audit_records(), or given back with
+        release_audit_records() if the export does not complete.
+        """
+        self.flush()
+
+        records = self._backend.get_audit_records(latest=latest)
+
+        pending = self._claim_pending_records(latest)
+        if not pending:
+            return records
+
+        return concat([records, DataFrame(pending)], ignore_index=True)
+
+    def _claim_pending_records(self, latest: datetime = None) -> List[Dict]:
+        self._check_pid()
+
+        def _older(record: Dict) -> bool:
+            return latest is None or record["timestamp"] < latest
+
+        with self._lock:
+            self._claimed.extend(record for record in self._buffer if _older(record))
+            self._buffer[:] = [record for record in self._buffer if not _older(record)]
+            pending = list(self._claimed)
+
+        if self.uses_redis:
+            try:
+                pending.extend(self._claim_redis(_older))
+            except Exception as e:
+                self._last_error = f"Could not claim queued audit records: {e}"
+
+        return pending
+
+    def _claim_redis(self, select) -> List[Dict]:
+        r = self._get_redis()
+
+        pipe = r.pipeline(transaction=True)
+        pipe.lrange(self._redis_key, 0, -1)
+        pipe.delete(self._redis_key)
+        raw_items, _ = pipe.execute()
+
+        claimed, keep = [], []
+        for raw in raw_items:
+            (claimed if select(json.loads(raw, object_hook=_decode_datetime)) else keep).append(raw)
+
+        pipe = r.pipeline(transaction=True)
+        if keep:
+            # records enqueued since the queue was read are at the tail, so these go back at the head
+            pipe.lpush(self._redis_key, *reversed(keep))
+        if claimed:
+            pipe.rpush(self._redis_exporting_key, *claimed)
+        pipe.lrange(self._redis_exporting_key, 0, -1)
+        *_, exporting = pipe.execute()
+
+        return [json.loads(raw, object_hook=_decode_datetime) for raw in exporting]
+
+    def delete_audit_records(self, latest: datetime = None) -> None:
+        """
+        Remove records older than *latest* from the backend, and acknowledge the queued records claimed by
+        get_audit_records(), which are then discarded.
+        """
+        self._backend.delete_audit_records(latest=latest)
+
+        with self._lock:
+            self._claimed.clear()
+
+        if self.uses_redis:
+            self._get_redis().delete(self._redis_exporting_key)
+
+    def release_audit_records(self) -> None:
+        """
+        Return the queued records claimed by get_audit_records() to the queue, after a failed export.
+        """
+        with self._lock:
+            self._buffer[:0] = self._claimed
+            self._claimed = []
+
+        if self.uses_redis:
+            r = self._get_redis()
+            pipe = r.pipeline(transaction=True)
+            pipe.lrange(self._redis_exporting_key, 0, -1)
+            pipe.delete(self._redis_exporting_key)
+            raw_items, _ = pipe.execute()
+            if raw_items:
+                r.lpush(self._redis_key, *reversed(raw_items))
+
+
+def _encode_datetime(obj):
+    if isinstance(obj, datetime):
+        return {"__datetime__": obj.isoformat()}
+    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
+
+
+def _decode_datetime(obj):
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+def flush_audit_writers() -> int:
+    """
+    Flush every audit writer in this process. Returns the number of records written.
+    """
+    written = 0
+    for writer in list(_writers):
+        try:
+            written += writer.flush()
+        except Exception:
+            pass
+
+    return written
+
+
+def audit_writer_stats() -> List[Dict]:
+    """
+    Throughput and backlog metrics for every audit writer in this process.
+    """
+    return [writer.stats() for writer in list(_writers)]
+
+
+atexit.register(flush_audit_writers)
@@ -21,6 +21,7 @@ from .drivers.local import LocalFileSystemDriver
 from .meta import ObjectMeta
 from .audit import AuditBackend
 from .audit_backends.mongodb import MongoDBAuditBackend
+from .audit_writer import BufferedAuditWriter
 
 _drivers = {
     "file": LocalFileSystemDriver,
@@ -30,6 +31,9 @@ _drivers = {
 
 _audit_backends = {"mongodb": MongoDBAuditBackend}
 
+# buffered audit writers, shared between object stores that write to the same audit destination
+_audit_writers: Dict = {}
+
 
 PathLike = Union[str, List[str], Path]
 BytesLike = Union[bytes, BytesIO]
@@ -152,6 +156,15 @@ class ObjectStore:
         if "audit" in data:
             del data["audit"]
 
+        # audit records are queued and written in batches; see audit_writer.BufferedAuditWriter
+        writer_options = {
+            "batch_size": data.pop("audit_batch_size", None),
+            "flush_interval": data.pop("audit_flush_interval", None),
+            "max_backlog": data.pop("audit_max_backlog", None),
+            "redis_url": data.pop("audit_queue", None),
+        }
+        writer_options = {k: v for k, v in writer_options.items() if v is not None}
+
         if "audit_backend" in data and data["audit_backend"] is not None:
             backend_uri_elements: SplitResult = urlsplit(data["audit_backend"])
 
@@ -160,9 +173,32 @@ class ObjectStore:
                 raise NotImplementedError(f'cloud_object_store: unsupported audit backend URI scheme "{backend_scheme}"')
 
             audit_backend_type: Type[AuditBackend] = _audit_backends[backend_scheme]
-            self._audit_backend = audit_backend_type(backend_uri_elements, data)
+            audit_backend: AuditBackend = audit_backend_type(backend_uri_elements, data)
+
+            key = audit_backend.cache_key
+            if key is not None and key in _audit_writers:
+                self._audit_writer = _audit_writers[key]
+            else:
+                self._audit_writer = BufferedAuditWriter(audit_backend, **writer_options)
+                if key is not None:
+                    _audit_writers[key] = self._audit_writer
         else:
-            self._audit_backend = None
+            self._audit_writer = None
+
+    def _store_audit_record(self, type: str, audit_data: str) -> None:
+        # generate audit record if auditing is enabled; the record is queued, not written, so this does not block
+        if self._audit and self._audit_writer is not None:
+            self._audit_writer.enqueue(
+                type,
+                audit_data,
+                driver=self._driver_name,
+                bucket=self._bucket_name,
+                host_uri=self._host_uri,
+            )
+
+    @property
+    def audit_writer(self) -> Optional[BufferedAuditWriter]:
+        return self._audit_writer
 
     @property
     def database_key(self) -> int:
@@ -201,15 +237,7 @@ class ObjectStore:
     ) -> bytes:
         data: bytes = self._driver.get(_as_path(key))
 
-        # generate audit record if auditing is enabled
-        if self._audit and self._audit_backend is not None:
-            self._audit_backend.store_audit_record(
-                "get",
-                audit_data,
-                driver=self._driver_name,
-                bucket=self._bucket_name,
-                host_uri=self._host_uri,
-            )
+        self._store_audit_record("get", audit_data)
 
         if self._encryption_pipeline is not None and not no_encryption:
             if self._encryption_pipeline.uses_nonce and nonce is None:
@@ -249,15 +277,7 @@ class ObjectStore:
 
         data = self._driver.get_range(_as_path(key), start=start, length=length)
 
-        # generate audit record if auditing is enabled
-        if self._audit and self._audit_backend is not None:
-            self._audit_backend.store_audit_record(
-                "get_range",
-                audit_data,
-                driver=self._driver_name,
-                bucket=self._bucket_name,
-                host_uri=self._host_uri,
-            )
+        self._store_audit_record("get_range", audit_data)
 
         return data
 
@@ -289,15 +309,7 @@ class ObjectStore:
 
         self._driver.put(_as_path(key), put_data, mimetype)
 
-        # generate audit record if auditing is enabled
-        if self._audit and self._audit_backend is not None:
-            self._audit_backend.store_audit_record(
-                "put",
-                audit_data,
-                driver=self._driver_name,
-                bucket=self._bucket_name,
-                host_uri=self._host_uri,
-            )
+        self._store_audit_record("put", audit_data)
 
         return {
             "nonce": nonce,
@@ -308,17 +320,7 @@ class ObjectStore:
     def delete(self, key: PathLike, audit_data: str) -> None:
         self._driver.delete(_as_path(key))
 
-        # generate audit record if auditing is enabled
-
-        # generate audit record if auditing is enabled
-        if self._audit and self._audit_backend is not None:
-            self._audit_backend.store_audit_record(
-                "delete",
-                audit_data,
-                driver=self._driver_name,
-                bucket=self._bucket_name,
-                host_uri=self._host_uri,
-            )
+        self._store_audit_record("delete", audit_data)
 
     def copy(self, src: PathLike, dst: PathLike, audit_data: str) -> None:
         if self._encryption_pipeline is not None:
@@ -328,63 +330,26 @@ class ObjectStore:
 
         self._driver.copy(_as_path(src), _as_path(dst))
 
-        # generate audit record if auditing is enabled
-
-        # generate audit record if auditing is enabled
-        if self._audit and self._audit_backend is not None:
-            self._audit_backend.store_audit_record(
-                "copy",
-                audit_data,
-                driver=self._driver_name,
-                bucket=self._bucket_name,
-                host_uri=self._host_uri,
-            )
+        self._store_audit_record("copy", audit_data)
 
     def list(self, audit_data: str, prefix: Optional[PathLike] = None) -> Dict[str, ObjectMeta]:
         data = self._driver.list(prefix=prefix)
 
-        # generate audit record if auditing is enabled
-        if self._audit:
-            # generate audit record if auditing is enabled
-            if self._audit and self._audit_backend is not None:
-                self._audit_backend.store_audit_record(
-                    "list",
-                    audit_data,
-                    driver=self._driver_name,
-                    bucket=self._bucket_name,
-                    host_uri=self._host_uri,
-                )
+        self._store_audit_record("list", audit_data)
 
         return data
 
     def list_keys(self, audit_data: str, prefix: Optional[PathLike] = None) -> Set[str]:
         data = self._driver.list_keys(prefix=prefix)
 
-        if self._audit and self._audit_backend is not None:
-            self._audit_backend.store_audit_record(
-                "list",
-                audit_data,
-                driver=self._driver_name,
-                bucket=self._bucket_name,
-                host_uri=self._host_uri,
-            )
+        self._store_audit_record("list", audit_data)
 
         return data
 
     def head(self, key: PathLike, audit_data: str) -> ObjectMeta:
         data = self._driver.head(_as_path(key))
 
-        # generate audit record if auditing is enabled
-        if self._audit:
-            # generate audit record if auditing is enabled
-            if self._audit and self._audit_backend is not None:
-                self._audit_backend.store_audit_record(
-                    "head",
-                    audit_data,
-                    driver=self._driver_name,
-                    bucket=self._bucket_name,
-                    host_uri=self._host_uri,
-                )
+        self._store_audit_record("head", audit_data)
 
         return data
 
@@ -403,15 +368,7 @@ class ObjectStore:
 
         url = self._driver.get_url(_as_path(key))
 
-        # generate audit record if auditing is enabled
-        if self._audit and self._audit_backend is not None:
-            self._audit_backend.store_audit_record(
-                "get_url",
-                audit_data,
-                driver=self._driver_name,
-                bucket=self._bucket_name,
-                host_uri=self._host_uri,
-            )
+        self._store_audit_record("get_url", audit_data)
 
         return url
 
@@ -7,18 +7,22 @@
 #
 # Contributors: David Seery <D.Seery@sussex.ac.uk>
 #
-from typing import Optional, Union
+from typing import Dict, List, Optional, Union
 
 from flask import current_app, has_request_context
 from flask_security import current_user
-from sqlalchemy import func, or_
+from sqlalchemy import and_, case, false, func, insert, literal, or_, select
 
 from ..database import db
 from ..models import (
     ConfirmRequest,
     CustomOffer,
+    EnrollmentRecord,
+    FacultyData,
     LiveProject,
+    Module,
     Project,
+    ProjectClass,
     ProjectClassConfig,
     ProjectDescription,
     SelectingStudent,
@@ -26,6 +30,22 @@ from ..models import (
     StudentJournalEntry,
     SubmissionRecord,
     SubmittingStudent,
+    User,
+    description_pclasses,
+    description_supervisors,
+    description_to_modules,
+    live_assessors,
+    live_project_programmes,
+    live_project_skills,
+    live_project_supervision,
+    live_project_tags,
+    live_project_to_modules,
+    live_supervisors,
+    project_assessors,
+    project_programmes,
+    project_skills,
+    project_supervisors,
+    project_tags,
 )
 from ..shared.journal import create_auto_journal_entry
 from ..shared.utils import get_current_year
@@ -121,6 +141,225 @@ def add_liveproject(
         db.session.commit()
 
 
+def _resolve_golive_descriptions(project_ids: List[int], pclass_id: int) -> Dict[int, int]:
+    """
+    Map each project id to the id of the ProjectDescription that applies for *pclass_id*: the description
+    attached to this project class, if there is one, and otherwise the project's default description.
+    This is the set-based equivalent of Project.get_description()
+    """
+    specific = dict(
+        db.session.execute(
+            select(ProjectDescription.parent_id, func.min(ProjectDescription.id))
+            .join(description_pclasses, description_pclasses.c.description_id == ProjectDescription.id)
+            .where(
+                description_pclasses.c.project_class_id == pclass_id,
+                ProjectDescription.parent_id.in_(project_ids),
+            )
+            .group_by(ProjectDescription.parent_id)
+        ).all()
+    )
+
+    defaults = dict(db.session.execute(select(Project.id, Project.default_id).where(Project.id.in_(project_ids))).all())
+
+    descriptions = {}
+    for pid in project_ids:
+        desc_id = specific.get(pid, defaults.get(pid))
+        if desc_id is None:
+            raise KeyError("Missing description for Project id={id}, ProjectClass id={pid}".format(id=pid, pid=pclass_id))
+        descriptions[pid] = desc_id
+
+    return descriptions
+
+
+def bulk_add_liveprojects(numbered_projects: List[tuple[int, int]], config: ProjectClassConfig) -> int:
+    """
+    Snapshot many projects into LiveProject records for *config* using a small fixed number of
+    INSERT ... SELECT statements, rather than one add_liveproject() call (and commit) per project.
+
+    *numbered_projects* is a list of (number, project_id) pairs. Projects that already have a LiveProject
+    counterpart for this config are skipped, as in add_liveproject().
+
+    The statements are issued in the current transaction; the caller is responsible for committing or
+    rolling back. Raises KeyError if a project has no usable description.
+    Returns the number of LiveProject records created.
+    """
+    config_id = config.id
+    pclass_id = config.pclass_id
+
+    existing = {
+        pid
+        for (pid,) in db.session.execute(
+            select(LiveProject.parent_id).where(
+                LiveProject.config_id == config_id,
+                LiveProject.parent_id.in_([pid for _, pid in numbered_projects]),
+            )
+        )
+    }
+
+    numbers = {pid: number for number, pid in numbered_projects if pid not in existing}
+    if len(numbers) == 0:
+        return 0
+
+    project_ids = list(numbers.keys())
+    descriptions = _resolve_golive_descriptions(project_ids, pclass_id)
+
+    # per-project values are supplied as CASE expressions keyed on the project id, so that all projects can
+    # be copied by a single statement
+    number_for_project = case(numbers, value=Project.id)
+    description_for_project = case(descriptions, value=Project.id)
+
+    # make sure pending ORM changes are visible to the INSERT ... SELECT statements
+    db.session.flush()
+
+    db.session.execute(
+        insert(LiveProject.__table__).from_select(
+            [
+                "config_id",
+                "parent_id",
+                "number",
+                "name",
+                "owner_id",
+                "use_supervisor_pool",
+                "ATAS_restricted",
+                "group_id",
+                "meeting_reqd",
+                "enforce_capacity",
+                "capacity",
+                "description",
+                "reading",
+                "aims",
+                "review_only",
+                "show_popularity",
+                "show_bookmarks",
+                "show_selections",
+                "dont_clash_presentations",
+                "hidden",
+                "page_views",
+            ],
+            select(
+                literal(config_id),
+                Project.id,
+                number_for_project,
+                Project.name,
+                Project.owner_id,
+                Project.use_supervisor_pool,
+                Project.ATAS_restricted,
+                Project.group_id,
+                Project.meeting_reqd,
+                Project.enforce_capacity,
+                ProjectDescription.capacity,
+                ProjectDescription.description,
+                ProjectDescription.reading,
+                ProjectDescription.aims,
+                ProjectDescription.review_only,
+                Project.show_popularity,
+                Project.show_bookmarks,
+                Project.show_selections,
+                Project.dont_clash_presentations,
+                false(),
+                literal(0),
+            )
+            .select_from(Project)
+            .join(ProjectDescription, ProjectDescription.id == description_for_project)
+            .where(Project.id.in_(project_ids)),
+        )
+    )
+
+    # the association tables are populated by joining the new LiveProject rows back to their parents
+    live = LiveProject.__table__
+    new_live = and_(live.c.config_id == config_id, live.c.parent_id.in_(project_ids))
+    description_for_live = case(descriptions, value=live.c.parent_id)
+
+    def copy_project_association(live_table, live_column, parent_table, parent_column):
+        db.session.execute(
+            insert(live_table).from_select(
+                ["project_id", live_column],
+                select(live.c.id, parent_table.c[parent_column])
+                .select_from(live)
+                .join(parent_table, parent_table.c.project_id == live.c.parent_id)
+                .where(new_live)
+                .distinct(),
+            )
+        )
+
+    copy_project_association(live_project_tags, "tag_id", project_tags, "tag_id")
+    copy_project_association(live_project_skills, "skill_id", project_skills, "skill_id")
+    copy_project_association(live_project_programmes, "programme_id", project_programmes, "programme_id")
+
+    # supervision team and modules come from the description; only active modules are carried over
+    db.session.execute(
+        insert(live_project_supervision).from_select(
+            ["project_id", "supervisor.id"],
+            select(live.c.id, description_supervisors.c.supervisor_id)
+            .select_from(live)
+            .join(description_supervisors, description_supervisors.c.description_id == description_for_live)
+            .where(new_live)
+            .distinct(),
+        )
+    )
+
+    db.session.execute(
+        insert(live_project_to_modules).from_select(
+            ["project_id", "module_id"],
+            select(live.c.id, description_to_modules.c.module_id)
+            .select_from(live)
+            .join(description_to_modules, description_to_modules.c.description_id == description_for_live)
+            .join(Module, Module.id == description_to_modules.c.module_id)
+            .where(new_live, Module.active)
+            .distinct(),
+        )
+    )
+
+    # assessors and supervisors are restricted to active faculty enrolled for this project class, mirroring
+    # ProjectConfigurationMixin._assessor_list_query() and _supervisor_list_query()
+    def copy_enrolled_faculty(live_table, parent_table, *criteria):
+        db.session.execute(
+            insert(live_table).from_select(
+                ["project_id", "faculty_id"],
+                select(live.c.id, parent_table.c.faculty_id)
+                .select_from(live)
+                .join(parent_table, parent_table.c.project_id == live.c.parent_id)
+                .join(FacultyData, FacultyData.id == parent_table.c.faculty_id)
+                .join(User, User.id == FacultyData.id)
+                .join(EnrollmentRecord, EnrollmentRecord.owner_id == FacultyData.id)
+                .join(ProjectClass, ProjectClass.id == EnrollmentRecord.pclass_id)
+                .where(
+                    new_live,
+                    User.active.is_(True),
+                    EnrollmentRecord.pclass_id == pclass_id,
+                    or_(*criteria),
+                )
+                .distinct(),
+            )
+        )
+
+    if config.uses_marker:
+        copy_enrolled_faculty(
+            live_assessors,
+            project_assessors,
+            and_(
+                ProjectClass.uses_marker.is_(True),
+                EnrollmentRecord.marker_state == EnrollmentRecord.MARKER_ENROLLED,
+            ),
+            and_(
+                ProjectClass.uses_presentations.is_(True),
+                EnrollmentRecord.presentations_state == EnrollmentRecord.PRESENTATIONS_ENROLLED,
+            ),
+        )
+
+    if config.uses_supervisor:
+        copy_enrolled_faculty(
+            live_supervisors,
+            project_supervisors,
+            and_(
+                ProjectClass.uses_supervisor.is_(True),
+                EnrollmentRecord.supervisor_state == EnrollmentRecord.SUPERVISOR_ENROLLED,
+            ),
+        )
+
+    return len(project_ids)
+
+
 def add_selector(student, config_id, convert=True, autocommit=False):
     # get StudentData instance
     if isinstance(student, StudentData):
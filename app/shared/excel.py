@@ -8,10 +8,22 @@
 # Contributors: David Seery <D.Seery@sussex.ac.uk>
 #
 
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple, Union
 
-def _normalize_excel_sheet_name(name: str) -> str:
-    if len(name) > 31:
-        name = name[:31]
+import xlsxwriter
+from xlsxwriter.format import Format
+
+# Excel's limit on the length of a sheet name
+_MAX_SHEET_NAME_LENGTH = 31
+
+
+def _normalize_excel_sheet_name(name: str, suffix: str = "") -> str:
+    # truncate before the suffix, so that names that differ only in their suffix remain distinct
+    name = name[: max(0, _MAX_SHEET_NAME_LENGTH - len(suffix))] + suffix
+    name = name[:_MAX_SHEET_NAME_LENGTH]
 
     name = name.replace("[", "(")
     name = name.replace("]", ")")
@@ -21,3 +33,268 @@ def _normalize_excel_sheet_name(name: str) -> str:
     name = name.replace("/", "-")
 
     return name
+
+
+class ExcelLink(NamedTuple):
+    """
+    Cell value to be written as a hyperlink by StreamingSheet.append(). If *text* is None, the URL is displayed.
+    """
+
+    url: str
+    text: Optional[str] = None
+
+
+class StreamingWorkbook:
+    """
+    Write-only Excel workbook that streams rows directly to a file on disk.
+
+    Wraps xlsxwriter in constant_memory mode: each row is flushed to a temporary file as soon as the next row
+    is started, so memory use does not grow with the number of rows. Rows must therefore be written in order,
+    one sheet at a time. Cell formats are created once with format() and reused for every cell that
+    refers to them, rather than being rebuilt per cell.
+
+    Typical use, together with ScratchFileManager and AssetUploadManager:
+
+        with ScratchFileManager(suffix=".xlsx") as mgr:
+            with StreamingWorkbook(mgr.path) as book:
+                sheet = book.add_sheet("Register", ["Student", "Grade"])
+                for row in iterate_in_batches(query, SubmissionRecord.id):
+                    sheet.append([row.name, row.grade])
+
+            # upload mgr.path
+    """
+
+    def __init__(self, path: Union[Path, str]):
+        path = Path(path)
+
+        self._workbook = xlsxwriter.Workbook(
+            str(path),
+            {
+                "constant_memory": True,
+                "tmpdir": str(path.parent),
+                # write strings verbatim; student-supplied text must never be interpreted as a formula or URL
+                "strings_to_formulas": False,
+                "strings_to_urls": False,
+                "strings_to_numbers": False,
+                "nan_inf_to_errors": True,
+            },
+        )
+
+        self._formats: Dict[str, Format] = {}
+        self._sheets: List["StreamingSheet"] = []
+        self._sheet_names: Set[str] = set()
+
+        self._header_format = self.format("header", bold=True, text_wrap=True, valign="vcenter", bg_color="#D0D0D0")
+        self._link_format = self.format("link", font_color="blue", underline=1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def format(self, name: str, **properties) -> Format:
+        """
+        Return the cell format registered under *name*, creating it from *properties* on first use.
+        """
+        fmt = self._formats.get(name)
+        if fmt is None:
+            fmt = self._workbook.add_format(properties)
+            self._formats[name] = fmt
+
+        return fmt
+
+    @property
+    def header_format(self) -> Format:
+        return self._header_format
+
+    @property
+    def link_format(self) -> Format:
+        return self._link_format
+
+    def add_sheet(
+        self,
+        name: str,
+        columns: Sequence[str],
+        header_formats: Union[Format, Sequence[Optional[Format]], None] = None,
+        freeze_panes: Optional[Tuple[int, int]] = None,
+        auto_width: bool = True,
+        suffix: str = "",
+    ) -> "StreamingSheet":
+        """
+        Start a new sheet with the given column headers. The previous sheet (if any) is finalized, since in
+        constant-memory mode rows can only be written to one sheet at a time.
+
+        :param name: sheet name; normalized with _normalize_excel_sheet_name(). If the normalized name is already
+            in use, a counter is appended to make it unique
+        :param columns: column header labels
+        :param header_formats: format for the header row, or one format per column; defaults to header_format
+        :param freeze_panes: (row, column) of the first unfrozen cell, e.g. (1, 1) to freeze row 1 and column A
+        :param auto_width: size columns to fit their contents (up to a maximum width)
+        :param suffix: appended to *name*; *name* is truncated first if necessary, so the suffix is always kept
+        """
+        if self._sheets:
+            self._sheets[-1].close()
+
+        worksheet = self._workbook.add_worksheet(self._unique_sheet_name(name, suffix))
+        sheet = StreamingSheet(self, worksheet, columns, header_formats, freeze_panes, auto_width)
+        self._sheets.append(sheet)
+        return sheet
+
+    def _unique_sheet_name(self, name: str, suffix: str) -> str:
+        sheet_name = _normalize_excel_sheet_name(name, suffix)
+
+        # Excel compares sheet names case-insensitively
+        counter = 2
+        while sheet_name.lower() in self._sheet_names:
+            sheet_name = _normalize_excel_sheet_name(name, f"{suffix} ({counter})")
+            counter += 1
+
+        self._sheet_names.add(sheet_name.lower())
+        return sheet_name
+
+    def close(self) -> None:
+        if self._workbook is None:
+            return
+
+        for sheet in self._sheets:
+            sheet.close()
+
+        # a workbook must contain at least one sheet to be valid
+        if not self._sheets:
+            self._workbook.add_worksheet()
+
+        self._workbook.close()
+        self._workbook = None
+
+
+class StreamingSheet:
+    """
+    A sheet of a StreamingWorkbook. Rows are appended in order and written to disk immediately.
+    """
+
+    _MIN_WIDTH = 8
+    _MAX_WIDTH = 50
+
+    # Excel's limit on the length of a string cell
+    _MAX_STRING_LENGTH = 32767
+
+    def __init__(
+        self,
+        book: StreamingWorkbook,
+        worksheet,
+        columns: Sequence[str],
+        header_formats: Union[Format, Sequence[Optional[Format]], None],
+        freeze_panes: Optional[Tuple[int, int]],
+        auto_width: bool,
+    ):
+        self._book = book
+        self._worksheet = worksheet
+        self._columns = list(columns)
+        self._index = {column: i for i, column in enumerate(self._columns)}
+        self._auto_width = auto_width
+        self._closed = False
+
+        self._widths = [len(str(column)) for column in self._columns]
+
+        if freeze_panes is not None:
+            worksheet.freeze_panes(*freeze_panes)
+
+        if header_formats is None:
+            header_formats = book.header_format
+        header_formats = self._expand(header_formats)
+
+        for col, column in enumerate(self._columns):
+            worksheet.write_string(0, col, str(column), header_formats[col])
+
+        self._row = 1
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    @property
+    def rows_written(self) -> int:
+        return self._row - 1
+
+    def _expand(self, formats) -> List[Optional[Format]]:
+        if formats is None or isinstance(formats, Format):
+            return [formats] * len(self._columns)
+        return list(formats)
+
+    def append(self, values: Sequence, formats: Union[Format, Sequence[Optional[Format]], None] = None) -> None:
+        """
+        Write one row. *values* must be in column order; missing trailing values are left blank.
+        *formats* is a single format applied to every cell, or one format (or None) per column.
+        """
+        if self._closed:
+            raise RuntimeError("StreamingSheet: cannot append to a sheet that has been closed")
+
+        formats = self._expand(formats)
+        row = self._row
+
+        for col, value in enumerate(values):
+            fmt = formats[col] if col < len(formats) else None
+            self._write(row, col, value, fmt)
+
+        self._row += 1
+
+    def append_dict(self, values: Mapping, formats: Union[Format, Sequence[Optional[Format]], None] = None) -> None:
+        """
+        Write one row from a mapping of column header to value. Keys that are not columns of this sheet are ignored.
+        """
+        row = [None] * len(self._columns)
+        for key, value in values.items():
+            col = self._index.get(key)
+            if col is not None:
+                row[col] = value
+
+        self.append(row, formats)
+
+    def _write(self, row: int, col: int, value, fmt: Optional[Format]) -> None:
+        worksheet = self._worksheet
+
+        if value is None:
+            if fmt is not None:
+                worksheet.write_blank(row, col, None, fmt)
+            return
+
+        if isinstance(value, ExcelLink):
+            worksheet.write_url(row, col, value.url, fmt if fmt is not None else self._book.link_format, string=value.text)
+            self._track_width(col, value.text if value.text is not None else value.url)
+            return
+
+        if isinstance(value, bool):
+            worksheet.write_boolean(row, col, value, fmt)
+        elif isinstance(value, (int, float, Decimal)):
+            worksheet.write_number(row, col, float(value), fmt)
+        elif isinstance(value, (datetime, date)):
+            worksheet.write_datetime(row, col, value, fmt if fmt is not None else self._book.format("datetime", num_format="yyyy-mm-dd hh:mm"))
+        else:
+            value = str(value)[: self._MAX_STRING_LENGTH]
+            worksheet.write_string(row, col, value, fmt)
+
+        self._track_width(col, value)
+
+    def _track_width(self, col: int, value) -> None:
+        if not self._auto_width or col >= len(self._widths):
+            return
+
+        length = len(str(value))
+        if length > self._widths[col]:
+            self._widths[col] = length
+
+    def close(self) -> None:
+        """
+        Finalize column widths. Called automatically when the next sheet is started or the workbook is closed.
+        """
+        if self._closed:
+            return
+
+        if self._auto_width:
+            # column metadata is written when the workbook is closed, so widths can be set after streaming the rows
+            for col, width in enumerate(self._widths):
+                self._worksheet.set_column(col, col, min(max(width + 2, self._MIN_WIDTH), self._MAX_WIDTH))
+
+        self._closed = True
@@ -0,0 +1,53 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+"""
+JSON encoding and decoding for large blobs stored in Text columns (e.g. SubmissionRecord.language_analysis).
+Uses orjson, which is several times faster than the standard library for multi-megabyte documents, and falls
+back to the json module if orjson is not installed.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# JSONDecodeError raised by loads(); orjson.JSONDecodeError is a subclass of json.JSONDecodeError
+JSONDecodeError = json.JSONDecodeError
+
+
+if orjson is not None:
+    # allow integer dictionary keys (as json.dumps does) and numpy scalars/arrays produced by the analysis pipeline
+    _DUMPS_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def loads(data):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # documents written by json.dumps() may contain NaN/Infinity literals, which orjson rejects
+            return json.loads(data)
+
+    def dumps(obj) -> str:
+        try:
+            return orjson.dumps(obj, option=_DUMPS_OPTIONS).decode("utf-8")
+        except orjson.JSONEncodeError:
+            # e.g. strings containing lone surrogates, or integers wider than 64 bits
+            return json.dumps(obj)
+
+else:
+
+    def loads(data):
+        return json.loads(data)
+
+    def dumps(obj) -> str:
+        return json.dumps(obj)
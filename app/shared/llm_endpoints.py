@@ -0,0 +1,340 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+"""
+Routing of LLM requests across a pool of Ollama endpoints.
+
+By default every request goes to OLLAMA_BASE_URL. If OLLAMA_ENDPOINTS is set, it lists several inference
+servers, each optionally with a limit on concurrent requests:
+
+    OLLAMA_ENDPOINTS="http://gpu1:11434=2,http://gpu2:11434=1,http://gpu3:11434"
+
+Endpoints without an explicit limit use OLLAMA_ENDPOINT_MAX_CONCURRENCY (0 = unlimited).
+
+_call_llm() takes a lease on an endpoint for each request attempt with acquire_endpoint(), and gives it back with
+release_endpoint(). Leases are members of a Redis sorted set per endpoint, scored by their expiry time, so the
+outstanding count is shared by all Celery workers. A lease held by a worker that died is dropped when it
+expires. acquire_endpoint() considers only healthy endpoints that are not cooling down after a failure (or every
+endpoint, if none is healthy). Among those with a free slot it prefers
+
+  1. endpoints that already have the model loaded (the pipeline requests keep_alive=-1, so a model stays
+     loaded once used, and loading a 70B model takes minutes),
+  2. the endpoint with the fewest outstanding requests, relative to its limit.
+
+If every such endpoint is at its limit, the caller waits for a slot for up to OLLAMA_ENDPOINT_WAIT_SECONDS.
+
+Health is checked with GET /api/ps, which also lists the loaded models. The result is kept in Redis and
+refreshed at most every OLLAMA_HEALTH_CHECK_SECONDS, by whichever worker finds it stale. After a transient
+failure (network error, timeout, HTTP 5xx) _call_llm() calls mark_endpoint_failed(). The endpoint is then
+avoided for OLLAMA_ENDPOINT_COOLDOWN_SECONDS, and the retry goes to another endpoint if there is one.
+
+If Redis is unavailable, requests go to the first endpoint that has not failed during the current call.
+"""
+
+import json
+import os
+import time
+from threading import Lock
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from uuid import uuid4
+
+import redis as redis_lib
+import requests
+from flask import current_app
+
+_LEASES_KEY_PREFIX = "llm_endpoint_leases"
+_HEALTH_KEY_PREFIX = "llm_endpoint_health"
+_PROBE_LOCK_PREFIX = "llm_endpoint_probe"
+
+# polling interval while waiting for a free slot
+_SLOT_POLL_SECONDS = 1.0
+
+# leases outlive the longest permitted request by this margin
+_LEASE_MARGIN_SECONDS = 120
+
+# timeout for a health probe; a server that cannot list its models this quickly is treated as unhealthy
+_PROBE_TIMEOUT_SECONDS = 5
+
+_clients: Dict[str, redis_lib.Redis] = {}
+_clients_pid: Optional[int] = None
+_lock = Lock()
+
+
+class Endpoint(NamedTuple):
+    url: str
+    max_concurrency: int  # 0 = unlimited
+
+
+class EndpointLease(NamedTuple):
+    url: str
+    token: Optional[str]  # None if no slot was recorded in Redis
+
+
+def _get_redis() -> Optional[redis_lib.Redis]:
+    global _clients_pid
+
+    url = current_app.config.get("ORCHESTRATION_REDIS_URL")
+    if not url:
+        return None
+
+    with _lock:
+        pid = os.getpid()
+        if _clients_pid != pid:
+            # connection pools are not fork-safe; rebuild them in a child process
+            _clients.clear()
+            _clients_pid = pid
+
+        client = _clients.get(url)
+        if client is None:
+            client = redis_lib.Redis.from_url(url, decode_responses=True)
+            _clients[url] = client
+
+        return client
+
+
+def configured_endpoints(default_url: str) -> List[Endpoint]:
+    """
+    Return the endpoint pool configured by OLLAMA_ENDPOINTS, or a pool containing only *default_url* if it is
+    not set.
+    """
+    default_limit = int(current_app.config.get("OLLAMA_ENDPOINT_MAX_CONCURRENCY", 0) or 0)
+    spec = current_app.config.get("OLLAMA_ENDPOINTS") or ""
+
+    endpoints: List[Endpoint] = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        url, _, limit = item.partition("=")
+        try:
+            max_concurrency = int(limit) if limit else default_limit
+        except ValueError:
+            current_app.logger.warning(f"llm_endpoints: ignoring invalid concurrency limit in OLLAMA_ENDPOINTS entry '{item}'")
+            max_concurrency = default_limit
+        endpoints.append(Endpoint(url=url.strip().rstrip("/"), max_concurrency=max(0, max_concurrency)))
+
+    if not endpoints:
+        endpoints.append(Endpoint(url=default_url.rstrip("/"), max_concurrency=default_limit))
+    return endpoints
+
+
+def _leases_key(url: str) -> str:
+    return f"{_LEASES_KEY_PREFIX}:{url}"
+
+
+def _health_key(url: str) -> str:
+    return f"{_HEALTH_KEY_PREFIX}:{url}"
+
+
+# ---------------------------------------------------------------------------
+# Health
+# ---------------------------------------------------------------------------
+
+
+def probe_endpoint(url: str) -> dict:
+    """Check *url* with GET /api/ps and return {"ok": bool, "models": [loaded model names]}."""
+    try:
+        resp = requests.get(f"{url}/api/ps", timeout=_PROBE_TIMEOUT_SECONDS)
+        resp.raise_for_status()
+        data = resp.json()
+    except Exception as exc:
+        current_app.logger.warning(f"llm_endpoints: health check of {url} failed: {type(exc).__name__}: {exc}")
+        return {"ok": False, "models": []}
+
+    models = []
+    for entry in data.get("models") or []:
+        if isinstance(entry, dict):
+            name = entry.get("name") or entry.get("model")
+            if name:
+                models.append(name)
+    return {"ok": True, "models": models}
+
+
+def _endpoint_health(r: redis_lib.Redis, url: str, now: float) -> dict:
+    """Return the cached health of *url*, refreshing it first if it is stale."""
+    interval = current_app.config.get("OLLAMA_HEALTH_CHECK_SECONDS", 30)
+    raw = r.hgetall(_health_key(url))
+
+    checked = float(raw.get("checked", 0) or 0)
+    if now - checked >= interval and r.set(f"{_PROBE_LOCK_PREFIX}:{url}", "1", nx=True, ex=max(1, int(interval))):
+        result = probe_endpoint(url)
+        raw["ok"] = "1" if result["ok"] else "0"
+        raw["checked"] = f"{now:.3f}"
+        # models are only replaced when the probe succeeds, so a brief outage does not lose them
+        if result["ok"]:
+            raw["models"] = json.dumps(result["models"])
+        r.hset(_health_key(url), mapping={k: raw[k] for k in ("ok", "checked", "models") if k in raw})
+
+    try:
+        models = json.loads(raw.get("models") or "[]")
+    except (TypeError, ValueError):
+        models = []
+
+    return {
+        "ok": raw.get("ok", "1") == "1",
+        "down_until": float(raw.get("down_until", 0) or 0),
+        "models": models,
+    }
+
+
+def _model_loaded(model: str, loaded: Iterable[str]) -> bool:
+    # Ollama reports 'llama3.1:70b'; a request for 'llama3.1' refers to 'llama3.1:latest'
+    name = model if ":" in model else f"{model}:latest"
+    return name in loaded or model in loaded
+
+
+def mark_endpoint_failed(lease: EndpointLease, exc: Exception) -> None:
+    """Avoid the endpoint of *lease* for OLLAMA_ENDPOINT_COOLDOWN_SECONDS after a transient failure."""
+    cooldown = current_app.config.get("OLLAMA_ENDPOINT_COOLDOWN_SECONDS", 60)
+    try:
+        r = _get_redis()
+        if r is None:
+            return
+        r.hset(_health_key(lease.url), "down_until", f"{time.time() + cooldown:.3f}")
+        current_app.logger.warning(f"llm_endpoints: {lease.url} marked unavailable for {cooldown}s after {type(exc).__name__}")
+    except Exception as err:
+        current_app.logger.warning(f"llm_endpoints: could not record failure of {lease.url}: {err}")
+
+
+def note_model_loaded(lease: EndpointLease, model: str) -> None:
+    """Record that *model* is loaded on the endpoint of *lease* after a successful request."""
+    try:
+        r = _get_redis()
+        if r is None:
+            return
+        key = _health_key(lease.url)
+        try:
+            models = json.loads(r.hget(key, "models") or "[]")
+        except (TypeError, ValueError):
+            models = []
+        if not _model_loaded(model, models):
+            models.append(model)
+            r.hset(key, "models", json.dumps(models))
+        r.hdel(key, "down_until")
+    except Exception as err:
+        current_app.logger.warning(f"llm_endpoints: could not record loaded model for {lease.url}: {err}")
+
+
+# ---------------------------------------------------------------------------
+# Leases
+# ---------------------------------------------------------------------------
+
+
+def _try_acquire(r: redis_lib.Redis, endpoint: Endpoint, now: float, lease_seconds: float) -> Optional[str]:
+    """Take a slot on *endpoint* if one is free, and return the lease token; otherwise return None."""
+    key = _leases_key(endpoint.url)
+    token = uuid4().hex
+
+    pipe = r.pipeline(transaction=True)
+    pipe.zremrangebyscore(key, "-inf", now)
+    pipe.zadd(key, {token: now + lease_seconds})
+    pipe.zcard(key)
+    pipe.expire(key, int(lease_seconds) + 1)
+    _, _, count, _ = pipe.execute()
+
+    if endpoint.max_concurrency and count > endpoint.max_concurrency:
+        # optimistic: two workers racing for the last slot may both back off, in which case both try again
+        r.zrem(key, token)
+        return None
+    return token
+
+
+def _outstanding(r: redis_lib.Redis, endpoints: List[Endpoint], now: float) -> List[int]:
+    pipe = r.pipeline(transaction=False)
+    for endpoint in endpoints:
+        pipe.zcount(_leases_key(endpoint.url), now, "+inf")
+    return pipe.execute()
+
+
+def acquire_endpoint(endpoints: List[Endpoint], model: str, exclude: Iterable[str] = (), label: str = "llm") -> EndpointLease:
+    """
+    Choose an endpoint from *endpoints* for a request to *model*, take a slot on it, and return the lease.
+    Endpoints in *exclude* (those that already failed during this call) are used only if there is no other.
+    The lease must be given back with release_endpoint().
+    """
+    exclude = set(exclude)
+    if len(endpoints) == 1 and not endpoints[0].max_concurrency:
+        return EndpointLease(url=endpoints[0].url, token=None)
+
+    try:
+        r = _get_redis()
+    except Exception as exc:
+        current_app.logger.warning(f"{label}: endpoint routing unavailable ({exc}); using the first endpoint")
+        r = None
+    if r is None:
+        fresh = [e for e in endpoints if e.url not in exclude]
+        return EndpointLease(url=(fresh or endpoints)[0].url, token=None)
+
+    max_request = current_app.config.get("OLLAMA_MAX_REQUEST_SECONDS", 1800)
+    lease_seconds = max_request + _LEASE_MARGIN_SECONDS
+    wait_limit = current_app.config.get("OLLAMA_ENDPOINT_WAIT_SECONDS", 600)
+    wait_start = time.monotonic()
+    waited_logged = False
+
+    while True:
+        now = time.time()
+        try:
+            health = {e.url: _endpoint_health(r, e.url, now) for e in endpoints}
+            outstanding = _outstanding(r, endpoints, now)
+        except Exception as exc:
+            current_app.logger.warning(f"{label}: could not read endpoint state ({exc}); using the first endpoint")
+            fresh = [e for e in endpoints if e.url not in exclude]
+            return EndpointLease(url=(fresh or endpoints)[0].url, token=None)
+
+        def _available(endpoint: Endpoint) -> bool:
+            h = health[endpoint.url]
+            return h["ok"] and h["down_until"] <= now and endpoint.url not in exclude
+
+        def _rank(item):
+            endpoint, count = item
+            h = health[endpoint.url]
+            load = count / endpoint.max_concurrency if endpoint.max_concurrency else 0.0
+            # down_until is kept after the cooldown ends (until the next successful request clears it), so rank by
+            # the cooldown remaining; an endpoint that has recovered competes on equal terms with the others
+            return max(0.0, h["down_until"] - now), not _model_loaded(model, h["models"]), load, count
+
+        # unavailable endpoints are used only if no endpoint is available, soonest-recovering first;
+        # if the available endpoints are merely busy, wait for one of them instead
+        candidates = [item for item in zip(endpoints, outstanding) if _available(item[0])]
+        if not candidates:
+            candidates = list(zip(endpoints, outstanding))
+
+        for endpoint, _count in sorted(candidates, key=_rank):
+            try:
+                token = _try_acquire(r, endpoint, now, lease_seconds)
+            except Exception as exc:
+                current_app.logger.warning(f"{label}: could not take a slot on {endpoint.url} ({exc}); sending without a lease")
+                return EndpointLease(url=endpoint.url, token=None)
+            if token is not None:
+                return EndpointLease(url=endpoint.url, token=token)
+
+        waited = time.monotonic() - wait_start
+        if waited >= wait_limit:
+            # the pool is oversubscribed (OLLAMA_BATCH_SIZE is larger than its total capacity); proceed
+            # rather than fail the record
+            endpoint = min(candidates, key=_rank)[0]
+            current_app.logger.warning(f"{label}: no free endpoint slot after {waited:.0f}s; sending to {endpoint.url} anyway")
+            return EndpointLease(url=endpoint.url, token=None)
+        if not waited_logged:
+            current_app.logger.info(f"{label}: all LLM endpoints are at their concurrency limit; waiting for a free slot")
+            waited_logged = True
+        time.sleep(_SLOT_POLL_SECONDS)
+
+
+def release_endpoint(lease: EndpointLease) -> None:
+    """Give back the slot held by *lease*."""
+    if lease.token is None:
+        return
+    try:
+        r = _get_redis()
+        if r is not None:
+            r.zrem(_leases_key(lease.url), lease.token)
+    except Exception as exc:
+        current_app.logger.warning(f"llm_endpoints: could not release slot on {lease.url}: {exc}")
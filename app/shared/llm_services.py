@@ -9,6 +9,7 @@
 #
 
 import json
+import threading
 import time
 import traceback
 
@@ -16,6 +17,9 @@ import requests
 from billiard.exceptions import SoftTimeLimitExceeded
 from flask import current_app
 
+from .llm_endpoints import acquire_endpoint, configured_endpoints, mark_endpoint_failed, note_model_loaded, release_endpoint
+from .token_budget import learned_token_ratios, record_prompt_usage
+
 # ---------------------------------------------------------------------------
 # Token estimation.
 # ---------------------------------------------------------------------------
@@ -39,6 +43,81 @@ _LLM_RETRY_ATTEMPTS = 3
 _LLM_RETRY_DELAY = 5  # seconds
 
 
+class ContextOverflowError(ValueError):
+    """
+    Raised (and returned as last_exception by _call_llm) when generation stopped with finish_reason=length,
+    i.e. the prompt plus the response did not fit in the context window.  Requests are made at temperature 0,
+    so repeating an identical request would overflow again; callers should shrink the prompt instead.
+    """
+
+
+# ---------------------------------------------------------------------------
+# Usage accounting.
+# Totals for successful _call_llm() requests made since the last call to
+# reset_llm_usage().  Pipeline step tracking resets the totals when a step
+# starts and collects them when it ends, so that LLM throughput can be
+# attributed to the step without threading counters through every call site.
+# ---------------------------------------------------------------------------
+
+_usage = threading.local()
+
+
+def reset_llm_usage() -> None:
+    _usage.totals = None
+
+
+def take_llm_usage() -> dict | None:
+    """
+    Return the usage totals accumulated since the last reset_llm_usage() and reset them, or None if no
+    successful LLM request has been made.  The dict has keys model, calls, request_ms, decode_ms,
+    prompt_tokens, completion_tokens, cached_prompt_tokens and cache_reported_prompt_tokens.  decode_ms runs
+    from the first streamed content delta to the end of the response, so completion_tokens / decode_ms measures
+    generation speed independent of prompt processing.
+
+    cached_prompt_tokens counts prompt tokens served from the inference server's prompt cache, as reported in
+    usage.prompt_tokens_details.cached_tokens.  Not every server reports it, so cache_reported_prompt_tokens
+    counts the prompt tokens of the requests that did; the cache hit rate is the ratio of the two.
+    """
+    totals = getattr(_usage, "totals", None)
+    _usage.totals = None
+    return totals
+
+
+def _accumulate_usage(model: str, request_s: float, decode_s: float, usage: dict | None) -> None:
+    totals = getattr(_usage, "totals", None)
+    if totals is None:
+        totals = {
+            "model": model,
+            "calls": 0,
+            "request_ms": 0,
+            "decode_ms": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "cached_prompt_tokens": 0,
+            "cache_reported_prompt_tokens": 0,
+        }
+        _usage.totals = totals
+
+    totals["calls"] += 1
+    totals["request_ms"] += int(request_s * 1000)
+    totals["decode_ms"] += int(decode_s * 1000)
+    if usage:
+        totals["prompt_tokens"] += usage.get("prompt_tokens") or 0
+        totals["completion_tokens"] += usage.get("completion_tokens") or 0
+        cached = cached_prompt_tokens(usage)
+        if cached is not None:
+            totals["cached_prompt_tokens"] += cached
+            totals["cache_reported_prompt_tokens"] += usage.get("prompt_tokens") or 0
+
+
+def cached_prompt_tokens(usage: dict | None) -> int | None:
+    """Return the number of prompt tokens served from the server's prompt cache, or None if not reported."""
+    details = (usage or {}).get("prompt_tokens_details")
+    if not isinstance(details, dict) or details.get("cached_tokens") is None:
+        return None
+    return int(details["cached_tokens"])
+
+
 def _truncate_text(text: str) -> tuple[str, bool]:
     """
     If *text* exceeds _MAX_WORDS_BEFORE_TRUNCATION words, return a truncated
@@ -77,10 +156,26 @@ def _call_llm(
 
     user_tokens_per_word: if provided, used instead of _TOKENS_PER_WORD for the user-prompt
     word count.  Pass _TOKENS_PER_WORD_CONTENT for calls that submit student submission text
-    so that est_input_tokens matches the assumptions of the chunk-budget formula.
+    so that est_input_tokens matches the assumptions of the chunk-budget formula.  Once
+    enough usage has been recorded for *model*, the learned ratios from token_budget are
+    used instead.
+
+    If the response is truncated by the context window, the request is not retried and
+    last_exception is a ContextOverflowError.
+
+    Each attempt is routed to an endpoint from the OLLAMA_ENDPOINTS pool (or *base_url* if no
+    pool is configured) by llm_endpoints.acquire_endpoint().  After a transient network or
+    server error the next attempt goes to a different endpoint, without the retry delay, if
+    the pool has one.
     """
-    _user_tpw = user_tokens_per_word if user_tokens_per_word is not None else _TOKENS_PER_WORD
-    est_input_tokens = int(len(system_prompt.split()) * _TOKENS_PER_WORD + len(user_prompt.split()) * _user_tpw)
+    system_words = len(system_prompt.split())
+    user_words = len(user_prompt.split())
+    ratios = learned_token_ratios(model)
+    if ratios is not None:
+        est_input_tokens = int(system_words * ratios.system + user_words * ratios.content)
+    else:
+        _user_tpw = user_tokens_per_word if user_tokens_per_word is not None else _TOKENS_PER_WORD
+        est_input_tokens = int(system_words * _TOKENS_PER_WORD + user_words * _user_tpw)
     accumulated = ""
     last_exc: Exception | None = None
     parsed_result: dict | None = None
@@ -88,12 +183,30 @@ def _call_llm(
 
     max_request_seconds = current_app.config.get("OLLAMA_MAX_REQUEST_SECONDS", 1800)
 
+    endpoints = configured_endpoints(base_url)
+    failed_endpoints: set[str] = set()
+
+    def _endpoint_failed(exc: Exception) -> None:
+        mark_endpoint_failed(lease, exc)
+        failed_endpoints.add(lease.url)
+
+    def _endpoint_retry_delay() -> float:
+        # no need to wait before retrying if there is an endpoint that has not failed yet
+        if any(e.url not in failed_endpoints for e in endpoints):
+            return 0
+        return _LLM_RETRY_DELAY
+
     for attempt in range(_LLM_RETRY_ATTEMPTS):
+        # back-off before the next attempt; the pause is taken after the endpoint slot has been released, so that
+        # other workers can use it in the meantime
+        retry_delay = 0
         accumulated = ""
+        lease = acquire_endpoint(endpoints, model, exclude=failed_endpoints, label=label)
         attempt_start = time.monotonic()
+        first_content_at: float | None = None
         try:
             resp = requests.post(
-                f"{base_url}/v1/chat/completions",
+                f"{lease.url}/v1/chat/completions",
                 json={
                     "model": model,
                     "messages": [
@@ -146,6 +259,8 @@ def _call_llm(
                 delta = first_choice.get("delta") or {}
                 content = delta.get("content") if isinstance(delta, dict) else None
                 if isinstance(content, str):
+                    if first_content_at is None and content:
+                        first_content_at = time.monotonic()
                     accumulated += content
                 fr = first_choice.get("finish_reason")
                 if fr is not None:
@@ -166,15 +281,25 @@ def _call_llm(
                 current_app.logger.debug(
                     f"{label}: token usage — prompt={usage.get('prompt_tokens')} "
                     f"completion={usage.get('completion_tokens')} "
-                    f"total={usage.get('total_tokens')}"
+                    f"total={usage.get('total_tokens')} "
+                    f"cached={cached_prompt_tokens(usage)}"
                 )
             if not seen_done:
                 current_app.logger.warning(
                     f"{label}: stream ended without [DONE] marker on attempt {attempt + 1}; "
                     f"accumulated_len={len(accumulated)} finish_reason={finish_reason!r}"
                 )
+            if usage is not None:
+                record_prompt_usage(
+                    model,
+                    system_words,
+                    user_words,
+                    usage.get("prompt_tokens"),
+                    num_ctx=(options or {}).get("num_ctx"),
+                    finish_reason=finish_reason,
+                )
             if finish_reason == "length":
-                raise ValueError(
+                raise ContextOverflowError(
                     f"output truncated by context window (finish_reason=length); "
                     f"prompt_tokens={usage.get('prompt_tokens') if usage else 'unknown'} "
                     f"completion_tokens={usage.get('completion_tokens') if usage else 'unknown'}"
@@ -186,6 +311,9 @@ def _call_llm(
             parsed_result = parsed
             last_exc = None
             actual_usage = usage
+            attempt_end = time.monotonic()
+            _accumulate_usage(model, attempt_end - attempt_start, attempt_end - (first_content_at or attempt_end), usage)
+            note_model_loaded(lease, model)
             break
 
         except requests.HTTPError as exc:
@@ -194,13 +322,21 @@ def _call_llm(
             if 400 <= status < 500:
                 current_app.logger.error(f"{label}: permanent HTTP {status} error (~{est_input_tokens} est. input tokens): {exc}")
                 break
-            current_app.logger.warning(f"{label}: transient HTTP error on attempt {attempt + 1} (~{est_input_tokens} est. input tokens): {exc}")
+            current_app.logger.warning(
+                f"{label}: transient HTTP error from {lease.url} on attempt {attempt + 1} (~{est_input_tokens} est. input tokens): {exc}"
+            )
+            _endpoint_failed(exc)
             if attempt < _LLM_RETRY_ATTEMPTS - 1:
-                time.sleep(_LLM_RETRY_DELAY)
+                retry_delay = _endpoint_retry_delay()
 
         except SoftTimeLimitExceeded:
             raise  # must not be swallowed — propagate so the task fails cleanly
 
+        except ContextOverflowError as exc:
+            last_exc = exc
+            current_app.logger.warning(f"{label}: context window exceeded on attempt {attempt + 1} (~{est_input_tokens} est. input tokens): {exc}")
+            break
+
         except (json.JSONDecodeError, ValueError) as exc:
             last_exc = exc
             _tail = accumulated[-300:] if len(accumulated) > 300 else accumulated
@@ -213,15 +349,17 @@ def _call_llm(
                 f"  accumulated_tail: {_tail!r}"
             )
             if attempt < _LLM_RETRY_ATTEMPTS - 1:
-                time.sleep(_LLM_RETRY_DELAY)
+                retry_delay = _LLM_RETRY_DELAY
 
         except (requests.ConnectionError, requests.Timeout) as exc:
             last_exc = exc
             current_app.logger.warning(
-                f"{label}: transient network error on attempt {attempt + 1} (~{est_input_tokens} est. input tokens): {type(exc).__name__}: {exc}"
+                f"{label}: transient network error from {lease.url} on attempt {attempt + 1} "
+                f"(~{est_input_tokens} est. input tokens): {type(exc).__name__}: {exc}"
             )
+            _endpoint_failed(exc)
             if attempt < _LLM_RETRY_ATTEMPTS - 1:
-                time.sleep(_LLM_RETRY_DELAY)
+                retry_delay = _endpoint_retry_delay()
 
         except Exception as exc:
             last_exc = exc
@@ -230,6 +368,12 @@ def _call_llm(
             )
             current_app.logger.warning(f"{label}: traceback (attempt {attempt + 1}):\n{traceback.format_exc()}")
             if attempt < _LLM_RETRY_ATTEMPTS - 1:
-                time.sleep(_LLM_RETRY_DELAY)
+                retry_delay = _LLM_RETRY_DELAY
+
+        finally:
+            release_endpoint(lease)
+
+        if retry_delay > 0:
+            time.sleep(retry_delay)
 
     return parsed_result, accumulated, last_exc, est_input_tokens, actual_usage
@@ -0,0 +1,190 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+"""
+Push-based delivery of live notifications to the browser.
+
+Every notification destined for a user is appended to a per-user Redis stream. Browser tabs hold a
+long-poll request open against this stream (admin.notifications_poll) and are woken as soon as a new
+entry arrives, so an idle tab costs one blocked Redis read rather than a repeated SQL query.
+
+Task progress ticks live *only* in Redis: the latest payload for each task is kept in a per-user hash,
+so that a freshly-loaded page can redraw its progress bars, and each tick is published on the stream.
+Durable notifications (user messages, show/hide and replace-text requests, and final task states)
+continue to be written to the notifications table and are additionally published here once the inserting
+transaction commits.
+"""
+
+import json
+from time import time as current_seconds_since_epoch
+
+from flask import current_app
+from redis.exceptions import RedisError
+
+from .internal_redis import get_redis
+
+# key templates for the per-user notification stream and task-progress snapshot
+_STREAM_KEY = "_notify_stream:{user_id}"
+_PROGRESS_KEY = "_notify_progress:{user_id}"
+
+# cap on the number of entries retained in each user's stream; the browser only ever needs the
+# entries published since its last poll, so a short tail is sufficient
+_STREAM_MAXLEN = 250
+
+# streams and progress snapshots expire if there is no activity for this many seconds
+_KEY_TTL = 86400
+
+
+def _decode(value):
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return value
+
+
+def _serialize(ntype, uuid, payload, timestamp):
+    return {
+        "type": str(ntype),
+        "uuid": uuid,
+        "timestamp": str(int(timestamp)),
+        "payload": json.dumps(payload),
+    }
+
+
+def _deserialize(fields):
+    fields = {_decode(k): _decode(v) for k, v in fields.items()}
+    return {
+        "type": int(fields["type"]),
+        "uuid": fields["uuid"],
+        "timestamp": int(fields["timestamp"]),
+        "payload": json.loads(fields["payload"]),
+    }
+
+
+def publish_notification(user_id: int, ntype: int, uuid: str, payload, timestamp=None) -> bool:
+    """
+    Append a notification to the stream for *user_id*, waking any browser tabs that are long-polling it.
+    Returns True on success, False if Redis is unavailable. Failure to publish is never fatal; the
+    durable copy (if any) will be picked up the next time the page loads.
+    """
+    if timestamp is None:
+        timestamp = current_seconds_since_epoch()
+
+    key = _STREAM_KEY.format(user_id=user_id)
+
+    try:
+        redis = get_redis()
+        pipe = redis.pipeline(transaction=False)
+        pipe.xadd(key, _serialize(ntype, uuid, payload, timestamp), maxlen=_STREAM_MAXLEN, approximate=True)
+        pipe.expire(key, _KEY_TTL)
+        pipe.execute()
+        return True
+
+    except RedisError as e:
+        current_app.logger.warning(f"notification_stream.publish_notification: could not publish for user #{user_id}: {e}")
+        return False
+
+
+def publish_task_progress(user_id: int, ntype: int, uuid: str, payload, final: bool = False) -> bool:
+    """
+    Record a task progress tick for *user_id*. The latest payload for each task is kept in a Redis hash
+    so that a page load can redraw progress bars without touching the database; once a task reaches a
+    final state its entry is dropped from the hash (the final state is persisted to SQL by the caller).
+    """
+    timestamp = current_seconds_since_epoch()
+    key = _PROGRESS_KEY.format(user_id=user_id)
+
+    try:
+        redis = get_redis()
+        pipe = redis.pipeline(transaction=False)
+        if final:
+            pipe.hdel(key, uuid)
+        else:
+            pipe.hset(key, uuid, json.dumps(_serialize(ntype, uuid, payload, timestamp)))
+            pipe.expire(key, _KEY_TTL)
+        pipe.execute()
+
+    except RedisError as e:
+        current_app.logger.warning(f"notification_stream.publish_task_progress: could not store progress for user #{user_id}: {e}")
+        return False
+
+    return publish_notification(user_id, ntype, uuid, payload, timestamp=timestamp)
+
+
+def get_task_progress(user_id: int) -> list:
+    """
+    Return the latest progress notification for every in-flight task belonging to *user_id*,
+    in ascending order of timestamp.
+    """
+    try:
+        entries = get_redis().hgetall(_PROGRESS_KEY.format(user_id=user_id))
+    except RedisError as e:
+        current_app.logger.warning(f"notification_stream.get_task_progress: could not read progress for user #{user_id}: {e}")
+        return []
+
+    data = [_deserialize(json.loads(_decode(v))) for v in entries.values()]
+    return sorted(data, key=lambda n: n["timestamp"])
+
+
+def get_stream_cursor(user_id: int) -> str:
+    """
+    Return the ID of the newest entry in the stream for *user_id*, suitable for use as the starting
+    cursor of a subsequent read_notifications() call. Returns "0-0" if the stream is empty.
+    """
+    try:
+        entries = get_redis().xrevrange(_STREAM_KEY.format(user_id=user_id), count=1)
+    except RedisError:
+        return "0-0"
+
+    if not entries:
+        return "0-0"
+
+    entry_id, _ = entries[0]
+    return _decode(entry_id)
+
+
+def read_notifications(user_id: int, cursor: str, timeout: int = 0):
+    """
+    Read notifications published for *user_id* after *cursor*, blocking for up to *timeout* seconds
+    if none are available yet.
+    Returns a (cursor, notifications) pair, where the returned cursor should be passed to the next call.
+    """
+    key = _STREAM_KEY.format(user_id=user_id)
+
+    try:
+        block = int(timeout * 1000) if timeout > 0 else None
+        response = get_redis().xread({key: cursor}, count=_STREAM_MAXLEN, block=block)
+    except RedisError as e:
+        current_app.logger.warning(f"notification_stream.read_notifications: could not read stream for user #{user_id}: {e}")
+        return cursor, []
+
+    notifications = []
+    for _stream, entries in response or []:
+        for entry_id, fields in entries:
+            cursor = _decode(entry_id)
+            try:
+                notifications.append(_deserialize(fields))
+            except (KeyError, ValueError):
+                continue
+
+    return cursor, notifications
+
+
+def clear_all_task_progress() -> int:
+    """
+    Drop every per-user task progress snapshot. Used when background task records are reset.
+    Returns the number of keys removed.
+    """
+    redis = get_redis()
+
+    count = 0
+    for key in redis.scan_iter(match=_PROGRESS_KEY.format(user_id="*")):
+        count += redis.delete(key)
+
+    return count
@@ -0,0 +1,225 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+"""
+Warm, offline HTML-to-PDF rendering with WeasyPrint.
+
+A PDFRenderer owns a single WeasyPrint FontConfiguration and a set of pre-parsed stylesheets, which are built
+once and reused for every document it renders. get_pdf_renderer() returns a renderer that is cached for the
+lifetime of the worker process, so that bulk jobs (e.g. feedback reports for a whole marking event) pay the
+cost of loading fonts and parsing stylesheets only once.
+
+Fonts are loaded from local files rather than from a web font service. Every font file in
+FEEDBACK_PDF_FONT_FOLDER is registered with an @font-face rule, using its file name to determine the family,
+weight and style:
+
+    Inter-Regular.ttf               -> family "Inter", weight 400, normal
+    Inter-SemiBold.ttf              -> family "Inter", weight 600, normal
+    LibreBaskerville-Italic.ttf     -> family "Libre Baskerville", weight 400, italic
+    Inter[wght].ttf                 -> family "Inter", weights 100-900 (variable font), normal
+
+Families that are not found in the font folder fall back to fonts installed on the system (via fontconfig).
+
+Unless FEEDBACK_PDF_ALLOW_NETWORK is set, the renderer refuses to fetch http(s) resources, so that a template
+that refers to a remote stylesheet or image cannot stall rendering when the worker has no network access.
+"""
+
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from flask import current_app
+from weasyprint import CSS, HTML
+from weasyprint.text.fonts import FontConfiguration
+from weasyprint.urls import URLFetcher
+
+_FONT_FORMATS = {
+    ".ttf": "truetype",
+    ".otf": "opentype",
+    ".woff": "woff",
+    ".woff2": "woff2",
+}
+
+_FONT_WEIGHTS = {
+    "thin": 100,
+    "hairline": 100,
+    "extralight": 200,
+    "ultralight": 200,
+    "light": 300,
+    "regular": 400,
+    "normal": 400,
+    "book": 400,
+    "medium": 500,
+    "semibold": 600,
+    "demibold": 600,
+    "bold": 700,
+    "extrabold": 800,
+    "ultrabold": 800,
+    "black": 900,
+    "heavy": 900,
+}
+
+_VARIABLE_FONT = re.compile(r"^(?P<name>[^\[]+)\[(?P<axes>[^\]]*)\]$")
+_CAMEL_CASE = re.compile(r"(?<=[a-z])(?=[A-Z])")
+
+# URL schemes that never require network access
+_LOCAL_PROTOCOLS = ("file", "data")
+
+
+class FontFace(NamedTuple):
+    family: str
+    weight: str
+    style: str
+    path: Path
+
+    @property
+    def css(self) -> str:
+        return (
+            "@font-face {{ font-family: '{family}'; src: url('{url}') format('{format}'); "
+            "font-weight: {weight}; font-style: {style}; }}".format(
+                family=self.family,
+                url=self.path.resolve().as_uri(),
+                format=_FONT_FORMATS[self.path.suffix.lower()],
+                weight=self.weight,
+                style=self.style,
+            )
+        )
+
+
+def parse_font_filename(path: Path) -> Optional[FontFace]:
+    """
+    Infer the family, weight and style of a font file from its name. Returns None if the file is not a
+    supported font format, or its name does not follow the Family-Variant convention.
+    """
+    if path.suffix.lower() not in _FONT_FORMATS:
+        return None
+
+    stem = path.stem
+
+    match = _VARIABLE_FONT.match(stem)
+    if match is not None:
+        # variable font, e.g. Inter[wght].ttf or Inter-Italic[wght].ttf
+        name = match.group("name")
+        family_part, _, variant = name.partition("-")
+        weight = "100 900" if "wght" in match.group("axes") else "400"
+        style = "italic" if variant.lower() == "italic" else "normal"
+        return FontFace(_CAMEL_CASE.sub(" ", family_part), weight, style, path)
+
+    family_part, _, variant = stem.partition("-")
+    variant = variant.lower()
+
+    style = "normal"
+    if variant.endswith("italic"):
+        style = "italic"
+        variant = variant[: -len("italic")]
+
+    weight = _FONT_WEIGHTS.get(variant or "regular")
+    if weight is None:
+        return None
+
+    return FontFace(_CAMEL_CASE.sub(" ", family_part), str(weight), style, path)
+
+
+def discover_fonts(font_folder: Optional[str]) -> List[FontFace]:
+    if not font_folder:
+        return []
+
+    folder = Path(font_folder)
+    if not folder.is_dir():
+        return []
+
+    faces = [parse_font_filename(p) for p in sorted(folder.rglob("*")) if p.is_file()]
+    return [face for face in faces if face is not None]
+
+
+class PDFRenderer:
+    """
+    Render HTML documents to PDF, reusing one FontConfiguration and one set of parsed stylesheets.
+    """
+
+    def __init__(self, font_folder: Optional[str] = None, allow_network: bool = False, stylesheets: Optional[List[str]] = None):
+        self.allow_network = allow_network
+        self.font_faces: List[FontFace] = discover_fonts(font_folder)
+
+        # refused fetches are reported by WeasyPrint as warnings, and the resource is skipped
+        self.url_fetcher = URLFetcher(allowed_protocols=None if allow_network else _LOCAL_PROTOCOLS)
+
+        self.font_config = FontConfiguration()
+        self._lock = threading.Lock()
+
+        self._stylesheets: List[CSS] = []
+        if self.font_faces:
+            self._stylesheets.append(
+                CSS(
+                    string="\n".join(face.css for face in self.font_faces),
+                    font_config=self.font_config,
+                    url_fetcher=self.url_fetcher,
+                )
+            )
+
+        for sheet in stylesheets or []:
+            self._stylesheets.append(CSS(string=sheet, font_config=self.font_config, url_fetcher=self.url_fetcher))
+
+        self.documents_rendered = 0
+
+    @property
+    def families(self) -> List[str]:
+        return sorted({face.family for face in self.font_faces})
+
+    def render(self, html: str, base_url: Optional[str] = None) -> bytes:
+        """
+        Render an HTML string to PDF and return the PDF data. Relative URLs in the document are resolved
+        against *base_url*, or the current working directory if it is not given.
+        """
+        if base_url is None:
+            base_url = Path.cwd().as_uri() + "/"
+
+        with self._lock:
+            document = HTML(string=html, base_url=base_url, url_fetcher=self.url_fetcher)
+            data = document.write_pdf(stylesheets=self._stylesheets, font_config=self.font_config)
+            self.documents_rendered += 1
+
+        return data
+
+
+_renderers: Dict[Tuple, PDFRenderer] = {}
+_renderers_pid: Optional[int] = None
+_renderers_lock = threading.Lock()
+
+
+def get_pdf_renderer() -> PDFRenderer:
+    """
+    Return the PDFRenderer for this worker process, creating it on first use. The renderer is rebuilt if the
+    font folder or network setting changes, and is never shared across a fork.
+    """
+    global _renderers_pid
+
+    font_folder = current_app.config.get("FEEDBACK_PDF_FONT_FOLDER")
+    allow_network = bool(int(current_app.config.get("FEEDBACK_PDF_ALLOW_NETWORK", 0)))
+    key = (font_folder, allow_network)
+
+    with _renderers_lock:
+        if _renderers_pid != os.getpid():
+            _renderers.clear()
+            _renderers_pid = os.getpid()
+
+        renderer = _renderers.get(key)
+        if renderer is None:
+            renderer = PDFRenderer(font_folder=font_folder, allow_network=allow_network)
+            _renderers[key] = renderer
+
+            if font_folder and not renderer.font_faces:
+                current_app.logger.warning(f"PDF rendering: no usable font files found in FEEDBACK_PDF_FONT_FOLDER={font_folder}")
+            elif renderer.font_faces:
+                current_app.logger.info(f"PDF rendering: loaded {len(renderer.font_faces)} font face(s) for {', '.join(renderer.families)}")
+
+        return renderer
@@ -0,0 +1,185 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+"""
+Body-text extraction from PDF documents using PyMuPDF.
+
+Text is taken from the "blocks" of each page, skipping image blocks and any block that intrudes into the header
+or footer strip (the top and bottom 8% of the page), to reduce noise from running titles and page numbers.
+Pages are joined with blank lines.
+
+If the caller asks for more than one worker, long documents are split into contiguous page ranges, which are
+extracted in parallel by a pool of worker processes. Pages are streamed back in document order by
+iter_pdf_pages(), so a caller can consume them as soon as the leading ranges are complete. If a worker pool cannot
+be started (e.g. because the calling process is not allowed to fork children) or breaks during extraction, the
+remaining pages are extracted in the calling process and a warning is logged.
+
+Worker processes are not forked from the caller. Forking a process that already runs background threads (as a
+Celery prefork child does, e.g. for its Redis and database connection pools) can deadlock the child on a lock
+that was held at the moment of the fork. Instead they are started by a forkserver, a fresh single-threaded
+process that imports this module once and forks a worker for each pool slot. Where forkserver is not available
+they are spawned. Either way the workers import only this module, which is why it must not import Flask or the
+rest of the application.
+
+This module has no Flask dependencies, so it is shared with the standalone tooling in lexical-pipeline-validation.
+Callers supply the number of workers and the page-range size explicitly.
+
+EXTRACTOR_VERSION identifies the extraction algorithm. It is stored alongside cached text, and should be
+incremented whenever a change here would alter the extracted text for an existing document, so that cached
+results keyed by file content hash are not reused.
+"""
+
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Tuple
+
+EXTRACTOR_VERSION = 1
+
+# positions, as fractions of the page height, at which the header strip ends and the footer strip begins
+HEADER_EDGE = 0.08
+FOOTER_EDGE = 0.92
+
+# default number of pages handled by a single worker task
+DEFAULT_PAGES_PER_RANGE = 16
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def file_content_hash(path: str) -> str:
+    """
+    Return the SHA-256 hex digest of the file at *path*, read in chunks so that large files are not held in memory.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def _page_body_text(page) -> str:
+    page_height = page.rect.height
+    top = page_height * HEADER_EDGE
+    bottom = page_height * FOOTER_EDGE
+
+    blocks = page.get_text("blocks")  # (x0, y0, x1, y1, text, block_no, block_type)
+    body_blocks = [
+        b[4]
+        for b in blocks
+        if b[1] > top and b[3] < bottom and b[6] == 0  # skip header / running title  # skip footer / page number  # block_type 0 = text (not image)
+    ]
+    return "\n".join(body_blocks)
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    """
+    Extract the body text of pages [start, stop) of the PDF at *path*. Runs in a worker process, so it opens its
+    own handle on the document.
+    """
+    import fitz
+
+    with fitz.open(path) as doc:
+        return [_page_body_text(doc[i]) for i in range(start, stop)]
+
+
+def page_ranges(page_count: int, pages_per_range: int) -> List[Tuple[int, int]]:
+    pages_per_range = max(1, pages_per_range)
+    return [(start, min(start + pages_per_range, page_count)) for start in range(0, page_count, pages_per_range)]
+
+
+def pdf_page_count(path: str) -> int:
+    import fitz
+
+    with fitz.open(path) as doc:
+        return len(doc)
+
+
+def _iter_pages_serial(path: str, start: int = 0) -> Iterator[str]:
+    import fitz
+
+    with fitz.open(path) as doc:
+        for i in range(start, len(doc)):
+            yield _page_body_text(doc[i])
+
+
+def _worker_context():
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+
+    # the forkserver imports this module once; workers forked from it then start without importing anything
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__])
+    return context
+
+
+def iter_pdf_pages(path: str, workers: int = 1, pages_per_range: int = DEFAULT_PAGES_PER_RANGE) -> Iterator[str]:
+    """
+    Yield the body text of each page of the PDF at *path*, in document order.
+
+    If *workers* > 1 and the document has more than one page range, the ranges are extracted by a pool of up to
+    *workers* processes. Otherwise the pages are extracted one at a time in the calling process.
+    """
+    if workers <= 1:
+        yield from _iter_pages_serial(path)
+        return
+
+    ranges = page_ranges(pdf_page_count(path), pages_per_range)
+    if len(ranges) <= 1:
+        yield from _iter_pages_serial(path)
+        return
+
+    context = _worker_context()
+
+    try:
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(ranges)), mp_context=context)
+    except (OSError, ValueError, AssertionError) as exc:
+        logger.warning(f"pdf_text_extraction: could not start worker pool for {path}, extracting serially: {exc!r}")
+        yield from _iter_pages_serial(path)
+        return
+
+    try:
+        try:
+            futures = [executor.submit(_extract_page_range, path, start, stop) for start, stop in ranges]
+        except (OSError, AssertionError, BrokenProcessPool) as exc:
+            # worker processes could not be started (e.g. the caller is a daemonic process); nothing has been
+            # yielded yet, so fall back to serial extraction of the whole document
+            logger.warning(f"pdf_text_extraction: could not start worker processes for {path}, extracting serially: {exc!r}")
+            executor.shutdown(wait=False, cancel_futures=True)
+            yield from _iter_pages_serial(path)
+            return
+
+        for (start, _), future in zip(ranges, futures):
+            try:
+                pages = future.result()
+            except BrokenProcessPool as exc:
+                # pages before *start* have already been yielded; extract the remainder here
+                logger.warning(f"pdf_text_extraction: worker pool broke while extracting {path}, extracting pages from {start + 1} serially: {exc!r}")
+                executor.shutdown(wait=False, cancel_futures=True)
+                yield from _iter_pages_serial(path, start=start)
+                return
+
+            yield from pages
+
+    finally:
+        # also reached if the caller stops consuming pages early; ranges that have not started are abandoned
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def extract_pdf_text(path: str, workers: int = 1, pages_per_range: int = DEFAULT_PAGES_PER_RANGE) -> Tuple[str, int]:
+    """
+    Extract the body text of the PDF at *path*. Returns (raw_text, page_count).
+    """
+    pages = list(iter_pdf_pages(path, workers=workers, pages_per_range=pages_per_range))
+    return "\n\n".join(pages), len(pages)
@@ -8,16 +8,56 @@
 # Contributors: David Seery <D.Seery@sussex.ac.uk>
 #
 
+import os
 from datetime import datetime
+from threading import Lock
+from typing import Iterable
 
 from flask import current_app
-from pymongo import MongoClient, ASCENDING
+from pymongo import ASCENDING, MongoClient
+
+# MongoClient maintains its own connection pool and is thread-safe, so a single client per URL is shared by
+# every caller in the process. Clients are not fork-safe: the pool is discarded and rebuilt if the owning
+# process id changes (e.g. in a Celery prefork child that inherited the parent's module state).
+_clients: dict[str, MongoClient] = {}
+_clients_pid: int | None = None
+_indexed_collections: set[tuple[str, str, str]] = set()
+_clients_lock = Lock()
+
+
+def _get_client(url: str) -> MongoClient:
+    global _clients_pid
+
+    with _clients_lock:
+        pid = os.getpid()
+        if _clients_pid != pid:
+            # do not close clients inherited across fork(); their sockets belong to the parent process
+            _clients.clear()
+            _indexed_collections.clear()
+            _clients_pid = pid
+
+        client = _clients.get(url)
+        if client is None:
+            client = MongoClient(url, connect=False)
+            _clients[url] = client
+
+        return client
+
+
+def _ensure_indexes(collection, key: tuple[str, str, str]) -> None:
+    if key in _indexed_collections:
+        return
+
+    collection.create_index([("submission_record_id", ASCENDING)], unique=True)
+    # several records may share a content hash (identical resubmissions), so this index is not unique
+    collection.create_index([("content_hash", ASCENDING), ("extractor_version", ASCENDING)], sparse=True)
+    _indexed_collections.add(key)
 
 
 def _get_collection():
     """
-    Return a (MongoClient, Collection) pair configured from Flask app config.
-    Caller is responsible for closing the client.
+    Return the scraped-text Collection configured from Flask app config, backed by the process-wide
+    client pool. Callers must not close the underlying client.
     Returns None if the required config keys are absent or empty.
     """
     url = current_app.config.get("LANGUAGE_ANALYSIS_MONGO_URL")
@@ -25,11 +65,38 @@ def _get_collection():
     collection_name = current_app.config.get("LANGUAGE_ANALYSIS_SCRAPED_TEXT_COLLECTION")
 
     if not url or not db_name or not collection_name:
-        return None, None
+        return None
 
-    client = MongoClient(url)
-    collection = client[db_name][collection_name]
-    return client, collection
+    collection = _get_client(url)[db_name][collection_name]
+
+    try:
+        _ensure_indexes(collection, (url, db_name, collection_name))
+    except Exception as exc:
+        # leave the collection unmarked, so that the next caller retries
+        current_app.logger.warning(f"scraped_text_store: could not ensure indexes: {exc}")
+
+    return collection
+
+
+def ensure_scraped_text_indexes() -> bool:
+    """
+    Create the indexes used by the scraped-text cache (idempotent).
+    Called once at worker start; other processes ensure indexes lazily on first use.
+    Returns True if the collection is configured.
+    """
+    return _get_collection() is not None
+
+
+def close_scraped_text_clients() -> None:
+    """
+    Close all pooled MongoDB clients owned by this process.
+    """
+    with _clients_lock:
+        if _clients_pid == os.getpid():
+            for client in _clients.values():
+                client.close()
+        _clients.clear()
+        _indexed_collections.clear()
 
 
 def store_scraped_text(
@@ -38,6 +105,8 @@ def store_scraped_text(
     mimetype: str,
     raw_text: str,
     page_count: int,
+    content_hash: str | None = None,
+    extractor_version: int | None = None,
 ) -> bool:
     """
     Upsert a scraped-text document for *record_id* into the MongoDB cache.
@@ -46,44 +115,46 @@ def store_scraped_text(
     page_count, and updated_at on subsequent calls.  created_at is set only on
     initial insert.
 
+    If *content_hash* (the SHA-256 digest of the asset file) and *extractor_version* are
+    given, they are stored too, so that get_scraped_text_by_hash() can reuse the text for
+    any other asset with identical content.  Otherwise any previous values are removed,
+    since they may not describe the new text.
+
     Returns True on success, False if MongoDB is unconfigured or unavailable.
     """
-    client, collection = _get_collection()
+    collection = _get_collection()
     if collection is None:
         current_app.logger.warning("scraped_text_store.store_scraped_text: MongoDB not configured — skipping cache write")
         return False
 
     try:
-        # Ensure unique index exists (idempotent).
-        collection.create_index([("submission_record_id", ASCENDING)], unique=True)
-
         now = datetime.now()
-        collection.update_one(
-            {"submission_record_id": record_id},
-            {
-                "$set": {
-                    "asset_id": asset_id,
-                    "mimetype": mimetype,
-                    "scraped_text": raw_text,
-                    "page_count": page_count,
-                    "updated_at": now,
-                },
-                "$setOnInsert": {
-                    "submission_record_id": record_id,
-                    "created_at": now,
-                },
+        update = {
+            "$set": {
+                "asset_id": asset_id,
+                "mimetype": mimetype,
+                "scraped_text": raw_text,
+                "page_count": page_count,
+                "updated_at": now,
             },
-            upsert=True,
-        )
+            "$setOnInsert": {
+                "submission_record_id": record_id,
+                "created_at": now,
+            },
+        }
+        if content_hash is not None and extractor_version is not None:
+            update["$set"]["content_hash"] = content_hash
+            update["$set"]["extractor_version"] = extractor_version
+        else:
+            update["$unset"] = {"content_hash": "", "extractor_version": ""}
+
+        collection.update_one({"submission_record_id": record_id}, update, upsert=True)
         return True
 
     except Exception as exc:
         current_app.logger.warning(f"scraped_text_store.store_scraped_text: failed for record #{record_id}: {exc}")
         return False
 
-    finally:
-        client.close()
-
 
 def get_scraped_text(record_id: int) -> dict | None:
     """
@@ -92,7 +163,7 @@ def get_scraped_text(record_id: int) -> dict | None:
     Returns a plain dict with at least the keys ``scraped_text`` and ``page_count``,
     or None on cache miss or error.
     """
-    client, collection = _get_collection()
+    collection = _get_collection()
     if collection is None:
         current_app.logger.warning("scraped_text_store.get_scraped_text: MongoDB not configured — cache miss")
         return None
@@ -108,8 +179,30 @@ def get_scraped_text(record_id: int) -> dict | None:
         current_app.logger.warning(f"scraped_text_store.get_scraped_text: failed for record #{record_id}: {exc}")
         return None
 
-    finally:
-        client.close()
+
+def get_scraped_text_by_hash(content_hash: str, extractor_version: int) -> dict | None:
+    """
+    Retrieve a cached scraped-text document for any asset whose file content has SHA-256 digest
+    *content_hash*, extracted by version *extractor_version* of the extraction engine.
+
+    Returns a plain dict with the keys ``scraped_text``, ``page_count`` and ``mimetype``,
+    or None on cache miss or error.
+    """
+    collection = _get_collection()
+    if collection is None:
+        current_app.logger.warning("scraped_text_store.get_scraped_text_by_hash: MongoDB not configured — cache miss")
+        return None
+
+    try:
+        doc = collection.find_one(
+            {"content_hash": content_hash, "extractor_version": extractor_version},
+            projection={"_id": False, "scraped_text": True, "page_count": True, "mimetype": True},
+        )
+        return doc
+
+    except Exception as exc:
+        current_app.logger.warning(f"scraped_text_store.get_scraped_text_by_hash: failed for hash {content_hash[:12]}: {exc}")
+        return None
 
 
 def delete_scraped_text(record_id: int) -> bool:
@@ -121,7 +214,7 @@ def delete_scraped_text(record_id: int) -> bool:
 
     Returns True on success (including no-op when document doesn't exist), False on error.
     """
-    client, collection = _get_collection()
+    collection = _get_collection()
     if collection is None:
         current_app.logger.warning("scraped_text_store.delete_scraped_text: MongoDB not configured — skipping")
         return False
@@ -134,9 +227,6 @@ def delete_scraped_text(record_id: int) -> bool:
         current_app.logger.warning(f"scraped_text_store.delete_scraped_text: failed for record #{record_id}: {exc}")
         return False
 
-    finally:
-        client.close()
-
 
 def store_similarity_chunks(
     record_id: int,
@@ -155,7 +245,7 @@ def store_similarity_chunks(
 
     Returns True on success, False if MongoDB is unconfigured or unavailable.
     """
-    client, collection = _get_collection()
+    collection = _get_collection()
     if collection is None:
         current_app.logger.warning("scraped_text_store.store_similarity_chunks: MongoDB not configured — skipping")
         return False
@@ -188,9 +278,6 @@ def store_similarity_chunks(
         current_app.logger.warning(f"scraped_text_store.store_similarity_chunks: failed for record #{record_id}: {exc}")
         return False
 
-    finally:
-        client.close()
-
 
 def delete_similarity_chunks(record_id: int) -> bool:
     """
@@ -200,7 +287,7 @@ def delete_similarity_chunks(record_id: int) -> bool:
 
     Returns True on success (or if no document exists); False if MongoDB is unavailable.
     """
-    client, collection = _get_collection()
+    collection = _get_collection()
     if collection is None:
         current_app.logger.warning("scraped_text_store.delete_similarity_chunks: MongoDB not configured — skipping")
         return False
@@ -213,8 +300,6 @@ def delete_similarity_chunks(record_id: int) -> bool:
     except Exception as exc:
         current_app.logger.warning(f"scraped_text_store.delete_similarity_chunks: failed for record #{record_id}: {exc}")
         return False
-    finally:
-        client.close()
 
 
 def get_similarity_chunks(record_id: int) -> dict | None:
@@ -225,7 +310,7 @@ def get_similarity_chunks(record_id: int) -> dict | None:
     chunk_prompt_version, heading_style, top_level_heading_count, and optionally
     minhash_signatures and minhash_computed_at), or None on cache miss or absent key.
     """
-    client, collection = _get_collection()
+    collection = _get_collection()
     if collection is None:
         current_app.logger.warning("scraped_text_store.get_similarity_chunks: MongoDB not configured — cache miss")
         return None
@@ -243,9 +328,6 @@ def get_similarity_chunks(record_id: int) -> dict | None:
         current_app.logger.warning(f"scraped_text_store.get_similarity_chunks: failed for record #{record_id}: {exc}")
         return None
 
-    finally:
-        client.close()
-
 
 def store_embeddings(record_id: int, vectors: dict, model_name: str) -> bool:
     """
@@ -258,7 +340,7 @@ def store_embeddings(record_id: int, vectors: dict, model_name: str) -> bool:
 
     Returns True on success, False if MongoDB is unconfigured or unavailable.
     """
-    client, collection = _get_collection()
+    collection = _get_collection()
     if collection is None:
         current_app.logger.warning("scraped_text_store.store_embeddings: MongoDB not configured — skipping")
         return False
@@ -281,9 +363,6 @@ def store_embeddings(record_id: int, vectors: dict, model_name: str) -> bool:
         current_app.logger.warning(f"scraped_text_store.store_embeddings: failed for record #{record_id}: {exc}")
         return False
 
-    finally:
-        client.close()
-
 
 def store_minhash_signatures(record_id: int, signatures: dict) -> bool:
     """
@@ -295,7 +374,7 @@ def store_minhash_signatures(record_id: int, signatures: dict) -> bool:
 
     Returns True on success, False if MongoDB is unconfigured or unavailable.
     """
-    client, collection = _get_collection()
+    collection = _get_collection()
     if collection is None:
         current_app.logger.warning("scraped_text_store.store_minhash_signatures: MongoDB not configured — skipping")
         return False
@@ -317,5 +396,68 @@ def store_minhash_signatures(record_id: int, signatures: dict) -> bool:
         current_app.logger.warning(f"scraped_text_store.store_minhash_signatures: failed for record #{record_id}: {exc}")
         return False
 
-    finally:
-        client.close()
+
+# ---------------------------------------------------------------------------
+# Bulk variants: one round trip for many records
+# ---------------------------------------------------------------------------
+
+
+def get_similarity_chunks_bulk(record_ids: Iterable[int], require_signatures: bool = False) -> dict[int, dict] | None:
+    """
+    Retrieve the "similarity_chunks" subdocuments for many records in a single query.
+
+    Returns a dict mapping submission_record_id → subdocument, omitting records that have no
+    similarity_chunks (or, if *require_signatures* is set, no MinHash signatures).
+    Returns None if MongoDB is unconfigured or unavailable, so that callers can distinguish a
+    failed lookup from an empty result.
+    """
+    record_ids = list(record_ids)
+
+    collection = _get_collection()
+    if collection is None:
+        current_app.logger.warning("scraped_text_store.get_similarity_chunks_bulk: MongoDB not configured — cache miss")
+        return None
+
+    if not record_ids:
+        return {}
+
+    query = {"submission_record_id": {"$in": record_ids}}
+    if require_signatures:
+        query["similarity_chunks.minhash_signatures"] = {"$exists": True}
+    else:
+        query["similarity_chunks"] = {"$exists": True}
+
+    try:
+        cursor = collection.find(query, projection={"_id": False, "submission_record_id": True, "similarity_chunks": True})
+        return {doc["submission_record_id"]: doc["similarity_chunks"] for doc in cursor}
+
+    except Exception as exc:
+        current_app.logger.warning(f"scraped_text_store.get_similarity_chunks_bulk: failed for {len(record_ids)} record(s): {exc}")
+        return None
+
+
+def delete_similarity_chunks_bulk(record_ids: Iterable[int]) -> bool:
+    """
+    Remove the similarity_chunks subdocument for many records with a single update.
+
+    Returns True on success (or if no documents exist); False if MongoDB is unavailable.
+    """
+    record_ids = list(record_ids)
+    if not record_ids:
+        return True
+
+    collection = _get_collection()
+    if collection is None:
+        current_app.logger.warning("scraped_text_store.delete_similarity_chunks_bulk: MongoDB not configured — skipping")
+        return False
+
+    try:
+        collection.update_many(
+            {"submission_record_id": {"$in": record_ids}},
+            {"$unset": {"similarity_chunks": ""}},
+        )
+        return True
+
+    except Exception as exc:
+        current_app.logger.warning(f"scraped_text_store.delete_similarity_chunks_bulk: failed for {len(record_ids)} record(s): {exc}")
+        return False
@@ -20,6 +20,33 @@ def get_count(q):
     return q.count()
 
 
+def iterate_in_batches(q, key, batch_size: int = 500):
+    """
+    Iterate over the results of query *q* in order of the unique column *key* (usually the primary key),
+    fetching *batch_size* rows at a time using keyset pagination.
+
+    Each batch is read in full before it is yielded. Unlike Query.yield_per(), which holds an unbuffered
+    server-side cursor open on MySQL, this leaves the connection free for the lazy loads that are typically
+    issued while each row is processed. Clean ORM instances are only weakly referenced by the session, so
+    instances from earlier batches are released once the caller drops them.
+    """
+    last = None
+    while True:
+        batch_q = q.order_by(None).order_by(key)
+        if last is not None:
+            batch_q = batch_q.filter(key > last)
+
+        batch = batch_q.limit(batch_size).all()
+        if not batch:
+            return
+
+        yield from batch
+
+        if len(batch) < batch_size:
+            return
+        last = getattr(batch[-1], key.key)
+
+
 # taken from https://stackoverflow.com/questions/28871406/how-to-clone-a-sqlalchemy-db-object-with-new-primary-key
 def clone_model(model, **kwargs):
     """Clone an arbitrary sqlalchemy model object without its primary key values."""
@@ -0,0 +1,246 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+"""
+Per-model token-per-word ratios learned from the usage that Ollama reports.
+
+Context budgets for LLM calls are computed in words, so they need a conversion from words to tokens. The fixed
+constants in llm_services (_TOKENS_PER_WORD) and language_analysis (_TOKENS_PER_WORD_CONTENT) are deliberately
+conservative. The true ratio depends on the model's tokenizer. Ollama does not expose the tokenizer, but it does
+report prompt_tokens for every request.
+
+After every completed request, _call_llm() records a sample (system-prompt words, user-prompt words,
+prompt_tokens) in a capped Redis list per model. From the most recent samples we fit
+
+    prompt_tokens ≈ system_ratio × system_words + content_ratio × user_words
+
+by least squares. For budgeting, content_ratio is replaced by a high quantile of the per-call content ratio, so
+that a chunk of unusually dense text (equations, code) still fits. The fit is used only when there are enough
+samples and both ratios are plausible. Otherwise callers get None and fall back to their constants.
+
+The samples also record completion tokens per rubric criterion for map-phase chunk calls. This lets the response
+reservation in _chunk_word_budget() follow observed output sizes, as proposed in
+token-budget/grading-context-utilisation-analysis.md.
+
+Fitted values are cached in-process for _CACHE_SECONDS, so budgeting does not read Redis on every call.
+Recording and fitting are best-effort. Redis errors are logged and never propagate.
+"""
+
+import json
+import math
+import os
+import time
+from threading import Lock
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import redis as redis_lib
+from flask import current_app
+
+_SAMPLES_KEY_PREFIX = "llm_token_samples"
+
+# samples kept per model; older samples are discarded, so the fit follows changes in prompts and models
+_MAX_SAMPLES = 500
+
+# minimum number of samples before learned prompt ratios are used
+_MIN_SAMPLES = 20
+
+# only calls with at least this many user-prompt words contribute to the content-ratio quantile
+_MIN_CONTENT_WORDS = 300
+_CONTENT_RATIO_QUANTILE = 0.95
+
+# a prompt reported within this many tokens of num_ctx is assumed to have been truncated by Ollama
+_TRUNCATION_MARGIN_TOKENS = 32
+
+# learned ratios outside these bounds indicate a bad fit (e.g. samples from a mislabelled model) and are ignored
+_RATIO_BOUNDS = (0.8, 4.0)
+
+# map-phase completion reservation: at least this many samples, and this safety factor over the observed peak
+_MAP_COMPLETION_MIN_SAMPLES = 15
+_MAP_COMPLETION_SAFETY = 1.6
+
+_CACHE_SECONDS = 600
+
+_clients: Dict[str, redis_lib.Redis] = {}
+_clients_pid: Optional[int] = None
+_cache: Dict[Tuple[str, str], Tuple[float, object]] = {}
+_lock = Lock()
+
+
+class TokenRatios(NamedTuple):
+    system: float  # tokens per word of system prompt
+    content: float  # tokens per word of user content, at the _CONTENT_RATIO_QUANTILE quantile
+    content_mean: float  # least-squares tokens per word of user content
+    samples: int
+
+
+def _get_redis() -> Optional[redis_lib.Redis]:
+    global _clients_pid
+
+    url = current_app.config.get("ORCHESTRATION_REDIS_URL")
+    if not url:
+        return None
+
+    with _lock:
+        pid = os.getpid()
+        if _clients_pid != pid:
+            # connection pools are not fork-safe; rebuild them in a child process
+            _clients.clear()
+            _cache.clear()
+            _clients_pid = pid
+
+        client = _clients.get(url)
+        if client is None:
+            client = redis_lib.Redis.from_url(url, decode_responses=True)
+            _clients[url] = client
+
+        return client
+
+
+def _samples_key(model: str, kind: str = "prompt") -> str:
+    return f"{_SAMPLES_KEY_PREFIX}:{model}:{kind}"
+
+
+def _push_sample(model: str, kind: str, sample) -> None:
+    try:
+        r = _get_redis()
+        if r is None:
+            return
+        key = _samples_key(model, kind)
+        pipe = r.pipeline(transaction=False)
+        pipe.lpush(key, json.dumps(sample))
+        pipe.ltrim(key, 0, _MAX_SAMPLES - 1)
+        pipe.execute()
+    except Exception as exc:
+        current_app.logger.warning(f"token_budget: could not record {kind} sample for model {model}: {exc}")
+
+
+def record_prompt_usage(
+    model: str,
+    system_words: int,
+    user_words: int,
+    prompt_tokens: Optional[int],
+    num_ctx: Optional[int] = None,
+    finish_reason: Optional[str] = None,
+) -> None:
+    """
+    Record the prompt size of a completed request, as reported by Ollama.
+
+    Ollama silently truncates a prompt that does not fit in num_ctx, and then reports the truncated size. Requests
+    whose prompt filled the context window, or whose output was cut off (finish_reason=length), would understate
+    the true ratio and are not recorded.
+    """
+    if not prompt_tokens or system_words + user_words == 0:
+        return
+    if finish_reason == "length":
+        return
+    if num_ctx and prompt_tokens >= num_ctx - _TRUNCATION_MARGIN_TOKENS:
+        return
+    _push_sample(model, "prompt", [system_words, user_words, int(prompt_tokens)])
+
+
+def record_map_completion(model: str, n_criteria: int, completion_tokens: Optional[int]) -> None:
+    """Record the completion size of a map-phase (chunk evidence) request."""
+    if not completion_tokens or n_criteria <= 0:
+        return
+    _push_sample(model, "map_completion", completion_tokens / n_criteria)
+
+
+def _load_samples(model: str, kind: str) -> List:
+    r = _get_redis()
+    if r is None:
+        return []
+    return [json.loads(s) for s in r.lrange(_samples_key(model, kind), 0, -1)]
+
+
+def _cached(model: str, kind: str, compute):
+    now = time.monotonic()
+    with _lock:
+        hit = _cache.get((model, kind))
+        if hit is not None and now - hit[0] < _CACHE_SECONDS:
+            return hit[1]
+
+    try:
+        value = compute(_load_samples(model, kind))
+    except Exception as exc:
+        current_app.logger.warning(f"token_budget: could not load {kind} samples for model {model}: {exc}")
+        value = None
+
+    with _lock:
+        _cache[(model, kind)] = (now, value)
+    return value
+
+
+def _quantile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def fit_token_ratios(samples: List) -> Optional[TokenRatios]:
+    """
+    Fit TokenRatios to a list of [system_words, user_words, prompt_tokens] samples, or return None if there
+    are too few samples or the fit is implausible.
+    """
+    if len(samples) < _MIN_SAMPLES:
+        return None
+
+    s_ss = s_su = s_uu = s_sy = s_uy = 0.0
+    for s, u, y in samples:
+        s_ss += s * s
+        s_su += s * u
+        s_uu += u * u
+        s_sy += s * y
+        s_uy += u * y
+
+    det = s_ss * s_uu - s_su * s_su
+    # system and content word counts must vary independently for the two ratios to be identifiable
+    if det <= 1e-9 * s_ss * s_uu:
+        return None
+
+    system_ratio = (s_sy * s_uu - s_uy * s_su) / det
+    content_ratio = (s_uy * s_ss - s_sy * s_su) / det
+
+    lo, hi = _RATIO_BOUNDS
+    if not (lo <= system_ratio <= hi and lo <= content_ratio <= hi):
+        return None
+
+    per_call = [(y - system_ratio * s) / u for s, u, y in samples if u >= _MIN_CONTENT_WORDS]
+    content_upper = max(content_ratio, _quantile(per_call, _CONTENT_RATIO_QUANTILE)) if per_call else content_ratio
+    content_upper = min(content_upper, hi)
+
+    return TokenRatios(system=system_ratio, content=content_upper, content_mean=content_ratio, samples=len(samples))
+
+
+def learned_token_ratios(model: str) -> Optional[TokenRatios]:
+    """Return the learned TokenRatios for *model*, or None if they are not (yet) available."""
+    return _cached(model, "prompt", fit_token_ratios)
+
+
+def learned_map_completion_per_criterion(model: str) -> Optional[float]:
+    """
+    Return the largest recently observed map-phase completion size per rubric criterion for *model*, or None
+    if there are too few samples.
+    """
+
+    def _peak(samples):
+        return max(samples) if len(samples) >= _MAP_COMPLETION_MIN_SAMPLES else None
+
+    return _cached(model, "map_completion", _peak)
+
+
+def map_response_reservation(model: str, n_criteria: int, formula_tokens: int, floor: int) -> int:
+    """
+    Return the number of tokens to reserve for a map-phase response. This is *formula_tokens* (the static
+    estimate), reduced to _MAP_COMPLETION_SAFETY × the observed peak, but never below *floor*, once enough
+    samples are available.
+    """
+    peak = learned_map_completion_per_criterion(model)
+    if peak is None:
+        return formula_tokens
+    return min(formula_tokens, max(floor, int(math.ceil(_MAP_COMPLETION_SAFETY * peak * n_criteria))))
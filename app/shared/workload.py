@@ -0,0 +1,339 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+"""
+Maintenance of the precomputed FacultyWorkload aggregates.
+
+Each FacultyWorkload row holds the CATS totals and assignment counts for one faculty member in one
+ProjectClassConfig, computed by a single grouped query over SubmissionRole. The rules are the same as those used
+by FacultyData.CATS_assignment(): retired SubmissionRecords are ignored, a role counts only if the submitter's
+ProjectClassConfig uses it, and the CATS for each assignment are taken from the allocated LiveProject.
+
+Rows are kept up to date incrementally. Mapper event handlers record which faculty members (or
+ProjectClassConfigs) are affected by changes to SubmissionRole, SubmissionRecord and ProjectClassConfig
+instances, and just before the session commits, the rows for those faculty members are recomputed inside the same
+transaction. Changes made with bulk SQL statements bypass these handlers; they are picked up by the full
+recomputation performed by app.tasks.workload.recompute_faculty_workload.
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, case, delete, func, insert, inspect, or_, select
+from sqlalchemy.event import listens_for
+from sqlalchemy.orm import aliased, object_session
+
+from ..database import db
+from ..models import (
+    FacultyData,
+    FacultyWorkload,
+    LiveProject,
+    ProjectClassConfig,
+    SubmissionRecord,
+    SubmissionRole,
+    SubmittingStudent,
+)
+
+# session.info keys for faculty and ProjectClassConfig ids whose aggregates need to be recomputed before commit
+_DIRTY_FACULTY = "faculty_workload_dirty_faculty"
+_DIRTY_CONFIGS = "faculty_workload_dirty_configs"
+
+_INSERT_BATCH_SIZE = 500
+
+# map each SubmissionRole type to the FacultyWorkload category in which it is counted
+_ROLE_CATEGORIES = {
+    SubmissionRole.ROLE_SUPERVISOR: "supervising",
+    SubmissionRole.ROLE_RESPONSIBLE_SUPERVISOR: "supervising",
+    SubmissionRole.ROLE_MARKER: "marking",
+    SubmissionRole.ROLE_MODERATOR: "moderating",
+    SubmissionRole.ROLE_PRESENTATION_ASSESSOR: "presentations",
+}
+
+# for each category: (ProjectClassConfig.uses_* flag, ProjectClassConfig CATS column, FacultyWorkload CATS column,
+# FacultyWorkload count column)
+_CATEGORIES = {
+    "supervising": ("uses_supervisor", "CATS_supervision", "supervising_CATS", "num_supervising"),
+    "marking": ("uses_marker", "CATS_marking", "marking_CATS", "num_marking"),
+    "moderating": ("uses_moderator", "CATS_moderation", "moderation_CATS", "num_moderating"),
+    "presentations": ("uses_presentations", "CATS_presentation", "presentation_CATS", "num_presentations"),
+}
+
+# ProjectClassConfig attributes that change the aggregates for every faculty member with assignments in that config
+_CONFIG_ATTRIBUTES = [attr for category in _CATEGORIES.values() for attr in category[:2]]
+
+
+def _scope_condition(faculty_column, config_column, faculty_ids, config_ids):
+    conditions = []
+    if faculty_ids is not None:
+        conditions.append(faculty_column.in_(faculty_ids))
+    if config_ids is not None:
+        conditions.append(config_column.in_(config_ids))
+
+    if not conditions:
+        return None
+
+    return or_(*conditions)
+
+
+def compute_faculty_workload(connection, faculty_ids: Optional[Iterable[int]] = None, config_ids: Optional[Iterable[int]] = None) -> List[Dict]:
+    """
+    Compute FacultyWorkload rows (as dictionaries suitable for an INSERT) for the given faculty members and/or
+    ProjectClassConfigs, or for every faculty member if neither is specified. If both are specified, rows matching
+    either are returned.
+    """
+    faculty_ids = list(faculty_ids) if faculty_ids is not None else None
+    config_ids = list(config_ids) if config_ids is not None else None
+
+    SubmitterConfig = aliased(ProjectClassConfig)
+    ProjectConfig = aliased(ProjectClassConfig)
+
+    # the CATS for each assignment come from the allocated project's config, exactly as LiveProject.CATS_supervision etc.
+    def _project_CATS(category: str):
+        uses_attr, CATS_attr, _, _ = _CATEGORIES[category]
+        uses = getattr(ProjectConfig, uses_attr)
+        CATS = getattr(ProjectConfig, CATS_attr)
+        return case((and_(uses.is_(True), CATS > 0), CATS), else_=0)
+
+    CATS_expr = case(
+        *[(SubmissionRole.role == role, _project_CATS(category)) for role, category in _ROLE_CATEGORIES.items()],
+        else_=0,
+    )
+
+    stmt = (
+        select(
+            SubmissionRole.user_id,
+            SubmitterConfig.id,
+            SubmitterConfig.pclass_id,
+            SubmitterConfig.year,
+            SubmitterConfig.uses_supervisor,
+            SubmitterConfig.uses_marker,
+            SubmitterConfig.uses_moderator,
+            SubmitterConfig.uses_presentations,
+            SubmissionRole.role,
+            func.count(SubmissionRole.id),
+            func.coalesce(func.sum(CATS_expr), 0),
+        )
+        .select_from(SubmissionRole)
+        .join(FacultyData, FacultyData.id == SubmissionRole.user_id)
+        .join(SubmissionRecord, SubmissionRecord.id == SubmissionRole.submission_id)
+        .join(SubmittingStudent, SubmittingStudent.id == SubmissionRecord.owner_id)
+        .join(SubmitterConfig, SubmitterConfig.id == SubmittingStudent.config_id)
+        .outerjoin(LiveProject, LiveProject.id == SubmissionRecord.project_id)
+        .outerjoin(ProjectConfig, ProjectConfig.id == LiveProject.config_id)
+        .where(
+            SubmissionRole.role.in_(list(_ROLE_CATEGORIES.keys())),
+            SubmissionRecord.retired.is_(False),
+        )
+        .group_by(SubmissionRole.user_id, SubmitterConfig.id, SubmissionRole.role)
+    )
+
+    scope = _scope_condition(SubmissionRole.user_id, SubmitterConfig.id, faculty_ids, config_ids)
+    if scope is not None:
+        stmt = stmt.where(scope)
+
+    now = datetime.now()
+    rows: Dict[Tuple[int, int], Dict] = {}
+
+    for (
+        faculty_id,
+        config_id,
+        pclass_id,
+        year,
+        uses_supervisor,
+        uses_marker,
+        uses_moderator,
+        uses_presentations,
+        role,
+        count,
+        CATS,
+    ) in connection.execute(stmt):
+        row = rows.get((faculty_id, config_id))
+        if row is None:
+            row = {
+                "faculty_id": faculty_id,
+                "config_id": config_id,
+                "pclass_id": pclass_id,
+                "year": year,
+                "updated_at": now,
+            }
+            for _, _, CATS_column, count_column in _CATEGORIES.values():
+                row[CATS_column] = 0
+                row[count_column] = 0
+            rows[(faculty_id, config_id)] = row
+
+        # roles are counted only if the submitter's config uses them, as in FacultyData.CATS_assignment()
+        uses = {
+            "uses_supervisor": uses_supervisor,
+            "uses_marker": uses_marker,
+            "uses_moderator": uses_moderator,
+            "uses_presentations": uses_presentations,
+        }
+        uses_attr, _, CATS_column, count_column = _CATEGORIES[_ROLE_CATEGORIES[role]]
+        if not uses[uses_attr]:
+            continue
+
+        row[CATS_column] += int(CATS or 0)
+        row[count_column] += int(count or 0)
+
+    return list(rows.values())
+
+
+def refresh_faculty_workload(connection, faculty_ids: Optional[Iterable[int]] = None, config_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Replace the FacultyWorkload rows for the given faculty members and/or ProjectClassConfigs with freshly computed
+    values, or rebuild the whole table if neither is specified. Executes on *connection* and does not commit.
+    Returns the number of rows written.
+    """
+    faculty_ids = list(faculty_ids) if faculty_ids is not None else None
+    config_ids = list(config_ids) if config_ids is not None else None
+
+    rows = compute_faculty_workload(connection, faculty_ids=faculty_ids, config_ids=config_ids)
+
+    table = FacultyWorkload.__table__
+    stmt = delete(table)
+    scope = _scope_condition(table.c.faculty_id, table.c.config_id, faculty_ids, config_ids)
+    if scope is not None:
+        stmt = stmt.where(scope)
+    connection.execute(stmt)
+
+    for i in range(0, len(rows), _INSERT_BATCH_SIZE):
+        connection.execute(insert(table), rows[i : i + _INSERT_BATCH_SIZE])
+
+    return len(rows)
+
+
+def load_faculty_workload(faculty_ids: Iterable[int], config_ids: Iterable[int]) -> Dict[Tuple[int, int], FacultyWorkload]:
+    """
+    Return the FacultyWorkload records for the given faculty members and ProjectClassConfigs, keyed by
+    (faculty_id, config_id). Pairs with no assignments have no record.
+    """
+    faculty_ids = list(faculty_ids)
+    config_ids = list(config_ids)
+    if not faculty_ids or not config_ids:
+        return {}
+
+    records = (
+        db.session.query(FacultyWorkload)
+        .filter(
+            FacultyWorkload.faculty_id.in_(faculty_ids),
+            FacultyWorkload.config_id.in_(config_ids),
+        )
+        .all()
+    )
+
+    return {(r.faculty_id, r.config_id): r for r in records}
+
+
+def _mark_faculty(session, *faculty_ids) -> None:
+    if session is None:
+        return
+
+    dirty = session.info.setdefault(_DIRTY_FACULTY, set())
+    dirty.update(fid for fid in faculty_ids if fid is not None)
+
+
+def _mark_config(session, config_id) -> None:
+    if session is None or config_id is None:
+        return
+
+    session.info.setdefault(_DIRTY_CONFIGS, set()).add(config_id)
+
+
+def _submission_role_holders(connection, submission_id) -> List[int]:
+    if submission_id is None:
+        return []
+
+    return list(connection.execute(select(SubmissionRole.user_id).where(SubmissionRole.submission_id == submission_id)).scalars())
+
+
+@listens_for(SubmissionRole, "after_insert")
+def _workload_SubmissionRole_insert_handler(mapper, connection, target):
+    _mark_faculty(object_session(target), target.user_id)
+
+
+@listens_for(SubmissionRole, "after_update")
+def _workload_SubmissionRole_update_handler(mapper, connection, target):
+    # if the role has been moved to a different user, both the old and the new user are affected
+    history = inspect(target).attrs.user_id.history
+    _mark_faculty(object_session(target), target.user_id, *history.deleted)
+
+
+@listens_for(SubmissionRole, "after_delete")
+def _workload_SubmissionRole_delete_handler(mapper, connection, target):
+    _mark_faculty(object_session(target), target.user_id)
+
+
+@listens_for(SubmissionRecord, "after_update")
+def _workload_SubmissionRecord_update_handler(mapper, connection, target):
+    state = inspect(target)
+    if not (state.attrs.project_id.history.has_changes() or state.attrs.retired.history.has_changes()):
+        return
+
+    _mark_faculty(object_session(target), *_submission_role_holders(connection, target.id))
+
+
+@listens_for(SubmissionRecord, "before_delete")
+def _workload_SubmissionRecord_delete_handler(mapper, connection, target):
+    # roles may be removed by a database-level cascade, so capture their holders while they still exist
+    _mark_faculty(object_session(target), *_submission_role_holders(connection, target.id))
+
+
+@listens_for(ProjectClassConfig, "after_update")
+def _workload_ProjectClassConfig_update_handler(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[attr].history.has_changes() for attr in _CONFIG_ATTRIBUTES):
+        _mark_config(object_session(target), target.id)
+
+
+def _has_pending_workload_changes(session) -> bool:
+    tracked = (SubmissionRole, SubmissionRecord, ProjectClassConfig)
+    return any(isinstance(obj, tracked) for obj in chain(session.new, session.dirty, session.deleted))
+
+
+@listens_for(db.session, "before_commit")
+def _workload_before_commit_handler(session):
+    # pending changes are only flushed (and our mapper handlers only run) after before_commit has been
+    # dispatched, so flush here if there is anything that could affect the aggregates
+    if _has_pending_workload_changes(session):
+        session.flush()
+
+    faculty_ids = session.info.pop(_DIRTY_FACULTY, None)
+    config_ids = session.info.pop(_DIRTY_CONFIGS, None)
+    if not faculty_ids and not config_ids:
+        return
+
+    refresh_faculty_workload(
+        session.connection(),
+        faculty_ids=sorted(faculty_ids) if faculty_ids else [],
+        config_ids=sorted(config_ids) if config_ids else [],
+    )
+
+
+@listens_for(db.session, "after_rollback")
+def _workload_after_rollback_handler(session):
+    session.info.pop(_DIRTY_FACULTY, None)
+    session.info.pop(_DIRTY_CONFIGS, None)
+
+
+def faculty_workload_by_config(faculty_ids: Iterable[int], configs: Dict[int, ProjectClassConfig]) -> Dict[int, Dict[int, FacultyWorkload]]:
+    """
+    Convenience wrapper over load_faculty_workload() for reports: return {faculty_id: {pclass_id: FacultyWorkload}}
+    for the given faculty members, where *configs* maps pclass_id to the ProjectClassConfig to report on.
+    """
+    config_to_pclass = {config.id: pclass_id for pclass_id, config in configs.items() if config is not None}
+    records = load_faculty_workload(faculty_ids, config_to_pclass.keys())
+
+    data: Dict[int, Dict[int, FacultyWorkload]] = defaultdict(dict)
+    for (faculty_id, config_id), record in records.items():
+        data[faculty_id][config_to_pclass[config_id]] = record
+
+    return data
@@ -9,4 +9,4 @@
 #
 
 from .make_celery import make_celery
-from .background_task import register_task, progress_update
+from .background_task import register_task, progress_update, get_task_progress, discard_live_state
@@ -9,8 +9,12 @@
 #
 
 from flask import current_app, flash
+from redis.exceptions import RedisError
+
 from ..database import db
-from ..models import TaskRecord
+from ..models import Notification, TaskRecord, User
+from ..shared.internal_redis import get_redis
+from ..shared.notification_stream import publish_task_progress
 
 from sqlalchemy import or_
 from sqlalchemy.exc import SQLAlchemyError
@@ -19,6 +23,14 @@ from uuid import uuid4
 
 from datetime import datetime
 
+# live task state is held in a Redis hash per task; SQL is written back at most once per
+# TASK_PROGRESS_WRITEBACK_INTERVAL seconds while a task is running, and synchronously on completion
+_TASK_KEY = "_task_progress:{task_id}"
+_TASK_WRITEBACK_KEY = "_task_progress_writeback:{task_id}"
+_TASK_TTL = 7 * 86400
+
+_FINAL_STATES = (TaskRecord.SUCCESS, TaskRecord.FAILURE, TaskRecord.TERMINATED)
+
 
 def register_task(name, owner=None, description=None):
     """
@@ -48,6 +60,18 @@ def register_task(name, owner=None, description=None):
         db.session.add(data)
         db.session.flush()
 
+        _store_live_state(
+            uuid,
+            {
+                "name": name,
+                "owner_id": data.owner_id if data.owner_id is not None else "",
+                "status": TaskRecord.PENDING,
+                "progress": "",
+                "message": "",
+                "last_updated": data.start_date.isoformat(),
+            },
+        )
+
         if data.owner is not None:
             data.owner.post_task_update(
                 data.id,
@@ -75,37 +99,176 @@ def register_task(name, owner=None, description=None):
     return uuid
 
 
+def _decode(value):
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return value
+
+
+def _store_live_state(task_id, fields):
+    key = _TASK_KEY.format(task_id=task_id)
+
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hset(key, mapping=fields)
+        pipe.expire(key, _TASK_TTL)
+        pipe.execute()
+    except RedisError as e:
+        current_app.logger.warning(f"background_task: could not store live state for task {task_id}: {e}")
+
+
+def _load_live_state(task_id):
+    try:
+        raw = get_redis().hgetall(_TASK_KEY.format(task_id=task_id))
+    except RedisError as e:
+        current_app.logger.warning(f"background_task: could not read live state for task {task_id}: {e}")
+        return {}
+
+    return {_decode(k): _decode(v) for k, v in raw.items()}
+
+
+def discard_live_state(task_ids):
+    """
+    Drop the live Redis state for the given tasks, so that subsequent reads fall back to the TaskRecord.
+    Used when task records are updated out-of-band (e.g. reconciliation after a restart).
+    """
+    keys = [_TASK_KEY.format(task_id=task_id) for task_id in task_ids]
+    if len(keys) == 0:
+        return
+
+    try:
+        get_redis().delete(*keys)
+    except RedisError as e:
+        current_app.logger.warning(f"background_task.discard_live_state: could not discard live state: {e}")
+
+
+def _writeback_due(task_id):
+    """
+    Rate-limit intermediate write-backs to SQL. Returns True at most once per write-back interval for
+    each task, across all workers. If Redis is unavailable, always write back.
+    """
+    interval = current_app.config.get("TASK_PROGRESS_WRITEBACK_INTERVAL", 30)
+    if interval <= 0:
+        return True
+
+    try:
+        return bool(get_redis().set(_TASK_WRITEBACK_KEY.format(task_id=task_id), 1, nx=True, ex=interval))
+    except RedisError:
+        return True
+
+
 def progress_update(task_id, state, progress, message, autocommit=False):
-    data = TaskRecord.query.filter_by(id=task_id).first()
+    """
+    Report progress for a task registered with register_task().
 
-    if data is not None:
-        # update data for task record
-        data.status = state
-        data.progress = progress
-        data.message = message
-        data.last_updated = datetime.now()
+    Live state is written to Redis on every call and pushed to the owner's notification stream.
+    Intermediate states are written back to the TaskRecord at most once per TASK_PROGRESS_WRITEBACK_INTERVAL
+    seconds; final states (SUCCESS, FAILURE, TERMINATED) are always written back immediately.
+    """
+    now = datetime.now()
+    final = state in _FINAL_STATES
 
-        # push a notification to owning user, if there is one
-        if data.owner is not None:
-            remove_on_load = False
-            if data.status == TaskRecord.SUCCESS or data.status == TaskRecord.FAILURE or data.status == TaskRecord.TERMINATED:
-                remove_on_load = True
+    live = _load_live_state(task_id)
+    if "name" not in live:
+        # no live state (e.g. task registered before a Redis flush); fall back to the database record
+        data = db.session.query(TaskRecord).filter_by(id=task_id).first()
+        if data is None:
+            return
 
-            data.owner.post_task_update(
-                data.id,
-                {
-                    "task": data.name,
-                    "state": state,
-                    "progress": progress,
-                    "message": message,
-                },
-                remove_on_load=remove_on_load,
-                autocommit=False,
-            )
+        live = {"name": data.name, "owner_id": data.owner_id if data.owner_id is not None else ""}
 
-        # commit all changes
-        if autocommit:
-            db.session.commit()
+    _store_live_state(
+        task_id,
+        {
+            "name": live["name"],
+            "owner_id": live["owner_id"],
+            "status": state,
+            "progress": progress if progress is not None else "",
+            "message": message if message is not None else "",
+            "last_updated": now.isoformat(),
+        },
+    )
+
+    owner_id = int(live["owner_id"]) if live["owner_id"] not in (None, "") else None
+    payload = {
+        "task": live["name"],
+        "state": state,
+        "progress": progress,
+        "message": message,
+    }
+
+    # push a notification to owning user, if there is one; intermediate ticks go only to Redis,
+    # so the User record need not be loaded
+    if owner_id is not None:
+        if final:
+            owner = db.session.query(User).filter_by(id=owner_id).first()
+            if owner is not None:
+                owner.post_task_update(task_id, payload, remove_on_load=True, autocommit=False)
+        else:
+            publish_task_progress(owner_id, Notification.TASK_PROGRESS, task_id, payload)
+
+    # update data for task record without loading it; the commit below is still needed if the write-back is
+    # skipped, because callers use autocommit to commit their own pending work
+    if final or _writeback_due(task_id):
+        db.session.query(TaskRecord).filter_by(id=task_id).update(
+            {
+                TaskRecord.status: state,
+                TaskRecord.progress: progress,
+                TaskRecord.message: message,
+                TaskRecord.last_updated: now,
+            },
+            synchronize_session=False,
+        )
+
+    # commit all changes
+    if autocommit:
+        db.session.commit()
+
+
+def get_task_progress(task_ids):
+    """
+    Bulk read the live state of many tasks in a single Redis round trip. Tasks with no live state in
+    Redis are read from their TaskRecord in a single query.
+    Returns a dict mapping task id to a dict with keys status, progress, message and last_updated.
+    """
+    task_ids = list(task_ids)
+    if len(task_ids) == 0:
+        return {}
+
+    results = {}
+
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for task_id in task_ids:
+            pipe.hgetall(_TASK_KEY.format(task_id=task_id))
+        responses = pipe.execute()
+    except RedisError as e:
+        current_app.logger.warning(f"background_task.get_task_progress: could not read live state: {e}")
+        responses = [{} for _ in task_ids]
+
+    for task_id, raw in zip(task_ids, responses):
+        live = {_decode(k): _decode(v) for k, v in raw.items()}
+        if "status" not in live:
+            continue
+
+        results[task_id] = {
+            "status": int(live["status"]),
+            "progress": int(float(live["progress"])) if live.get("progress") not in (None, "") else None,
+            "message": live.get("message") or None,
+            "last_updated": datetime.fromisoformat(live["last_updated"]) if live.get("last_updated") else None,
+        }
+
+    missing = [task_id for task_id in task_ids if task_id not in results]
+    if len(missing) > 0:
+        for record in db.session.query(TaskRecord).filter(TaskRecord.id.in_(missing)).all():
+            results[record.id] = {
+                "status": record.status,
+                "progress": record.progress,
+                "message": record.message,
+                "last_updated": record.last_updated,
+            }
+
+    return results
 
 
 def reconcile_background_tasks(app):
@@ -170,6 +333,7 @@ def reconcile_background_tasks(app):
 
         try:
             db.session.commit()
+            discard_live_state([task.id for task in stale])
             app.logger.info(f"reconcile_background_tasks: reconciliation complete")
         except SQLAlchemyError as e:
             db.session.rollback()
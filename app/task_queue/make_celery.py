@@ -12,7 +12,7 @@
 from datetime import datetime
 
 from celery import Celery
-from celery.signals import task_failure, task_revoked, worker_init
+from celery.signals import task_failure, task_revoked, worker_init, worker_process_init, worker_process_shutdown
 
 
 @worker_init.connect
@@ -55,6 +55,29 @@ def make_celery(app):
 
     celery.Task = ContextTask
 
+    @worker_process_init.connect
+    def on_worker_process_init(**kwargs):
+        """
+        Open the pooled MongoDB client for the scraped-text cache in each worker child, and ensure its
+        indexes exist, so that pipeline tasks do not pay this cost per call.
+        """
+        with app.app_context():
+            from ..shared.scraped_text_store import ensure_scraped_text_indexes
+
+            try:
+                ensure_scraped_text_indexes()
+            except Exception as e:
+                app.logger.exception("on_worker_process_init signal: could not initialize scraped-text store", exc_info=e)
+
+    @worker_process_shutdown.connect
+    def on_worker_process_shutdown(**kwargs):
+        from ..shared.cloud_object_store.audit_writer import flush_audit_writers
+        from ..shared.scraped_text_store import close_scraped_text_clients
+
+        # prefork children exit without running atexit handlers, so flush queued cloud API audit records here
+        flush_audit_writers()
+        close_scraped_text_clients()
+
     @task_failure.connect
     def on_task_failure(task_id, exception, traceback, einfo, sender=None, **kwargs):
         """
@@ -59,3 +59,5 @@ from .data_export import register_data_export_tasks
 from .allocation_export import register_allocation_export_tasks
 from .canvas_push import register_canvas_push_tasks
 from .object_store_backup import register_object_store_backup_tasks
+from .workload import register_workload_tasks
+from .ai_calibration import register_ai_calibration_tasks
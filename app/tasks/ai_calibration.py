@@ -0,0 +1,45 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+from typing import List, Optional
+
+from celery import states
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..database import db
+from ..shared.ai_calibration_statistics import refresh_calibration_statistics
+
+
+def register_ai_calibration_tasks(celery):
+    @celery.task(bind=True, default_retry_delay=30)
+    def recompute_ai_calibration_statistics(self, cells: Optional[List[List[int]]] = None):
+        """
+        Rebuild the AICalibrationStatistics sufficient statistics, either for the given [pclass_id, year] cells
+        or for every project class and year if none are specified.
+        These rows are normally maintained incrementally; a full rebuild picks up changes made with bulk SQL
+        statements, which bypass the ORM event handlers.
+        """
+        self.update_state(state=states.STARTED, meta={"msg": "Recomputing AI calibration statistics"})
+
+        try:
+            written = refresh_calibration_statistics(
+                db.session.connection(),
+                cells=[tuple(cell) for cell in cells] if cells is not None else None,
+            )
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+            raise self.retry()
+
+        msg = {"msg": f"Wrote {written} AI calibration statistics record(s)"}
+        self.update_state(state=states.SUCCESS, meta=msg)
+        return msg
@@ -200,6 +200,7 @@ from typing import List, Optional
 
 from flask import current_app, render_template_string
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import undefer
 
 from ..database import db
 from ..models import (
@@ -451,7 +452,7 @@ def _load_and_build_rows(record_ids: List[int]) -> List[dict]:
     chunk_size = 200
     for start in range(0, len(record_ids), chunk_size):
         chunk = record_ids[start : start + chunk_size]
-        records = db.session.query(SubmissionRecord).filter(SubmissionRecord.id.in_(chunk)).all()
+        records = db.session.query(SubmissionRecord).filter(SubmissionRecord.id.in_(chunk)).options(undefer(SubmissionRecord.language_analysis)).all()
         # Preserve the order given by record_ids (stable for reproducible exports)
         id_to_rec = {r.id: r for r in records}
         for rid in chunk:
@@ -16,6 +16,7 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from ..database import db
 from ..models import TaskRecord
+from ..task_queue import discard_live_state
 
 
 def register_background_tasks(celery):
@@ -86,6 +87,7 @@ def register_background_tasks(celery):
 
             if stale_tasks:
                 db.session.commit()  # intentionally not logged: periodic maintenance task
+                discard_live_state([task.id for task in stale_tasks])
 
         except SQLAlchemyError as e:
             db.session.rollback()
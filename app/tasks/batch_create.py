@@ -17,9 +17,8 @@ from typing import Optional, Tuple, List
 from celery import group
 from dateutil.parser import parse
 from flask import current_app, render_template_string
-from sqlalchemy import or_
+from sqlalchemy import insert
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from sqlalchemy.sql.functions import func
 
 from app.manage_users.actions import register_user
 from ..database import db
@@ -48,6 +47,9 @@ OUTCOME_ERROR = 5
 
 BATCH_IMPORT_LIFETIME_SECONDS = 24 * 60 * 60
 
+# number of batch items inserted, or imported, per database transaction
+BATCH_IMPORT_CHUNK_SIZE = 250
+
 # language=jinja2
 _student_batch_import_report_header = """
 <div><strong>Some student account entries did not import correctly.</strong></div>
@@ -455,9 +457,12 @@ def _student_overwrite_record(item: StudentBatchItem, batch: StudentBatch) -> in
     return OUTCOME_MERGED
 
 
-def _faculty_create_record(item: FacultyBatchItem, batch: FacultyBatch, user_id) -> int:
-    faculty_lic = current_app.config["FACULTY_DEFAULT_LICENSE"]
-    faculty_default = db.session.query(AssetLicense).filter_by(abbreviation=faculty_lic).first()
+def _faculty_create_record(item: FacultyBatchItem, batch: FacultyBatch, user_id, default_license=None, commit=True) -> int:
+    if default_license is not None:
+        faculty_default = default_license
+    else:
+        faculty_lic = current_app.config["FACULTY_DEFAULT_LICENSE"]
+        faculty_default = db.session.query(AssetLicense).filter_by(abbreviation=faculty_lic).first()
 
     user: User = register_user(
         first_name=item.first_name,
@@ -468,6 +473,7 @@ def _faculty_create_record(item: FacultyBatchItem, batch: FacultyBatch, user_id)
         random_password=True,
         ask_confirm=False,
         default_license=faculty_default,
+        commit=commit,
     )
 
     # assign tenants from the batch record to the new user
@@ -502,9 +508,12 @@ def _faculty_create_record(item: FacultyBatchItem, batch: FacultyBatch, user_id)
     return OUTCOME_CREATED
 
 
-def _student_create_record(item: StudentBatchItem, batch: StudentBatch, user_id) -> int:
-    student_lic = current_app.config["STUDENT_DEFAULT_LICENSE"]
-    student_default = db.session.query(AssetLicense).filter_by(abbreviation=student_lic).first()
+def _student_create_record(item: StudentBatchItem, batch: StudentBatch, user_id, default_license=None, commit=True) -> int:
+    if default_license is not None:
+        student_default = default_license
+    else:
+        student_lic = current_app.config["STUDENT_DEFAULT_LICENSE"]
+        student_default = db.session.query(AssetLicense).filter_by(abbreviation=student_lic).first()
 
     user: User = register_user(
         first_name=item.first_name,
@@ -515,6 +524,7 @@ def _student_create_record(item: StudentBatchItem, batch: StudentBatch, user_id)
         random_password=True,
         ask_confirm=False,
         default_license=student_default,
+        commit=commit,
     )
 
     # assign tenants from the batch record to the new user
@@ -916,22 +926,44 @@ def _get_CATS(row, current_line) -> CATS_data:
 ## MATCHING HELPERS
 
 
-def _match_existing_student(current_line, username, email) -> Optional[Tuple[bool, StudentData]]:
+class _UserLookup:
+    """
+    Case-folded email and username index over the users table, built with a single query at the start of
+    an import. Matching each imported row against this map avoids a per-row query on func.lower(...),
+    which cannot use an ordinary index.
+    """
+
+    def __init__(self):
+        self._by_email = {}
+        self._by_username = {}
+
+        for user_id, email, username in db.session.query(User.id, User.email, User.username).all():
+            if email is not None:
+                self._by_email.setdefault(email.casefold(), user_id)
+            if username is not None:
+                self._by_username.setdefault(username.casefold(), user_id)
+
+    def match(self, username, email) -> Optional[User]:
+        # prefer a match on email address, which is the more reliable identifier
+        user_id = None
+        if email is not None:
+            user_id = self._by_email.get(email.casefold())
+        if user_id is None and username is not None:
+            user_id = self._by_username.get(username.casefold())
+
+        if user_id is None:
+            return None
+
+        return db.session.get(User, user_id)
+
+
+def _match_existing_student(current_line, username, email, lookup: _UserLookup) -> Optional[Tuple[bool, StudentData]]:
     # test whether we can find an existing student record with this email address.
     # if we can, check whether it is a student account.
     # If not, there's not much we can do
     dont_convert = False
 
-    existing_record = (
-        db.session.query(User)
-        .filter(
-            or_(
-                func.lower(User.email) == func.lower(email),
-                func.lower(User.username) == func.lower(username),
-            )
-        )
-        .first()
-    )
+    existing_record = lookup.match(username, email)
 
     print(f'@@ trying to match record with user_id="{username}" and email="{email}"')
 
@@ -952,22 +984,13 @@ def _match_existing_student(current_line, username, email) -> Optional[Tuple[boo
     )
 
 
-def _match_existing_faculty(current_line, username, email) -> Optional[Tuple[bool, FacultyData]]:
+def _match_existing_faculty(current_line, username, email, lookup: _UserLookup) -> Optional[Tuple[bool, FacultyData]]:
     # test whether we can find an existing faculty record with this email address.
     # if we can, check whether it is a faculty account.
     # If not, there's not much we can do
     dont_convert = False
 
-    existing_record = (
-        db.session.query(User)
-        .filter(
-            or_(
-                func.lower(User.email) == func.lower(email),
-                func.lower(User.username) == func.lower(username),
-            )
-        )
-        .first()
-    )
+    existing_record = lookup.match(username, email)
 
     print(f'@@ trying to match record with user_id="{username}" and email="{email}"')
 
@@ -988,6 +1011,17 @@ def _match_existing_faculty(current_line, username, email) -> Optional[Tuple[boo
     )
 
 
+def _insert_batch_items(ItemType, rows: List[dict]) -> None:
+    """
+    Insert a chunk of batch items using a single executemany INSERT, rather than flushing one ORM object at a time
+    """
+    if len(rows) == 0:
+        return
+
+    db.session.execute(insert(ItemType), rows)
+    rows.clear()
+
+
 def _perform_expiry_check(self, record_id, BatchType, BatchItemType):
     try:
         record = db.session.query(BatchType).filter_by(id=record_id).first()
@@ -1018,6 +1052,77 @@ def _perform_expiry_check(self, record_id, BatchType, BatchItemType):
             raise self.retry()
 
 
+def _import_batch_item(item, batch, user_id, overwrite, create, default_license) -> int:
+    """
+    Import a single batch item inside a SAVEPOINT, so that a failure rolls back only this item and does not
+    abort the enclosing chunk transaction
+    """
+    if item.dont_convert:
+        return OUTCOME_IGNORED
+
+    try:
+        with db.session.begin_nested():
+            if item.existing_record is not None:
+                result = overwrite(item, batch)
+            else:
+                result = create(item, batch, user_id, default_license=default_license, commit=False)
+
+            # delete this item
+            db.session.delete(item)
+
+    except ValueError as e:
+        # encountered a validation error while merging or creating a record
+        current_app.logger.exception("ValueError exception", exc_info=e)
+        return OUTCOME_ERROR
+
+    except (SQLAlchemyError, IntegrityError) as e:
+        current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+        return OUTCOME_FAILED
+
+    return result
+
+
+def _import_batch_chunked(self, record_id, user_id, BatchType, ItemType, overwrite, create, license_key, label) -> List[int]:
+    """
+    Import every item in a batch within a single task, committing once per BATCH_IMPORT_CHUNK_SIZE items.
+    Returns a list of outcomes in the same format as the per-item import tasks, so it can feed the
+    existing finalize tasks.
+    """
+    try:
+        batch = db.session.query(BatchType).filter_by(id=record_id).first()
+        item_ids = [x for (x,) in db.session.query(ItemType.id).filter(ItemType.parent_id == record_id).order_by(ItemType.id).all()]
+        default_license = db.session.query(AssetLicense).filter_by(abbreviation=current_app.config[license_key]).first()
+    except SQLAlchemyError as e:
+        current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+        raise self.retry()
+
+    if batch is None:
+        self.update_state(state="FAILURE", meta={"msg": "Could not load database records"})
+        raise RuntimeError("Could not load database records")
+
+    results = []
+    for offset in range(0, len(item_ids), BATCH_IMPORT_CHUNK_SIZE):
+        chunk = item_ids[offset : offset + BATCH_IMPORT_CHUNK_SIZE]
+
+        try:
+            items = db.session.query(ItemType).filter(ItemType.id.in_(chunk)).order_by(ItemType.id).all()
+
+            for item in items:
+                results.append(_import_batch_item(item, batch, user_id, overwrite, create, default_license))
+
+            log_db_commit(
+                f"Imported {label} batch items {offset + 1}-{offset + len(chunk)} of {len(item_ids)}",
+                endpoint=self.name,
+            )
+
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+            raise self.retry()
+
+    return results
+
+
 def register_batch_create_tasks(celery):
     @celery.task(bind=True, default_retry_delay=30)
     def faculty(self, record_id, asset_id):
@@ -1077,6 +1182,10 @@ def register_batch_create_tasks(celery):
 
                 ignored_lines = []
 
+                # index existing users once, rather than querying for each row
+                lookup = _UserLookup()
+                pending_items = []
+
                 # in Python >= 3.6, row is an OrderedDict
                 for row in reader:
                     current_line += 1
@@ -1087,7 +1196,7 @@ def register_batch_create_tasks(celery):
                         email = _get_email(row, current_line, FacultySkipRow)
 
                         # try to match this data to an existing record
-                        dont_convert, existing_record = _match_existing_faculty(current_line, username, email)
+                        dont_convert, existing_record = _match_existing_faculty(current_line, username, email, lookup)
 
                         # get name and break into comma-separated parts
                         first_name, last_name = _get_name(row, current_line, FacultySkipRow)
@@ -1107,28 +1216,25 @@ def register_batch_create_tasks(celery):
                             office = _get_office(row, current_line)
                             CATS = _get_CATS(row, current_line)
 
-                            item = FacultyBatchItem(
-                                parent_id=record.id,
-                                existing_id=existing_record.id if existing_record is not None else None,
-                                user_id=username,
-                                first_name=first_name,
-                                last_name=last_name,
-                                email=email,
-                                office=office,
-                                CATS_supervision=CATS.supervision,
-                                CATS_marking=CATS.marking,
-                                CATS_moderation=CATS.moderating,
-                                CATS_presentation=CATS.presentation,
-                                dont_convert=dont_convert,
+                            pending_items.append(
+                                dict(
+                                    parent_id=record.id,
+                                    existing_id=existing_record.id if existing_record is not None else None,
+                                    user_id=username,
+                                    first_name=first_name,
+                                    last_name=last_name,
+                                    email=email,
+                                    office=office,
+                                    CATS_supervision=CATS.supervision,
+                                    CATS_marking=CATS.marking,
+                                    CATS_moderation=CATS.moderating,
+                                    CATS_presentation=CATS.presentation,
+                                    dont_convert=dont_convert,
+                                )
                             )
 
                             interpreted_lines += 1
 
-                            try:
-                                db.session.add(item)
-                            except SQLAlchemyError as e:
-                                raise FacultySkipRow(current_line, reason="Internal database error")
-
                         except FacultySkipRow as e:
                             # populate with values extracted from list
                             if e.user is None:
@@ -1149,6 +1255,16 @@ def register_batch_create_tasks(celery):
                         ignored_lines.append(e)
                         print(f">> SUMMARY: skipped line {str(e)}")
 
+                    if len(pending_items) >= BATCH_IMPORT_CHUNK_SIZE:
+                        _insert_batch_items(FacultyBatchItem, pending_items)
+
+        try:
+            _insert_batch_items(FacultyBatchItem, pending_items)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+            raise self.retry()
+
         progress_update(
             record.celery_id,
             TaskRecord.RUNNING,
@@ -1192,46 +1308,18 @@ def register_batch_create_tasks(celery):
             record.owner.post_message(message_string, "info", autocommit=True)
 
     @celery.task(bind=True, default_retry_delay=30)
-    def import_faculty_batch_item(self, item_id, user_id):
-        try:
-            item: FacultyBatchItem = db.session.query(FacultyBatchItem).filter_by(id=item_id).first()
-        except SQLAlchemyError as e:
-            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
-            raise self.retry()
-
-        if item is None:
-            self.update_state(state="FAILURE", meta={"msg": "Could not load database records"})
-            return OUTCOME_FAILED
-
-        if item.dont_convert:
-            return OUTCOME_IGNORED
-
-        try:
-            batch: FacultyBatch = item.parent
-
-            if item.existing_record is not None:
-                result = _faculty_overwrite_record(item, batch)
-            else:
-                result = _faculty_create_record(item, batch, user_id)
-
-            # delete this item
-            batch.items.remove(item)
-            db.session.delete(item)
-
-            log_db_commit("Imported faculty batch item", endpoint=self.name)
-
-        except (SQLAlchemyError, IntegrityError) as e:
-            db.session.rollback()
-            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
-            raise self.retry()
-
-        except ValueError as e:
-            # encountered a validation error while merging or creating a record
-            db.session.rollback()
-            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
-            return OUTCOME_ERROR
-
-        return result
+    def import_faculty_batch(self, record_id, user_id):
+        return _import_batch_chunked(
+            self,
+            record_id,
+            user_id,
+            FacultyBatch,
+            FacultyBatchItem,
+            _faculty_overwrite_record,
+            _faculty_create_record,
+            "FACULTY_DEFAULT_LICENSE",
+            "faculty",
+        )
 
     @celery.task(bind=True, default_retry_delay=30)
     def import_faculty_finalize(self, result_data, record_id, user_id):
@@ -1351,6 +1439,10 @@ def register_batch_create_tasks(celery):
 
                 ignored_lines = []
 
+                # index existing users once, rather than querying for each row
+                lookup = _UserLookup()
+                pending_items = []
+
                 # in Python >= 3.6, row is an OrderedDict
                 for row in reader:
                     current_line += 1
@@ -1370,7 +1462,7 @@ def register_batch_create_tasks(celery):
                             )
 
                         # try to match this data to an existing record
-                        dont_convert, existing_record = _match_existing_student(current_line, username, email)
+                        dont_convert, existing_record = _match_existing_student(current_line, username, email, lookup)
 
                         # get name and break into comma-separated parts
                         first_name, last_name = _get_name(row, current_line, StudentSkipRow)
@@ -1420,7 +1512,7 @@ def register_batch_create_tasks(celery):
                                 if not record.trust_registration and existing_record.registration_number is not None:
                                     registration_number = existing_record.registration_number
 
-                            item = StudentBatchItem(
+                            item_data = dict(
                                 parent_id=record.id,
                                 existing_id=existing_record.id if existing_record is not None else None,
                                 user_id=username,
@@ -1435,13 +1527,13 @@ def register_batch_create_tasks(celery):
                                 intermitting=intermitting,
                                 dont_convert=dont_convert,
                             )
+                            pending_items.append(item_data)
 
                             interpreted_lines += 1
 
-                            try:
-                                db.session.add(item)
-                            except SQLAlchemyError as e:
-                                raise StudentSkipRow(current_line, reason="Internal database error")
+                            # transient instance used only to compute the academic year; it is never added to the session
+                            item = StudentBatchItem(**item_data)
+                            item.programme = programme
 
                             if item.academic_year is None:
                                 if not item.programme.year_out or year_of_course != item.programme.year_out_value:
@@ -1499,6 +1591,16 @@ def register_batch_create_tasks(celery):
                         ignored_lines.append(e)
                         print(f">> SUMMARY: skipped line {str(e)}")
 
+                    if len(pending_items) >= BATCH_IMPORT_CHUNK_SIZE:
+                        _insert_batch_items(StudentBatchItem, pending_items)
+
+        try:
+            _insert_batch_items(StudentBatchItem, pending_items)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+            raise self.retry()
+
         progress_update(
             record.celery_id,
             TaskRecord.RUNNING,
@@ -1583,46 +1685,18 @@ def register_batch_create_tasks(celery):
             record.owner.post_message(message_string, "info", autocommit=True)
 
     @celery.task(bind=True, default_retry_delay=30)
-    def import_student_batch_item(self, item_id, user_id):
-        try:
-            item: StudentBatchItem = db.session.query(StudentBatchItem).filter_by(id=item_id).first()
-        except SQLAlchemyError as e:
-            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
-            raise self.retry()
-
-        if item is None:
-            self.update_state(state="FAILURE", meta={"msg": "Could not load database records"})
-            return OUTCOME_FAILED
-
-        if item.dont_convert:
-            return OUTCOME_IGNORED
-
-        try:
-            batch: StudentBatch = item.parent
-
-            if item.existing_record is not None:
-                result = _student_overwrite_record(item, batch)
-            else:
-                result = _student_create_record(item, batch, user_id)
-
-            # delete this item
-            batch.items.remove(item)
-            db.session.delete(item)
-
-            log_db_commit("Imported student batch item", endpoint=self.name)
-
-        except (SQLAlchemyError, IntegrityError) as e:
-            db.session.rollback()
-            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
-            raise self.retry()
-
-        except ValueError as e:
-            # encountered a validation error while merging or creating a record
-            db.session.rollback()
-            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
-            return OUTCOME_ERROR
-
-        return result
+    def import_student_batch(self, record_id, user_id):
+        return _import_batch_chunked(
+            self,
+            record_id,
+            user_id,
+            StudentBatch,
+            StudentBatchItem,
+            _student_overwrite_record,
+            _student_create_record,
+            "STUDENT_DEFAULT_LICENSE",
+            "student",
+        )
 
     @celery.task(bind=True, default_retry_delay=30)
     def import_student_finalize(self, result_data, record_id, user_id):
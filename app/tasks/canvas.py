@@ -8,12 +8,14 @@
 # Contributors: David Seery <D.Seery@sussex.ac.uk>
 #
 
+from collections import defaultdict
 from datetime import datetime, timedelta
+from typing import Optional
 
 from celery import group
 from flask import current_app
 from nameparser import HumanName
-from sqlalchemy import func, or_
+from sqlalchemy import func
 from sqlalchemy.exc import SQLAlchemyError
 
 from ..database import db
@@ -32,11 +34,13 @@ from ..models import (
 )
 from ..shared.asset_tools import AssetCloudAdapter, AssetUploadManager
 from ..shared.canvas_api import (
+    CanvasAPIError,
     build_api_url,
     extract_turnitin_data,
-    get_paginated,
     make_session,
 )
+from ..shared.canvas_sync import CanvasSyncEngine, CanvasSyncState, fingerprint
+from ..shared.internal_redis import get_redis
 from ..shared.scraped_text_store import delete_scraped_text
 from ..shared.utils import get_main_config
 from ..shared.workflow_logging import log_db_commit
@@ -135,6 +139,141 @@ def _finalize_report_attachment(data, rid, user_id, endpoint=None):
     return record.id
 
 
+def _store_report_attachment(record: SubmissionRecord, attachment, content: bytes, submission, user_id, endpoint=None):
+    """
+    Shared helper for pull_report and pull_reports_batch.
+
+    Stores the downloaded Canvas attachment *content* as a SubmittedAsset and extracts Turnitin data from
+    the Canvas *submission* object. Commits via log_db_commit and dispatches a thumbnail task.
+
+    Returns the payload expected by _finalize_report_attachment(). Raises on DB errors, after removing
+    the uploaded object from the object store.
+    """
+    submitter: SubmittingStudent = record.owner
+    config: ProjectClassConfig = submitter.config
+
+    default_report_license = db.session.query(AssetLicense).filter_by(abbreviation="Exam").first()
+    if default_report_license is None:
+        default_report_license = submitter.student.user.default_license
+
+    # AssetUploadManager will populate most fields later
+    asset = SubmittedAsset(
+        timestamp=datetime.now(),
+        uploaded_id=user_id,
+        expiry=None,
+        target_name=attachment["filename"],
+        license=default_report_license,
+    )
+    db.session.add(asset)
+
+    object_store = current_app.config.get("OBJECT_STORAGE_ASSETS")
+    with AssetUploadManager(
+        asset,
+        data=content,
+        storage=object_store,
+        length=attachment["size"],
+        audit_data=f"canvas.pull_report (submission record #{record.id})",
+        mimetype=attachment["content-type"],
+    ) as upload_mgr:
+        pass
+
+    adapter = AssetCloudAdapter(
+        asset,
+        object_store,
+        audit_data=f"canvas.pull_report (submission record #{record.id})",
+    )
+
+    turnitin = extract_turnitin_data(submission)
+
+    try:
+        db.session.flush()
+        log_db_commit(
+            "Save downloaded Canvas submission asset to database",
+            user=user_id,
+            student=submitter.student if submitter is not None else None,
+            project_classes=config.project_class if config is not None else None,
+            endpoint=endpoint,
+        )
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+        try:
+            adapter.delete()
+        except FileNotFoundError:
+            # silently ignore if cloud object cannot be found
+            pass
+        raise
+
+    dispatch_thumbnail_task(asset)
+
+    return {
+        "asset_id": asset.id,
+        "turnitin_outcome": turnitin["turnitin_outcome"],
+        "similarity_score": turnitin["similarity_score"],
+        "web_overlap": turnitin["web_overlap"],
+        "publication_overlap": turnitin["publication_overlap"],
+        "student_overlap": turnitin["student_overlap"],
+    }
+
+
+def _canvas_sync_engine(api_token: str) -> CanvasSyncEngine:
+    """
+    Build a CanvasSyncEngine configured from the application settings. Sync state (ETags and fingerprints)
+    is kept in Redis, so that it is shared by every worker.
+    """
+    state = CanvasSyncState(get_redis(), ttl=current_app.config.get("CANVAS_SYNC_STATE_TTL", 86400))
+    return CanvasSyncEngine(
+        api_token,
+        max_workers=current_app.config.get("CANVAS_SYNC_MAX_WORKERS", 4),
+        per_page=current_app.config.get("CANVAS_SYNC_PER_PAGE", 100),
+        state=state,
+    )
+
+
+def _load_submitters(config_id):
+    """
+    Return (SubmittingStudent, StudentData, User) rows for every submitter attached to a ProjectClassConfig.
+    """
+    return (
+        db.session.query(SubmittingStudent, StudentData, User)
+        .filter(SubmittingStudent.config_id == config_id)
+        .join(StudentData, StudentData.id == SubmittingStudent.student_id)
+        .join(User, User.id == StudentData.id)
+        .all()
+    )
+
+
+def _post_pull_report_error(user: User, record: SubmissionRecord):
+    user.post_message(
+        "An error occurred when pulling the report for submitter {name} from Canvas".format(name=record.owner.student.user.name),
+        "danger",
+        autocommit=True,
+    )
+
+
+def _match_key(value: Optional[str]) -> Optional[str]:
+    # the per-user queries these lookups replace compared under a case-insensitive MySQL collation
+    return value.strip().casefold() if value is not None else None
+
+
+def _user_checkin_fingerprint(submitters, missing_canvas_ids):
+    # summarizes every local value that canvas_user_checkin_module reads or writes, so that a module is
+    # re-synchronized if either Canvas or our submitter list has changed
+    return fingerprint(
+        {
+            "submitters": sorted(
+                [sub.id, sub.canvas_user_id, sub.canvas_missing, user.email, user.first_name, user.last_name, sd.exam_number]
+                for sub, sd, user in submitters
+            ),
+            "missing": sorted(missing_canvas_ids),
+        }
+    )
+
+
+def _submission_checkin_fingerprint(records):
+    return fingerprint(sorted([record.id, canvas_user_id, record.canvas_submission_available] for record, canvas_user_id, user in records))
+
+
 def register_canvas_tasks(celery):
     @celery.task(bind=True, default_retry_delay=30)
     def canvas_user_checkin(self):
@@ -210,34 +349,86 @@ def register_canvas_tasks(celery):
 
         print("** Querying Canvas API for student list on module for {pcl} (module id={mid})".format(pcl=config.name, mid=config.canvas_module_id))
 
-        # set up requests session; safe to assume config.canvas_login is not zero
-        session = make_session(config.canvas_login.canvas_API_token)
+        # preload the submitter list and the existing CanvasStudent records (students present in the Canvas
+        # database, but not present as submitters in our database), so that Canvas users can be matched
+        # against in-memory maps rather than by one query per user
+        try:
+            submitters = _load_submitters(config.id)
+            missing_records = config.missing_canvas_students.all()
+        except SQLAlchemyError as e:
+            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+            raise self.retry()
+
+        local_fingerprint = _user_checkin_fingerprint(submitters, [c.canvas_user_id for c in missing_records])
 
         API_URL = build_api_url(
             API_root,
             "courses/{course_id}/users".format(course_id=config.canvas_module_id),
         )
-        user_list = get_paginated(session, API_URL, params={"enrollment_type": "student"})
+        params = {"enrollment_type": "student"}
+        sync_key = "users:{pid}:{mid}".format(pid=config.id, mid=config.canvas_module_id)
 
-        if user_list is None:
-            print("** [{pcl}]: recovered no students from Canvas API".format(pcl=config.name))
-            return
+        # safe to assume config.canvas_login is not zero
+        with _canvas_sync_engine(config.canvas_login.canvas_API_token) as engine:
+            try:
+                collection = engine.fetch_collection(API_URL, params=params, key=sync_key)
+
+                if engine.is_unchanged(collection, local_fingerprint):
+                    print(
+                        "** [{pcl}]: Canvas student list and submitter list are unchanged since the last synchronization; skipping".format(
+                            pcl=config.name
+                        )
+                    )
+                    self.update_state(state="FINISHED", meta={"msg": "Unchanged since last synchronization"})
+                    return
+
+                if collection.items is None:
+                    # Canvas is unchanged, but our submitter list has changed, so the student list is still needed
+                    collection = engine.fetch_collection(API_URL, params=params, key=sync_key, conditional=False)
+
+            except CanvasAPIError as e:
+                print("** [{pcl}]: recovered no students from Canvas API ({err})".format(pcl=config.name, err=e))
+                return
+
+        user_list = collection.items
 
         # now loop through recovered students, matching them to SubmittingStudent instances if possible
-        print("** [{pcl}]: recovered {n} students from Canvas API".format(pcl=config.name, n=len(user_list)))
+        print(
+            "** [{pcl}]: recovered {n} students from Canvas API ({p} page{pl})".format(
+                pcl=config.name, n=len(user_list), p=collection.pages, pl="s" if collection.pages != 1 else ""
+            )
+        )
+
+        # match keys mirror the alternatives used by the original per-user query: exact email address, full name,
+        # or the initial.surname@sussex.ac.uk form of the email address
+        by_email = defaultdict(set)
+        by_name = defaultdict(set)
+        by_initial_email = defaultdict(set)
+        submitter_map = {}
 
-        # initially, mark all students as missing, and get a list of all CanvasStudent records (if any)
-        # that represent students present in the Canvas database, but not present as submitters in our
-        # database
-        for sub in config.submitting_students:
+        # initially, mark all students as missing
+        for sub, sd, user in submitters:
+            sub: SubmittingStudent
             sub.canvas_user_id = None
             sub.canvas_missing = True
 
+            submitter_map[sub.id] = (sub, sd)
+
+            if user.email is not None:
+                by_email[_match_key(user.email)].add(sub.id)
+            if user.first_name is not None and user.last_name is not None:
+                by_name[_match_key("{first} {last}".format(first=user.first_name, last=user.last_name))].add(sub.id)
+                by_initial_email[_match_key("{initial}.{last}@sussex.ac.uk".format(initial=user.first_name[:1], last=user.last_name))].add(sub.id)
+
+        missing_by_canvas_id = defaultdict(list)
+        for c in missing_records:
+            missing_by_canvas_id[c.canvas_user_id].append(c)
+
         # get a list of CanvasStudent items to delete (to keep our list of missing students in sync)
-        canvas_student_delete_list = [c.id for c in config.missing_canvas_students]
+        canvas_student_delete_list = set(c.id for c in missing_records)
 
-        # keep a list of CanvasStudent instances to add
-        c_add_list = []
+        # Canvas users that need a new CanvasStudent record
+        new_missing = []
 
         for user in user_list:
             if "email" in user:
@@ -245,25 +436,9 @@ def register_canvas_tasks(celery):
                 name = user["name"]
                 canvas_user_id = user["id"]
 
-                # try to find a submitting student with this email address
-                match = (
-                    config.submitting_students.join(StudentData, StudentData.id == SubmittingStudent.student_id)
-                    .join(User, User.id == StudentData.id)
-                    .filter(
-                        or_(
-                            User.email == email,
-                            func.concat(User.first_name, " ", User.last_name) == name,
-                            func.concat(
-                                func.left(User.first_name, 1),
-                                ".",
-                                User.last_name,
-                                "@sussex.ac.uk",
-                            )
-                            == email,
-                        )
-                    )
-                    .all()
-                )
+                # try to find a submitting student matching this email address or name
+                email_key = _match_key(email)
+                match = by_email.get(email_key, set()) | by_name.get(_match_key(name), set()) | by_initial_email.get(email_key, set())
                 num = len(match)
 
                 if num > 1:
@@ -277,32 +452,16 @@ def register_canvas_tasks(celery):
                     print('** [{pcl}]: Student "{name}" was not found in submitter list'.format(pcl=config.name, name=name))
 
                     # the student isn't in our submitter list; check whether we already have a record of that
-                    record = config.missing_canvas_students.filter_by(canvas_user_id=canvas_user_id).all()
+                    record = missing_by_canvas_id.get(canvas_user_id, [])
                     num_record = len(record)
 
                     if num_record == 0:
                         # need to add a new record
+                        new_missing.append(user)
 
-                        # parse name to human-readable format with first name/last name
-                        hn = HumanName(name)
-
-                        # try to find match in our own user database
-                        found_user = db.session.query(StudentData).join(User, User.id == StudentData.id).filter(User.email == email).first()
-
-                        c_add_list.append(
-                            CanvasStudent(
-                                config_id=config.id,
-                                student_id=found_user.id if found_user is not None else None,
-                                email=email,
-                                canvas_user_id=canvas_user_id,
-                                first_name=hn.first,
-                                last_name=hn.last,
-                            )
-                        )
                     elif num_record == 1:
                         # remove from list of CanvasStudent entries to delete
-                        if record[0].id in canvas_student_delete_list:
-                            canvas_student_delete_list.remove(record[0].id)
+                        canvas_student_delete_list.discard(record[0].id)
 
                     else:
                         msg = (
@@ -313,10 +472,10 @@ def register_canvas_tasks(celery):
                         print(msg)
                         current_app.logger.warning(msg)
 
-                elif num == 1:
+                else:
                     print('** [{pcl}]: Student "{name}" was matched to a student in the submitter list'.format(pcl=config.name, name=name))
 
-                    sub: SubmittingStudent = match[0]
+                    sub, sd = submitter_map[next(iter(match))]
                     sub.canvas_missing = False
                     sub.canvas_user_id = canvas_user_id
 
@@ -326,14 +485,43 @@ def register_canvas_tasks(celery):
                         exam_number_prefix = "Candidate No :  "
                         if sortable_name.startswith(exam_number_prefix):
                             exam_number = sortable_name.removeprefix(exam_number_prefix)
-                            sub.student.exam_number = int(exam_number)
+                            sd.exam_number = int(exam_number)
 
-                else:
-                    msg = '** [{pcl}]Unexpected number of matches for Canvas user with email address "{email}", name={name}'.format(
-                        pcl=config.name, email=email, name=name
-                    )
-                    print(msg)
-                    current_app.logger.warning(msg)
+        # try to find matches for new missing students in our own user database, using a single query
+        try:
+            new_emails = set(user["email"] for user in new_missing)
+            found_users = {}
+            if len(new_emails) > 0:
+                for sd_id, email in (
+                    db.session.query(StudentData.id, User.email).join(User, User.id == StudentData.id).filter(User.email.in_(new_emails)).all()
+                ):
+                    found_users.setdefault(_match_key(email), sd_id)
+        except SQLAlchemyError as e:
+            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+            raise self.retry()
+
+        # keep a list of CanvasStudent instances to add
+        c_add_list = []
+        for user in new_missing:
+            # parse name to human-readable format with first name/last name
+            hn = HumanName(user["name"])
+
+            c_add_list.append(
+                CanvasStudent(
+                    config_id=config.id,
+                    student_id=found_users.get(_match_key(user["email"])),
+                    email=user["email"],
+                    canvas_user_id=user["id"],
+                    first_name=hn.first,
+                    last_name=hn.last,
+                )
+            )
+
+        # fingerprint of the state this sync leaves behind, recorded with the Canvas fingerprint once committed
+        local_fingerprint = _user_checkin_fingerprint(
+            submitters,
+            [c.canvas_user_id for c in missing_records if c.id not in canvas_student_delete_list] + [c.canvas_user_id for c in c_add_list],
+        )
 
         try:
             # add new CanvasStudent instances
@@ -341,8 +529,8 @@ def register_canvas_tasks(celery):
                 db.session.add(c)
 
             # remove unneeded instances
-            for sid in canvas_student_delete_list:
-                db.session.query(CanvasStudent).filter_by(id=sid).delete()
+            if len(canvas_student_delete_list) > 0:
+                db.session.query(CanvasStudent).filter(CanvasStudent.id.in_(canvas_student_delete_list)).delete(synchronize_session=False)
 
             # notify convenors if new missing students were found
             if len(c_add_list) > 0:
@@ -378,6 +566,8 @@ def register_canvas_tasks(celery):
             msg = 'Could not synchronize submitter list with Canvas for project "{pname}" because of a database error'.format(pname=config.name)
             print(msg)
             current_app.logger.error(msg)
+        else:
+            engine.mark_synced(collection, local_fingerprint)
 
         self.update_state(state="FINISHED", meta={"msg": "Finished successfully"})
 
@@ -481,13 +671,27 @@ def register_canvas_tasks(celery):
             )
         )
 
-        # reset the Canvas submission availability flag
-        for sub in period.submissions:
-            sub: SubmissionRecord
-            sub.canvas_submission_available = False
+        # preload the submission records for this period, together with the Canvas user id of their owners,
+        # so that Canvas submissions can be matched without one query per submission
+        try:
+            records = (
+                db.session.query(SubmissionRecord, SubmittingStudent.canvas_user_id, User)
+                .filter(SubmissionRecord.period_id == period.id)
+                .join(SubmittingStudent, SubmittingStudent.id == SubmissionRecord.owner_id)
+                .join(User, User.id == SubmittingStudent.student_id)
+                .all()
+            )
+            submitter_counts = dict(
+                db.session.query(SubmittingStudent.canvas_user_id, func.count(SubmittingStudent.id))
+                .filter(SubmittingStudent.config_id == config.id, SubmittingStudent.canvas_user_id != None)
+                .group_by(SubmittingStudent.canvas_user_id)
+                .all()
+            )
+        except SQLAlchemyError as e:
+            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+            raise self.retry()
 
-        # set up requests session; safe to assume config.canvas_login is not zero
-        session = make_session(config.canvas_login.canvas_API_token)
+        local_fingerprint = _submission_checkin_fingerprint(records)
 
         API_URL = build_api_url(
             API_root,
@@ -496,38 +700,47 @@ def register_canvas_tasks(celery):
                 assign_id=period.canvas_assignment_id,
             ),
         )
-        submission_list = get_paginated(session, API_URL)
+        sync_key = "submissions:{pid}:{mid}:{aid}".format(pid=period.id, mid=period.canvas_module_id, aid=period.canvas_assignment_id)
 
-        if submission_list is None:
-            print("** [{pcl}]: no submissions available from Canvas API".format(pcl=config.name))
-            return
+        # safe to assume config.canvas_login is not zero
+        with _canvas_sync_engine(config.canvas_login.canvas_API_token) as engine:
+            try:
+                collection = engine.fetch_collection(API_URL, key=sync_key)
+
+                if engine.is_unchanged(collection, local_fingerprint):
+                    print("** [{pcl}]: Canvas submission list is unchanged since the last synchronization; skipping".format(pcl=config.name))
+                    self.update_state(state="FINISHED", meta={"msg": "Unchanged since last synchronization"})
+                    return
+
+                if collection.items is None:
+                    # Canvas is unchanged, but our submitter records have changed, so the submission list is still needed
+                    collection = engine.fetch_collection(API_URL, key=sync_key, conditional=False)
+
+            except CanvasAPIError as e:
+                print("** [{pcl}]: no submissions available from Canvas API ({err})".format(pcl=config.name, err=e))
+                return
+
+        records_by_canvas_id = defaultdict(list)
+        for record, canvas_user_id, user in records:
+            if canvas_user_id is not None:
+                records_by_canvas_id[canvas_user_id].append((record, user))
+
+        available = set()
 
         # now loop through submissions
-        for sub in submission_list:
+        for sub in collection.items:
             if sub["workflow_state"] != "unsubmitted":
                 canvas_id = sub["user_id"]
-
-                # find a submitting user with this user id
-                student = config.submitting_students.filter_by(canvas_user_id=canvas_id).all()
-                num_student = len(student)
+                num_student = submitter_counts.get(canvas_id, 0)
 
                 if num_student == 1:
-                    record = student[0].records.filter_by(period_id=period.id).first()
-                    sd = student[0].student
-
-                    if record is not None:
+                    for record, user in records_by_canvas_id.get(canvas_id, []):
                         print(
                             '** [{pcl}]: Student "{name}" with email address "{email}" has a Canvas submission available'.format(
-                                pcl=config.name, name=sd.user.name, email=sd.user.email
-                            )
-                        )
-                        record.canvas_submission_available = True
-                    else:
-                        print(
-                            '** [{pcl}]: Submission record for student "{name}" with email address "{name}" is None'.format(
-                                pcl=config.name, name=sd.user.name, email=sd.user.email
+                                pcl=config.name, name=user.name, email=user.email
                             )
                         )
+                        available.add(record.id)
 
                 elif num_student > 1:
                     msg = "** [{pcl}]: Canvas user with userid {uid} matches multiple (N={n}) submitting student records".format(
@@ -536,6 +749,13 @@ def register_canvas_tasks(celery):
                     print(msg)
                     current_app.logger.warning(msg)
 
+        # update the Canvas submission availability flag; the ORM emits UPDATEs only for records whose flag changes
+        for record, canvas_user_id, user in records:
+            record: SubmissionRecord
+            record.canvas_submission_available = record.id in available
+
+        local_fingerprint = _submission_checkin_fingerprint(records)
+
         try:
             log_db_commit(
                 "Synchronize Canvas submission availability flags",
@@ -551,6 +771,8 @@ def register_canvas_tasks(celery):
             )
             print(msg)
             current_app.logger.error(msg)
+        else:
+            engine.mark_synced(collection, local_fingerprint)
 
         self.update_state(state="FINISHED", meta={"msg": "Finished successfully"})
 
@@ -698,75 +920,9 @@ def register_canvas_tasks(celery):
             )
         )
 
-        default_report_license = db.session.query(AssetLicense).filter_by(abbreviation="Exam").first()
-        if default_report_license is None:
-            default_report_license = submitter.student.user.default_license
-
         get_pdf_report = session.get(attachment["url"])
 
-        # AssetUploadManager will populate most fields later
-        asset = SubmittedAsset(
-            timestamp=datetime.now(),
-            uploaded_id=user_id,
-            expiry=None,
-            target_name=attachment["filename"],
-            license=default_report_license,
-        )
-        db.session.add(asset)
-
-        object_store = current_app.config.get("OBJECT_STORAGE_ASSETS")
-        with AssetUploadManager(
-            asset,
-            data=get_pdf_report.content,
-            storage=object_store,
-            length=attachment["size"],
-            audit_data=f"canvas.pull_report (submission record #{rid})",
-            mimetype=attachment["content-type"],
-        ) as upload_mgr:
-            pass
-
-        adapter = AssetCloudAdapter(
-            asset,
-            object_store,
-            audit_data=f"canvas.pull_report (submission record #{rid})",
-        )
-
-        turnitin = extract_turnitin_data(data)
-        similarity_score = turnitin["similarity_score"]
-        web_overlap = turnitin["web_overlap"]
-        publication_overlap = turnitin["publication_overlap"]
-        student_overlap = turnitin["student_overlap"]
-        turnitin_outcome = turnitin["turnitin_outcome"]
-
-        try:
-            db.session.flush()
-            log_db_commit(
-                "Save downloaded Canvas submission asset to database",
-                user=user_id,
-                student=submitter.student if submitter is not None else None,
-                project_classes=config.project_class if config is not None else None,
-                endpoint=self.name,
-            )
-        except SQLAlchemyError as e:
-            db.session.rollback()
-            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
-            try:
-                adapter.delete()
-            except FileNotFoundError:
-                # silently ignore if cloud object cannot be found
-                pass
-            raise
-
-        dispatch_thumbnail_task(asset)
-
-        return {
-            "asset_id": asset.id,
-            "turnitin_outcome": turnitin_outcome,
-            "similarity_score": similarity_score,
-            "web_overlap": web_overlap,
-            "publication_overlap": publication_overlap,
-            "student_overlap": student_overlap,
-        }
+        return _store_report_attachment(record, attachment, get_pdf_report.content, data, user_id, endpoint=self.name)
 
     @celery.task(bind=True, default_retry_delay=30)
     def pull_report_finalize(self, data, rid, user_id) -> bool:
@@ -819,6 +975,133 @@ def register_canvas_tasks(celery):
         """
         return _finalize_report_attachment(data, rid, user_id, endpoint=self.name)
 
+    @celery.task(bind=True, default_retry_delay=30)
+    def pull_reports_batch(self, period_id, record_ids, user_id):
+        """
+        Pull reports for several SubmissionRecords in a single task, used by pull_all_reports_from_canvas.
+
+        The submission list for the assignment is read once (with concurrent page fetches) rather than once
+        per record, and attachments are downloaded concurrently with bounded parallelism. Each downloaded
+        attachment is stored and finalized exactly as pull_report and pull_report_finalize_batch would do.
+
+        Returns a list containing record.id for each successful pull and None for each failure, in the
+        format expected by pull_all_reports_summary. As for pull_report_error, the user is sent a message naming
+        the student for each record that could not be pulled.
+        """
+        main_config: MainConfig = get_main_config()
+        API_root = main_config.canvas_root_API
+
+        failed = [None] * len(record_ids)
+
+        if API_root is None:
+            print("** Canvas API integration is not enabled; skipping")
+            return failed
+
+        user = None
+
+        try:
+            period: SubmissionPeriodRecord = db.session.query(SubmissionPeriodRecord).filter_by(id=period_id).first()
+            records = db.session.query(SubmissionRecord).filter(SubmissionRecord.id.in_(record_ids)).all()
+
+            if user_id is not None:
+                user: User = db.session.query(User).filter_by(id=user_id).first()
+        except SQLAlchemyError as e:
+            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+            raise self.retry()
+
+        if period is None:
+            msg = "Could not load SubmissionPeriodRecord instance from database"
+            current_app.logger.error(msg)
+            raise Exception(msg)
+
+        def _report_failure(record: SubmissionRecord):
+            if user is not None:
+                _post_pull_report_error(user, record)
+            return None
+
+        if period.closed or not period.canvas_enabled:
+            print("** Submission period is closed, or Canvas integration is not enabled for this submission period")
+            for record in records:
+                _report_failure(record)
+            return failed
+
+        config: ProjectClassConfig = period.config
+
+        API_URL = build_api_url(
+            API_root,
+            "courses/{course_id}/assignments/{assign_id}/submissions".format(
+                course_id=period.canvas_module_id,
+                assign_id=period.canvas_assignment_id,
+            ),
+        )
+
+        results = [None] * (len(record_ids) - len(records))
+        downloads = []
+
+        # safe to assume config.canvas_login is not zero
+        with _canvas_sync_engine(config.canvas_login.canvas_API_token) as engine:
+            try:
+                submissions = engine.fetch_collection(API_URL).items
+            except CanvasAPIError as e:
+                print("** [{pcl}]: could not read submission list from Canvas API ({err})".format(pcl=config.name, err=e))
+                for record in records:
+                    _report_failure(record)
+                return failed
+
+            by_canvas_id = {sub["user_id"]: sub for sub in submissions}
+
+            for record in records:
+                record: SubmissionRecord
+                submitter: SubmittingStudent = record.owner
+
+                data = by_canvas_id.get(submitter.canvas_user_id) if submitter.canvas_user_id is not None else None
+                attachments = data.get("attachments", []) if data is not None else []
+
+                if (
+                    record.report is not None
+                    or data is None
+                    or data["workflow_state"] == "unsubmitted"
+                    or len(attachments) != 1
+                    or "url" not in attachments[0]
+                ):
+                    print(
+                        "** [Canvas, {pcl}]: Could not identify a unique attachment to pull for submitting student {name}".format(
+                            pcl=config.name, name=submitter.student.user.name
+                        )
+                    )
+                    results.append(_report_failure(record))
+                    continue
+
+                downloads.append(((record, data, attachments[0]), attachments[0]["url"]))
+
+            for (record, data, attachment), content, error in engine.iter_downloads(downloads):
+                name = record.owner.student.user.name
+
+                if error is not None:
+                    print(
+                        '** [Canvas, {pcl}]: Could not download attachment "{file}" for submitting student {name} ({err})'.format(
+                            pcl=config.name, file=attachment["id"], name=name, err=error
+                        )
+                    )
+                    results.append(_report_failure(record))
+                    continue
+
+                print(
+                    '** [Canvas, {pcl}]: Downloaded attachment "{file}" for submitting student {name}'.format(
+                        pcl=config.name, file=attachment["id"], name=name
+                    )
+                )
+
+                try:
+                    payload = _store_report_attachment(record, attachment, content, data, None, endpoint=self.name)
+                    results.append(_finalize_report_attachment(payload, record.id, None, endpoint=self.name))
+                except Exception as e:
+                    db.session.rollback()
+                    current_app.logger.exception("Could not store Canvas report for submitting student {name}".format(name=name), exc_info=e)
+                    results.append(_report_failure(record))
+
+        return results
+
     @celery.task(bind=True, default_retry_delay=30)
     def pull_report_error(self, rid, user_id):
         try:
@@ -838,11 +1121,7 @@ def register_canvas_tasks(celery):
             current_app.logger.error(msg)
             raise Exception(msg)
 
-        user.post_message(
-            "An error occurred when pulling the report for submitter {name} from Canvas".format(name=record.owner.student.user.name),
-            "danger",
-            autocommit=True,
-        )
+        _post_pull_report_error(user, record)
 
         raise RuntimeError("Errors occurred when pulling report from Canvas")
 
@@ -10,13 +10,17 @@
 
 from datetime import datetime, timedelta
 
-from celery import chain, group
+from celery import chain
 from flask import current_app
+from sqlalchemy import func, insert, literal, or_, select, true, update
 from sqlalchemy.exc import SQLAlchemyError
 
+from ..cache import cache
 from ..database import db
 from ..models import (
     BackupRecord,
+    Bookmark,
+    CustomOffer,
     EmailTemplate,
     EmailWorkflow,
     EmailWorkflowItem,
@@ -27,13 +31,16 @@ from ..models import (
     User,
 )
 from ..models.emails import encode_email_payload
+from ..models.live_projects import _SelectingStudent_is_valid
+from ..models.utilities import _MatchingAttempt_current_score, _MatchingAttempt_hint_status
+from ..shared.sqlalchemy import get_count
 from ..shared.workflow_logging import log_db_commit
 from ..task_queue import progress_update
 
 
 def register_close_selection_tasks(celery):
     @celery.task(bind=True)
-    def pclass_close(self, task_id, config_id, convenor_id, notify_convenor):
+    def pclass_close(self, task_id, config_id, convenor_id, notify_convenor, dry_run=False):
         progress_update(task_id, TaskRecord.RUNNING, 0, "Preparing to close...", autocommit=True)
 
         # get database records for this project class
@@ -65,8 +72,32 @@ def register_close_selection_tasks(celery):
 
         year = config.year
 
-        # build group of parallel tasks to perform maintenance on each SelectingStudent
-        selectors_group = group(selector_close.si(sel.id) for sel in config.selecting_students)
+        # in dry-run mode, report what closing would do without changing anything
+        if dry_run:
+            try:
+                counts = close_selectors_bulk(config, dry_run=True)
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+                raise self.retry()
+
+            convenor.post_message(
+                'Dry run for closing selections for "{proj}" {yra}-{yrb}: {msg}'.format(
+                    proj=config.name, yra=year, yrb=year + 1, msg=_format_close_counts(counts)
+                ),
+                "info",
+                autocommit=False,
+            )
+            counts.pop("selector_ids")
+
+            progress_update(task_id, TaskRecord.SUCCESS, 100, "Dry run complete", autocommit=False)
+            log_db_commit(
+                f"Posted close-selections dry run report for '{config.name}' to convenor",
+                user=convenor,
+                project_classes=config.project_class,
+                endpoint=self.name,
+            )
+            return counts
 
         # get backup task from Celery instance
         celery = current_app.extensions["celery"]
@@ -82,8 +113,8 @@ def register_close_selection_tasks(celery):
             ),
         )
 
-        if len(selectors_group) > 0:
-            seq = seq | selectors_group
+        if get_count(config.selecting_students) > 0:
+            seq = seq | close_selectors.si(task_id, config_id)
 
         seq = (seq | close_finalize.si(task_id, config_id, convenor_id, notify_convenor)).on_error(close_fail.si(task_id, convenor_id))
 
@@ -99,6 +130,55 @@ def register_close_selection_tasks(celery):
             autocommit=True,
         )
 
+    @celery.task(bind=True, default_retry_delay=30)
+    def close_selectors(self, task_id, config_id):
+        progress_update(
+            task_id,
+            TaskRecord.RUNNING,
+            50,
+            "Converting bookmarks and sanitizing selections...",
+            autocommit=True,
+        )
+
+        try:
+            config: ProjectClassConfig = db.session.query(ProjectClassConfig).filter_by(id=config_id).first()
+        except SQLAlchemyError as e:
+            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+            raise self.retry()
+
+        if config is None:
+            raise KeyError("Missing database record for ProjectClassConfig id={id}".format(id=config_id))
+
+        try:
+            counts = close_selectors_bulk(config)
+            log_db_commit(
+                f"Closed selections for '{config.name}': {_format_close_counts(counts)}",
+                user=None,
+                project_classes=config.project_class,
+                endpoint=self.name,
+            )
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+            raise self.retry()
+
+        # bulk statements bypass the ORM event handlers that normally invalidate these caches
+        cache.delete_memoized(_MatchingAttempt_current_score)
+        cache.delete_memoized(_MatchingAttempt_hint_status)
+        for sel_id in counts["selector_ids"]:
+            cache.delete_memoized(_SelectingStudent_is_valid, sel_id)
+
+        progress_update(
+            task_id,
+            TaskRecord.RUNNING,
+            80,
+            "Converted bookmarks for {n} selector{pl}".format(n=counts["converted"], pl="" if counts["converted"] == 1 else "s"),
+            autocommit=True,
+        )
+
+        counts.pop("selector_ids")
+        return counts
+
     @celery.task(bind=True)
     def close_finalize(self, task_id, config_id, convenor_id, notify_convenor):
         progress_update(
@@ -239,6 +319,151 @@ def register_close_selection_tasks(celery):
             convert_bookmarks(sel)
 
 
+def _format_close_counts(counts):
+    return (
+        "{conv} selector(s) with bookmarks converted to selections ({recs} selection record(s)), "
+        "{sub} selector(s) already submitted, {san} selection record(s) sanitized, "
+        "{none} selector(s) without a valid selection".format(
+            conv=counts["converted"],
+            recs=counts["records_created"],
+            sub=counts["submitted"],
+            san=counts["sanitized"],
+            none=counts["no_selection"],
+        )
+    )
+
+
+def close_selectors_bulk(config: ProjectClassConfig, dry_run: bool = False):
+    """
+    Set-based equivalent of running selector_close() for every SelectingStudent attached to *config*:
+      - existing selection records are sanitized with a single UPDATE
+      - for selectors without a submission, valid bookmark lists are converted into selection records with
+        one INSERT ... SELECT per distinct number of required choices
+
+    Only the bookmark-validity check is evaluated per selector, because it depends on the availability
+    rules in SelectingStudent.is_valid_selection; it issues reads only.
+
+    Statements are issued in the current transaction and the caller is responsible for committing.
+    If dry_run is set, nothing is written and only the counts are computed.
+    Returns a dict of counts, together with the ids of the selectors whose selection records changed.
+    """
+    selector_ids = select(SelectingStudent.id).where(SelectingStudent.config_id == config.id).scalar_subquery()
+    number_selectors = get_count(config.selecting_students)
+
+    # selectors with a submission: those with a list of selection records, or that have accepted at least one
+    # custom offer per submission period (see SelectingStudent.has_submitted)
+    with_selections = set(db.session.scalars(select(SelectionRecord.owner_id).where(SelectionRecord.owner_id.in_(selector_ids)).distinct()).all())
+
+    number_periods = get_count(config.project_class.periods)
+    accepted_offers = db.session.execute(
+        select(CustomOffer.selector_id, func.count(CustomOffer.id))
+        .where(CustomOffer.selector_id.in_(selector_ids), CustomOffer.status == CustomOffer.ACCEPTED)
+        .group_by(CustomOffer.selector_id)
+    ).all()
+    with_offers = {sel_id for sel_id, count in accepted_offers if count > 0 and count >= number_periods}
+
+    submitted = with_selections | with_offers
+
+    # STEP 1: sanitize existing selection records
+    needs_sanitizing = or_(
+        SelectionRecord.converted_from_bookmark.is_(None),
+        SelectionRecord.hint.is_(None),
+        SelectionRecord.hint != SelectionRecord.SELECTION_HINT_NEUTRAL,
+    )
+    sanitize_where = (SelectionRecord.owner_id.in_(selector_ids), needs_sanitizing)
+
+    sanitized_owners = set(db.session.scalars(select(SelectionRecord.owner_id).where(*sanitize_where).distinct()).all())
+    sanitized = db.session.scalar(select(func.count(SelectionRecord.id)).where(*sanitize_where))
+
+    if not dry_run and sanitized > 0:
+        db.session.execute(
+            update(SelectionRecord)
+            .where(*sanitize_where)
+            .values(
+                converted_from_bookmark=func.coalesce(SelectionRecord.converted_from_bookmark, False),
+                hint=SelectionRecord.SELECTION_HINT_NEUTRAL,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    # STEP 2: convert bookmarks for selectors who have not submitted, unless this is a 'submit to subscribe'
+    # type of project (tagged by 'selection_open_to_all'), in which case non-submitters are left as they are
+    to_convert = {}
+    if not config.selection_open_to_all:
+        # a selector needs at least as many bookmarks as the smaller of the two choice counts to have any chance
+        # of holding a valid selection, so the remainder can be excluded without loading them
+        choice_counts = [c for c in (config.initial_choices, config.switch_choices) if c is not None]
+        min_choices = min(choice_counts) if choice_counts else 0
+
+        bookmark_counts = db.session.execute(
+            select(Bookmark.owner_id, func.count(Bookmark.id))
+            .where(Bookmark.owner_id.in_(selector_ids))
+            .group_by(Bookmark.owner_id)
+            .having(func.count(Bookmark.id) >= min_choices)
+        ).all()
+        candidates = [sel_id for sel_id, _ in bookmark_counts if sel_id not in submitted]
+
+        if candidates:
+            sel: SelectingStudent
+            for sel in db.session.query(SelectingStudent).filter(SelectingStudent.id.in_(candidates)):
+                if sel.is_valid_selection[0]:
+                    to_convert.setdefault(sel.number_choices, []).append(sel.id)
+
+    converted_ids = [sel_id for ids in to_convert.values() for sel_id in ids]
+
+    records_created = 0
+    for number_choices, ids in to_convert.items():
+        # number the bookmarks for each selector in rank order, and keep the first number_choices of them,
+        # as SelectingStudent.ordered_bookmarks.limit(number_choices) would
+        ranked = (
+            select(
+                Bookmark.owner_id,
+                Bookmark.liveproject_id,
+                Bookmark.rank,
+                func.row_number().over(partition_by=Bookmark.owner_id, order_by=(Bookmark.rank, Bookmark.id)).label("position"),
+            )
+            .where(Bookmark.owner_id.in_(ids))
+            .subquery()
+        )
+
+        chosen = select(
+            ranked.c.owner_id,
+            ranked.c.liveproject_id,
+            ranked.c.rank,
+            true(),
+            literal(SelectionRecord.SELECTION_HINT_NEUTRAL),
+        ).where(ranked.c.position <= number_choices)
+
+        if dry_run:
+            records_created += db.session.scalar(select(func.count()).select_from(chosen.subquery()))
+        else:
+            result = db.session.execute(
+                insert(SelectionRecord.__table__).from_select(
+                    ["owner_id", "liveproject_id", "rank", "converted_from_bookmark", "hint"],
+                    chosen,
+                )
+            )
+            records_created += result.rowcount
+
+    if not dry_run and converted_ids:
+        db.session.execute(
+            update(SelectingStudent)
+            .where(SelectingStudent.id.in_(converted_ids))
+            .values(submission_time=datetime.now(), submission_IP=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    return {
+        "selectors": number_selectors,
+        "submitted": len(submitted),
+        "sanitized": sanitized,
+        "converted": len(converted_ids),
+        "records_created": records_created,
+        "no_selection": number_selectors - len(submitted) - len(converted_ids),
+        "selector_ids": sorted(sanitized_owners | set(converted_ids)),
+    }
+
+
 def convert_bookmarks(sel):
     for item in sel.ordered_bookmarks.limit(sel.number_choices):
         data = SelectionRecord(
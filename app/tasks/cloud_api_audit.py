@@ -9,7 +9,7 @@
 #
 
 import tarfile
-from datetime import datetime
+from datetime import datetime, timedelta
 from io import BytesIO
 from os import path
 from pathlib import Path
@@ -20,6 +20,7 @@ import pandas as pd
 from flask import current_app
 
 from ..shared.cloud_object_store.audit import AuditBackend
+from ..shared.cloud_object_store.audit_writer import BufferedAuditWriter, audit_writer_stats
 from ..shared.cloud_object_store.base import _audit_backends, ObjectStore
 from ..shared.scratch import ScratchFileManager
 
@@ -70,14 +71,27 @@ def register_cloud_api_audit_tasks(celery):
                 "audit_collection": current_app.config.get("OBJECT_STORAGE_AUDIT_BACKEND_COLLECTION"),
             }
 
-        # instantiate the backend
+        # instantiate the backend, wrapped in a writer attached to the same queue as the object stores, so that
+        # records still queued (in Redis, or in this process) are included in the export
         backend: AuditBackend = backend_type(elements, data)
 
+        flush_interval = float(current_app.config.get("OBJECT_STORAGE_AUDIT_FLUSH_INTERVAL", 5))
+        writer = BufferedAuditWriter(
+            backend,
+            flush_interval=flush_interval,
+            redis_url=current_app.config.get("OBJECT_STORAGE_AUDIT_QUEUE_URL"),
+        )
+
+        for stats in audit_writer_stats():
+            current_app.logger.info(f"send_api_events_to_telemetry: audit writer stats = {stats}")
+
         # get all audit records from the backend
         # what's supplied is a Pandas DataFrame containing the details
+        # records buffered in memory by other processes may reach the backend up to one flush interval after
+        # their timestamp, so leave a margin to avoid deleting records that have not yet been exported
         self.update_state("PROGRESS", meta={"msg": "Obtaining audit records from Cloud API backend"})
-        now = datetime.now()
-        records: pd.DataFrame = backend.get_audit_records(latest=now)
+        now = datetime.now() - timedelta(seconds=2 * flush_interval)
+        records: pd.DataFrame = writer.get_audit_records(latest=now)
         rows: int = records.shape[0]
         print(f"send_api_events_to_telemetry: obtained Pandas DataFrame containing {rows} records")
 
@@ -88,61 +102,66 @@ def register_cloud_api_audit_tasks(celery):
             )
             return True
 
-        yr = now.strftime("%Y")
-        mo = now.strftime("%m")
-        dy = now.strftime("%d")
-        time = now.strftime("%H_%M_%S")
-        csv_key = "Cloud_API_events_{yr}-{mo}-{dy}-{time}.csv".format(yr=yr, mo=mo, dy=dy, time=time)
-        tgz_key = "Cloud_API_events_{yr}-{mo}-{dy}-{time}.tar.gz".format(yr=yr, mo=mo, dy=dy, time=time)
-
-        with ScratchFileManager(suffix=".csv") as csv_scratch:
-            csv_path: Path = csv_scratch.path
-            records.to_csv(str(csv_path), index_label="rowid")
-
-            if not path.exists(csv_path) or not path.isfile(csv_path):
-                self.update_state(
-                    state="FAILURE",
-                    meta={"msg": "Extraction of Cloud API backend data to CSV file did not produce any usable output"},
-                )
-                raise self.retry()
-
-            self.update_state("PROGRESS", meta={"msg": "Compressing extracted CSV file"})
+        try:
+            yr = now.strftime("%Y")
+            mo = now.strftime("%m")
+            dy = now.strftime("%d")
+            time = now.strftime("%H_%M_%S")
+            csv_key = "Cloud_API_events_{yr}-{mo}-{dy}-{time}.csv".format(yr=yr, mo=mo, dy=dy, time=time)
+            tgz_key = "Cloud_API_events_{yr}-{mo}-{dy}-{time}.tar.gz".format(yr=yr, mo=mo, dy=dy, time=time)
 
-            with ScratchFileManager(suffix=".tar.gz") as archive_scratch:
-                archive_path: Path = archive_scratch.path
+            with ScratchFileManager(suffix=".csv") as csv_scratch:
+                csv_path: Path = csv_scratch.path
+                records.to_csv(str(csv_path), index_label="rowid")
 
-                with tarfile.open(name=archive_path, mode="w:gz", format=tarfile.PAX_FORMAT) as archive:
-                    archive.add(name=csv_path, arcname=csv_key)
-                    archive.close()
-
-                if not path.exists(archive_path) or not path.isfile(archive_path):
+                if not path.exists(csv_path) or not path.isfile(csv_path):
                     self.update_state(
                         state="FAILURE",
-                        meta={"msg": "Compression of extracted Cloud API backend data did not produce any usable output"},
+                        meta={"msg": "Extraction of Cloud API backend data to CSV file did not produce any usable output"},
                     )
                     raise self.retry()
 
-                self.update_state(
-                    "PROGRESS",
-                    meta={"msg": "Uploading compressed CSV to telemetry object store"},
-                )
-
-                with open(archive_path, "rb") as f:
-                    _ = object_store.put(
-                        tgz_key,
-                        audit_data="send_cloud_api_events_to_telemetry",
-                        data=BytesIO(f.read()),
-                        mimetype="application/gzip",
+                self.update_state("PROGRESS", meta={"msg": "Compressing extracted CSV file"})
+
+                with ScratchFileManager(suffix=".tar.gz") as archive_scratch:
+                    archive_path: Path = archive_scratch.path
+
+                    with tarfile.open(name=archive_path, mode="w:gz", format=tarfile.PAX_FORMAT) as archive:
+                        archive.add(name=csv_path, arcname=csv_key)
+                        archive.close()
+
+                    if not path.exists(archive_path) or not path.isfile(archive_path):
+                        self.update_state(
+                            state="FAILURE",
+                            meta={"msg": "Compression of extracted Cloud API backend data did not produce any usable output"},
+                        )
+                        raise self.retry()
+
+                    self.update_state(
+                        "PROGRESS",
+                        meta={"msg": "Uploading compressed CSV to telemetry object store"},
                     )
 
-        # delete current events from backend
+                    with open(archive_path, "rb") as f:
+                        _ = object_store.put(
+                            tgz_key,
+                            audit_data="send_cloud_api_events_to_telemetry",
+                            data=BytesIO(f.read()),
+                            mimetype="application/gzip",
+                        )
+        except BaseException:
+            # queued records claimed by get_audit_records() must be exported by a later run
+            writer.release_audit_records()
+            raise
+
+        # delete current events from backend, and acknowledge the queued records that were exported with them
         # we synchronize the events that are deleted using the same timestamp used to obtain records, so
         # none should get lost (in theory)
         self.update_state(
             "PROGRESS",
             meta={"msg": "Requesting backend to remove records sent to telemetry"},
         )
-        backend.delete_audit_records(latest=now)
+        writer.delete_audit_records(latest=now)
 
         self.update_state("SUCCESS", meta={"msg": "Completed successfully"})
         return True
@@ -23,10 +23,11 @@ Provider-agnostic: cloud storage operations go through CloudStorageLocation.from
 import os
 import re
 import string
-from io import BytesIO
+from pathlib import Path
 
 from flask import current_app
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import undefer
 
 from ..database import db
 from ..models import SubmissionPeriodRecord, SubmissionRecord, TaskRecord, User
@@ -36,6 +37,8 @@ from ..models.markingevent import (
 )
 from ..shared.asset_tools import AssetCloudAdapter
 from ..shared.cloud_storage import CloudStorageLocation
+from ..shared.excel import ExcelLink, StreamingWorkbook
+from ..shared.scratch import ScratchFileManager
 from ..task_queue import progress_update
 
 # ---------------------------------------------------------------------------
@@ -88,7 +91,9 @@ def _build_in_scope_records(period: SubmissionPeriodRecord) -> list:
 
     in_scope_ids = {rid for rid in all_record_ids if not dropped_everywhere.get(rid, False)}
 
-    records = db.session.query(SubmissionRecord).filter(SubmissionRecord.id.in_(in_scope_ids)).all()
+    records = (
+        db.session.query(SubmissionRecord).filter(SubmissionRecord.id.in_(in_scope_ids)).options(undefer(SubmissionRecord.language_analysis)).all()
+    )
 
     # Sort by exam number (None sorts last)
     def _exam_key(r):
@@ -111,9 +116,9 @@ _HEADER_FILL = "D0D0D0"
 _HEADER_FILL_DARK = "B0B0B0"
 
 
-def _build_excel(period: SubmissionPeriodRecord, records: list, cloud_url_map: dict) -> bytes:
+def _build_excel(period: SubmissionPeriodRecord, records: list, cloud_url_map: dict, path: Path) -> None:
     """
-    Build the anonymised marking summary workbook and return the raw bytes.
+    Build the anonymised marking summary workbook, streaming rows to the file at *path*.
 
     Columns:
       G1: Candidate number, cloud link
@@ -122,14 +127,6 @@ def _build_excel(period: SubmissionPeriodRecord, records: list, cloud_url_map: d
       G4: ConflationReport targets (one column per unique target name)
       G5+: Per-MarkingWorkflow groups
     """
-    import openpyxl
-    from openpyxl.styles import Alignment, Font, PatternFill
-    from openpyxl.utils import get_column_letter
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Marking summary"
-
     # ------------------------------------------------------------------
     # Pre-compute column layout
     # ------------------------------------------------------------------
@@ -232,144 +229,118 @@ def _build_excel(period: SubmissionPeriodRecord, records: list, cloud_url_map: d
     n_cols = len(columns)
 
     # ------------------------------------------------------------------
-    # Styles
+    # Styles: one format per colour group, created once and shared by every cell
     # ------------------------------------------------------------------
-    header_fill = PatternFill(fill_type="solid", fgColor=_HEADER_FILL)
-    first_col_fill = PatternFill(fill_type="solid", fgColor=_HEADER_FILL_DARK)
-    header_font = Font(bold=True)
-
-    group_fills = [PatternFill(fill_type="solid", fgColor=c) for c in _GROUP_COLOURS]
+    with StreamingWorkbook(path) as book:
+        header_format = book.format("header", bold=True, text_wrap=True, valign="vcenter", bg_color=f"#{_HEADER_FILL}")
+        first_col_header_format = book.format("first_col_header", bold=True, text_wrap=True, valign="vcenter", bg_color=f"#{_HEADER_FILL_DARK}")
+        first_col_format = book.format("first_col", bold=True, bg_color=f"#{_HEADER_FILL_DARK}")
+        group_formats = [book.format(f"group_{i}", bg_color=f"#{c}") for i, c in enumerate(_GROUP_COLOURS)]
 
-    def _get_group_fill(grp_idx: int):
-        if grp_idx < len(group_fills):
-            return group_fills[grp_idx % len(group_fills)]
-        return group_fills[(grp_idx - 4) % len(group_fills)]
+        def _get_group_format(grp_idx: int):
+            if grp_idx < len(group_formats):
+                return group_formats[grp_idx % len(group_formats)]
+            return group_formats[(grp_idx - 4) % len(group_formats)]
 
-    # ------------------------------------------------------------------
-    # Header row
-    # ------------------------------------------------------------------
-    for col_idx, (header, grp) in enumerate(columns, start=1):
-        cell = ws.cell(row=1, column=col_idx, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(wrap_text=True, vertical="center")
+        row_formats = [first_col_format] + [_get_group_format(grp) for _, grp in columns[1:]]
+        link_row_formats = [first_col_format, book.link_format] + row_formats[2:]
 
-    # Override first column header with darker fill
-    ws.cell(row=1, column=1).fill = first_col_fill
+        # ------------------------------------------------------------------
+        # Header row; freeze row 1 and column A
+        # ------------------------------------------------------------------
+        ws = book.add_sheet(
+            "Marking summary",
+            [header for header, _ in columns],
+            header_formats=[first_col_header_format] + [header_format] * (n_cols - 1),
+            freeze_panes=(1, 1),
+        )
 
-    # ------------------------------------------------------------------
-    # Data rows
-    # ------------------------------------------------------------------
-    for row_idx, record in enumerate(records, start=2):
-        # Collect values for this row
-        row_values = [None] * n_cols
+        # ------------------------------------------------------------------
+        # Data rows, written as they are built
+        # ------------------------------------------------------------------
+        for record in records:
+            # Collect values for this row
+            row_values = [None] * n_cols
 
-        # -- G1: Candidate
-        try:
-            exam_num = record.owner.student.exam_number
-        except Exception:
-            exam_num = None
-        row_values[0] = exam_num
-        row_values[1] = cloud_url_map.get(record.id)
+            # -- G1: Candidate
+            try:
+                exam_num = record.owner.student.exam_number
+            except Exception:
+                exam_num = None
+            row_values[0] = exam_num
+            row_values[1] = cloud_url_map.get(record.id)
 
-        # -- G2: Language stats
-        try:
-            la = record.language_analysis_data
-            metrics = la.get("metrics", {})
-            llm_result = la.get("llm_result", {})
-            row_values[2] = metrics.get("page_count")
-            stated_found = llm_result.get("stated_word_count_found", False)
-            row_values[3] = llm_result.get("stated_word_count") if stated_found else None
-        except Exception:
-            pass
+            # -- G2: Language stats
+            try:
+                la = record.language_analysis_data
+                metrics = la.get("metrics", {})
+                llm_result = la.get("llm_result", {})
+                row_values[2] = metrics.get("page_count")
+                stated_found = llm_result.get("stated_word_count_found", False)
+                row_values[3] = llm_result.get("stated_word_count") if stated_found else None
+            except Exception:
+                pass
 
-        # -- G3: Turnitin
-        try:
-            rf_data = record.risk_factors_data
-            t = rf_data.get(record.RISK_TURNITIN, {})
-            row_values[4] = record.turnitin_score
-            flagged = t.get("present", False)
-            row_values[5] = "Yes" if flagged else "No"
-            row_values[6] = ("Yes" if t.get("resolved", False) else "No") if flagged else None
-            row_values[7] = t.get("annotation")
-        except Exception:
-            pass
-
-        # -- G4: ConflationReport targets
-        for t_idx, tname in enumerate(all_target_names):
-            for ev in events:
-                cr = cr_lookup.get((ev.id, record.id))
-                if cr is not None:
-                    val = cr.conflation_report_as_dict.get(tname)
-                    if val is not None:
-                        row_values[g4_start + t_idx] = float(val)
-                        break
-
-        # -- G5+: Workflow columns
-        for wf in all_workflows:
-            col_offset = wf_col_start[wf.id]
-            key = wf.key or wf.name
-            sr = sr_lookup.get((wf.id, record.id))
-
-            n_markers = wf_max_markers[wf.id]
-            mrs = sorted(sr.marking_reports.all(), key=lambda m: m.id) if sr else []
-            for i in range(n_markers):
-                mr = mrs[i] if i < len(mrs) else None
-                row_values[col_offset + i] = float(mr.grade) if mr and mr.grade is not None else None
-            col_offset += n_markers
-
-            if wf.scheme and wf.scheme.uses_tolerance:
-                grades = [float(mr.grade) for mr in mrs if mr.grade is not None]
-                if len(grades) >= 2:
-                    diff = max(grades) - min(grades)
-                    tolerance = float(wf.scheme.marker_tolerance) if wf.scheme.marker_tolerance else 0
-                    row_values[col_offset] = round(diff, 2)
-                    row_values[col_offset + 1] = "Yes" if diff > tolerance else "No"
-                else:
-                    row_values[col_offset] = None
-                    row_values[col_offset + 1] = None
-                col_offset += 2
-
-            n_mods = wf_max_moderators[wf.id]
-            mods = sorted(sr.moderator_reports.all(), key=lambda m: m.id) if sr else []
-            for i in range(n_mods):
-                mod = mods[i] if i < len(mods) else None
-                row_values[col_offset + i * 2] = float(mod.grade) if mod and mod.grade is not None else None
-                row_values[col_offset + i * 2 + 1] = mod.report if mod else None
-
-        # Write all values and apply formatting
-        for col_idx, val in enumerate(row_values, start=1):
-            cell = ws.cell(row=row_idx, column=col_idx, value=val)
-            _, grp = columns[col_idx - 1]
-            if col_idx == 1:
-                cell.fill = first_col_fill
-                cell.font = header_font
-            else:
-                cell.fill = _get_group_fill(grp)
+            # -- G3: Turnitin
+            try:
+                rf_data = record.risk_factors_data
+                t = rf_data.get(record.RISK_TURNITIN, {})
+                row_values[4] = record.turnitin_score
+                flagged = t.get("present", False)
+                row_values[5] = "Yes" if flagged else "No"
+                row_values[6] = ("Yes" if t.get("resolved", False) else "No") if flagged else None
+                row_values[7] = t.get("annotation")
+            except Exception:
+                pass
+
+            # -- G4: ConflationReport targets
+            for t_idx, tname in enumerate(all_target_names):
+                for ev in events:
+                    cr = cr_lookup.get((ev.id, record.id))
+                    if cr is not None:
+                        val = cr.conflation_report_as_dict.get(tname)
+                        if val is not None:
+                            row_values[g4_start + t_idx] = float(val)
+                            break
+
+            # -- G5+: Workflow columns
+            for wf in all_workflows:
+                col_offset = wf_col_start[wf.id]
+                key = wf.key or wf.name
+                sr = sr_lookup.get((wf.id, record.id))
+
+                n_markers = wf_max_markers[wf.id]
+                mrs = sorted(sr.marking_reports.all(), key=lambda m: m.id) if sr else []
+                for i in range(n_markers):
+                    mr = mrs[i] if i < len(mrs) else None
+                    row_values[col_offset + i] = float(mr.grade) if mr and mr.grade is not None else None
+                col_offset += n_markers
+
+                if wf.scheme and wf.scheme.uses_tolerance:
+                    grades = [float(mr.grade) for mr in mrs if mr.grade is not None]
+                    if len(grades) >= 2:
+                        diff = max(grades) - min(grades)
+                        tolerance = float(wf.scheme.marker_tolerance) if wf.scheme.marker_tolerance else 0
+                        row_values[col_offset] = round(diff, 2)
+                        row_values[col_offset + 1] = "Yes" if diff > tolerance else "No"
+                    else:
+                        row_values[col_offset] = None
+                        row_values[col_offset + 1] = None
+                    col_offset += 2
+
+                n_mods = wf_max_moderators[wf.id]
+                mods = sorted(sr.moderator_reports.all(), key=lambda m: m.id) if sr else []
+                for i in range(n_mods):
+                    mod = mods[i] if i < len(mods) else None
+                    row_values[col_offset + i * 2] = float(mod.grade) if mod and mod.grade is not None else None
+                    row_values[col_offset + i * 2 + 1] = mod.report if mod else None
 
             # Make cloud link a hyperlink
-            if col_idx == 2 and val:
-                cell.hyperlink = val
-                cell.style = "Hyperlink"
-
-    # ------------------------------------------------------------------
-    # Freeze row 1 and column A
-    # ------------------------------------------------------------------
-    ws.freeze_panes = "B2"
-
-    # Auto-size columns (approximate)
-    for col_idx in range(1, n_cols + 1):
-        col_letter = get_column_letter(col_idx)
-        max_len = len(str(columns[col_idx - 1][0]))
-        for row_idx in range(2, len(records) + 2):
-            cell_val = ws.cell(row=row_idx, column=col_idx).value
-            if cell_val is not None:
-                max_len = max(max_len, len(str(cell_val)))
-        ws.column_dimensions[col_letter].width = min(max(max_len + 2, 8), 50)
-
-    buf = BytesIO()
-    wb.save(buf)
-    return buf.getvalue()
+            if row_values[1]:
+                row_values[1] = ExcelLink(row_values[1])
+                ws.append(row_values, link_row_formats)
+            else:
+                ws.append(row_values, row_formats)
 
 
 # ---------------------------------------------------------------------------
@@ -549,12 +520,14 @@ def register_cloud_export_period_marking_tasks(celery):
         # ------------------------------------------------------------------
         progress_update(task_id, TaskRecord.RUNNING, 65, "Building marking summary spreadsheet...", autocommit=True)
 
-        try:
-            xlsx_bytes = _build_excel(period, records, cloud_url_map)
-        except Exception as exc:
-            current_app.logger.exception("Error building Excel workbook in export_period_marking", exc_info=exc)
-            progress_update(task_id, TaskRecord.FAILURE, 100, "Error building marking summary spreadsheet.", autocommit=True)
-            return
+        with ScratchFileManager(suffix=".xlsx") as mgr:
+            try:
+                _build_excel(period, records, cloud_url_map, mgr.path)
+                xlsx_bytes = mgr.path.read_bytes()
+            except Exception as exc:
+                current_app.logger.exception("Error building Excel workbook in export_period_marking", exc_info=exc)
+                progress_update(task_id, TaskRecord.FAILURE, 100, "Error building marking summary spreadsheet.", autocommit=True)
+                return
 
         # ------------------------------------------------------------------
         # Upload Excel workbook
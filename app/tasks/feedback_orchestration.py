@@ -25,10 +25,16 @@ Architecture mirrors LLMOrchestrationJob / llm_orchestration.py exactly:
     a. Loads every PENDING/RUNNING job from the DB.
     b. Computes the number of currently in-flight records by summing the
        length of each job's inflight Redis list (feedback_inflight:{uuid}).
-    c. Fills available slots (up to PDF_BATCH_SIZE, default 5) by round-robin
-       across active job queues, using RPOPLPUSH to atomically move each
-       ConflationReport ID from the pending queue to the inflight list.
-    d. Dispatches a PDF generation chain for each record.
+    c. Fills available slots by round-robin across active job queues, using
+       RPOPLPUSH to atomically move each ConflationReport ID from the pending
+       queue to the inflight list.  Up to PDF_RECORDS_PER_TASK (default 10)
+       records are taken from a job at a time, and at most PDF_BATCH_SIZE
+       (default 5) such batches are in flight at once.
+    d. Dispatches a PDF generation chain for each batch.  The chain runs
+       generate_feedback_reports_batch, which downloads the recipe assets and
+       compiles the template once and renders every record in the batch with
+       the worker's warm PDFRenderer, so that font loading and stylesheet
+       parsing are not repeated for each student.
 
   Crash safety and recovery follow the same pattern as llm_orchestration:
   inflight IDs are moved back to the pending queue on worker restart by the
@@ -73,6 +79,7 @@ from .shared.utils import report_info
 # ---------------------------------------------------------------------------
 
 PDF_BATCH_SIZE_DEFAULT = 5
+PDF_RECORDS_PER_TASK_DEFAULT = 10
 
 # Distributed lock acquired by _recover_active_jobs() so that only one worker
 # runs recovery at startup even when multiple workers start simultaneously.
@@ -148,6 +155,52 @@ def _dispatch_pdf_chain(
     work.apply_async()
 
 
+def _dispatch_pdf_batch_chain(
+    celery,
+    job_uuid: str,
+    cr_ids: List[int],
+    recipe_id: int,
+    convenor_id: Optional[int],
+) -> None:
+    """Build and dispatch a PDF generation chain that renders every record in *cr_ids* in one task."""
+    t_generate = celery.tasks["app.tasks.marking.generate_feedback_reports_batch"]
+    t_done = celery.tasks["app.tasks.feedback_orchestration.feedback_records_done"]
+    t_err = celery.tasks["app.tasks.feedback_orchestration.feedback_records_error"]
+
+    # t_done receives the result of t_generate as its first argument, so it can distinguish failed records
+    work = chain(
+        t_generate.si(cr_ids, recipe_id, convenor_id).set(queue="llm_tasks"),
+        t_done.s(job_uuid, cr_ids).set(queue="default"),
+    ).on_error(t_err.si(job_uuid, cr_ids).set(queue="default"))
+
+    work.apply_async()
+
+
+def _finish_job_if_complete(job: FeedbackOrchestrationJob) -> None:
+    """
+    Mark *job* complete and notify the convenor if every record has been accounted for, and advance the
+    MarkingEvent to READY_TO_PUSH_FEEDBACK if every ConflationReport now has a feedback PDF.
+    Does not commit.
+    """
+    # Use >= (not ==) to correctly handle the double-processing race.
+    if (job.completed_count + job.failed_count) < job.total_count or job.status != FeedbackOrchestrationJob.STATUS_RUNNING:
+        return
+
+    job.mark_complete()
+    convenor: Optional[User] = job.convenor
+    total = job.completed_count + job.failed_count
+    failed = job.failed_count
+    event_name = job.event.name if job.event else "unknown event"
+    recipe_label = job.recipe.label if job.recipe else "unknown recipe"
+    _notify_completion(event_name, recipe_label, total, failed, convenor)
+
+    event: Optional[MarkingEvent] = job.event
+    if event is not None and event.workflow_state == MarkingEventWorkflowStates.READY_TO_GENERATE_FEEDBACK:
+        crs = event.conflation_reports.all()
+        if crs and all(cr.feedback_reports.count() > 0 for cr in crs):
+            event.workflow_state = MarkingEventWorkflowStates.READY_TO_PUSH_FEEDBACK
+
+
 def _notify_completion(
     event_name: str,
     recipe_label: str,
@@ -432,6 +485,96 @@ def register_feedback_orchestration_tasks(celery):
 
         _dispatch_global_coordinator()
 
+    # ------------------------------------------------------------------
+    # feedback_records_done
+    # ------------------------------------------------------------------
+
+    @celery.task(bind=True, default_retry_delay=10)
+    def feedback_records_done(self, result, job_uuid: str, cr_ids: List[int]):
+        """
+        Success callback for a batch PDF generation chain.  *result* is the return value of
+        generate_feedback_reports_batch; records listed in result["failed"] are counted as failures
+        and the remainder as completed.  Removes every record in the batch from the inflight list
+        and triggers the global coordinator.
+        """
+        failed_ids = set((result or {}).get("failed", []))
+
+        try:
+            r = _get_orchestration_redis()
+            pipe = r.pipeline(transaction=False)
+            for cr_id in cr_ids:
+                pipe.lrem(f"feedback_inflight:{job_uuid}", 0, str(cr_id).encode())
+            pipe.execute()
+        except Exception as exc:
+            current_app.logger.warning(f"feedback_orchestration.feedback_records_done: Redis LREM failed for job {job_uuid}: {exc}")
+
+        try:
+            job: FeedbackOrchestrationJob = db.session.query(FeedbackOrchestrationJob).filter_by(uuid=job_uuid).first()
+            if job is not None:
+                for cr_id in cr_ids:
+                    if cr_id in failed_ids:
+                        job.increment_failed()
+                    else:
+                        job.increment_completed()
+                _finish_job_if_complete(job)
+                db.session.commit()
+        except SQLAlchemyError as exc:
+            db.session.rollback()
+            current_app.logger.exception(
+                f"feedback_orchestration.feedback_records_done: SQLAlchemyError for job {job_uuid}",
+                exc_info=exc,
+            )
+
+        _dispatch_global_coordinator()
+
+    # ------------------------------------------------------------------
+    # feedback_records_error
+    # ------------------------------------------------------------------
+
+    @celery.task(bind=True, default_retry_delay=10)
+    def feedback_records_error(self, job_uuid: str, cr_ids: List[int]):
+        """
+        Error callback for a batch PDF generation chain that raised an unhandled exception.
+        Records processed before the exception already have a feedback PDF and are counted as completed;
+        the others are counted as failed and flagged so that the inspector can surface them.
+        """
+        try:
+            r = _get_orchestration_redis()
+            pipe = r.pipeline(transaction=False)
+            for cr_id in cr_ids:
+                pipe.lrem(f"feedback_inflight:{job_uuid}", 0, str(cr_id).encode())
+            pipe.execute()
+        except Exception as exc:
+            current_app.logger.warning(f"feedback_orchestration.feedback_records_error: Redis LREM failed for job {job_uuid}: {exc}")
+
+        try:
+            crs: List[ConflationReport] = db.session.query(ConflationReport).filter(ConflationReport.id.in_(cr_ids)).all()
+            generated_ids = {cr.id for cr in crs if cr.feedback_reports.count() > 0}
+
+            # mark the ConflationReports that did not receive a PDF as failed
+            for cr in crs:
+                if cr.id not in generated_ids:
+                    cr.feedback_generation_failed = True
+                    cr.feedback_celery_id = None
+
+            job: FeedbackOrchestrationJob = db.session.query(FeedbackOrchestrationJob).filter_by(uuid=job_uuid).first()
+            if job is not None:
+                for cr_id in cr_ids:
+                    if cr_id in generated_ids:
+                        job.increment_completed()
+                    else:
+                        job.increment_failed()
+                _finish_job_if_complete(job)
+            db.session.commit()
+        except SQLAlchemyError as exc:
+            db.session.rollback()
+            current_app.logger.exception(
+                f"feedback_orchestration.feedback_records_error: SQLAlchemyError for job {job_uuid}",
+                exc_info=exc,
+            )
+
+        _dispatch_global_coordinator()
+
     # ------------------------------------------------------------------
     # global_feedback_orchestration_step
     # ------------------------------------------------------------------
@@ -439,9 +582,9 @@ def register_feedback_orchestration_tasks(celery):
     @celery.task(bind=True, default_retry_delay=30)
     def global_feedback_orchestration_step(self):
         """
-        Global coordinator: fill up to PDF_BATCH_SIZE slots by popping
-        ConflationReport IDs from all active FeedbackOrchestrationJob queues
-        (round-robin).
+        Global coordinator: fill up to PDF_BATCH_SIZE task slots by popping
+        batches of up to PDF_RECORDS_PER_TASK ConflationReport IDs from all
+        active FeedbackOrchestrationJob queues (round-robin).
         """
         # Clear the coordinator-queued flag so that _dispatch_global_coordinator()
         # can queue the next coordinator as soon as this one starts executing.
@@ -452,6 +595,7 @@ def register_feedback_orchestration_tasks(celery):
             pass
 
         batch_size: int = current_app.config.get("PDF_BATCH_SIZE", PDF_BATCH_SIZE_DEFAULT)
+        records_per_task: int = max(1, current_app.config.get("PDF_RECORDS_PER_TASK", PDF_RECORDS_PER_TASK_DEFAULT))
 
         # ------- load active jobs -------
         try:
@@ -537,7 +681,8 @@ def register_feedback_orchestration_tasks(celery):
             )
             raise self.retry()
 
-        available_slots = max(0, batch_size - inflight)
+        # inflight counts records, so each of the PDF_BATCH_SIZE task slots accounts for up to records_per_task of them
+        available_slots = max(0, batch_size * records_per_task - inflight)
         if available_slots == 0:
             return
 
@@ -552,53 +697,57 @@ def register_feedback_orchestration_tasks(celery):
             job_idx += 1
             attempts += 1
 
-            try:
-                cr_id_bytes = r.rpoplpush(job.redis_queue_key, job.redis_inflight_key)
-            except Exception as exc:
-                current_app.logger.exception(
-                    f"feedback_orchestration.global_feedback_orchestration_step: Redis RPOPLPUSH error for job {job.uuid}",
-                    exc_info=exc,
-                )
-                continue
-
-            if cr_id_bytes is None:
-                continue
-
-            cr_id = int(cr_id_bytes)
-
-            try:
-                cr: ConflationReport = db.session.query(ConflationReport).filter_by(id=cr_id).first()
-            except SQLAlchemyError as exc:
-                current_app.logger.exception(
-                    f"feedback_orchestration.global_feedback_orchestration_step: SQLAlchemyError loading ConflationReport #{cr_id}",
-                    exc_info=exc,
-                )
-                r.lrem(job.redis_inflight_key, 0, cr_id_bytes)
+            # pop a batch of records from this job's queue
+            batch: List[int] = []
+            while len(batch) < records_per_task and dispatched < available_slots:
                 try:
-                    job.increment_failed()
-                    db.session.commit()
-                except Exception:
-                    db.session.rollback()
+                    cr_id_bytes = r.rpoplpush(job.redis_queue_key, job.redis_inflight_key)
+                except Exception as exc:
+                    current_app.logger.exception(
+                        f"feedback_orchestration.global_feedback_orchestration_step: Redis RPOPLPUSH error for job {job.uuid}",
+                        exc_info=exc,
+                    )
+                    break
+
+                if cr_id_bytes is None:
+                    break
+
+                cr_id = int(cr_id_bytes)
                 dispatched += 1
-                continue
 
-            if cr is None:
-                current_app.logger.warning(
-                    f"feedback_orchestration.global_feedback_orchestration_step: skipping ConflationReport #{cr_id} (not found)"
-                )
-                r.lrem(job.redis_inflight_key, 0, cr_id_bytes)
                 try:
-                    job.increment_failed()
-                    if (job.completed_count + job.failed_count) >= job.total_count and job.status == FeedbackOrchestrationJob.STATUS_RUNNING:
-                        job.mark_complete()
-                    db.session.commit()
-                except Exception:
-                    db.session.rollback()
-                dispatched += 1
-                continue
-
-            _dispatch_pdf_chain(celery, job.uuid, cr_id, job.recipe_id, job.convenor_id)
-            dispatched += 1
+                    cr_exists = db.session.query(ConflationReport.id).filter_by(id=cr_id).first() is not None
+                except SQLAlchemyError as exc:
+                    current_app.logger.exception(
+                        f"feedback_orchestration.global_feedback_orchestration_step: SQLAlchemyError loading ConflationReport #{cr_id}",
+                        exc_info=exc,
+                    )
+                    r.lrem(job.redis_inflight_key, 0, cr_id_bytes)
+                    try:
+                        job.increment_failed()
+                        db.session.commit()
+                    except Exception:
+                        db.session.rollback()
+                    continue
+
+                if not cr_exists:
+                    current_app.logger.warning(
+                        f"feedback_orchestration.global_feedback_orchestration_step: skipping ConflationReport #{cr_id} (not found)"
+                    )
+                    r.lrem(job.redis_inflight_key, 0, cr_id_bytes)
+                    try:
+                        job.increment_failed()
+                        if (job.completed_count + job.failed_count) >= job.total_count and job.status == FeedbackOrchestrationJob.STATUS_RUNNING:
+                            job.mark_complete()
+                        db.session.commit()
+                    except Exception:
+                        db.session.rollback()
+                    continue
+
+                batch.append(cr_id)
+
+            if batch:
+                _dispatch_pdf_batch_chain(celery, job.uuid, batch, job.recipe_id, job.convenor_id)
 
     # ------------------------------------------------------------------
     # feedback_watchdog
@@ -628,5 +777,7 @@ def register_feedback_orchestration_tasks(celery):
         global_feedback_orchestration_step,
         feedback_record_done,
         feedback_record_error,
+        feedback_records_done,
+        feedback_records_error,
         feedback_watchdog,
     )
@@ -33,7 +33,7 @@ from ..models import (
     User,
 )
 from ..models.emails import encode_email_payload
-from ..shared.convenor import add_liveproject
+from ..shared.convenor import add_liveproject, bulk_add_liveprojects
 from ..shared.workflow_logging import log_db_commit
 from ..task_queue import progress_update
 
@@ -227,8 +227,9 @@ def register_golive_tasks(celery):
             self.update_state("FAILURE", meta={"msg": "No attached projects"})
             return golive_fail.apply_async(args=(task_id, convenor_id))
 
-        # build group of parallel tasks to take each offerable attached project to a live counterpart
-        projects_group = group(project_golive.si(n + 1, p.id, config_id) for n, p in enumerate(attached_projects))
+        # take every offerable attached project to a live counterpart in a single transaction;
+        # projects are numbered in the order of the query above
+        numbered_projects = [(n + 1, p.id) for n, p in enumerate(attached_projects)]
 
         # get backup task from Celery instance
         celery = current_app.extensions["celery"]
@@ -243,7 +244,7 @@ def register_golive_tasks(celery):
                 description="Rollback snapshot for {proj} Go Live {yr}".format(proj=config.name, yr=year),
             ),
             golive_preprojects.si(task_id),
-            projects_group,
+            golive_projects.si(task_id, config_id, numbered_projects),
         )
 
         # if this is a go-live-then-close job, don't bother sending email notifications;
@@ -772,6 +773,49 @@ def register_golive_tasks(celery):
             current_app.logger.exception("KeyError exception", exc_info=e)
             raise
 
+    @celery.task(bind=True, default_retry_delay=30)
+    def golive_projects(self, task_id, config_id, numbered_projects):
+        try:
+            config: ProjectClassConfig = ProjectClassConfig.query.filter_by(id=config_id).first()
+        except SQLAlchemyError as e:
+            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+            raise self.retry()
+
+        if config is None:
+            raise KeyError("Missing database record for ProjectClassConfig id={id}".format(id=config_id))
+
+        # arguments arrive as lists after JSON serialization
+        numbered_projects = [(int(number), int(pid)) for number, pid in numbered_projects]
+
+        try:
+            created = bulk_add_liveprojects(numbered_projects, config)
+            log_db_commit(
+                f"Created {created} LiveProject records for {config.name} Go Live",
+                project_classes=config.project_class,
+                endpoint=self.name,
+            )
+
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+            raise self.retry()
+
+        except KeyError as e:
+            db.session.rollback()
+            current_app.logger.exception("KeyError exception", exc_info=e)
+            raise
+
+        skipped = len(numbered_projects) - created
+        progress_update(
+            task_id,
+            TaskRecord.RUNNING,
+            50,
+            f"Moved {created} attached projects onto the live system" + (f" ({skipped} already live)" if skipped > 0 else "") + "...",
+            autocommit=True,
+        )
+
+        return created
+
     @celery.task(bind=True, default_retry_delay=30)
     def golive_close(self, config_id, convenor_id):
         try:
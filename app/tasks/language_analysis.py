@@ -12,25 +12,31 @@ import hashlib
 import re
 import time
 import unicodedata
+from datetime import datetime
+from typing import Callable
 
 import numpy as np
 from celery import chord, states
 from celery import group as cgroup
 from flask import current_app
+from sqlalchemy import bindparam
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import selectinload, undefer
 
 from ..database import db
 from ..models import (
     ProjectClass,
     ProjectClassConfig,
+    SubmissionLanguageMetrics,
     SubmissionPeriodRecord,
     SubmissionRecord,
     TaskRecord,
     Tenant,
 )
-from ..shared.ai_calibration import mahalanobis_distance
+from ..shared import fast_json
+from ..shared.ai_calibration import mahalanobis_distance, mahalanobis_distances
 from ..shared.asset_tools import AssetCloudAdapter
-from ..shared.llm_services import _TOKENS_PER_WORD, _call_llm, _truncate_text
+from ..shared.llm_services import _TOKENS_PER_WORD, ContextOverflowError, _call_llm, _truncate_text
 
 # Tokens-per-word estimate for student submission content.  Technical/academic text with
 # equations, DOIs, code snippets, and jargon.  Empirical calibration (comparing Ollama-reported
@@ -50,7 +56,9 @@ from ..shared.llm_thresholds import (
     classify_mtld,
     classify_sentence_cv,
 )
-from ..shared.scraped_text_store import get_scraped_text, store_scraped_text
+from ..shared.pdf_text_extraction import DEFAULT_PAGES_PER_RANGE, EXTRACTOR_VERSION, extract_pdf_text, file_content_hash
+from ..shared.scraped_text_store import get_scraped_text, get_scraped_text_by_hash, store_scraped_text
+from ..shared.token_budget import learned_token_ratios, map_response_reservation, record_map_completion
 from ..shared.text_utils import (
     _APPENDIX_HEADING,
     _looks_like_code,
@@ -228,26 +236,13 @@ def _extract_pdf_text(path: str) -> tuple[str, int]:
 
     Returns (raw_text, page_count).  Header and footer regions (top/bottom 8%
     of each page) are skipped to reduce noise from running headers and page
-    numbers.
+    numbers.  Documents longer than PDF_EXTRACTION_PAGES_PER_RANGE pages are
+    split into page ranges that are extracted by up to PDF_EXTRACTION_WORKERS
+    worker processes; see app/shared/pdf_text_extraction.py.
     """
-    import fitz
-
-    doc = fitz.open(path)
-    pages = []
-    for page in doc:
-        page_height = page.rect.height
-        blocks = page.get_text("blocks")  # (x0, y0, x1, y1, text, block_no, block_type)
-        body_blocks = [
-            b[4]
-            for b in blocks
-            if b[1] > page_height * 0.08  # skip top 8 % (header / running title)
-            and b[3] < page_height * 0.92  # skip bottom 8 % (footer / page number)
-            and b[6] == 0  # block_type 0 = text (not image)
-        ]
-        pages.append("\n".join(body_blocks))
-    page_count = len(doc)
-    doc.close()
-    return "\n\n".join(pages), page_count
+    workers = int(current_app.config.get("PDF_EXTRACTION_WORKERS", 4))
+    pages_per_range = int(current_app.config.get("PDF_EXTRACTION_PAGES_PER_RANGE", DEFAULT_PAGES_PER_RANGE))
+    return extract_pdf_text(path, workers=workers, pages_per_range=pages_per_range)
 
 
 def _extract_docx_text(path: str) -> tuple[str, int]:
@@ -275,6 +270,41 @@ def _extract_docx_text(path: str) -> tuple[str, int]:
         return "", 0
 
 
+def _extract_document_text(path: str, mimetype: str, record_id: int) -> tuple[str, int, str | None]:
+    """
+    Extract NFKC-normalized text from the downloaded report at *path*.
+
+    The file is first hashed, and if the scraped-text cache already holds text
+    for an asset with identical content (an unchanged resubmission, or the same
+    file attached to another record), that text is reused without extraction.
+
+    Returns (raw_text, page_count, content_hash).  content_hash is None if the
+    text should not be shared with other assets, i.e. extraction produced no text.
+    Extraction errors are propagated to the caller.
+
+    Text cached by content hash is tagged with EXTRACTOR_VERSION, which should be
+    incremented if either the PDF or the DOCX extraction changes its output.
+    """
+    content_hash = file_content_hash(path)
+
+    shared = get_scraped_text_by_hash(content_hash, EXTRACTOR_VERSION)
+    if shared is not None and shared.get("scraped_text"):
+        current_app.logger.info(f"language_analysis: record #{record_id} — reusing scraped text for identical content (sha256={content_hash[:12]})")
+        return shared["scraped_text"], shared.get("page_count", 0), content_hash
+
+    if "pdf" in mimetype or path.lower().endswith(".pdf"):
+        raw_text, page_count = _extract_pdf_text(path)
+    elif "word" in mimetype or "officedocument" in mimetype or path.lower().endswith((".docx", ".doc")):
+        raw_text, page_count = _extract_docx_text(path)
+    else:
+        # Fall back to PDF extraction and log a warning
+        current_app.logger.warning(f"language_analysis: unknown mimetype '{mimetype}' for record #{record_id}; attempting PDF extraction")
+        raw_text, page_count = _extract_pdf_text(path)
+
+    raw_text = unicodedata.normalize("NFKC", raw_text)
+    return raw_text, page_count, (content_hash if raw_text else None)
+
+
 # ---------------------------------------------------------------------------
 # Statistical analysis helpers.
 # ---------------------------------------------------------------------------
@@ -557,6 +587,167 @@ def _count_patterns(text: str) -> dict:
     }
 
 
+def _compute_text_statistics(raw_text: str, errors: list) -> tuple[dict, dict, dict, dict]:
+    """
+    Compute the statistical language metrics for the scraped text of a report.
+
+    Errors in individual computation steps are appended to *errors* and the
+    affected metrics are set to None; the computation does not abort.
+
+    Returns (metrics, references_info, patterns_info, timings).
+    """
+    metrics: dict = {}
+    references_info: dict = {}
+    patterns_info: dict = {}
+
+    # --- split into core, references, and appendices ---------------------
+    # _split_document() implements the priority-ordered 3-way split:
+    #   _core       — main body text (no references, no appendices)
+    #   _references — bibliography / reference list
+    #   _appendices — appendix sections (may be empty)
+    _core, _references, _appendices = _split_document(raw_text)
+
+    # Strip math-extraction noise from the core body text.  Appendix text
+    # is also stripped separately for appendix word counting.
+    # See _strip_math_lines() for full rationale and threshold choice.
+    clean_core_text = _strip_math_lines(_core)
+
+    # Content text for figure/table detection: core + appendices (not refs).
+    _content_text = _core + ("\n\n" + _appendices if _appendices else "")
+
+    # Stripped content text for lexical diversity and sentence-structure metrics.
+    # Appendices are included because they are the student's own writing, consistent
+    # with the text submitted to the LLM.  Word count stays core-only (see above).
+    clean_content_text = _strip_math_lines(_content_text)
+
+    _t_counting = time.monotonic()
+
+    # --- word count (core body only — appendices excluded) ---------------
+    try:
+        wc = _word_count(clean_core_text)
+        metrics["word_count"] = wc
+        # Appendix word count stored separately so the UI can surface both.
+        if _appendices:
+            appendix_wc = _word_count(_strip_math_lines(_appendices))
+            if appendix_wc > 0:
+                metrics["appendix_word_count"] = appendix_wc
+    except Exception as exc:
+        errors.append({"stage": "word_count", "type": type(exc).__name__, "message": str(exc)})
+        metrics["word_count"] = None
+
+    # --- bibliography count and citation check ----------------------------
+    try:
+        ref_count, ref_keys = _count_bibliography(_references)
+        metrics["reference_count"] = ref_count
+
+        uncited = _check_uncited(_core, ref_keys)
+        references_info["uncited"] = uncited
+    except Exception as exc:
+        errors.append({"stage": "references", "type": type(exc).__name__, "message": str(exc)})
+        metrics["reference_count"] = None
+        references_info["uncited"] = []
+
+    # --- figure and table cross-reference check --------------------------
+    try:
+        uncaptioned_figs, uncaptioned_tabs = _check_figure_table_refs(_content_text)
+        # Count distinct canonical labels (e.g. "3.1", "A.1") in core + appendices.
+        fig_labels = {m.group(1) for m in _FIG_REF.finditer(_content_text)}
+        tab_labels = {m.group(1) for m in _TAB_REF.finditer(_content_text)}
+        metrics["figure_count"] = len(fig_labels)
+        metrics["table_count"] = len(tab_labels)
+        references_info["uncaptioned_figures"] = uncaptioned_figs
+        references_info["uncaptioned_tables"] = uncaptioned_tabs
+    except Exception as exc:
+        errors.append(
+            {
+                "stage": "figure_table_refs",
+                "type": type(exc).__name__,
+                "message": str(exc),
+            }
+        )
+        metrics["figure_count"] = None
+        metrics["table_count"] = None
+        references_info["uncaptioned_figures"] = []
+        references_info["uncaptioned_tables"] = []
+
+    # counting_s covers: word count, bibliography, figure/table refs, pattern
+    # matching — all fast regex/counting operations with no NLP model load.
+    _t_ai = time.monotonic()
+
+    # --- MATTR and MTLD --------------------------------------------------
+    try:
+        mattr, mtld = _compute_mattr_mtld(clean_content_text)
+        metrics["mattr"] = mattr
+        metrics["mtld"] = mtld
+    except Exception as exc:
+        errors.append({"stage": "mattr_mtld", "type": type(exc).__name__, "message": str(exc)})
+        metrics["mattr"] = None
+        metrics["mtld"] = None
+
+    # --- burstiness ------------------------------------------------------
+    try:
+        burstiness_groups, burstiness_aggregate = _compute_burstiness(raw_text)
+        metrics["burstiness"] = burstiness_aggregate
+        metrics["burstiness_by_group"] = burstiness_groups
+    except Exception as exc:
+        errors.append({"stage": "burstiness", "type": type(exc).__name__, "message": str(exc)})
+        metrics["burstiness"] = None
+        metrics["burstiness_by_group"] = {}
+
+    # --- sentence CV -----------------------------------------------------
+    try:
+        metrics["sentence_cv"] = _compute_sentence_cv(clean_content_text)
+    except Exception as exc:
+        errors.append(
+            {
+                "stage": "sentence_cv",
+                "type": type(exc).__name__,
+                "message": str(exc),
+            }
+        )
+        metrics["sentence_cv"] = None
+
+    # --- pattern matching ------------------------------------------------
+    try:
+        patterns_info = _count_patterns(raw_text)
+    except Exception as exc:
+        errors.append({"stage": "patterns", "type": type(exc).__name__, "message": str(exc)})
+
+    timings = {
+        "counting_s": round(_t_ai - _t_counting, 1),
+        "ai_metrics_s": round(time.monotonic() - _t_ai, 1),
+    }
+
+    return metrics, references_info, patterns_info, timings
+
+
+def _statistics_flags(metrics: dict, calibrations: list) -> dict:
+    """
+    Classify the statistical metrics computed by _compute_text_statistics(), and
+    evaluate the AI-concern flag against *calibrations* (without NLL features).
+    """
+    ai_result = _ai_concern_flag(
+        metrics.get("mattr"),
+        metrics.get("mtld"),
+        metrics.get("sentence_cv"),
+        calibrations,
+    )
+
+    return {
+        "mattr_flag": classify_mattr(metrics.get("mattr")),
+        "mtld_flag": classify_mtld(metrics.get("mtld")),
+        "burstiness_flag": classify_burstiness(metrics.get("burstiness")),
+        "sentence_cv_flag": classify_sentence_cv(metrics.get("sentence_cv")),
+        "ai_concern": ai_result["concern"],
+        "mahalanobis_sigma": ai_result["sigma"],
+        "mahalanobis_pvalue": ai_result["p_value"],
+        "calibration_results": ai_result.get("calibration_results", []),
+        "bonferroni_k": ai_result.get("bonferroni_k", 0),
+        "bonferroni_alpha_medium": ai_result.get("bonferroni_alpha_medium"),
+        "bonferroni_alpha_high": ai_result.get("bonferroni_alpha_high"),
+    }
+
+
 def _ai_concern_flag(
     mattr: float | None,
     mtld: float | None,
@@ -676,6 +867,181 @@ def _ai_concern_flag(
     }
 
 
+# Number of SubmissionRecords loaded, classified and written back together by a classify-only AI concern
+# recalculation.  Can be overridden with AI_CONCERN_RECALC_CHUNK_SIZE.
+_AI_CONCERN_RECALC_CHUNK_SIZE = 1000
+
+# Order of the columns in the metric matrices passed to _ai_concern_flags_bulk().  "lexical" calibrations use
+# the first three columns; "full" calibrations use the first cal.n_features columns.
+_AI_CONCERN_METRIC_KEYS = ("mattr", "mtld", "sentence_cv", "mean_nll", "nll_cv")
+
+
+def _ai_concern_metric_matrix(analyses: list[dict]) -> np.ndarray:
+    """
+    Build an (n, 5) matrix of AI-concern features from a list of language_analysis dicts, in the column order
+    given by _AI_CONCERN_METRIC_KEYS.  Missing or non-numeric values are represented by NaN.
+    """
+    X = np.full((len(analyses), len(_AI_CONCERN_METRIC_KEYS)), np.nan)
+    for i, la in enumerate(analyses):
+        metrics = la.get("metrics", {})
+        for j, key in enumerate(_AI_CONCERN_METRIC_KEYS):
+            value = metrics.get(key)
+            if value is None:
+                continue
+            try:
+                X[i, j] = float(value)
+            except (TypeError, ValueError):
+                pass
+    return X
+
+
+def _ai_concern_flags_bulk(
+    X: np.ndarray,
+    llm_keys: list[tuple],
+    calibrations: list | None,
+) -> list[dict]:
+    """
+    Vectorised form of _ai_concern_flag() for many submissions at once.
+
+    *X* is an (n, 5) matrix built by _ai_concern_metric_matrix(), with NaN for
+    missing metrics, and *llm_keys* holds the (llm_model_name, llm_context_size)
+    pair for each row.  For each calibration the Mahalanobis distances and
+    p-values of every applicable row are computed in a single matrix operation;
+    the Bonferroni correction, concern levels and choice of most significant
+    test then follow _ai_concern_flag() exactly, so that row i of the result is
+    the dict that _ai_concern_flag() would return for submission i.
+    """
+    n = X.shape[0]
+    _UNCALIBRATED = {"concern": "uncalibrated", "sigma": None, "p_value": None}
+
+    if n == 0:
+        return []
+
+    if not calibrations:
+        return [dict(_UNCALIBRATED) for _ in range(n)]
+
+    # label each row by its LLM (model, context window) pair, so that matching against "full" calibrations
+    # needs one comparison per distinct pair rather than one per submission
+    key_codes: dict[tuple, int] = {}
+    row_codes = np.array([key_codes.setdefault(tuple(key), len(key_codes)) for key in llm_keys], dtype=int)
+
+    # one entry per applicable calibration, in the same order as _ai_concern_flag() evaluates them
+    tests = []
+    applicable_count = np.zeros(n, dtype=int)
+    for cal in calibrations:
+        if cal.feature_set == "lexical":
+            d = 3
+            mask = np.ones(n, dtype=bool)
+        elif cal.feature_set == "full":
+            d = cal.n_features
+            matched = [code for key, code in key_codes.items() if cal.is_llm_matched(*key)]
+            mask = np.isin(row_codes, matched)
+        else:
+            continue
+
+        features = X[:, :d]
+        mask &= ~np.isnan(features).any(axis=1)
+        if not mask.any():
+            continue
+
+        applicable_count += mask
+
+        sigma = np.full(n, np.nan)
+        p_value = np.full(n, np.nan)
+        try:
+            sigma[mask], p_value[mask] = mahalanobis_distances(features[mask], cal)
+        except Exception:
+            # as for _ai_concern_flag(), a calibration that cannot be evaluated still counts towards K
+            continue
+
+        meta = {
+            "feature_set": cal.feature_set,
+            "n_features": cal.n_features,
+            "llm_model_name": cal.llm_model_name,
+            "llm_context_window": cal.llm_context_window,
+        }
+        tests.append((meta, mask, sigma, p_value))
+
+    with np.errstate(divide="ignore"):
+        alpha_medium = np.where(applicable_count > 0, 0.05 / applicable_count, np.nan)
+        alpha_high = np.where(applicable_count > 0, 0.01 / applicable_count, np.nan)
+
+    if not tests:
+        return [dict(_UNCALIBRATED) for _ in range(n)]
+
+    # (tests, n) matrices of results; NaN where a test was not evaluated for a row
+    P = np.vstack([t[3] for t in tests])
+    S = np.vstack([t[2] for t in tests])
+    evaluated = ~np.isnan(P)
+
+    # 0 = low, 1 = medium, 2 = high
+    levels = np.where(P <= alpha_high, 2, np.where(P <= alpha_medium, 1, 0))
+    levels[~evaluated] = 0
+    overall = levels.max(axis=0)
+
+    # the most significant test is the first one attaining the smallest p-value
+    any_evaluated = evaluated.any(axis=0)
+    best = np.argmin(np.where(evaluated, P, np.inf), axis=0)
+
+    level_names = ("low", "medium", "high")
+    results = []
+    for i in range(n):
+        if not any_evaluated[i]:
+            results.append(dict(_UNCALIBRATED))
+            continue
+
+        cal_results = [
+            {
+                **meta,
+                "sigma": float(S[t, i]),
+                "p_value": float(P[t, i]),
+                "concern": level_names[levels[t, i]],
+            }
+            for t, (meta, _, _, _) in enumerate(tests)
+            if evaluated[t, i]
+        ]
+
+        results.append(
+            {
+                "concern": level_names[overall[i]],
+                "sigma": float(S[best[i], i]),
+                "p_value": float(P[best[i], i]),
+                "calibration_results": cal_results,
+                "bonferroni_k": int(applicable_count[i]),
+                "bonferroni_alpha_medium": float(alpha_medium[i]),
+                "bonferroni_alpha_high": float(alpha_high[i]),
+            }
+        )
+
+    return results
+
+
+def _store_ai_concern_flags(flags: dict, ai_result: dict) -> None:
+    """Copy the result of _ai_concern_flag() or _ai_concern_flags_bulk() into a language_analysis 'flags' dict."""
+    flags["ai_concern"] = ai_result["concern"]
+    flags["mahalanobis_sigma"] = ai_result["sigma"]
+    flags["mahalanobis_pvalue"] = ai_result["p_value"]
+    flags["calibration_results"] = ai_result.get("calibration_results", [])
+    flags["bonferroni_k"] = ai_result.get("bonferroni_k", 0)
+    flags["bonferroni_alpha_medium"] = ai_result.get("bonferroni_alpha_medium")
+    flags["bonferroni_alpha_high"] = ai_result.get("bonferroni_alpha_high")
+
+
+def _classify_ai_concern_bulk(records: list, analyses: list[dict], calibrations: list) -> None:
+    """
+    Re-evaluate the AI concern flags for each SubmissionRecord in *records*, using the metrics held in the
+    corresponding language_analysis dict in *analyses*.  The flags are updated in place; the caller is
+    responsible for storing the dicts.
+    """
+    X = _ai_concern_metric_matrix(analyses)
+    llm_keys = [(record.llm_model_name, record.llm_context_size) for record in records]
+
+    for la, ai_result in zip(analyses, _ai_concern_flags_bulk(X, llm_keys, calibrations)):
+        flags = la.get("flags", {})
+        _store_ai_concern_flags(flags, ai_result)
+        la["flags"] = flags
+
+
 # ---------------------------------------------------------------------------
 # LLM helpers.
 # ---------------------------------------------------------------------------
@@ -701,6 +1067,21 @@ _FEEDBACK_OVERHEAD_TOKENS = 400
 # aggregation.  Minority-polarity entries are always kept (one each).
 _MAX_EVIDENCE_PER_CRITERION = 3
 
+# Share of the context left after prompt and response overheads that is filled
+# with document text.  The static tokens-per-word constants leave a 15% margin;
+# learned ratios (app/shared/token_budget.py) already use a high quantile of
+# the observed per-call ratio, so less headroom is needed.
+_CONTEXT_FILL_STATIC = 0.85
+_CONTEXT_FILL_LEARNED = 0.95
+
+# Floor for the learned map-phase response reservation; see
+# token-budget/grading-context-utilisation-analysis.md.
+_MAP_RESPONSE_MIN_TOKENS = 1400
+
+# Number of times a map-phase chunk may be halved after overflowing the
+# context window.
+_MAX_CHUNK_SPLIT_DEPTH = 2
+
 # Excerpt character limit applied when the synthesis evidence text would
 # otherwise overflow the synthesis context window.
 _MAX_EXCERPT_CHARS = 150
@@ -1216,8 +1597,67 @@ _LLM_CHUNK_SCHEMA = {
 }
 
 
-def _build_chunk_system_prompt(chunk_idx: int, total_chunks: int, rubric) -> str:
-    """Compact system prompt for the map-phase evidence extraction call."""
+def _prompt_token_ratios(model: str | None) -> tuple[float, float, float]:
+    """
+    Return (system tokens/word, content tokens/word, context fill factor) for budgeting
+    prompts to *model*: learned from recorded Ollama usage where available, otherwise
+    the conservative static constants.
+    """
+    ratios = learned_token_ratios(model) if model else None
+    if ratios is None:
+        return _TOKENS_PER_WORD, _TOKENS_PER_WORD_CONTENT, _CONTEXT_FILL_STATIC
+    return ratios.system, ratios.content, _CONTEXT_FILL_LEARNED
+
+
+def _single_pass_word_budget(context_size: int, rubric, model: str | None = None) -> int:
+    """
+    Return the largest document (in words) that can be graded by a single-pass
+    call within *context_size* tokens.
+    """
+    system_tpw, content_tpw, fill = _prompt_token_ratios(model)
+    n_criteria = sum(len(band["criteria"]) for band in rubric._bands)
+    grading_prompt_tokens = int(len(_build_system_prompt(False, rubric).split()) * system_tpw)
+    # Per criterion: ~130 tokens (assessment enum + ~80-word commentary + confidence enum).
+    # Fixed overhead: ~700 tokens (summary, classification, overall_reasoning, caveats, JSON framing).
+    response_tokens = max(2200, 700 + n_criteria * 130)
+    overhead = grading_prompt_tokens + response_tokens
+    return max(int((context_size - overhead) / content_tpw * fill), 0)
+
+
+def _chunk_word_budget(context_size: int, rubric, model: str | None = None) -> int:
+    """
+    Return the maximum chunk size (in words) for the map phase of chunked grading
+    within *context_size* tokens.
+    """
+    system_tpw, content_tpw, fill = _prompt_token_ratios(model)
+    n_criteria = sum(len(band["criteria"]) for band in rubric._bands)
+    chunk_prompt_tokens = int(len(_build_chunk_system_prompt(rubric).split()) * system_tpw)
+    # Per criterion: up to _MAX_EVIDENCE_PER_CRITERION entries.  Each entry carries a
+    # 2-sentence verbatim excerpt (~80 tokens) + observation (~30 tokens) + overhead,
+    # so ~220 tokens/criterion at the average 2-entry density is more realistic than the
+    # old 150.  The higher floor (1200) covers small rubrics safely.  Once enough
+    # map-phase responses have been observed for *model*, the reservation follows
+    # their peak size instead.
+    response_tokens = max(1200, 500 + n_criteria * 220)
+    if model:
+        response_tokens = map_response_reservation(model, n_criteria, response_tokens, _MAP_RESPONSE_MIN_TOKENS)
+    overhead = chunk_prompt_tokens + response_tokens
+    return max(int((context_size - overhead) / content_tpw * fill), 500)
+
+
+def _build_chunk_system_prompt(rubric) -> str:
+    """
+    Compact system prompt for the map-phase evidence extraction call.
+
+    The prompt depends only on the rubric, so it is byte-identical for every chunk of every report
+    graded against the same rubric, and the inference server can reuse its cached prompt prefix.
+    Anything that varies between calls (such as the chunk position) belongs in the user prompt.
+
+    When the chunk position moved to the user prompt, its sentence here was replaced by a pointer to the user
+    message.  The extraction instructions did not change, so PROMPT_VERSION was not bumped.  PROMPT_VERSION and
+    prompt_hash describe the grading (single-pass or synthesis) prompt that produced a stored result, and this
+    map-phase prompt only feeds the synthesis call.
+    """
     criterion_lines = []
     for band_idx, band in enumerate(rubric.to_prompt_bands(), start=1):
         for crit_idx, criterion in enumerate(band["criteria"], start=1):
@@ -1226,7 +1666,7 @@ def _build_chunk_system_prompt(chunk_idx: int, total_chunks: int, rubric) -> str
 
     return f"""You are extracting evidence from a portion of a student project report.
 
-This is chunk {chunk_idx + 1} of {total_chunks}. Do NOT assess or classify the work overall.
+The user message gives the position of this portion in the report. Do NOT assess or classify the work overall.
 
 For each passage that is relevant to any of the criteria listed below, record one evidence entry:
   - criterion_code: the numeric code from the list (e.g. "1.1", "3.4")
@@ -1242,7 +1682,77 @@ If no genuine evidence exists for a criterion in this chunk, do not record an en
 
 
 def _build_chunk_user_prompt(chunk_text: str, chunk_idx: int, total_chunks: int) -> str:
-    return f"Please extract evidence from the following text (chunk {chunk_idx + 1} of {total_chunks}):\n\n---\n\n{chunk_text}\n\n---"
+    return f"This is chunk {chunk_idx + 1} of {total_chunks}. Please extract evidence from the following text:\n\n---\n\n{chunk_text}\n\n---"
+
+
+def _extract_chunk_evidence(
+    base_url: str,
+    model: str,
+    chunk_text: str,
+    chunk_idx: int,
+    total_chunks: int,
+    rubric,
+    context_size: int,
+    label: str,
+    depth: int = 0,
+) -> tuple[dict | None, str, Exception | None, int, list[tuple[int, dict | None]]]:
+    """
+    Run the map-phase evidence extraction call for one chunk.
+
+    If the response overflows the context window, the chunk is split in half at
+    paragraph or sentence boundaries and each part is extracted separately (at most
+    _MAX_CHUNK_SPLIT_DEPTH times); the evidence from the parts is concatenated, so the
+    result still describes chunk *chunk_idx*.
+
+    Returns (parsed, accumulated, last_exc, est_input_tokens, calls), where calls lists
+    (est_input_tokens, actual_usage) for each successful LLM request.
+    """
+    parsed, accumulated, last_exc, est_tok, usage = _call_llm(
+        base_url,
+        model,
+        _build_chunk_system_prompt(rubric),
+        _build_chunk_user_prompt(chunk_text, chunk_idx, total_chunks),
+        _LLM_CHUNK_SCHEMA,
+        options={"num_ctx": context_size},
+        label=label,
+        user_tokens_per_word=_TOKENS_PER_WORD_CONTENT,
+    )
+
+    if parsed is not None:
+        if usage is not None:
+            n_criteria = sum(len(band["criteria"]) for band in rubric._bands)
+            record_map_completion(model, n_criteria, usage.get("completion_tokens"))
+        return parsed, accumulated, None, est_tok, [(est_tok, usage)]
+
+    if not isinstance(last_exc, ContextOverflowError) or depth >= _MAX_CHUNK_SPLIT_DEPTH:
+        return None, accumulated, last_exc, est_tok, []
+
+    parts = _build_chunks(chunk_text, max((len(chunk_text.split()) + 1) // 2, 1))
+    if len(parts) < 2:
+        return None, accumulated, last_exc, est_tok, []
+
+    current_app.logger.info(f"{label}: context window exceeded; retrying as {len(parts)} smaller parts")
+
+    evidence: list = []
+    calls: list = []
+    for part_idx, part in enumerate(parts):
+        part_parsed, accumulated, last_exc, est_tok, part_calls = _extract_chunk_evidence(
+            base_url,
+            model,
+            part,
+            chunk_idx,
+            total_chunks,
+            rubric,
+            context_size,
+            f"{label} part {part_idx + 1}/{len(parts)}",
+            depth=depth + 1,
+        )
+        if part_parsed is None:
+            return None, accumulated, last_exc, est_tok, calls
+        evidence.extend(part_parsed.get("evidence", []))
+        calls.extend(part_calls)
+
+    return {"evidence": evidence}, accumulated, None, est_tok, calls
 
 
 # ---------------------------------------------------------------------------
@@ -1479,6 +1989,311 @@ def _build_synthesis_user_prompt(evidence_text: str) -> str:
     )
 
 
+_METADATA_FIELDS = (
+    "stated_word_count_found",
+    "stated_word_count",
+    "genai_statement_found",
+    "genai_statement",
+    "preface_found",
+    "preface_precis",
+)
+
+
+def _grading_text(raw_text: str) -> str:
+    """
+    Build the text for grade-band assessment: core body + appendices.
+
+    The reference list is excluded (bibliographic entries are noise for the LLM assessor).  Math-extraction
+    artefacts are stripped so that equation fragments do not waste context tokens.
+    """
+    _core, _references, _appendices = _split_document(raw_text)
+    clean_text = _strip_toc_lines(_strip_math_lines(_core))
+    if _appendices:
+        clean_text = clean_text + "\n\n" + _strip_toc_lines(_strip_math_lines(_appendices))
+    return clean_text
+
+
+def _grade_document(
+    clean_text: str,
+    rubric,
+    base_url: str,
+    model: str,
+    context_size: int,
+    record_id: int,
+    label_prefix: str = "submit_to_llm",
+    metadata_result: dict | None = None,
+    chunk_state: dict | None = None,
+    on_metadata: Callable[[dict], None] | None = None,
+    on_chunk: Callable[[int, dict], None] | None = None,
+) -> dict:
+    """
+    Grade *clean_text* against *rubric* with the LLM: a dedicated metadata call, followed by either a single
+    grading pass (if the document fits within the context window) or a chunked map-reduce with a synthesis call.
+
+    On the chunked path, *metadata_result* and *chunk_state* carry the intermediate state of an interrupted run
+    (the "_llm_metadata" and "_llm_chunks" entries of the language_analysis blob), so that completed work is
+    reused.  *on_metadata* and *on_chunk* (with the index of the completed chunk) are called with the updated state
+    as soon as it is available, so that the caller can persist it.
+
+    Returns a dict with keys:
+      parsed_result          validated grading result, with the metadata fields merged in; None on failure
+      accumulated            raw text of the last LLM response
+      last_exc               exception from the last failed LLM call, or None
+      est_tok                estimated input tokens for the last LLM call
+      prompt_hash            hash of the grading system prompt, or None if grading was not reached
+      num_chunks             number of chunks (1 on the single-pass path)
+      chunk_failure_reason   set if a map-phase chunk failed; the synthesis call is then not made
+      peak_prompt_tokens, peak_context_pressure, total_est_tokens, total_actual_prompt_tokens,
+      peak_completion_tokens, total_completion_tokens
+                             token instrumentation, None where not reported
+    """
+    outcome = {
+        "parsed_result": None,
+        "accumulated": "",
+        "last_exc": None,
+        "est_tok": 0,
+        "prompt_hash": None,
+        "num_chunks": 1,
+        "chunk_failure_reason": None,
+        "peak_prompt_tokens": None,
+        "peak_context_pressure": None,
+        "total_est_tokens": None,
+        "total_actual_prompt_tokens": None,
+        "peak_completion_tokens": None,
+        "total_completion_tokens": None,
+    }
+
+    all_criterion_codes: frozenset = frozenset(
+        f"{band_idx}.{crit_idx}" for band_idx, band in enumerate(rubric._bands, start=1) for crit_idx in range(1, len(band["criteria"]) + 1)
+    )
+    llm_response_schema = _make_llm_response_schema(rubric)
+
+    single_pass_word_budget = _single_pass_word_budget(context_size, rubric, model)
+    doc_words = len(clean_text.split())
+
+    if doc_words <= single_pass_word_budget:
+        # ----------------------------------------------------------------
+        # Single-pass path: document fits within the context window.
+        # ----------------------------------------------------------------
+        # Step 1: dedicated metadata extraction (same as chunked path step 1).
+        candidate_text = _extract_metadata_regions(clean_text)
+        metadata_result = None
+        meta_parsed, _, meta_exc, _, _ = _call_llm(
+            base_url,
+            model,
+            _build_metadata_system_prompt(),
+            _build_metadata_user_prompt(candidate_text),
+            _LLM_METADATA_SCHEMA,
+            options={"num_ctx": context_size},
+            label=f"{label_prefix}/metadata (record #{record_id})",
+        )
+        if meta_parsed is not None:
+            metadata_result = meta_parsed
+        else:
+            current_app.logger.warning(f"language_analysis.submit_to_llm: metadata extraction failed for record #{record_id}: {meta_exc}")
+
+        # Step 2: grading call (grading fields only).
+        document_text, was_truncated = _truncate_text(clean_text)
+        _system_prompt = _build_system_prompt(was_truncated, rubric)
+        outcome["prompt_hash"] = _prompt_hash(_system_prompt)
+        parsed_result, accumulated, last_exc, est_tok, _sp_actual_usage = _call_llm(
+            base_url,
+            model,
+            _system_prompt,
+            _build_user_prompt(document_text),
+            llm_response_schema,
+            options={"num_ctx": context_size},
+            validate_fn=_validate_llm_response,
+            label=f"{label_prefix}/single-pass (record #{record_id})",
+            user_tokens_per_word=_TOKENS_PER_WORD_CONTENT,
+        )
+
+        # Merge metadata into the grading result so downstream code and
+        # templates can access all fields from a single dict.
+        if parsed_result is not None and metadata_result is not None:
+            for field in _METADATA_FIELDS:
+                parsed_result[field] = metadata_result.get(field)
+
+        outcome.update(parsed_result=parsed_result, accumulated=accumulated, last_exc=last_exc, est_tok=est_tok)
+
+        # Token instrumentation for single-pass path.
+        outcome["total_est_tokens"] = est_tok
+        if _sp_actual_usage is not None:
+            _pt = _sp_actual_usage.get("prompt_tokens")
+            if _pt is not None:
+                outcome["peak_prompt_tokens"] = _pt
+                outcome["total_actual_prompt_tokens"] = _pt
+                outcome["peak_context_pressure"] = _pt / context_size
+            _ct = _sp_actual_usage.get("completion_tokens")
+            if _ct is not None:
+                outcome["peak_completion_tokens"] = _ct
+                outcome["total_completion_tokens"] = _ct
+
+        return outcome
+
+    # ----------------------------------------------------------------
+    # Chunked map-reduce path: document exceeds single-pass budget.
+    # ----------------------------------------------------------------
+    # Learned token ratios drift as usage is recorded.  Keep the chunk size of an
+    # interrupted run for the same context window, so that its completed chunks
+    # still line up with the chunk boundaries and can be reused.
+    chunk_state = chunk_state or {}
+    if chunk_state.get("context_size") == context_size and chunk_state.get("chunk_word_budget"):
+        chunk_word_budget = chunk_state["chunk_word_budget"]
+    else:
+        chunk_word_budget = _chunk_word_budget(context_size, rubric, model)
+    chunks = _build_chunks(clean_text, chunk_word_budget)
+    total_chunks = len(chunks)
+    outcome["num_chunks"] = total_chunks
+    current_app.logger.info(
+        f"language_analysis.submit_to_llm: record #{record_id} — "
+        f"{doc_words} words, {total_chunks} chunk(s) of ~{chunk_word_budget} words "
+        f"(context_size={context_size})"
+    )
+
+    # -- Step 1: dedicated metadata extraction (regex → LLM) ------
+    if metadata_result is None:
+        candidate_text = _extract_metadata_regions(clean_text)
+        meta_parsed, _, meta_exc, _, _ = _call_llm(
+            base_url,
+            model,
+            _build_metadata_system_prompt(),
+            _build_metadata_user_prompt(candidate_text),
+            _LLM_METADATA_SCHEMA,
+            options={"num_ctx": context_size},
+            label=f"{label_prefix}/metadata (record #{record_id})",
+        )
+        if meta_parsed is not None:
+            metadata_result = meta_parsed
+        else:
+            # Non-fatal: map phase metadata_hits act as a fallback.
+            current_app.logger.warning(
+                f"language_analysis.submit_to_llm: metadata extraction failed "
+                f"for record #{record_id}: {meta_exc}; "
+                f"map-phase metadata_hits will be used instead"
+            )
+            metadata_result = {
+                "stated_word_count_found": False,
+                "stated_word_count": None,
+                "genai_statement_found": False,
+                "genai_statement": "",
+                "preface_found": False,
+                "preface_precis": "",
+            }
+        if on_metadata is not None:
+            on_metadata(metadata_result)
+
+    # -- Step 2: map phase (per-chunk evidence extraction) ---------
+    # Reset persisted state if chunk topology changed between retries
+    # (e.g. OLLAMA_CONTEXT_SIZE was adjusted by an administrator).
+    if chunk_state.get("total_chunks") != total_chunks or chunk_state.get("chunk_word_budget") != chunk_word_budget:
+        chunk_state = {
+            "total_chunks": total_chunks,
+            "chunk_word_budget": chunk_word_budget,
+            "context_size": context_size,
+            "completed": [],
+            "results": {},
+        }
+
+    completed_chunks: set[int] = set(chunk_state.get("completed", []))
+    chunk_results: dict = chunk_state.get("results", {})
+    _chunk_est_tokens: list[int] = []
+    _chunk_actual_tokens: list[int | None] = []
+    _chunk_completion_tokens: list[int | None] = []
+
+    for idx, chunk_text in enumerate(chunks):
+        if idx in completed_chunks:
+            continue  # already persisted on a previous attempt
+
+        chunk_parsed, accumulated, last_exc, est_tok, _chunk_calls = _extract_chunk_evidence(
+            base_url,
+            model,
+            chunk_text,
+            idx,
+            total_chunks,
+            rubric,
+            context_size,
+            label=f"{label_prefix}/chunk {idx + 1}/{total_chunks} (record #{record_id})",
+        )
+
+        if chunk_parsed is None:
+            outcome.update(
+                accumulated=accumulated,
+                last_exc=last_exc,
+                est_tok=est_tok,
+                chunk_failure_reason=f"chunk {idx + 1}/{total_chunks} failed (~{est_tok} est. input tokens): {last_exc}",
+            )
+            return outcome
+
+        for _call_est, _call_usage in _chunk_calls:
+            _chunk_est_tokens.append(_call_est)
+            _chunk_actual_tokens.append(_call_usage.get("prompt_tokens") if _call_usage else None)
+            _chunk_completion_tokens.append(_call_usage.get("completion_tokens") if _call_usage else None)
+        chunk_results[str(idx)] = chunk_parsed
+        completed_chunks.add(idx)
+        chunk_state = {
+            "total_chunks": total_chunks,
+            "chunk_word_budget": chunk_word_budget,
+            "context_size": context_size,
+            "completed": list(completed_chunks),
+            "results": chunk_results,
+        }
+        if on_chunk is not None:
+            on_chunk(idx, chunk_state)
+
+    # -- Step 3: synthesis (reduce phase) -------------------------
+    merged = _merge_chunk_evidence(chunk_results, all_criterion_codes)
+
+    # Override aggregated metadata with the dedicated extraction result,
+    # which is more reliable (regex-located, purpose-built prompt).
+    merged["metadata"] = {
+        "stated_word_count_found": metadata_result.get("stated_word_count_found", False),
+        "stated_word_count": metadata_result.get("stated_word_count"),
+        "genai_statement_found": metadata_result.get("genai_statement_found", False),
+        "genai_statement": metadata_result.get("genai_statement", ""),
+        "preface_found": metadata_result.get("preface_found", False),
+        "preface_precis": metadata_result.get("preface_precis", ""),
+    }
+
+    evidence_text = _build_synthesis_evidence_text(merged, total_chunks, rubric)
+
+    _system_prompt = _build_system_prompt(False, rubric)
+    outcome["prompt_hash"] = _prompt_hash(_system_prompt)
+    parsed_result, accumulated, last_exc, est_tok, _ = _call_llm(
+        base_url,
+        model,
+        _system_prompt,
+        _build_synthesis_user_prompt(evidence_text),
+        llm_response_schema,
+        options={"num_ctx": max(context_size, _SYNTHESIS_MIN_CTX)},
+        validate_fn=_validate_llm_response,
+        label=f"{label_prefix}/synthesis (record #{record_id})",
+    )
+
+    # Inject metadata from the dedicated extraction call into the synthesis
+    # result; the grading schema no longer includes these fields.
+    if parsed_result is not None:
+        for field in _METADATA_FIELDS:
+            parsed_result[field] = metadata_result.get(field)
+
+    outcome.update(parsed_result=parsed_result, accumulated=accumulated, last_exc=last_exc, est_tok=est_tok)
+
+    # Token instrumentation for chunked path.
+    if _chunk_est_tokens:
+        outcome["total_est_tokens"] = sum(_chunk_est_tokens)
+    _actual_available = [t for t in _chunk_actual_tokens if t is not None]
+    if _actual_available:
+        outcome["peak_prompt_tokens"] = max(_actual_available)
+        outcome["peak_context_pressure"] = outcome["peak_prompt_tokens"] / context_size
+        outcome["total_actual_prompt_tokens"] = sum(_actual_available)
+    _ct_available = [t for t in _chunk_completion_tokens if t is not None]
+    if _ct_available:
+        outcome["peak_completion_tokens"] = max(_ct_available)
+        outcome["total_completion_tokens"] = sum(_ct_available)
+
+    return outcome
+
+
 # ---------------------------------------------------------------------------
 # Celery task registration.
 # ---------------------------------------------------------------------------
@@ -1565,6 +2380,7 @@ def register_language_analysis_tasks(celery):
 
         raw_text = ""
         page_count = 0
+        content_hash = None
         errors = []
 
         mimetype = (asset.mimetype or "").lower()
@@ -1572,33 +2388,33 @@ def register_language_analysis_tasks(celery):
 
         try:
             with adapter.download_to_scratch() as scratch:
-                path = str(scratch.path)
-                if "pdf" in mimetype or path.lower().endswith(".pdf"):
-                    raw_text, page_count = _extract_pdf_text(path)
-                elif "word" in mimetype or "officedocument" in mimetype or path.lower().endswith((".docx", ".doc")):
-                    raw_text, page_count = _extract_docx_text(path)
-                else:
-                    # Fall back to PDF extraction and log a warning
-                    current_app.logger.warning(f"language_analysis: unknown mimetype '{mimetype}' for record #{record_id}; attempting PDF extraction")
-                    try:
-                        raw_text, page_count = _extract_pdf_text(path)
-                    except Exception as exc2:
-                        errors.append(
-                            {
-                                "stage": "extract",
-                                "type": type(exc2).__name__,
-                                "message": str(exc2),
-                            }
-                        )
+                try:
+                    raw_text, page_count, content_hash = _extract_document_text(str(scratch.path), mimetype, record_id)
+                except Exception as exc2:
+                    errors.append(
+                        {
+                            "stage": "extract",
+                            "type": type(exc2).__name__,
+                            "message": str(exc2),
+                        }
+                    )
         except Exception as exc:
             errors.append({"stage": "download", "type": type(exc).__name__, "message": str(exc)})
 
         # Cache extracted text in MongoDB for use by subsequent pipeline stages
-        # and future pairwise similarity analysis.
-        normalized_text = unicodedata.normalize("NFKC", raw_text)
-        store_scraped_text(record_id, asset.id, mimetype, normalized_text, page_count)
+        # and future pairwise similarity analysis.  Only a clean extraction is
+        # published under its content hash for reuse by identical assets.
+        store_scraped_text(
+            record_id,
+            asset.id,
+            mimetype,
+            raw_text,
+            page_count,
+            content_hash=None if errors else content_hash,
+            extractor_version=EXTRACTOR_VERSION,
+        )
 
-        data = record.language_analysis_data
+        data = record.language_analysis_for_update()
         data["_page_count"] = page_count
         if errors:
             data.setdefault("errors", []).extend(errors)
@@ -1659,133 +2475,12 @@ def register_language_analysis_tasks(celery):
             record_step_end(_r, record_id, "compute_statistics", _t0)
             return
 
-        data = record.language_analysis_data
+        data = record.language_analysis_for_update()
         _cached = get_scraped_text(record_id)
         raw_text: str = _cached["scraped_text"] if _cached else ""
         errors: list = data.get("errors", [])
 
-        metrics: dict = {}
-        references_info: dict = {}
-        patterns_info: dict = {}
-
-        # --- split into core, references, and appendices ---------------------
-        # _split_document() implements the priority-ordered 3-way split:
-        #   _core       — main body text (no references, no appendices)
-        #   _references — bibliography / reference list
-        #   _appendices — appendix sections (may be empty)
-        _core, _references, _appendices = _split_document(raw_text)
-
-        # Strip math-extraction noise from the core body text.  Appendix text
-        # is also stripped separately for appendix word counting.
-        # See _strip_math_lines() for full rationale and threshold choice.
-        clean_core_text = _strip_math_lines(_core)
-
-        # Content text for figure/table detection: core + appendices (not refs).
-        _content_text = _core + ("\n\n" + _appendices if _appendices else "")
-
-        # Stripped content text for lexical diversity and sentence-structure metrics.
-        # Appendices are included because they are the student's own writing, consistent
-        # with the text submitted to the LLM.  Word count stays core-only (see above).
-        clean_content_text = _strip_math_lines(_content_text)
-
-        _t_counting = time.monotonic()
-
-        # --- word count (core body only — appendices excluded) ---------------
-        try:
-            wc = _word_count(clean_core_text)
-            metrics["word_count"] = wc
-            # Appendix word count stored separately so the UI can surface both.
-            if _appendices:
-                appendix_wc = _word_count(_strip_math_lines(_appendices))
-                if appendix_wc > 0:
-                    metrics["appendix_word_count"] = appendix_wc
-        except Exception as exc:
-            errors.append({"stage": "word_count", "type": type(exc).__name__, "message": str(exc)})
-            metrics["word_count"] = None
-
-        # --- bibliography count and citation check ----------------------------
-        try:
-            ref_count, ref_keys = _count_bibliography(_references)
-            metrics["reference_count"] = ref_count
-
-            uncited = _check_uncited(_core, ref_keys)
-            references_info["uncited"] = uncited
-        except Exception as exc:
-            errors.append({"stage": "references", "type": type(exc).__name__, "message": str(exc)})
-            metrics["reference_count"] = None
-            references_info["uncited"] = []
-
-        # --- figure and table cross-reference check --------------------------
-        try:
-            uncaptioned_figs, uncaptioned_tabs = _check_figure_table_refs(_content_text)
-            # Count distinct canonical labels (e.g. "3.1", "A.1") in core + appendices.
-            fig_labels = {m.group(1) for m in _FIG_REF.finditer(_content_text)}
-            tab_labels = {m.group(1) for m in _TAB_REF.finditer(_content_text)}
-            metrics["figure_count"] = len(fig_labels)
-            metrics["table_count"] = len(tab_labels)
-            references_info["uncaptioned_figures"] = uncaptioned_figs
-            references_info["uncaptioned_tables"] = uncaptioned_tabs
-        except Exception as exc:
-            errors.append(
-                {
-                    "stage": "figure_table_refs",
-                    "type": type(exc).__name__,
-                    "message": str(exc),
-                }
-            )
-            metrics["figure_count"] = None
-            metrics["table_count"] = None
-            references_info["uncaptioned_figures"] = []
-            references_info["uncaptioned_tables"] = []
-
-        # counting_s covers: word count, bibliography, figure/table refs, pattern
-        # matching — all fast regex/counting operations with no NLP model load.
-        _t_ai = time.monotonic()
-
-        # --- MATTR and MTLD --------------------------------------------------
-        try:
-            mattr, mtld = _compute_mattr_mtld(clean_content_text)
-            metrics["mattr"] = mattr
-            metrics["mtld"] = mtld
-        except Exception as exc:
-            errors.append({"stage": "mattr_mtld", "type": type(exc).__name__, "message": str(exc)})
-            metrics["mattr"] = None
-            metrics["mtld"] = None
-
-        # --- burstiness ------------------------------------------------------
-        try:
-            burstiness_groups, burstiness_aggregate = _compute_burstiness(raw_text)
-            metrics["burstiness"] = burstiness_aggregate
-            metrics["burstiness_by_group"] = burstiness_groups
-        except Exception as exc:
-            errors.append({"stage": "burstiness", "type": type(exc).__name__, "message": str(exc)})
-            metrics["burstiness"] = None
-            metrics["burstiness_by_group"] = {}
-
-        # --- sentence CV -----------------------------------------------------
-        try:
-            metrics["sentence_cv"] = _compute_sentence_cv(clean_content_text)
-        except Exception as exc:
-            errors.append(
-                {
-                    "stage": "sentence_cv",
-                    "type": type(exc).__name__,
-                    "message": str(exc),
-                }
-            )
-            metrics["sentence_cv"] = None
-
-        # --- pattern matching ------------------------------------------------
-        try:
-            patterns_info = _count_patterns(raw_text)
-        except Exception as exc:
-            errors.append({"stage": "patterns", "type": type(exc).__name__, "message": str(exc)})
-
-        # --- classification flags --------------------------------------------
-        mattr_flag = classify_mattr(metrics.get("mattr"))
-        mtld_flag = classify_mtld(metrics.get("mtld"))
-        burst_flag = classify_burstiness(metrics.get("burstiness"))
-        cv_flag = classify_sentence_cv(metrics.get("sentence_cv"))
+        metrics, references_info, patterns_info, stats_timings = _compute_text_statistics(raw_text, errors)
 
         # Fetch calibrations from the tenant associated with this project class.
         # NLL metrics are not available at this stage; full calibrations will be
@@ -1798,31 +2493,11 @@ def register_language_analysis_tasks(celery):
         except Exception:
             calibrations = []
 
-        ai_result = _ai_concern_flag(
-            metrics.get("mattr"),
-            metrics.get("mtld"),
-            metrics.get("sentence_cv"),
-            calibrations,
-        )
-
-        flags = {
-            "mattr_flag": mattr_flag,
-            "mtld_flag": mtld_flag,
-            "burstiness_flag": burst_flag,
-            "sentence_cv_flag": cv_flag,
-            "ai_concern": ai_result["concern"],
-            "mahalanobis_sigma": ai_result["sigma"],
-            "mahalanobis_pvalue": ai_result["p_value"],
-            "calibration_results": ai_result.get("calibration_results", []),
-            "bonferroni_k": ai_result.get("bonferroni_k", 0),
-            "bonferroni_alpha_medium": ai_result.get("bonferroni_alpha_medium"),
-            "bonferroni_alpha_high": ai_result.get("bonferroni_alpha_high"),
-        }
+        flags = _statistics_flags(metrics, calibrations)
 
         # --- persist ---------------------------------------------------------
         timings = data.get("timings", {})
-        timings["counting_s"] = round(_t_ai - _t_counting, 1)
-        timings["ai_metrics_s"] = round(time.monotonic() - _t_ai, 1)
+        timings.update(stats_timings)
         data["timings"] = timings
         data["metrics"] = metrics
         data["flags"] = flags
@@ -1898,7 +2573,7 @@ def register_language_analysis_tasks(celery):
             record_step_end(_r, record_id, "submit_to_llm", _t0)
             return
 
-        data = record.language_analysis_data
+        data = record.language_analysis_for_update()
 
         # Idempotency check: skip if a grading result is already present at the current
         # prompt version.  Bumping PROMPT_VERSION in code is the mechanism to force
@@ -1917,14 +2592,7 @@ def register_language_analysis_tasks(celery):
         _rubric_orm = record.period.config.grading_rubric
         rubric_snap: _RubricSnapshot | None = _RubricSnapshot(_rubric_orm) if _rubric_orm is not None else None
 
-        # Build the text for grade-band assessment: core body + appendices.
-        # The reference list is excluded (bibliographic entries are noise for
-        # the LLM assessor).  Math-extraction artefacts are stripped so that
-        # equation fragments do not waste context tokens.
-        _core, _references, _appendices = _split_document(raw_text)
-        clean_text = _strip_toc_lines(_strip_math_lines(_core))
-        if _appendices:
-            clean_text = clean_text + "\n\n" + _strip_toc_lines(_strip_math_lines(_appendices))
+        clean_text = _grading_text(raw_text)
 
         context_size: int = current_app.config.get("OLLAMA_CONTEXT_SIZE", 18432)
         base_url: str = current_app.config.get("OLLAMA_BASE_URL", "http://localhost:11434")
@@ -2029,322 +2697,87 @@ def register_language_analysis_tasks(celery):
         # ----------------------------------------------------------------
         # Rubric-present grading path.
         # ----------------------------------------------------------------
-        all_criterion_codes: frozenset = frozenset(
-            f"{band_idx}.{crit_idx}" for band_idx, band in enumerate(rubric_snap._bands, start=1) for crit_idx in range(1, len(band["criteria"]) + 1)
-        )
-        n_criteria = sum(len(band["criteria"]) for band in rubric_snap._bands)
-        llm_response_schema = _make_llm_response_schema(rubric_snap)
-
-        _grading_prompt = _build_system_prompt(False, rubric_snap)
-        _grading_prompt_tokens = int(len(_grading_prompt.split()) * _TOKENS_PER_WORD)
-        # Per criterion: ~130 tokens (assessment enum + ~80-word commentary + confidence enum).
-        # Fixed overhead: ~700 tokens (summary, classification, overall_reasoning, caveats, JSON framing).
-        _single_pass_response_tokens = max(2200, 700 + n_criteria * 130)
-        _single_pass_overhead = _grading_prompt_tokens + _single_pass_response_tokens
-        single_pass_word_budget = max(
-            int((context_size - _single_pass_overhead) / _TOKENS_PER_WORD_CONTENT * 0.85),
-            0,
-        )
-        doc_words = len(clean_text.split())
-
-        accumulated = ""
-        last_exc: Exception | None = None
-        parsed_result: dict | None = None
-        prompt_hash_val: str | None = None
-        num_chunks = 1  # updated to actual chunk count on the chunked path
-        est_tok: int = 0
-        # Token instrumentation — computed on each path and passed to record_step_end.
-        _peak_prompt_tokens: int | None = None
-        _peak_context_pressure: float | None = None
-        _total_est_tokens: int | None = None
-        _total_actual_prompt_tokens: int | None = None
-        _peak_completion_tokens: int | None = None
-        _total_completion_tokens: int | None = None
-
-        if doc_words <= single_pass_word_budget:
-            # ----------------------------------------------------------------
-            # Single-pass path: document fits within the context window.
-            # ----------------------------------------------------------------
-            # Step 1: dedicated metadata extraction (same as chunked path step 1).
-            candidate_text = _extract_metadata_regions(clean_text)
-            metadata_result: dict | None = None
-            meta_parsed, _, meta_exc, _, _ = _call_llm(
-                base_url,
-                model,
-                _build_metadata_system_prompt(),
-                _build_metadata_user_prompt(candidate_text),
-                _LLM_METADATA_SCHEMA,
-                options={"num_ctx": context_size},
-                label=f"submit_to_llm/metadata (record #{record_id})",
-            )
-            if meta_parsed is not None:
-                metadata_result = meta_parsed
-            else:
-                current_app.logger.warning(f"language_analysis.submit_to_llm: metadata extraction failed for record #{record_id}: {meta_exc}")
-
-            # Step 2: grading call (grading fields only).
-            document_text, was_truncated = _truncate_text(clean_text)
-            _system_prompt = _build_system_prompt(was_truncated, rubric_snap)
-            prompt_hash_val = _prompt_hash(_system_prompt)
-            parsed_result, accumulated, last_exc, est_tok, _sp_actual_usage = _call_llm(
-                base_url,
-                model,
-                _system_prompt,
-                _build_user_prompt(document_text),
-                llm_response_schema,
-                options={"num_ctx": context_size},
-                validate_fn=_validate_llm_response,
-                label=f"submit_to_llm/single-pass (record #{record_id})",
-                user_tokens_per_word=_TOKENS_PER_WORD_CONTENT,
-            )
-
-            # Merge metadata into the grading result so downstream code and
-            # templates can access all fields from a single dict.
-            if parsed_result is not None and metadata_result is not None:
-                for field in (
-                    "stated_word_count_found",
-                    "stated_word_count",
-                    "genai_statement_found",
-                    "genai_statement",
-                    "preface_found",
-                    "preface_precis",
-                ):
-                    parsed_result[field] = metadata_result.get(field)
-
-            # Token instrumentation for single-pass path.
-            _total_est_tokens = est_tok
-            if _sp_actual_usage is not None:
-                _pt = _sp_actual_usage.get("prompt_tokens")
-                if _pt is not None:
-                    _peak_prompt_tokens = _pt
-                    _total_actual_prompt_tokens = _pt
-                    _peak_context_pressure = _pt / context_size
-                _ct = _sp_actual_usage.get("completion_tokens")
-                if _ct is not None:
-                    _peak_completion_tokens = _ct
-                    _total_completion_tokens = _ct
-
-        else:
-            # ----------------------------------------------------------------
-            # Chunked map-reduce path: document exceeds single-pass budget.
-            # ----------------------------------------------------------------
-            _sample_chunk_prompt = _build_chunk_system_prompt(0, 1, rubric_snap)
-            _chunk_prompt_tokens = int(len(_sample_chunk_prompt.split()) * _TOKENS_PER_WORD)
-            # Per criterion: up to _MAX_EVIDENCE_PER_CRITERION entries.  Each entry carries a
-            # 2-sentence verbatim excerpt (~80 tokens) + observation (~30 tokens) + overhead,
-            # so ~220 tokens/criterion at the average 2-entry density is more realistic than the
-            # old 150.  The higher floor (1200) covers small rubrics safely.
-            _map_response_tokens = max(1200, 500 + n_criteria * 220)
-            _map_overhead = _chunk_prompt_tokens + _map_response_tokens
-            chunk_word_budget = max(
-                int((context_size - _map_overhead) / _TOKENS_PER_WORD_CONTENT * 0.85),
-                500,
-            )
-            chunks = _build_chunks(clean_text, chunk_word_budget)
-            total_chunks = len(chunks)
-            num_chunks = total_chunks
-            current_app.logger.info(
-                f"language_analysis.submit_to_llm: record #{record_id} — "
-                f"{doc_words} words, {total_chunks} chunk(s) of ~{chunk_word_budget} words "
-                f"(context_size={context_size})"
-            )
-
-            # -- Step 1: dedicated metadata extraction (regex → LLM) ------
-            metadata_result: dict | None = data.get("_llm_metadata")
-            if metadata_result is None:
-                candidate_text = _extract_metadata_regions(clean_text)
-                meta_parsed, _, meta_exc, _, _ = _call_llm(
-                    base_url,
-                    model,
-                    _build_metadata_system_prompt(),
-                    _build_metadata_user_prompt(candidate_text),
-                    _LLM_METADATA_SCHEMA,
-                    options={"num_ctx": context_size},
-                    label=f"submit_to_llm/metadata (record #{record_id})",
-                )
-                if meta_parsed is not None:
-                    metadata_result = meta_parsed
-                else:
-                    # Non-fatal: map phase metadata_hits act as a fallback.
-                    current_app.logger.warning(
-                        f"language_analysis.submit_to_llm: metadata extraction failed "
-                        f"for record #{record_id}: {meta_exc}; "
-                        f"map-phase metadata_hits will be used instead"
-                    )
-                    metadata_result = {
-                        "stated_word_count_found": False,
-                        "stated_word_count": None,
-                        "genai_statement_found": False,
-                        "genai_statement": "",
-                        "preface_found": False,
-                        "preface_precis": "",
-                    }
-                data["_llm_metadata"] = metadata_result
-                record = db.session.get(SubmissionRecord, record_id)
-                if record is None:
-                    raise Exception(f"submit_to_llm: SubmissionRecord #{record_id} not found on reload (metadata)")
-                record.set_language_analysis_data(data)
-                try:
-                    db.session.commit()
-                except SQLAlchemyError as exc:
-                    db.session.rollback()
-                    current_app.logger.exception("SQLAlchemyError committing metadata result", exc_info=exc)
-                    raise self.retry()
-                db.session.close()
-
-            # -- Step 2: map phase (per-chunk evidence extraction) ---------
-            chunk_state = data.get("_llm_chunks", {})
-
-            # Reset persisted state if chunk topology changed between retries
-            # (e.g. OLLAMA_CONTEXT_SIZE was adjusted by an administrator).
-            if chunk_state.get("total_chunks") != total_chunks:
-                chunk_state = {
-                    "total_chunks": total_chunks,
-                    "chunk_word_budget": chunk_word_budget,
-                    "completed": [],
-                    "results": {},
-                }
+        def _persist_metadata(metadata_result: dict) -> None:
+            data["_llm_metadata"] = metadata_result
+            record = db.session.get(SubmissionRecord, record_id)
+            if record is None:
+                raise Exception(f"submit_to_llm: SubmissionRecord #{record_id} not found on reload (metadata)")
+            record.set_language_analysis_data(data)
+            try:
+                db.session.commit()
+            except SQLAlchemyError as exc:
+                db.session.rollback()
+                current_app.logger.exception("SQLAlchemyError committing metadata result", exc_info=exc)
+                raise self.retry()
+            db.session.close()
 
-            completed_chunks: set[int] = set(chunk_state.get("completed", []))
-            chunk_results: dict = chunk_state.get("results", {})
-            chunk_failed = False
-            chunk_failure_reason = ""
-            _chunk_est_tokens: list[int] = []
-            _chunk_actual_tokens: list[int | None] = []
-            _chunk_completion_tokens: list[int | None] = []
-
-            for idx, chunk_text in enumerate(chunks):
-                if idx in completed_chunks:
-                    continue  # already persisted on a previous Celery attempt
-
-                chunk_parsed, accumulated, last_exc, est_tok, _chunk_actual_usage = _call_llm(
-                    base_url,
-                    model,
-                    _build_chunk_system_prompt(idx, total_chunks, rubric_snap),
-                    _build_chunk_user_prompt(chunk_text, idx, total_chunks),
-                    _LLM_CHUNK_SCHEMA,
-                    options={"num_ctx": context_size},
-                    label=f"submit_to_llm/chunk {idx + 1}/{total_chunks} (record #{record_id})",
-                    user_tokens_per_word=_TOKENS_PER_WORD_CONTENT,
+        def _persist_chunk(idx: int, chunk_state: dict) -> None:
+            data["_llm_chunks"] = chunk_state
+            record = db.session.get(SubmissionRecord, record_id)
+            if record is None:
+                raise Exception(f"submit_to_llm: SubmissionRecord #{record_id} not found on reload (chunk {idx + 1})")
+            record.set_language_analysis_data(data)
+            try:
+                db.session.commit()
+            except SQLAlchemyError as exc:
+                db.session.rollback()
+                current_app.logger.exception(
+                    f"SQLAlchemyError committing chunk {idx + 1} result",
+                    exc_info=exc,
                 )
-
-                if chunk_parsed is None:
-                    chunk_failed = True
-                    chunk_failure_reason = f"chunk {idx + 1}/{total_chunks} failed (~{est_tok} est. input tokens): {last_exc}"
-                    break
-
-                _chunk_est_tokens.append(est_tok)
-                _chunk_actual_tokens.append(_chunk_actual_usage.get("prompt_tokens") if _chunk_actual_usage else None)
-                _chunk_completion_tokens.append(_chunk_actual_usage.get("completion_tokens") if _chunk_actual_usage else None)
-                chunk_results[str(idx)] = chunk_parsed
-                completed_chunks.add(idx)
-                chunk_state = {
-                    "total_chunks": total_chunks,
-                    "chunk_word_budget": chunk_word_budget,
-                    "completed": list(completed_chunks),
-                    "results": chunk_results,
+                raise self.retry()
+            db.session.close()
+
+        grading = _grade_document(
+            clean_text,
+            rubric_snap,
+            base_url,
+            model,
+            context_size,
+            record_id,
+            metadata_result=data.get("_llm_metadata"),
+            chunk_state=data.get("_llm_chunks"),
+            on_metadata=_persist_metadata,
+            on_chunk=_persist_chunk,
+        )
+        parsed_result: dict | None = grading["parsed_result"]
+        accumulated: str = grading["accumulated"]
+        last_exc: Exception | None = grading["last_exc"]
+        est_tok: int = grading["est_tok"]
+        prompt_hash_val: str | None = grading["prompt_hash"]
+        num_chunks: int = grading["num_chunks"]
+
+        if grading["chunk_failure_reason"] is not None:
+            # Record failure and return; intermediate state is preserved in
+            # data["_llm_chunks"] so a subsequent re-trigger can resume.
+            chunk_failure_reason = grading["chunk_failure_reason"]
+            elapsed = round(time.monotonic() - _t_llm, 1)
+            data.setdefault("timings", {})["llm_s"] = elapsed
+            # Reload record — the session was closed after the last successful chunk commit.
+            record = db.session.get(SubmissionRecord, record_id)
+            if record is None:
+                raise Exception(f"submit_to_llm: SubmissionRecord #{record_id} not found on reload (chunk failure)")
+            record.llm_analysis_failed = True
+            record.llm_failure_reason = chunk_failure_reason
+            if accumulated:
+                data["llm_raw_response"] = accumulated
+            errors.append(
+                {
+                    "stage": "llm_submission",
+                    "type": type(last_exc).__name__ if last_exc else "ChunkFailure",
+                    "message": chunk_failure_reason,
                 }
-                data["_llm_chunks"] = chunk_state
-                record = db.session.get(SubmissionRecord, record_id)
-                if record is None:
-                    raise Exception(f"submit_to_llm: SubmissionRecord #{record_id} not found on reload (chunk {idx + 1})")
-                record.set_language_analysis_data(data)
-                try:
-                    db.session.commit()
-                except SQLAlchemyError as exc:
-                    db.session.rollback()
-                    current_app.logger.exception(
-                        f"SQLAlchemyError committing chunk {idx + 1} result",
-                        exc_info=exc,
-                    )
-                    raise self.retry()
-                db.session.close()
-
-            if chunk_failed:
-                # Record failure and return; intermediate state is preserved in
-                # data["_llm_chunks"] so a subsequent re-trigger can resume.
-                elapsed = round(time.monotonic() - _t_llm, 1)
-                data.setdefault("timings", {})["llm_s"] = elapsed
-                # Reload record — the session was closed after the last successful chunk commit.
-                record = db.session.get(SubmissionRecord, record_id)
-                if record is None:
-                    raise Exception(f"submit_to_llm: SubmissionRecord #{record_id} not found on reload (chunk failure)")
-                record.llm_analysis_failed = True
-                record.llm_failure_reason = chunk_failure_reason
-                if accumulated:
-                    data["llm_raw_response"] = accumulated
-                errors.append(
-                    {
-                        "stage": "llm_submission",
-                        "type": type(last_exc).__name__ if last_exc else "ChunkFailure",
-                        "message": chunk_failure_reason,
-                    }
-                )
-                current_app.logger.error(f"language_analysis.submit_to_llm: {chunk_failure_reason} for record #{record_id}")
-                data["errors"] = errors
-                record.set_language_analysis_data(data)
-                try:
-                    db.session.commit()
-                except SQLAlchemyError as exc:
-                    db.session.rollback()
-                    current_app.logger.exception("SQLAlchemyError committing chunk failure", exc_info=exc)
-                    raise self.retry()
-                return
-
-            # -- Step 3: synthesis (reduce phase) -------------------------
-            merged = _merge_chunk_evidence(chunk_results, all_criterion_codes)
-
-            # Override aggregated metadata with the dedicated extraction result,
-            # which is more reliable (regex-located, purpose-built prompt).
-            merged["metadata"] = {
-                "stated_word_count_found": metadata_result.get("stated_word_count_found", False),
-                "stated_word_count": metadata_result.get("stated_word_count"),
-                "genai_statement_found": metadata_result.get("genai_statement_found", False),
-                "genai_statement": metadata_result.get("genai_statement", ""),
-                "preface_found": metadata_result.get("preface_found", False),
-                "preface_precis": metadata_result.get("preface_precis", ""),
-            }
-
-            evidence_text = _build_synthesis_evidence_text(merged, total_chunks, rubric_snap)
-
-            _system_prompt = _build_system_prompt(False, rubric_snap)
-            prompt_hash_val = _prompt_hash(_system_prompt)
-            parsed_result, accumulated, last_exc, est_tok, _ = _call_llm(
-                base_url,
-                model,
-                _system_prompt,
-                _build_synthesis_user_prompt(evidence_text),
-                llm_response_schema,
-                options={"num_ctx": max(context_size, _SYNTHESIS_MIN_CTX)},
-                validate_fn=_validate_llm_response,
-                label=f"submit_to_llm/synthesis (record #{record_id})",
             )
-
-            # Inject metadata from the dedicated extraction call into the synthesis
-            # result; the grading schema no longer includes these fields.
-            if parsed_result is not None:
-                for field in (
-                    "stated_word_count_found",
-                    "stated_word_count",
-                    "genai_statement_found",
-                    "genai_statement",
-                    "preface_found",
-                    "preface_precis",
-                ):
-                    parsed_result[field] = metadata_result.get(field)
-
-            # Token instrumentation for chunked path.
-            if _chunk_est_tokens:
-                _total_est_tokens = sum(_chunk_est_tokens)
-            _actual_available = [t for t in _chunk_actual_tokens if t is not None]
-            if _actual_available:
-                _peak_prompt_tokens = max(_actual_available)
-                _peak_context_pressure = _peak_prompt_tokens / context_size
-                _total_actual_prompt_tokens = sum(_actual_available)
-            _ct_available = [t for t in _chunk_completion_tokens if t is not None]
-            if _ct_available:
-                _peak_completion_tokens = max(_ct_available)
-                _total_completion_tokens = sum(_ct_available)
+            current_app.logger.error(f"language_analysis.submit_to_llm: {chunk_failure_reason} for record #{record_id}")
+            data["errors"] = errors
+            record.set_language_analysis_data(data)
+            try:
+                db.session.commit()
+            except SQLAlchemyError as exc:
+                db.session.rollback()
+                current_app.logger.exception("SQLAlchemyError committing chunk failure", exc_info=exc)
+                raise self.retry()
+            return
 
         # ----------------------------------------------------------------
         # Common outcome handling (single-pass and chunked-synthesis paths).
@@ -2465,12 +2898,12 @@ def register_language_analysis_tasks(celery):
                 _t0,
                 meta={
                     "num_chunks": num_chunks,
-                    "peak_prompt_tokens": _peak_prompt_tokens,
-                    "peak_context_pressure": _peak_context_pressure,
-                    "total_est_tokens": _total_est_tokens,
-                    "total_actual_prompt_tokens": _total_actual_prompt_tokens,
-                    "peak_completion_tokens": _peak_completion_tokens,
-                    "total_completion_tokens": _total_completion_tokens,
+                    "peak_prompt_tokens": grading["peak_prompt_tokens"],
+                    "peak_context_pressure": grading["peak_context_pressure"],
+                    "total_est_tokens": grading["total_est_tokens"],
+                    "total_actual_prompt_tokens": grading["total_actual_prompt_tokens"],
+                    "peak_completion_tokens": grading["peak_completion_tokens"],
+                    "total_completion_tokens": grading["total_completion_tokens"],
                 },
             )
 
@@ -2529,7 +2962,7 @@ def register_language_analysis_tasks(celery):
             record_step_end(_r, record_id, "submit_to_llm_feedback", _t0)
             return
 
-        data = record.language_analysis_data
+        data = record.language_analysis_for_update()
         _cached = get_scraped_text(record_id)
         raw_text: str = _cached["scraped_text"] if _cached else ""
 
@@ -2737,6 +3170,9 @@ def register_language_analysis_tasks(celery):
         record.llm_chunking_failed = False
         record.llm_chunking_failure_reason = None
 
+        # make sure the typed metrics row used by the AI dashboard matches the final analysis data
+        record.update_language_metrics()
+
         try:
             db.session.commit()
         except SQLAlchemyError as exc:
@@ -2844,7 +3280,7 @@ def register_language_analysis_tasks(celery):
         record.language_analysis_complete = False
 
         # Record the workflow-level failure in the JSON blob
-        data = record.language_analysis_data
+        data = record.language_analysis_for_update()
         data.setdefault("errors", []).append(
             {
                 "stage": "workflow",
@@ -2867,41 +3303,112 @@ def register_language_analysis_tasks(celery):
     # Helpers shared by both recalculate modes
     # ---------------------------------------------------------------------------
 
-    def _reclassify_record(record, calibrations: list) -> bool:
-        """Re-run _ai_concern_flag and risk factors for *record* using stored metrics.
+    def _store_reclassified_records(records: list, analyses: list[dict], calibrations: list) -> None:
+        """
+        Re-evaluate AI concern flags for *records* in bulk from the metrics in *analyses*, then store each
+        language_analysis dict and recompute risk factors through the ORM.  Used when the metrics themselves
+        have changed, so that the SubmissionLanguageMetrics rows must be refreshed too.  Caller is
+        responsible for committing.
+        """
+        _classify_ai_concern_bulk(records, analyses, calibrations)
+        flagged = SubmissionRecord.records_with_unreviewed_similarity(record.id for record in records)
+
+        for record, la in zip(records, analyses):
+            record.set_language_analysis_data(la)
+            try:
+                config = record.period.config if record.period else None
+                record.compute_risk_factors(config, similarity_flagged=record.id in flagged)
+            except Exception as exc:
+                current_app.logger.warning(f"recalculate_ai_concern: could not recompute risk factors for record #{record.id}: {exc}")
 
-        Returns True on success.  Caller is responsible for committing.
+    def _reclassify_records_bulk(record_ids: list[int], calibrations: list) -> int:
         """
-        la = record.language_analysis_data
-        metrics = la.get("metrics", {})
-        flags = la.get("flags", {})
+        Re-run the AI concern classification and risk factors for *record_ids* using stored metrics.
 
-        ai_result = _ai_concern_flag(
-            metrics.get("mattr"),
-            metrics.get("mtld"),
-            metrics.get("sentence_cv"),
-            calibrations,
-            mean_nll=metrics.get("mean_nll"),
-            nll_cv=metrics.get("nll_cv"),
-            llm_model_name=record.llm_model_name,
-            llm_context_window=record.llm_context_size,
+        The metric vectors for all records are classified together by _ai_concern_flags_bulk(), and the
+        language_analysis and risk_factors blobs, and the ai_use_flagged column of SubmissionLanguageMetrics,
+        are written back with one executemany UPDATE per table rather than through the unit of work.
+
+        Returns the number of records updated.  Caller is responsible for committing.
+        """
+        records: list[SubmissionRecord] = (
+            db.session.query(SubmissionRecord)
+            .filter(SubmissionRecord.id.in_(record_ids))
+            .options(
+                undefer(SubmissionRecord.language_analysis),
+                selectinload(SubmissionRecord.period).selectinload(SubmissionPeriodRecord.config),
+            )
+            .all()
         )
-        flags["ai_concern"] = ai_result["concern"]
-        flags["mahalanobis_sigma"] = ai_result["sigma"]
-        flags["mahalanobis_pvalue"] = ai_result["p_value"]
-        flags["calibration_results"] = ai_result.get("calibration_results", [])
-        flags["bonferroni_k"] = ai_result.get("bonferroni_k", 0)
-        flags["bonferroni_alpha_medium"] = ai_result.get("bonferroni_alpha_medium")
-        flags["bonferroni_alpha_high"] = ai_result.get("bonferroni_alpha_high")
-        la["flags"] = flags
-        record.set_language_analysis_data(la)
+        if not records:
+            return 0
 
-        try:
-            config = record.period.config if record.period else None
-            record.compute_risk_factors(config)
-        except Exception as exc:
-            current_app.logger.warning(f"recalculate_ai_concern: could not recompute risk factors for record #{record.id}: {exc}")
-        return True
+        analyses = [record.language_analysis_for_update() for record in records]
+        _classify_ai_concern_bulk(records, analyses, calibrations)
+
+        ids = [record.id for record in records]
+        flagged = SubmissionRecord.records_with_unreviewed_similarity(ids)
+        has_metrics_row = {
+            record_id for (record_id,) in db.session.query(SubmissionLanguageMetrics.record_id).filter(SubmissionLanguageMetrics.record_id.in_(ids))
+        }
+
+        now = datetime.now()
+        record_params = []
+        metrics_params = []
+        for record, la in zip(records, analyses):
+            try:
+                config = record.period.config if record.period else None
+                risk_factors = record.evaluate_risk_factors(config, language_analysis=la, similarity_flagged=record.id in flagged)
+            except Exception as exc:
+                current_app.logger.warning(f"recalculate_ai_concern: could not recompute risk factors for record #{record.id}: {exc}")
+                risk_factors = None
+
+            if record.id not in has_metrics_row:
+                # no typed metrics row yet; let the ORM create it
+                record.set_language_analysis_data(la)
+                if risk_factors is not None:
+                    record.set_risk_factors_data(risk_factors)
+                continue
+
+            if risk_factors is None:
+                risk_factors = record.risk_factors_data
+                raw_risk_factors = record.risk_factors
+            else:
+                raw_risk_factors = fast_json.dumps(risk_factors)
+
+            record_params.append(
+                {
+                    "b_id": record.id,
+                    "b_language_analysis": fast_json.dumps(la),
+                    "b_risk_factors": raw_risk_factors,
+                }
+            )
+            metrics_params.append(
+                {
+                    "b_record_id": record.id,
+                    "b_ai_use_flagged": bool(risk_factors.get(SubmissionRecord.RISK_AI_USE, {}).get("present", False)),
+                    "b_updated_at": now,
+                }
+            )
+
+        if record_params:
+            records_table = SubmissionRecord.__table__
+            db.session.execute(
+                records_table.update()
+                .where(records_table.c.id == bindparam("b_id"))
+                .values(language_analysis=bindparam("b_language_analysis"), risk_factors=bindparam("b_risk_factors")),
+                record_params,
+            )
+
+            metrics_table = SubmissionLanguageMetrics.__table__
+            db.session.execute(
+                metrics_table.update()
+                .where(metrics_table.c.record_id == bindparam("b_record_id"))
+                .values(ai_use_flagged=bindparam("b_ai_use_flagged"), updated_at=bindparam("b_updated_at")),
+                metrics_params,
+            )
+
+        return len(records)
 
     # ---------------------------------------------------------------------------
     # Fan-out sub-task: process one pclass×year batch for full metric recompute
@@ -2918,7 +3425,8 @@ def register_language_analysis_tasks(celery):
           3. Recomputes MATTR, MTLD, burstiness, and sentence CV via the current
              pipeline implementations (including any code-block filtering).
           4. Updates metric values and classification flags in the JSON blob.
-          5. Re-evaluates the Mahalanobis AI concern flag.
+          5. Re-evaluates the Mahalanobis AI concern flag, for 50 records at a
+             time with _ai_concern_flags_bulk().
           6. Re-runs compute_risk_factors().
           7. Commits in batches of 50.
 
@@ -2949,6 +3457,35 @@ def register_language_analysis_tasks(celery):
             current_app.logger.warning("recalculate_ai_concern_batch: no calibration data — skipping batch")
             return {"updated": 0, "skipped": len(record_ids), "errors": 0}
 
+        # records whose metrics have been recomputed, awaiting bulk classification
+        pending_records: list = []
+        pending_analyses: list[dict] = []
+
+        def _flush_pending() -> int:
+            if not pending_records:
+                return 0
+
+            failed = 0
+            try:
+                _store_reclassified_records(pending_records, pending_analyses, calibrations)
+            except Exception as exc:
+                current_app.logger.warning(f"recalculate_ai_concern_batch: error classifying {len(pending_records)} record(s): {exc}")
+                failed = len(pending_records)
+
+            pending_records.clear()
+            pending_analyses.clear()
+
+            try:
+                db.session.commit()
+            except SQLAlchemyError as exc:
+                db.session.rollback()
+                current_app.logger.exception(
+                    "recalculate_ai_concern_batch: DB error during batch commit",
+                    exc_info=exc,
+                )
+
+            return failed
+
         for i, record_id in enumerate(record_ids, start=1):
             try:
                 record = db.session.query(SubmissionRecord).filter_by(id=record_id).first()
@@ -2957,7 +3494,7 @@ def register_language_analysis_tasks(celery):
                     skipped += 1
                     continue
 
-                la = record.language_analysis_data
+                la = record.language_analysis_for_update()
                 _cached = get_scraped_text(record_id)
                 raw_text = _cached["scraped_text"] if _cached else None
 
@@ -2983,17 +3520,17 @@ def register_language_analysis_tasks(celery):
                         continue
 
                     mimetype = (asset.mimetype or "").lower()
-                    page_count = 0
                     with adapter.download_to_scratch() as scratch:
-                        path = str(scratch.path)
-                        if "pdf" in mimetype or path.lower().endswith(".pdf"):
-                            raw_text, page_count = _extract_pdf_text(path)
-                        elif "word" in mimetype or "officedocument" in mimetype or path.lower().endswith((".docx", ".doc")):
-                            raw_text, page_count = _extract_docx_text(path)
-                        else:
-                            raw_text, page_count = _extract_pdf_text(path)
-                    raw_text = unicodedata.normalize("NFKC", raw_text)
-                    store_scraped_text(record_id, asset.id, mimetype, raw_text, page_count)
+                        raw_text, page_count, content_hash = _extract_document_text(str(scratch.path), mimetype, record_id)
+                    store_scraped_text(
+                        record_id,
+                        asset.id,
+                        mimetype,
+                        raw_text,
+                        page_count,
+                        content_hash=content_hash,
+                        extractor_version=EXTRACTOR_VERSION,
+                    )
 
                 # Re-process from text using the current pipeline.
                 _core, _references, _appendices = _split_document(raw_text)
@@ -3016,54 +3553,25 @@ def register_language_analysis_tasks(celery):
                 metrics["sentence_cv_flag"] = classify_sentence_cv(sentence_cv)
                 la["metrics"] = metrics
 
-                # Re-classify using fresh metric values.
-                flags = la.get("flags", {})
-                ai_result = _ai_concern_flag(
-                    mattr,
-                    mtld,
-                    sentence_cv,
-                    calibrations,
-                    mean_nll=metrics.get("mean_nll"),
-                    llm_model_name=record.llm_model_name,
-                    llm_context_window=record.llm_context_size,
-                )
-                flags["ai_concern"] = ai_result["concern"]
-                flags["mahalanobis_sigma"] = ai_result["sigma"]
-                flags["mahalanobis_pvalue"] = ai_result["p_value"]
-                flags["calibration_results"] = ai_result.get("calibration_results", [])
-                flags["bonferroni_k"] = ai_result.get("bonferroni_k", 0)
-                flags["bonferroni_alpha_medium"] = ai_result.get("bonferroni_alpha_medium")
-                flags["bonferroni_alpha_high"] = ai_result.get("bonferroni_alpha_high")
-                la["flags"] = flags
-                record.set_language_analysis_data(la)
-
-                try:
-                    config = record.period.config if record.period else None
-                    record.compute_risk_factors(config)
-                except Exception as exc:
-                    current_app.logger.warning(f"recalculate_ai_concern_batch: could not recompute risk factors for record #{record.id}: {exc}")
+                # Re-classify using fresh metric values; classification, storage and risk factors are
+                # handled for the whole group of pending records by _flush_pending()
+                pending_records.append(record)
+                pending_analyses.append(la)
 
                 updated += 1
 
-                if updated % 50 == 0:
-                    try:
-                        db.session.commit()
-                    except SQLAlchemyError as exc:
-                        db.session.rollback()
-                        current_app.logger.exception(
-                            "recalculate_ai_concern_batch: DB error during batch commit",
-                            exc_info=exc,
-                        )
+                if len(pending_records) >= 50:
+                    failed = _flush_pending()
+                    updated -= failed
+                    errors += failed
 
             except Exception as exc:
                 current_app.logger.warning(f"recalculate_ai_concern_batch: error on record #{record_id}: {exc}")
                 errors += 1
 
-        try:
-            db.session.commit()
-        except SQLAlchemyError as exc:
-            db.session.rollback()
-            current_app.logger.exception("recalculate_ai_concern_batch: final commit error", exc_info=exc)
+        failed = _flush_pending()
+        updated -= failed
+        errors += failed
 
         return {"updated": updated, "skipped": skipped, "errors": errors}
 
@@ -3120,8 +3628,9 @@ def register_language_analysis_tasks(celery):
         specific project class IDs and/or academic years.
 
         When *full_recalculate* is False (default) the task re-runs only the
-        Mahalanobis classification from already-stored metric values — fast,
-        DB-only, sequential.
+        Mahalanobis classification from already-stored metric values — fast and
+        DB-only.  Records are classified in chunks with one matrix operation per
+        calibration, and written back with bulk UPDATE statements.
 
         When *full_recalculate* is True the task re-processes the cached
         extracted text through the current metric pipeline (MATTR, MTLD,
@@ -3254,8 +3763,12 @@ def register_language_analysis_tasks(celery):
             self.replace(chord(sub_tasks, finalize).on_error(error_cb))
             return
 
-        # ── Classify-only: sequential loop (existing behaviour) ───────────────
-        records = [row[0] for row in rows]
+        # ── Classify-only: vectorised bulk reclassification ─────────────────
+        # The language_analysis blobs can be large, so records are loaded, classified and written back in
+        # chunks; within each chunk every record is classified by a single matrix operation per calibration.
+        record_ids = sorted(row[0].id for row in rows)
+        del rows
+
         progress_update(
             task_id,
             TaskRecord.RUNNING,
@@ -3263,41 +3776,30 @@ def register_language_analysis_tasks(celery):
             f"Recalculating AI concern for {total} submission(s)…",
         )
 
-        updated = 0
-        for i, record in enumerate(records, start=1):
-            try:
-                _reclassify_record(record, calibrations)
-                updated += 1
+        chunk_size = max(1, current_app.config.get("AI_CONCERN_RECALC_CHUNK_SIZE", _AI_CONCERN_RECALC_CHUNK_SIZE))
 
-                if updated % 50 == 0:
-                    try:
-                        db.session.commit()
-                    except SQLAlchemyError as exc:
-                        db.session.rollback()
-                        current_app.logger.exception(
-                            "recalculate_ai_concern: DB error during batch commit",
-                            exc_info=exc,
-                        )
-
-                pct = 10 + int(85 * i / total)
-                progress_update(task_id, TaskRecord.RUNNING, pct, f"Processed {i}/{total}…")
+        updated = 0
+        for start in range(0, total, chunk_size):
+            chunk_ids = record_ids[start : start + chunk_size]
 
-            except Exception as exc:
-                current_app.logger.warning(f"recalculate_ai_concern: error processing record #{record.id}: {exc}")
+            try:
+                updated += _reclassify_records_bulk(chunk_ids, calibrations)
+                db.session.commit()
+            except SQLAlchemyError as exc:
+                db.session.rollback()
+                current_app.logger.exception("recalculate_ai_concern: DB error during bulk update", exc_info=exc)
+                progress_update(
+                    task_id,
+                    TaskRecord.FAILURE,
+                    100,
+                    f"Database error after updating {updated} submission(s)",
+                    autocommit=True,
+                )
+                return
 
-        try:
-            db.session.commit()
-        except SQLAlchemyError as exc:
-            db.session.rollback()
-            current_app.logger.exception("recalculate_ai_concern: final commit error", exc_info=exc)
-            progress_update(
-                task_id,
-                TaskRecord.FAILURE,
-                100,
-                "Database error on final commit",
-                autocommit=True,
-            )
-            return
+            done = min(start + chunk_size, total)
+            pct = 10 + int(85 * done / total)
+            progress_update(task_id, TaskRecord.RUNNING, pct, f"Processed {done}/{total}…")
 
         progress_update(
             task_id,
@@ -28,9 +28,11 @@ Architecture (Global coordinator with reliable Redis queue):
   a. Loads every PENDING/RUNNING job from the DB.
   b. Computes the number of currently in-flight records by summing the length
      of each job's inflight Redis list (llm_inflight:{uuid}).
-  c. Fills available slots (up to OLLAMA_BATCH_SIZE) by round-robin across
-     active job queues, using RPOPLPUSH to atomically move each record ID from
-     the pending queue (llm_queue:{uuid}) to the inflight list
+  c. Fills available slots (up to OLLAMA_BATCH_SIZE, plus LLM_FAST_LANE_SLOTS
+     for interactive jobs) in priority and weighted fair-share order, subject
+     to an optional budget on the estimated token cost in flight (see
+     llm_scheduling.py).  RPOPLPUSH atomically moves each record ID from the
+     pending queue (llm_queue:{uuid}) to the inflight list
      (llm_inflight:{uuid}).
   d. Dispatches an analysis chain for each record.
 
@@ -89,7 +91,7 @@ Architecture (Global coordinator with reliable Redis queue):
 """
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from celery import chain
 from celery.signals import worker_ready
@@ -108,7 +110,22 @@ from ..models import (
 )
 from ..shared.scraped_text_store import delete_similarity_chunks
 from ..shared.workflow_logging import log_db_commit
-from .pipeline_tracking import delete_workflow_hash, get_pipeline_redis, read_workflow_entry
+from .llm_scheduling import (
+    clear_blocked,
+    estimate_record_costs,
+    inflight_cost,
+    load_fair_share,
+    note_blocked,
+    queue_order,
+    rank_jobs,
+    record_costs,
+    records_rubric_ids,
+    records_tenant_id,
+    save_fair_share,
+    share_key,
+)
+from .pipeline_metrics import record_workflow_metrics
+from .pipeline_tracking import delete_workflow_hash, get_pipeline_redis, read_workflow_entry, record_dispatch
 
 # ---------------------------------------------------------------------------
 # Global pause state key
@@ -135,6 +152,10 @@ RECOVERY_LOCK_TTL = 30  # seconds; long enough to cover recovery; auto-expires o
 COORDINATOR_QUEUED_KEY = "llm_orchestration:coordinator_queued"
 COORDINATOR_QUEUED_TTL = 120  # safety TTL; cleared normally when the task starts
 
+# Lifetime of the per-job record cost hash (llm_cost:{uuid}).  The hash is deleted
+# when a job is cancelled; the TTL removes it after a job completes normally.
+COST_HASH_TTL = 30 * 24 * 60 * 60  # seconds
+
 # ---------------------------------------------------------------------------
 # Internal helpers
 # ---------------------------------------------------------------------------
@@ -166,10 +187,11 @@ def get_inflight_record_ids(active_jobs: List[LLMOrchestrationJob]) -> set:
 
 
 def _cleanup_redis(job: LLMOrchestrationJob) -> None:
-    """Delete both Redis keys for a job (best-effort)."""
+    """Delete the Redis keys for a job (best-effort)."""
     try:
         r = _get_orchestration_redis()
-        r.delete(job.redis_queue_key, job.redis_inflight_key)
+        r.delete(job.redis_queue_key, job.redis_inflight_key, job.redis_cost_key)
+        clear_blocked(r, job)
     except Exception as exc:
         current_app.logger.warning(f"llm_orchestration: could not clean up Redis keys for job {job.uuid}: {exc}")
 
@@ -208,6 +230,7 @@ def _clear_record_state(record: SubmissionRecord) -> None:
     # try to UPDATE all pending changes before issuing the SELECT — and that UPDATE
     # can race with worker transactions holding row locks on submission_records.
     old_processed_report = record.processed_report
+    old_language_metrics = record.language_metrics
 
     record.language_analysis = None
     record.language_analysis_started = False
@@ -220,6 +243,8 @@ def _clear_record_state(record: SubmissionRecord) -> None:
     record.llm_chunking_failure_reason = None
     record.similarity_complete = False
     record.risk_factors = None
+    if old_language_metrics is not None:
+        record.language_metrics = None
     # Fine-grained presence flags and version columns
     record.stats_present = False
     record.stats_algorithm_version = None
@@ -314,8 +339,11 @@ def _collect_record_ids(
     return [row[0] for row in q.all()]
 
 
-def _populate_redis_queue(job: LLMOrchestrationJob, record_ids: List[int]) -> None:
-    """Push *record_ids* into the job's Redis pending queue (left push → right pop = FIFO)."""
+def _populate_redis_queue(job: LLMOrchestrationJob, record_ids: List[int], costs: Optional[Dict[int, int]] = None) -> None:
+    """
+    Push *record_ids* into the job's Redis pending queue (left push → right pop = FIFO),
+    and store their estimated token costs (if given) for the coordinator's admission check.
+    """
     if not record_ids:
         return
     r = _get_orchestration_redis()
@@ -323,6 +351,9 @@ def _populate_redis_queue(job: LLMOrchestrationJob, record_ids: List[int]) -> No
     pipe = r.pipeline()
     for rid in record_ids:
         pipe.lpush(key, rid)
+    if costs:
+        pipe.hset(job.redis_cost_key, mapping={rid: costs[rid] for rid in record_ids if rid in costs})
+        pipe.expire(job.redis_cost_key, COST_HASH_TTL)
     pipe.execute()
 
 
@@ -377,12 +408,31 @@ def _create_and_dispatch_job(
     description: str,
     log_message: str,
     similarity_only: bool = False,
+    priority: Optional[int] = None,
     **log_db_commit_kwargs,
 ) -> LLMOrchestrationJob:
     """
     Build, persist, enqueue, and dispatch a single LLMOrchestrationJob.
     Raises SQLAlchemyError (after rollback) on commit failure.
+
+    Records are queued in increasing order of estimated token cost, so that short reports
+    in a bulk job are not held up behind long ones, and grouped by grading rubric within
+    each factor-of-two cost band, so that consecutive LLM calls share a cacheable prompt
+    prefix (see llm_scheduling.queue_order).
     """
+    try:
+        tenant_id = records_tenant_id(record_ids)
+        costs = estimate_record_costs(record_ids)
+        rubric_ids = records_rubric_ids(record_ids) if len(record_ids) > 1 else {}
+    except SQLAlchemyError as exc:
+        current_app.logger.warning(f"llm_orchestration._create_and_dispatch_job: could not estimate record costs: {exc}")
+        db.session.rollback()
+        tenant_id = None
+        costs = {}
+        rubric_ids = {}
+    if len(record_ids) > 1:
+        record_ids = queue_order(record_ids, costs, rubric_ids)
+
     job = LLMOrchestrationJob.build(
         scope=scope,
         scope_id=scope_id,
@@ -391,6 +441,8 @@ def _create_and_dispatch_job(
         similarity_only=similarity_only,
         owner=user,
         description=description,
+        priority=priority,
+        tenant_id=tenant_id,
     )
     db.session.add(job)
     db.session.flush()
@@ -484,7 +536,7 @@ def _create_and_dispatch_job(
         except SQLAlchemyError:
             db.session.rollback()
             raise
-    _populate_redis_queue(job, record_ids)
+    _populate_redis_queue(job, record_ids, costs)
     try:
         log_db_commit(log_message, **log_db_commit_kwargs)
     except SQLAlchemyError:
@@ -1150,7 +1202,9 @@ def enqueue_single_record(
 
     Used by ad-hoc submission paths (the per-record launch view and the Canvas
     pull_report workflow) to ensure they are subject to the same batch-size
-    limit and fault-tolerance guarantees as bulk submissions.
+    limit and fault-tolerance guarantees as bulk submissions.  The job is
+    created at PRIORITY_INTERACTIVE, so it is served ahead of bulk work and may
+    use the LLM_FAST_LANE_SLOTS reserved for interactive requests.
 
     *clear_existing=True* is appropriate when the caller has already confirmed
     that the user intends to regenerate all analysis data for this record.
@@ -1193,6 +1247,7 @@ def enqueue_single_record(
         user=user,
         description=description,
         log_message=f"Enqueued single-record LLM orchestration job (SubmissionRecord #{record_id}, clear={clear_existing})",
+        priority=LLMOrchestrationJob.PRIORITY_INTERACTIVE,
         student=record.owner.student if record.owner else None,
         project_classes=record.owner.config.project_class if record.owner and record.owner.config else None,
     )
@@ -1282,7 +1337,8 @@ def register_llm_orchestration_tasks(celery):
         """
         Read the Redis step-tracking hash for *record*, build a workflow-summary
         entry (augmented with student/pclass/year metadata from *record*), prepend
-        it to *job.recent_workflows*.
+        it to *job.recent_workflows*, and fold its step timings into the durable
+        per-stage metrics (see pipeline_metrics).
 
         Hash deletion is intentionally NOT performed here — it is the caller's
         responsibility to call delete_workflow_hash() only after db.session.commit()
@@ -1309,6 +1365,11 @@ def register_llm_orchestration_tasks(celery):
             entry["status"] = status
             entry["finished_at"] = datetime.now().isoformat(timespec="milliseconds")
             job.prepend_workflow(entry)
+
+            tenant_id = None
+            if record is not None and record.period is not None and record.period.config is not None:
+                tenant_id = record.period.config.project_class.tenant_id
+            record_workflow_metrics(redis_client, entry, tenant_id)
         except Exception as exc:
             current_app.logger.warning(f"llm_orchestration._finalize_workflow_entry: failed for record #{record.id if record else '?'}: {exc}")
 
@@ -1391,7 +1452,7 @@ def register_llm_orchestration_tasks(celery):
             record: SubmissionRecord = db.session.query(SubmissionRecord).filter_by(id=record_id).first()
             if record is not None:
                 _reset_record_flags_only(record)
-                data = record.language_analysis_data
+                data = record.language_analysis_for_update()
                 data.pop("_extracted_text", None)
                 data.setdefault("errors", []).append(
                     {
@@ -1443,7 +1504,9 @@ def register_llm_orchestration_tasks(celery):
     def global_orchestration_step(self):
         """
         Global coordinator: fill up to OLLAMA_BATCH_SIZE slots by popping
-        records from all active LLMOrchestrationJob queues (round-robin).
+        records from all active LLMOrchestrationJob queues, in priority and
+        weighted fair-share order (see llm_scheduling.py).  Interactive jobs
+        may also use LLM_FAST_LANE_SLOTS extra slots.
 
         Replaces the former per-job orchestration_step.  Because there is a
         single coordinator, parallel submissions from multiple
@@ -1568,23 +1631,79 @@ def register_llm_orchestration_tasks(celery):
             )
             raise self.retry()
 
-        available_slots = max(0, batch_size - inflight)
-        if available_slots == 0:
+        fast_lane_slots: int = current_app.config.get("LLM_FAST_LANE_SLOTS", 1)
+        token_budget: int = current_app.config.get("LLM_INFLIGHT_TOKEN_BUDGET", 0)
+        max_bypass: int = current_app.config.get("LLM_ADMISSION_MAX_BYPASS_SECONDS", 900)
+
+        # Interactive jobs may use the fast-lane slots above batch_size; bulk jobs may not.
+        has_interactive = any(job.is_interactive for job in dispatchable_jobs)
+        if inflight >= batch_size + (fast_lane_slots if has_interactive else 0):
             # All slots occupied; will be re-triggered when in-flight records complete.
             return
 
-        # ------- round-robin dispatch -------
+        try:
+            inflight_tokens = inflight_cost(r, active_jobs) if token_budget > 0 else 0
+            usage = load_fair_share(r)
+        except Exception as exc:
+            current_app.logger.warning(
+                f"llm_orchestration.global_orchestration_step: Redis error reading scheduler state: {exc} — using equal shares"
+            )
+            inflight_tokens = 0
+            usage = {}
+
+        # ------- priority and fair-share dispatch -------
+        # Each pass takes one record from the best-ranked job that can admit one (see
+        # llm_scheduling.rank_jobs).  A job is dropped from the candidates once its queue
+        # is empty or it cannot admit its next record; every pass either drops a job or
+        # consumes a record, so the loop terminates.
         dispatched = 0
-        # Loop at most len(dispatchable_jobs) times per slot to avoid an infinite loop
-        # when all queues are empty.
-        max_attempts = len(dispatchable_jobs) * available_slots + len(dispatchable_jobs)
-        attempts = 0
-        job_idx = 0
+        candidates = list(dispatchable_jobs)
+        charged = set()
+        # Set when a bulk record has been refused by the token budget for longer than
+        # max_bypass; no more bulk records are admitted until it fits.
+        reserved = False
+
+        while candidates:
+            job = rank_jobs(candidates, usage)[0]
+
+            limit = batch_size + fast_lane_slots if job.is_interactive else batch_size
+            if inflight + dispatched >= limit:
+                candidates.remove(job)
+                continue
 
-        while dispatched < available_slots and attempts < max_attempts:
-            job = dispatchable_jobs[job_idx % len(dispatchable_jobs)]
-            job_idx += 1
-            attempts += 1
+            # Peek at the next record and check it against the token budget.
+            try:
+                head = r.lindex(job.redis_queue_key, -1)
+                cost = record_costs(r, job, [head])[0] if head is not None else 0
+            except Exception as exc:
+                current_app.logger.exception(
+                    f"llm_orchestration.global_orchestration_step: Redis error reading queue head for job {job.uuid}",
+                    exc_info=exc,
+                )
+                candidates.remove(job)
+                continue
+
+            if head is None:
+                candidates.remove(job)  # this job's queue is empty
+                continue
+
+            if token_budget > 0 and not job.is_interactive:
+                if reserved:
+                    candidates.remove(job)
+                    continue
+                if inflight_tokens > 0 and inflight_tokens + cost > token_budget:
+                    try:
+                        waited = note_blocked(r, job)
+                    except Exception:
+                        waited = 0.0
+                    if waited >= max_bypass:
+                        current_app.logger.info(
+                            f"llm_orchestration.global_orchestration_step: record #{int(head)} of job {job.uuid} "
+                            f"(~{cost} tokens) has waited {waited:.0f}s for the token budget — holding back other bulk records"
+                        )
+                        reserved = True
+                    candidates.remove(job)
+                    continue
 
             # Atomically move record ID from pending queue to inflight list.
             try:
@@ -1594,13 +1713,26 @@ def register_llm_orchestration_tasks(celery):
                     f"llm_orchestration.global_orchestration_step: Redis RPOPLPUSH error for job {job.uuid}",
                     exc_info=exc,
                 )
+                candidates.remove(job)
                 continue
 
             if record_id_bytes is None:
-                continue  # this job's queue is empty; try the next
+                candidates.remove(job)
+                continue
 
             record_id = int(record_id_bytes)
 
+            # Charge the job's share class for this record, whatever the outcome of the dispatch.
+            key = share_key(job)
+            usage[key] = usage.get(key, 0.0) + cost
+            charged.add(key)
+            inflight_tokens += cost
+            if token_budget > 0:
+                try:
+                    clear_blocked(r, job)
+                except Exception:
+                    pass
+
             # ------- load and validate record -------
             try:
                 record: SubmissionRecord = db.session.query(SubmissionRecord).filter_by(id=record_id).first()
@@ -1688,12 +1820,19 @@ def register_llm_orchestration_tasks(celery):
                 delete_similarity_chunks(record_id)
 
             # ------- dispatch the analysis chain -------
+            record_dispatch(r, record_id)
             if job.similarity_only:
                 _dispatch_similarity_chain(celery, job.uuid, record_id)
             else:
                 _dispatch_analysis_chain(celery, job.uuid, record_id)
             dispatched += 1
 
+        if charged:
+            try:
+                save_fair_share(r, usage, charged)
+            except Exception as exc:
+                current_app.logger.warning(f"llm_orchestration.global_orchestration_step: could not save fair-share usage: {exc}")
+
     # ------------------------------------------------------------------
     # llm_watchdog
     # ------------------------------------------------------------------
@@ -0,0 +1,301 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+"""
+Admission policy for global_orchestration_step.
+
+The coordinator used to fill its OLLAMA_BATCH_SIZE slots round-robin across all active jobs, so that a single
+record submitted by a convenor could wait behind a global re-run of thousands of records. This module decides
+which job the next record is taken from, and whether it may be admitted at all:
+
+  1. Priority.  Every LLMOrchestrationJob carries a priority (bulk, normal, interactive).  A job is only served
+     when no job of higher priority has a record that can be admitted.
+
+  2. Weighted fair share.  Within a priority level, jobs are grouped into share classes (tenant, workload), where
+     the workload is the job scope, "similarity", or "interactive".  Each class accumulates the estimated token
+     cost of the records dispatched for it, decayed exponentially with half-life LLM_FAIR_SHARE_HALF_LIFE.  The
+     next record is taken from the class with the smallest decayed cost divided by its weight (the product of
+     its tenant weight and workload weight).  Within a class, older jobs are served first.
+
+  3. Fast lane.  Interactive jobs may use LLM_FAST_LANE_SLOTS slots above OLLAMA_BATCH_SIZE, and are not subject
+     to the token budget, so they are never blocked behind long-running bulk records.
+
+  4. Token-cost admission.  If LLM_INFLIGHT_TOKEN_BUDGET is set, a bulk record is admitted only if the estimated
+     token cost of all in-flight records plus its own cost fits within the budget.  A record that does not fit
+     may be overtaken by smaller records from other jobs for at most LLM_ADMISSION_MAX_BYPASS_SECONDS.  After
+     that, no further bulk records are admitted until it fits, so large reports are not starved.  One record is
+     always admitted when nothing is in flight.
+
+Record costs are estimated when a job is created and kept in a Redis hash per job (llm_cost:{uuid}).  The
+estimate is the word count from a previous analysis (SubmissionLanguageMetrics), or the page count, times the
+content token ratio learned for OLLAMA_MODEL.  Bulk jobs queue their records in increasing order of cost, so
+that short reports are not held up behind long ones, in bands that each span a factor of two in cost.  Within a
+band, records are grouped by grading rubric, so that consecutive map-phase calls share a byte-identical system
+prompt (see language_analysis._build_chunk_system_prompt), which the inference server can serve from its prompt
+cache.
+
+Fair-share usage and the bypass timestamps are best-effort state in Redis.  If they are lost the scheduler
+starts again from equal shares.
+"""
+
+import math
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+
+from ..database import db
+from ..models import LLMOrchestrationJob, ProjectClass, ProjectClassConfig, SubmissionPeriodRecord, SubmissionRecord
+from ..models.submissions import SubmissionLanguageMetrics
+from ..shared.token_budget import learned_token_ratios
+
+# Redis hash of decayed dispatched token cost per share class; field = share key, value = "cost|timestamp"
+FAIR_SHARE_KEY = "llm_orchestration:fair_share"
+
+# Redis hash of the time at which each job's head-of-queue record was first refused by the token budget
+ADMISSION_BLOCKED_KEY = "llm_orchestration:admission_blocked"
+
+# used when no size information is available for a record; a typical final-year report
+_DEFAULT_RECORD_WORDS = 8000
+
+# words per page of a typical report, used when only the page count is known
+_WORDS_PER_PAGE = 350
+
+# content tokens per word when no learned ratio is available; matches language_analysis._TOKENS_PER_WORD_CONTENT
+_DEFAULT_TOKENS_PER_WORD = 1.5
+
+# the workload weights in LLM_SCHEDULER_WORKLOAD_WEIGHTS are looked up with these keys
+WORKLOAD_INTERACTIVE = "interactive"
+WORKLOAD_SIMILARITY = "similarity"
+
+_DEFAULT_WORKLOAD_WEIGHTS = {
+    WORKLOAD_INTERACTIVE: 4.0,
+    LLMOrchestrationJob.SCOPE_PERIOD: 2.0,
+    LLMOrchestrationJob.SCOPE_PCLASS: 2.0,
+    LLMOrchestrationJob.SCOPE_CYCLE: 1.0,
+    LLMOrchestrationJob.SCOPE_GLOBAL: 1.0,
+    WORKLOAD_SIMILARITY: 1.0,
+}
+
+
+def job_workload(job: LLMOrchestrationJob) -> str:
+    """Return the workload label of *job* used for fair-share weighting."""
+    if job.priority is not None and job.priority >= LLMOrchestrationJob.PRIORITY_INTERACTIVE:
+        return WORKLOAD_INTERACTIVE
+    if job.similarity_only:
+        return WORKLOAD_SIMILARITY
+    return job.scope
+
+
+def share_key(job: LLMOrchestrationJob) -> str:
+    """Return the fair-share class of *job*: its tenant (or 'shared' for cross-tenant jobs) and workload."""
+    tenant = str(job.tenant_id) if job.tenant_id is not None else "shared"
+    return f"{tenant}|{job_workload(job)}"
+
+
+def share_weight(job: LLMOrchestrationJob) -> float:
+    """Return the fair-share weight of *job*: tenant weight × workload weight."""
+    workload_weights = current_app.config.get("LLM_SCHEDULER_WORKLOAD_WEIGHTS") or {}
+    tenant_weights = current_app.config.get("LLM_SCHEDULER_TENANT_WEIGHTS") or {}
+
+    workload = job_workload(job)
+    w_workload = float(workload_weights.get(workload, _DEFAULT_WORKLOAD_WEIGHTS.get(workload, 1.0)))
+    # tenant weights may have been read from JSON, in which case the keys are strings
+    w_tenant = float(tenant_weights.get(job.tenant_id, tenant_weights.get(str(job.tenant_id), 1.0)))
+
+    return max(1e-3, w_workload * w_tenant)
+
+
+# ---------------------------------------------------------------------------
+# Job creation: tenant and cost estimates
+# ---------------------------------------------------------------------------
+
+
+def records_tenant_id(record_ids: List[int]) -> Optional[int]:
+    """Return the tenant that owns every record in *record_ids*, or None if they span several tenants."""
+    if not record_ids:
+        return None
+
+    rows = (
+        db.session.query(ProjectClass.tenant_id)
+        .select_from(SubmissionRecord)
+        .join(SubmissionPeriodRecord, SubmissionPeriodRecord.id == SubmissionRecord.period_id)
+        .join(ProjectClassConfig, ProjectClassConfig.id == SubmissionPeriodRecord.config_id)
+        .join(ProjectClass, ProjectClass.id == ProjectClassConfig.pclass_id)
+        .filter(SubmissionRecord.id.in_(record_ids))
+        .distinct()
+        .all()
+    )
+    tenant_ids = {row[0] for row in rows}
+    return tenant_ids.pop() if len(tenant_ids) == 1 else None
+
+
+def _tokens_per_word() -> float:
+    model = current_app.config.get("OLLAMA_MODEL")
+    ratios = learned_token_ratios(model) if model else None
+    return ratios.content if ratios is not None else _DEFAULT_TOKENS_PER_WORD
+
+
+def estimate_record_costs(record_ids: List[int]) -> Dict[int, int]:
+    """
+    Return an estimate of the number of content tokens the pipeline will submit for each record in *record_ids*.
+    The metrics row of a previous analysis survives a clear-and-resubmit, so its word count is usually available.
+    """
+    if not record_ids:
+        return {}
+
+    words: Dict[int, float] = {}
+    rows = (
+        db.session.query(SubmissionLanguageMetrics.record_id, SubmissionLanguageMetrics.word_count, SubmissionLanguageMetrics.page_count)
+        .filter(SubmissionLanguageMetrics.record_id.in_(record_ids))
+        .all()
+    )
+    for record_id, word_count, page_count in rows:
+        if word_count:
+            words[record_id] = word_count
+        elif page_count:
+            words[record_id] = page_count * _WORDS_PER_PAGE
+
+    tokens_per_word = _tokens_per_word()
+    return {rid: int(math.ceil(words.get(rid, _DEFAULT_RECORD_WORDS) * tokens_per_word)) for rid in record_ids}
+
+
+def default_record_cost() -> int:
+    """Return the cost assumed for a record with no stored estimate."""
+    return int(math.ceil(_DEFAULT_RECORD_WORDS * _tokens_per_word()))
+
+
+def records_rubric_ids(record_ids: List[int]) -> Dict[int, Optional[int]]:
+    """Return the id of the grading rubric that applies to each record in *record_ids* (None if it has none)."""
+    if not record_ids:
+        return {}
+
+    rows = (
+        db.session.query(SubmissionRecord.id, ProjectClassConfig.grading_rubric_id)
+        .join(SubmissionPeriodRecord, SubmissionPeriodRecord.id == SubmissionRecord.period_id)
+        .join(ProjectClassConfig, ProjectClassConfig.id == SubmissionPeriodRecord.config_id)
+        .filter(SubmissionRecord.id.in_(record_ids))
+        .all()
+    )
+    return {record_id: rubric_id for record_id, rubric_id in rows}
+
+
+def queue_order(record_ids: List[int], costs: Dict[int, int], rubric_ids: Dict[int, Optional[int]]) -> List[int]:
+    """
+    Return *record_ids* in increasing order of estimated cost, grouped by rubric within cost bands.
+
+    Each band spans a factor of two in cost, and bands are queued cheapest first, so a report is never queued
+    behind one that costs twice as much or more.  Within a band, records are grouped by rubric (groups ordered by
+    their cheapest record, records by cost), so that consecutive records mostly share a cacheable prompt prefix.
+    The price of grouping is that shortest-first holds only between bands, not within them.
+    """
+    bands: Dict[int, Dict[Optional[int], List[int]]] = {}
+    for rid in sorted(record_ids, key=lambda rid: costs.get(rid, 0)):
+        band = max(costs.get(rid, 0), 1).bit_length()
+        bands.setdefault(band, {}).setdefault(rubric_ids.get(rid), []).append(rid)
+    return [rid for band in sorted(bands) for group in bands[band].values() for rid in group]
+
+
+# ---------------------------------------------------------------------------
+# Fair-share state
+# ---------------------------------------------------------------------------
+
+
+def _decay(cost: float, elapsed: float, half_life: float) -> float:
+    if elapsed <= 0 or half_life <= 0:
+        return cost
+    return cost * math.pow(0.5, elapsed / half_life)
+
+
+def load_fair_share(r, now: Optional[float] = None) -> Dict[str, float]:
+    """Return the decayed dispatched cost of every share class, as of *now*."""
+    now = time.time() if now is None else now
+    half_life = float(current_app.config.get("LLM_FAIR_SHARE_HALF_LIFE", 3600))
+
+    usage: Dict[str, float] = {}
+    for field, value in r.hgetall(FAIR_SHARE_KEY).items():
+        key = field.decode() if isinstance(field, bytes) else field
+        raw = value.decode() if isinstance(value, bytes) else value
+        try:
+            cost, stamp = raw.split("|", 1)
+            usage[key] = _decay(float(cost), now - float(stamp), half_life)
+        except ValueError:
+            continue
+    return usage
+
+
+def save_fair_share(r, usage: Dict[str, float], keys: Iterable[str], now: Optional[float] = None) -> None:
+    """Write back the decayed cost of the share classes in *keys*; negligible entries are dropped."""
+    now = time.time() if now is None else now
+    pipe = r.pipeline(transaction=False)
+    for key in keys:
+        cost = usage.get(key, 0.0)
+        if cost < 1.0:
+            pipe.hdel(FAIR_SHARE_KEY, key)
+        else:
+            pipe.hset(FAIR_SHARE_KEY, key, f"{cost:.1f}|{now:.3f}")
+    pipe.execute()
+
+
+def rank_jobs(jobs: List[LLMOrchestrationJob], usage: Dict[str, float]) -> List[LLMOrchestrationJob]:
+    """
+    Order *jobs* for service: highest priority first, then smallest weighted fair-share usage, then oldest job.
+    """
+
+    def _key(job: LLMOrchestrationJob) -> Tuple:
+        priority = job.priority if job.priority is not None else LLMOrchestrationJob.PRIORITY_NORMAL
+        created = job.created_at.timestamp() if job.created_at is not None else 0.0
+        return -priority, usage.get(share_key(job), 0.0) / share_weight(job), created, job.id
+
+    return sorted(jobs, key=_key)
+
+
+# ---------------------------------------------------------------------------
+# Token-cost admission
+# ---------------------------------------------------------------------------
+
+
+def record_costs(r, job: LLMOrchestrationJob, raw_ids: List) -> List[int]:
+    """Return the stored cost of each raw record ID in *raw_ids*, falling back to default_record_cost()."""
+    if not raw_ids:
+        return []
+    fallback = None
+    costs = []
+    for value in r.hmget(job.redis_cost_key, raw_ids):
+        if value is None:
+            if fallback is None:
+                fallback = default_record_cost()
+            costs.append(fallback)
+        else:
+            costs.append(int(value))
+    return costs
+
+
+def inflight_cost(r, jobs: List[LLMOrchestrationJob]) -> int:
+    """Return the total estimated cost of the records in flight for *jobs*."""
+    total = 0
+    for job in jobs:
+        total += sum(record_costs(r, job, r.lrange(job.redis_inflight_key, 0, -1)))
+    return total
+
+
+def note_blocked(r, job: LLMOrchestrationJob, now: Optional[float] = None) -> float:
+    """Record that the head of *job*'s queue was refused admission, and return for how long it has been refused."""
+    now = time.time() if now is None else now
+    r.hsetnx(ADMISSION_BLOCKED_KEY, job.uuid, f"{now:.3f}")
+    since = r.hget(ADMISSION_BLOCKED_KEY, job.uuid)
+    try:
+        return now - float(since)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def clear_blocked(r, job: LLMOrchestrationJob) -> None:
+    r.hdel(ADMISSION_BLOCKED_KEY, job.uuid)
@@ -62,7 +62,7 @@ from ..shared.asset_tools import (
 from ..shared.cloud_object_store import ObjectStore
 from ..shared.utils import get_count, get_current_year
 from ..shared.workflow_logging import log_db_commit
-from .thumbnails import dispatch_thumbnail_task
+from .thumbnails import dispatch_thumbnail_backfill
 
 
 def register_maintenance_tasks(celery):
@@ -1087,7 +1087,7 @@ def register_maintenance_tasks(celery):
     def thumbnail_maintenance(self):
         """
         Check all GeneratedAsset and SubmittedAsset records for missing or lost thumbnails,
-        and dispatch generate_thumbnails tasks as needed.
+        and dispatch batched generate_thumbnails_batch tasks as needed.
         """
         self.update_state(state=states.STARTED)
 
@@ -1109,6 +1109,8 @@ def register_maintenance_tasks(celery):
                     pass
             db.session.delete(thumbnail)
 
+        pending = []
+
         def _check_asset(asset) -> None:
             if asset.thumbnail_error:
                 return
@@ -1128,7 +1130,7 @@ def register_maintenance_tasks(celery):
                 needs_regeneration = True
 
             if needs_regeneration:
-                dispatch_thumbnail_task(asset)
+                pending.append((type(asset).__name__, asset.id))
 
         try:
             generated_assets = db.session.query(GeneratedAsset).all()
@@ -1150,4 +1152,7 @@ def register_maintenance_tasks(celery):
             current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
             raise self.retry()
 
+        # dispatch only after commit, so that batch workers see the cleared thumbnail references
+        dispatch_thumbnail_backfill(pending)
+
         self.update_state(state=states.SUCCESS)
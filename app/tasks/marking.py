@@ -19,8 +19,6 @@ from dateutil import parser
 from flask import current_app, url_for
 from pathvalidate import sanitize_filename
 from sqlalchemy.exc import SQLAlchemyError
-from weasyprint import CSS, HTML
-from weasyprint.text.fonts import FontConfiguration
 
 from ..database import db
 from ..models import (
@@ -63,7 +61,8 @@ from ..shared.asset_tools import (
     AssetCloudScratchContextManager,
     AssetUploadManager,
 )
-from ..shared.scratch import ScratchFileManager, ScratchGroupManager
+from ..shared.pdf_rendering import get_pdf_renderer
+from ..shared.scratch import ScratchGroupManager
 from ..shared.workflow_logging import log_db_commit
 from .shared.utils import report_error, report_info
 from .thumbnails import dispatch_thumbnail_task
@@ -1185,6 +1184,191 @@ def register_marking_tasks(celery):
     def markdown_filter(input):
         return markdown.markdown(input)
 
+    def _download_recipe_assets(recipe: FeedbackRecipe) -> ScratchGroupManager:
+        # We re-download each time because we don't know which worker will handle the task, but a batch task
+        # downloads once and shares the files between all the reports it renders
+        object_store = current_app.config.get("OBJECT_STORAGE_PROJECT")
+        mgr = ScratchGroupManager(folder=current_app.config.get("SCRATCH_FOLDER"))
+
+        try:
+            for asset in recipe.asset_list:
+                asset: FeedbackAsset
+                asset_storage: AssetCloudAdapter = AssetCloudAdapter(
+                    asset.asset,
+                    object_store,
+                    audit_data="generate_feedback_report.download_asset",
+                )
+                with asset_storage.download_to_scratch() as asset_scratch:
+                    mgr.copy(asset.label, asset_scratch.path)
+        except Exception:
+            mgr.cleanup()
+            raise
+
+        return mgr
+
+    def _raise_template_exception(msg: str):
+        raise ValueError(msg)
+
+    def _build_feedback_template(recipe: FeedbackRecipe, mgr: ScratchGroupManager) -> jinja2.Template:
+        # Template body is stored in the database — no file download needed.
+        # The environment holds everything that is common to every report rendered with this recipe;
+        # per-record variables are supplied by _feedback_template_context() at render time
+        template_body: str = recipe.template.template_body
+        template_env = jinja2.Environment(loader=jinja2.DictLoader({"template": template_body}))
+
+        # add markdown filter to template environment
+        template_env.filters["markdown"] = markdown_filter
+
+        # add path names for each downloaded supporting asset
+        for label, path in mgr.items():
+            template_env.globals[label] = path
+
+        template_env.globals["raise_exception"] = _raise_template_exception
+
+        return template_env.get_template("template")
+
+    def _feedback_template_context(cr: ConflationReport) -> Dict:
+        record: SubmissionRecord = cr.submission_record
+        sd: StudentData = record.owner.student
+        period: SubmissionPeriodRecord = record.period
+        config: ProjectClassConfig = period.config
+        event: MarkingEvent = cr.marking_event
+
+        # build workflow_data context variable, keyed by MarkingWorkflow.key
+        workflow_data = {}
+        for workflow in event.workflows:
+            if workflow.key is None:
+                continue
+            sr: SubmitterReport = workflow.submitter_reports.filter_by(record_id=record.id).first()
+            if sr is None:
+                continue
+            if sr.workflow_state == SubmitterReportWorkflowStates.DROPPED:
+                workflow_data[workflow.key] = {
+                    "grade": None,
+                    "grade_generated_by": None,
+                    "grade_generated_timestamp": None,
+                    "reports": [],
+                }
+                continue
+            reports = []
+            for mr in sr.marking_reports:
+                reports.append(
+                    {
+                        "name": mr.role.user.name if mr.role and mr.role.user else None,
+                        "role": mr.role,
+                        "grade": float(mr.grade) if mr.grade is not None else None,
+                        "report": mr.report,
+                        "feedback_positive": mr.feedback_positive,
+                        "feedback_improvement": mr.feedback_improvement,
+                        "feedback_timestamp": mr.feedback_timestamp.strftime("%Y/%m/%d %H:%M") if mr.feedback_timestamp else None,
+                    }
+                )
+            workflow_data[workflow.key] = {
+                "grade": float(sr.grade) if sr.grade is not None else None,
+                "grade_generated_by": sr.grade_generated_by.name if sr.grade_generated_by else None,
+                "grade_generated_timestamp": sr.grade_generated_timestamp.strftime("%Y/%m/%d %H:%M") if sr.grade_generated_timestamp else None,
+                "reports": reports,
+            }
+
+        return {
+            "student_user": sd.user,
+            "sd": sd,
+            "pclass": config.project_class,
+            "config": config,
+            "period": period,
+            "event": event,
+            "record": record,
+            "conflation_report": cr.conflation_report_as_dict,
+            "workflow_data": workflow_data,
+        }
+
+    def _store_feedback_report(
+        task_name: str,
+        cr: ConflationReport,
+        recipe: FeedbackRecipe,
+        convenor: Optional[User],
+        pdf_data: bytes,
+    ) -> None:
+        """
+        Upload a rendered feedback PDF, attach it to the ConflationReport, and commit.
+        Raises SQLAlchemyError if the database could not be updated; the caller is responsible for rolling back.
+        """
+        record: SubmissionRecord = cr.submission_record
+        sd: StudentData = record.owner.student
+        student: User = sd.user
+        period: SubmissionPeriodRecord = record.period
+        config: ProjectClassConfig = period.config
+        pclass: ProjectClass = config.project_class
+
+        target_name = sanitize_filename(f"Feedback-{config.year}-{config.abbreviation}-{student.last_name}.pdf")
+        license = db.session.query(AssetLicense).filter_by(abbreviation="Work").first()
+
+        new_asset = GeneratedAsset(
+            timestamp=datetime.now(),
+            expiry=None,
+            parent_asset_id=None,
+            target_name=target_name,
+            license=license,
+        )
+        db.session.add(new_asset)
+
+        feedback_store = current_app.config.get("OBJECT_STORAGE_FEEDBACK")
+        with AssetUploadManager(
+            new_asset,
+            data=BytesIO(pdf_data),
+            storage=feedback_store,
+            audit_data=f"generate_feedback_report ({config.abbreviation}, {student.name})",
+            length=len(pdf_data),
+            mimetype="application/pdf",
+        ) as upload_mgr:
+            pass
+
+        db.session.flush()
+
+        dispatch_thumbnail_task(new_asset)
+
+        new_report = FeedbackReport(
+            asset=new_asset,
+            generated_id=convenor.id if convenor is not None else None,
+            timestamp=datetime.now(),
+        )
+        db.session.add(new_report)
+        db.session.flush()
+
+        # attach to the ConflationReport
+        # it may also later be attached to the SubmissionRecord (for document manager) after pushing to the student
+        cr.feedback_reports.append(new_report)
+        cr.feedback_sent = False
+        cr.feedback_push_id = None
+        cr.feedback_push_timestamp = None
+        # record which recipe was used and clear the in-progress marker
+        cr.recipe = recipe.label
+        cr.feedback_celery_id = None
+        cr.feedback_generation_failed = False
+
+        new_asset.grant_user(student)
+        for role in record.supervisor_roles:
+            new_asset.grant_user(role.user)
+        for role in record.marker_roles:
+            new_asset.grant_user(role.user)
+        for role in record.moderator_roles:
+            new_asset.grant_user(role.user)
+
+        if convenor is not None:
+            new_asset.grant_user(convenor)
+
+        project: LiveProject = record.project
+        if project is not None and project.owner is not None:
+            new_asset.grant_user(project.owner.user)
+
+        log_db_commit(
+            f"Saved generated feedback report PDF for {student.name} ({pclass.name}, {period.display_name})",
+            user=convenor,
+            student=sd,
+            project_classes=pclass,
+            endpoint=task_name,
+        )
+
     @celery.task(bind=True, serializer="pickle", default_retry_delay=30)
     def generate_feedback_report(self, conflation_report_id: int, recipe_id: int, convenor_id: Optional[int]):
         """
@@ -1257,6 +1441,13 @@ def register_marking_tasks(celery):
               ...
           }
 
+        FONTS AND EXTERNAL RESOURCES
+        ============================
+        The HTML is rendered by the worker's shared PDFRenderer (app/shared/pdf_rendering.py).
+        Font families are resolved from the font files in FEEDBACK_PDF_FONT_FOLDER, then from
+        fonts installed on the system.  Web font services and other http(s) resources are not
+        fetched unless FEEDBACK_PDF_ALLOW_NETWORK is set, so templates should not depend on them.
+
         ABORT PROTOCOL
         ==============
         The template may raise any Exception to signal that it cannot produce a
@@ -1272,10 +1463,12 @@ def register_marking_tasks(celery):
         MAINTENANCE NOTE FOR FUTURE AGENTS
         ===================================
         This docstring is the authoritative reference for the template contract.
-        It must be kept in sync with the environment-building code below whenever:
-          - a new variable is added to or removed from template_env.globals
+        It must be kept in sync with _build_feedback_template() and
+        _feedback_template_context() whenever:
+          - a new variable is added to or removed from the template environment
           - the structure of conflation_report or workflow_data changes
           - the abort protocol changes
+        generate_feedback_reports_batch() uses the same contract.
         """
         try:
             cr: ConflationReport = db.session.query(ConflationReport).filter_by(id=conflation_report_id).first()
@@ -1321,102 +1514,79 @@ def register_marking_tasks(celery):
                 current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
                 raise self.retry()
 
-        record: SubmissionRecord = cr.submission_record
-        submitter: SubmittingStudent = record.owner
-        sd: StudentData = submitter.student
-        student: User = sd.user
-        period: SubmissionPeriodRecord = record.period
-        config: ProjectClassConfig = period.config
-        pclass: ProjectClass = config.project_class
-        event: MarkingEvent = cr.marking_event
-
         # Download supporting assets needed by the recipe.
-        # We re-download each time because we don't know which worker will handle this task.
-        object_store = current_app.config.get("OBJECT_STORAGE_PROJECT")
-        mgr = ScratchGroupManager(folder=current_app.config.get("SCRATCH_FOLDER"))
+        mgr = _download_recipe_assets(recipe)
 
-        for asset in recipe.asset_list:
-            asset: FeedbackAsset
-            asset_storage: AssetCloudAdapter = AssetCloudAdapter(
-                asset.asset,
-                object_store,
-                audit_data="generate_feedback_report.download_asset",
-            )
-            with asset_storage.download_to_scratch() as asset_scratch:
-                mgr.copy(asset.label, asset_scratch.path)
+        try:
+            template = _build_feedback_template(recipe, mgr)
+            try:
+                output = template.render(**_feedback_template_context(cr))
+            except Exception as e:
+                current_app.logger.warning(f"generate_feedback_report: template raised exception for ConflationReport #{conflation_report_id}: {e}")
+                cr.feedback_generation_failed = True
+                cr.feedback_celery_id = None
+                try:
+                    db.session.commit()
+                except SQLAlchemyError as db_e:
+                    db.session.rollback()
+                    current_app.logger.exception("SQLAlchemyError exception", exc_info=db_e)
+                    raise self.retry()
+                return {"generated": 0}
 
-        # Template body is stored in the database — no file download needed
-        template_body: str = recipe.template.template_body
-        template_env = jinja2.Environment(loader=jinja2.DictLoader({"template": template_body}))
+            pdf_data: bytes = get_pdf_renderer().render(output)
 
-        # add basic data
-        template_env.globals["student_user"] = student
-        template_env.globals["sd"] = sd
-        template_env.globals["pclass"] = pclass
-        template_env.globals["config"] = config
-        template_env.globals["period"] = period
-        template_env.globals["event"] = event
-        template_env.globals["record"] = record
+            try:
+                _store_feedback_report(self.name, cr, recipe, convenor, pdf_data)
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+                raise self.retry()
 
-        # add markdown filter to template environment
-        template_env.filters["markdown"] = markdown_filter
+        finally:
+            # remove downloaded files from the scratch folder
+            mgr.cleanup()
 
-        # add path names for each downloaded supporting asset
-        for label, path in mgr.items():
-            template_env.globals[label] = path
+        return {"generated": 1}
 
-        # build conflation_report context variable
-        conflation_data = cr.conflation_report_as_dict
+    @celery.task(bind=True, serializer="pickle", default_retry_delay=30)
+    def generate_feedback_reports_batch(self, conflation_report_ids: List[int], recipe_id: int, convenor_id: Optional[int]):
+        """
+        Render feedback PDFs for several ConflationReports that share a recipe, in a single task.
 
-        # build workflow_data context variable, keyed by MarkingWorkflow.key
-        workflow_data = {}
-        for workflow in event.workflows:
-            if workflow.key is None:
-                continue
-            sr: SubmitterReport = workflow.submitter_reports.filter_by(record_id=record.id).first()
-            if sr is None:
-                continue
-            if sr.workflow_state == SubmitterReportWorkflowStates.DROPPED:
-                workflow_data[workflow.key] = {
-                    "grade": None,
-                    "grade_generated_by": None,
-                    "grade_generated_timestamp": None,
-                    "reports": [],
-                }
-                continue
-            reports = []
-            for mr in sr.marking_reports:
-                reports.append(
-                    {
-                        "name": mr.role.user.name if mr.role and mr.role.user else None,
-                        "role": mr.role,
-                        "grade": float(mr.grade) if mr.grade is not None else None,
-                        "report": mr.report,
-                        "feedback_positive": mr.feedback_positive,
-                        "feedback_improvement": mr.feedback_improvement,
-                        "feedback_timestamp": mr.feedback_timestamp.strftime("%Y/%m/%d %H:%M") if mr.feedback_timestamp else None,
-                    }
-                )
-            workflow_data[workflow.key] = {
-                "grade": float(sr.grade) if sr.grade is not None else None,
-                "grade_generated_by": sr.grade_generated_by.name if sr.grade_generated_by else None,
-                "grade_generated_timestamp": sr.grade_generated_timestamp.strftime("%Y/%m/%d %H:%M") if sr.grade_generated_timestamp else None,
-                "reports": reports,
-            }
+        The recipe assets are downloaded once, the Jinja2 template is compiled once, and every report is
+        rendered by the same warm PDFRenderer. The template contract is the same as for generate_feedback_report().
 
-        template_env.globals["conflation_report"] = conflation_data
-        template_env.globals["workflow_data"] = workflow_data
+        A report whose template aborts, or which fails to render, is marked with feedback_generation_failed and
+        the batch continues with the next report. Reports that already have a feedback PDF are skipped, so the
+        task can safely be retried after a database error.
 
-        def _raise(msg: str):
-            raise ValueError(msg)
+        Returns a dict with the number of reports generated and ignored, and the ids of reports that failed.
+        """
+        try:
+            recipe: FeedbackRecipe = db.session.query(FeedbackRecipe).filter_by(id=recipe_id).first()
+        except SQLAlchemyError as e:
+            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+            raise self.retry()
 
-        template_env.globals["raise_exception"] = _raise
+        if recipe is None:
+            msg = "Could not load recipe record from database"
+            current_app.logger.error(msg)
+            raise Exception(msg)
 
-        template = template_env.get_template("template")
-        try:
-            output = template.render()
-        except Exception as e:
-            current_app.logger.warning(f"generate_feedback_report: template raised exception for ConflationReport #{conflation_report_id}: {e}")
+        convenor: Optional[User] = None
+        if convenor_id is not None:
+            try:
+                convenor = db.session.query(User).filter_by(id=convenor_id).first()
+            except SQLAlchemyError as e:
+                current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+                raise self.retry()
+
+        generated = 0
+        ignored = 0
+        failed: List[int] = []
+
+        def _mark_failed(cr: ConflationReport):
+            failed.append(cr.id)
             cr.feedback_generation_failed = True
             cr.feedback_celery_id = None
             try:
@@ -1425,116 +1595,64 @@ def register_marking_tasks(celery):
                 db.session.rollback()
                 current_app.logger.exception("SQLAlchemyError exception", exc_info=db_e)
                 raise self.retry()
-            mgr.cleanup()
-            return {"generated": 0}
-
-        with ScratchFileManager(suffix=".html") as html_mgr:
-            HTML_file = open(html_mgr.path, "w")
-            HTML_file.write(output)
-            HTML_file.close()
-
-            with ScratchFileManager(suffix=".pdf") as pdf_mgr:
-                font_config = FontConfiguration()
-                sheet = CSS(
-                    string="",  # no body rule needed; the template handles fonts
-                    font_config=font_config,
-                )
-                HTML(filename=html_mgr.path, base_url=".").write_pdf(
-                    pdf_mgr.path,
-                    stylesheets=[
-                        "https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700"
-                        "&family=Libre+Baskerville:ital,wght@0,400;0,700;1,400&display=swap",
-                        sheet,
-                    ],
-                    font_config=font_config,
-                )
-                target_name = sanitize_filename(f"Feedback-{config.year}-{config.abbreviation}-{student.last_name}.pdf")
-                license = db.session.query(AssetLicense).filter_by(abbreviation="Work").first()
-
-                new_asset = GeneratedAsset(
-                    timestamp=datetime.now(),
-                    expiry=None,
-                    parent_asset_id=None,
-                    target_name=target_name,
-                    license=license,
-                )
-                db.session.add(new_asset)
-
-                feedback_store = current_app.config.get("OBJECT_STORAGE_FEEDBACK")
-                with open(pdf_mgr.path, "rb") as f:
-                    with AssetUploadManager(
-                        new_asset,
-                        data=BytesIO(f.read()),
-                        storage=feedback_store,
-                        audit_data=f"generate_feedback_report ({config.abbreviation}, {student.name})",
-                        length=pdf_mgr.path.stat().st_size,
-                        mimetype="application/pdf",
-                    ) as upload_mgr:
-                        pass
 
+        mgr = _download_recipe_assets(recipe)
+
+        try:
+            template = _build_feedback_template(recipe, mgr)
+            renderer = get_pdf_renderer()
+
+            for cr_id in conflation_report_ids:
                 try:
-                    db.session.flush()
+                    cr: ConflationReport = db.session.query(ConflationReport).filter_by(id=cr_id).first()
                 except SQLAlchemyError as e:
-                    db.session.rollback()
                     current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
                     raise self.retry()
 
-                dispatch_thumbnail_task(new_asset)
+                if cr is None:
+                    current_app.logger.error(f"generate_feedback_reports_batch: could not load ConflationReport id={cr_id} from database")
+                    failed.append(cr_id)
+                    continue
 
-                new_report = FeedbackReport(
-                    asset=new_asset,
-                    generated_id=convenor_id,
-                    timestamp=datetime.now(),
-                )
-                db.session.add(new_report)
+                # idempotency: if feedback reports already exist, skip
+                if cr.feedback_reports.count() > 0:
+                    ignored += 1
+                    continue
 
+                cr.feedback_celery_id = self.request.id
+                cr.feedback_generation_failed = False
                 try:
-                    db.session.flush()
+                    db.session.commit()
                 except SQLAlchemyError as e:
                     db.session.rollback()
                     current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
                     raise self.retry()
 
-                # attach to the ConflationReport
-                # it may also later be attached to the SubmissionRecord (for document manager) after pushing to the student
-                cr.feedback_reports.append(new_report)
-                cr.feedback_sent = False
-                cr.feedback_push_id = None
-                cr.feedback_push_timestamp = None
-                # record which recipe was used and clear the in-progress marker
-                cr.recipe = recipe.label
-                cr.feedback_celery_id = None
-                cr.feedback_generation_failed = False
-
-                new_asset.grant_user(student)
-                for role in record.supervisor_roles:
-                    new_asset.grant_user(role.user)
-                for role in record.marker_roles:
-                    new_asset.grant_user(role.user)
-                for role in record.moderator_roles:
-                    new_asset.grant_user(role.user)
-
-                if convenor is not None:
-                    new_asset.grant_user(convenor)
+                try:
+                    output = template.render(**_feedback_template_context(cr))
+                except Exception as e:
+                    current_app.logger.warning(f"generate_feedback_reports_batch: template raised exception for ConflationReport #{cr_id}: {e}")
+                    _mark_failed(cr)
+                    continue
 
-                project: LiveProject = record.project
-                if project is not None and project.owner is not None:
-                    new_asset.grant_user(project.owner.user)
+                try:
+                    pdf_data: bytes = renderer.render(output)
+                except Exception as e:
+                    current_app.logger.exception(f"generate_feedback_reports_batch: could not render PDF for ConflationReport #{cr_id}", exc_info=e)
+                    _mark_failed(cr)
+                    continue
 
                 try:
-                    log_db_commit(
-                        f"Saved generated feedback report PDF for {student.name} ({pclass.name}, {period.display_name})",
-                        user=convenor,
-                        student=sd,
-                        project_classes=pclass,
-                        endpoint=self.name,
-                    )
+                    _store_feedback_report(self.name, cr, recipe, convenor, pdf_data)
                 except SQLAlchemyError as e:
                     db.session.rollback()
                     current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
                     raise self.retry()
 
-        # remove downloaded files from the scratch folder
-        mgr.cleanup()
+                generated += 1
 
-        return {"generated": 1}
+        finally:
+            # remove downloaded files from the scratch folder
+            mgr.cleanup()
+
+        return {"generated": generated, "ignored": ignored, "failed": failed}
@@ -20,7 +20,6 @@ GeneratedAsset + DownloadCentreItem, and the requesting user is notified.
 """
 
 from datetime import datetime, timedelta
-from io import BytesIO
 
 from flask import current_app, render_template_string
 from sqlalchemy.exc import SQLAlchemyError
@@ -43,7 +42,7 @@ from ..models.markingevent import (
     SubmitterReportWorkflowStates,
 )
 from ..shared.asset_tools import AssetUploadManager
-from ..shared.excel import _normalize_excel_sheet_name
+from ..shared.excel import StreamingWorkbook
 from ..shared.scratch import ScratchFileManager
 from ..shared.workflow_logging import log_db_commit
 from ..task_queue import progress_update
@@ -66,16 +65,15 @@ def _make_asset(source_path, target_name, now, expiry, object_store, user):
         license_id=None,
     )
     size = source_path.stat().st_size
-    with open(source_path, "rb") as fh:
-        with AssetUploadManager(
-            asset,
-            data=BytesIO(fh.read()),
-            storage=object_store,
-            audit_data="marking_export.generate_marking_excel_report",
-            length=size,
-            mimetype=("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
-        ):
-            pass
+    with AssetUploadManager(
+        asset,
+        data=source_path.read_bytes(),
+        storage=object_store,
+        audit_data="marking_export.generate_marking_excel_report",
+        length=size,
+        mimetype=("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    ):
+        pass
     asset.grant_user(user)
     db.session.add(asset)
     db.session.flush()
@@ -83,6 +81,51 @@ def _make_asset(source_path, target_name, now, expiry, object_store, user):
     return asset
 
 
+def _overview_columns(target_names, workflows):
+    """Column headers for the overview sheet, in the order the rows populate them."""
+    columns = ["Student", "Exam Number", "Generated By", "Generated At", "Is Stale", "Feedback Sent"]
+    columns.extend(f"Target: {t}" for t in target_names)
+    columns.extend(f"{wf.name}: Grade" for wf in workflows)
+
+    # workflows sharing a name share columns, as they would in a DataFrame built from the row dicts
+    return list(dict.fromkeys(columns))
+
+
+def _register_columns(workflows, wf_max_mr):
+    """Column headers for the register sheet, in the order the rows populate them."""
+    columns = ["Student", "Exam Number"]
+
+    for wf in workflows:
+        pfx = wf.name
+        columns.extend(
+            [
+                f"{pfx}: Grade",
+                f"{pfx}: Grade Generated By",
+                f"{pfx}: Grade Generated At",
+                f"{pfx}: Completed At",
+                f"{pfx}: Signed Off By",
+                f"{pfx}: Signed Off At",
+            ]
+        )
+
+        for i in range(wf_max_mr[wf.id]):
+            n = i + 1
+            columns.extend(
+                [
+                    f"{pfx}: Assessor {n} Grade",
+                    f"{pfx}: Assessor {n} Name",
+                    f"{pfx}: Assessor {n} Submitted At",
+                    f"{pfx}: Assessor {n} Signed Off By",
+                    f"{pfx}: Assessor {n} Signed Off At",
+                    f"{pfx}: Assessor {n} Feedback Submitted",
+                ]
+            )
+
+        columns.extend([f"{pfx}: Accepted Moderator Grade", f"{pfx}: Accepted Moderator"])
+
+    return list(dict.fromkeys(columns))
+
+
 def register_marking_export_tasks(celery):
 
     @celery.task(bind=True, default_retry_delay=30)
@@ -129,8 +172,6 @@ def register_marking_export_tasks(celery):
         progress_update(task_id, TaskRecord.RUNNING, 15, "Building export data...", autocommit=True)
 
         try:
-            import pandas as pd
-
             config = event.config
             abbr = getattr(config, "abbreviation", None) or "MKG"
             label = f"{abbr}_{event.name}"
@@ -185,131 +226,125 @@ def register_marking_export_tasks(celery):
             )
 
             # ----------------------------------------------------------------
-            # Sheet 1: Overview (ConflationReports) — only if conflation done
-            # ----------------------------------------------------------------
-            has_conflation = event.conflation_reports.count() > 0
-            overview_rows = []
-
-            if has_conflation:
-                target_names = list(event.targets_as_dict.keys())
-                cr_lookup = {cr.submission_record_id: cr for cr in event.conflation_reports}
-
-                for record in records:
-                    cr: ConflationReport = cr_lookup.get(record.id)
-                    student_user = record.owner.student.user
-                    exam_number = record.owner.student.exam_number
-
-                    cr_data = cr.conflation_report_as_dict if cr else {}
-
-                    row = {
-                        "Student": student_user.name,
-                        "Exam Number": exam_number if exam_number is not None else "",
-                        "Generated By": cr.generated_by.name if cr and cr.generated_by else "",
-                        "Generated At": (cr.generated_timestamp.strftime("%Y-%m-%d %H:%M") if cr and cr.generated_timestamp else ""),
-                        "Is Stale": cr.is_stale if cr else "",
-                        "Feedback Sent": cr.feedback_sent if cr else "",
-                    }
-
-                    for t in target_names:
-                        row[f"Target: {t}"] = cr_data.get(t)
-
-                    for wf in workflows:
-                        sr = sr_lookup.get((wf.id, record.id))
-                        row[f"{wf.name}: Grade"] = float(sr.grade) if sr and sr.grade is not None else None
-
-                    overview_rows.append(row)
-
-            progress_update(
-                task_id,
-                TaskRecord.RUNNING,
-                50,
-                "Building register sheet...",
-                autocommit=True,
-            )
-
-            # ----------------------------------------------------------------
-            # Sheet 2: Register (all workflows side-by-side)
-            # ----------------------------------------------------------------
-            register_rows = []
-
-            for record in records:
-                student_data = record.owner.student
-                student_user = student_data.user
-
-                row = {
-                    "Student": student_user.name,
-                    "Exam Number": (student_data.exam_number if student_data.exam_number is not None else ""),
-                }
-
-                for wf in workflows:
-                    sr: SubmitterReport = sr_lookup.get((wf.id, record.id))
-                    pfx = wf.name
-
-                    row[f"{pfx}: Grade"] = float(sr.grade) if sr and sr.grade is not None else None
-                    row[f"{pfx}: Grade Generated By"] = sr.grade_generated_by.name if sr and sr.grade_generated_by else ""
-                    row[f"{pfx}: Grade Generated At"] = (
-                        sr.grade_generated_timestamp.strftime("%Y-%m-%d %H:%M") if sr and sr.grade_generated_timestamp else ""
-                    )
-                    row[f"{pfx}: Completed At"] = sr.completed_timestamp.strftime("%Y-%m-%d %H:%M") if sr and sr.completed_timestamp else ""
-                    row[f"{pfx}: Signed Off By"] = sr.signed_off_by.name if sr and sr.signed_off_by else ""
-                    row[f"{pfx}: Signed Off At"] = sr.signed_off_timestamp.strftime("%Y-%m-%d %H:%M") if sr and sr.signed_off_timestamp else ""
-
-                    mrs = mr_lookup.get(sr.id, []) if sr else []
-                    max_mr = wf_max_mr[wf.id]
-
-                    for i in range(max_mr):
-                        mr: MarkingReport = mrs[i] if i < len(mrs) else None
-                        n = i + 1
-                        row[f"{pfx}: Assessor {n} Grade"] = float(mr.grade) if mr and mr.grade is not None else None
-                        row[f"{pfx}: Assessor {n} Name"] = mr.role.user.name if mr and mr.role and mr.role.user else ""
-                        row[f"{pfx}: Assessor {n} Submitted At"] = (
-                            mr.grade_submitted_timestamp.strftime("%Y-%m-%d %H:%M") if mr and mr.grade_submitted_timestamp else ""
-                        )
-                        row[f"{pfx}: Assessor {n} Signed Off By"] = (
-                            mr.signed_off_by.user.name if mr and mr.signed_off_by and mr.signed_off_by.user else ""
-                        )
-                        row[f"{pfx}: Assessor {n} Signed Off At"] = (
-                            mr.signed_off_timestamp.strftime("%Y-%m-%d %H:%M") if mr and mr.signed_off_timestamp else ""
-                        )
-                        row[f"{pfx}: Assessor {n} Feedback Submitted"] = mr.feedback_submitted if mr else ""
-
-                    # Accepted moderator report (if any)
-                    mod_report = sr.accepted_moderator_report if sr else None
-                    row[f"{pfx}: Accepted Moderator Grade"] = float(mod_report.grade) if mod_report and mod_report.grade is not None else None
-                    row[f"{pfx}: Accepted Moderator"] = mod_report.role.user.name if mod_report and mod_report.role and mod_report.role.user else ""
-
-                register_rows.append(row)
-
-            progress_update(
-                task_id,
-                TaskRecord.RUNNING,
-                70,
-                "Writing Excel workbook...",
-                autocommit=True,
-            )
-
-            # ----------------------------------------------------------------
-            # Write workbook and upload
+            # Write workbook and upload. Rows are streamed to a scratch file
+            # as they are built, so neither sheet is held in memory.
             # ----------------------------------------------------------------
             now = datetime.now()
             expiry = now + timedelta(weeks=4)
             object_store = current_app.config.get("OBJECT_STORAGE_ASSETS")
             stem = f"Marking_{label}_{now.strftime('%Y-%m-%d_%H-%M-%S')}"
 
+            has_conflation = event.conflation_reports.count() > 0
+
             with ScratchFileManager(suffix=".xlsx") as mgr:
-                with pd.ExcelWriter(mgr.path, engine="openpyxl") as writer:
-                    if has_conflation and overview_rows:
-                        pd.DataFrame(overview_rows).to_excel(
-                            writer,
-                            sheet_name=_normalize_excel_sheet_name(f"{label}_overview"),
-                            index=False,
-                        )
-                    pd.DataFrame(register_rows).to_excel(
-                        writer,
-                        sheet_name=_normalize_excel_sheet_name(f"{label}_register"),
-                        index=False,
+                with StreamingWorkbook(mgr.path) as book:
+                    # ----------------------------------------------------------------
+                    # Sheet 1: Overview (ConflationReports) — only if conflation done
+                    # ----------------------------------------------------------------
+                    if has_conflation and records:
+                        target_names = list(event.targets_as_dict.keys())
+                        cr_lookup = {cr.submission_record_id: cr for cr in event.conflation_reports}
+
+                        overview = book.add_sheet(label, _overview_columns(target_names, workflows), suffix="_overview")
+
+                        for record in records:
+                            cr: ConflationReport = cr_lookup.get(record.id)
+                            student_user = record.owner.student.user
+                            exam_number = record.owner.student.exam_number
+
+                            cr_data = cr.conflation_report_as_dict if cr else {}
+
+                            row = {
+                                "Student": student_user.name,
+                                "Exam Number": exam_number if exam_number is not None else "",
+                                "Generated By": cr.generated_by.name if cr and cr.generated_by else "",
+                                "Generated At": (cr.generated_timestamp.strftime("%Y-%m-%d %H:%M") if cr and cr.generated_timestamp else ""),
+                                "Is Stale": cr.is_stale if cr else "",
+                                "Feedback Sent": cr.feedback_sent if cr else "",
+                            }
+
+                            for t in target_names:
+                                row[f"Target: {t}"] = cr_data.get(t)
+
+                            for wf in workflows:
+                                sr = sr_lookup.get((wf.id, record.id))
+                                row[f"{wf.name}: Grade"] = float(sr.grade) if sr and sr.grade is not None else None
+
+                            overview.append_dict(row)
+
+                    progress_update(
+                        task_id,
+                        TaskRecord.RUNNING,
+                        50,
+                        "Building register sheet...",
+                        autocommit=True,
                     )
 
+                    # ----------------------------------------------------------------
+                    # Sheet 2: Register (all workflows side-by-side)
+                    # ----------------------------------------------------------------
+                    register = book.add_sheet(label, _register_columns(workflows, wf_max_mr), suffix="_register")
+
+                    for record in records:
+                        student_data = record.owner.student
+                        student_user = student_data.user
+
+                        row = {
+                            "Student": student_user.name,
+                            "Exam Number": (student_data.exam_number if student_data.exam_number is not None else ""),
+                        }
+
+                        for wf in workflows:
+                            sr: SubmitterReport = sr_lookup.get((wf.id, record.id))
+                            pfx = wf.name
+
+                            row[f"{pfx}: Grade"] = float(sr.grade) if sr and sr.grade is not None else None
+                            row[f"{pfx}: Grade Generated By"] = sr.grade_generated_by.name if sr and sr.grade_generated_by else ""
+                            row[f"{pfx}: Grade Generated At"] = (
+                                sr.grade_generated_timestamp.strftime("%Y-%m-%d %H:%M") if sr and sr.grade_generated_timestamp else ""
+                            )
+                            row[f"{pfx}: Completed At"] = sr.completed_timestamp.strftime("%Y-%m-%d %H:%M") if sr and sr.completed_timestamp else ""
+                            row[f"{pfx}: Signed Off By"] = sr.signed_off_by.name if sr and sr.signed_off_by else ""
+                            row[f"{pfx}: Signed Off At"] = (
+                                sr.signed_off_timestamp.strftime("%Y-%m-%d %H:%M") if sr and sr.signed_off_timestamp else ""
+                            )
+
+                            mrs = mr_lookup.get(sr.id, []) if sr else []
+                            max_mr = wf_max_mr[wf.id]
+
+                            for i in range(max_mr):
+                                mr: MarkingReport = mrs[i] if i < len(mrs) else None
+                                n = i + 1
+                                row[f"{pfx}: Assessor {n} Grade"] = float(mr.grade) if mr and mr.grade is not None else None
+                                row[f"{pfx}: Assessor {n} Name"] = mr.role.user.name if mr and mr.role and mr.role.user else ""
+                                row[f"{pfx}: Assessor {n} Submitted At"] = (
+                                    mr.grade_submitted_timestamp.strftime("%Y-%m-%d %H:%M") if mr and mr.grade_submitted_timestamp else ""
+                                )
+                                row[f"{pfx}: Assessor {n} Signed Off By"] = (
+                                    mr.signed_off_by.user.name if mr and mr.signed_off_by and mr.signed_off_by.user else ""
+                                )
+                                row[f"{pfx}: Assessor {n} Signed Off At"] = (
+                                    mr.signed_off_timestamp.strftime("%Y-%m-%d %H:%M") if mr and mr.signed_off_timestamp else ""
+                                )
+                                row[f"{pfx}: Assessor {n} Feedback Submitted"] = mr.feedback_submitted if mr else ""
+
+                            # Accepted moderator report (if any)
+                            mod_report = sr.accepted_moderator_report if sr else None
+                            row[f"{pfx}: Accepted Moderator Grade"] = float(mod_report.grade) if mod_report and mod_report.grade is not None else None
+                            row[f"{pfx}: Accepted Moderator"] = (
+                                mod_report.role.user.name if mod_report and mod_report.role and mod_report.role.user else ""
+                            )
+
+                        register.append_dict(row)
+
+                progress_update(
+                    task_id,
+                    TaskRecord.RUNNING,
+                    70,
+                    "Uploading Excel workbook...",
+                    autocommit=True,
+                )
+
                 asset = _make_asset(mgr.path, stem, now, expiry, object_store, user)
 
             download_item = DownloadCentreItem._build(
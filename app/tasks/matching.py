@@ -20,9 +20,9 @@ import pulp
 import pulp.apis as pulp_apis
 from celery import chain, group
 from flask import current_app, render_template_string
-from pandas import DataFrame
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, func, or_
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload
 
 from ..database import db
 from ..models import (
@@ -55,9 +55,9 @@ from ..models import (
     User,
 )
 from ..shared.asset_tools import AssetCloudAdapter, AssetUploadManager, encode_nonce
-from ..shared.excel import _normalize_excel_sheet_name
+from ..shared.excel import StreamingWorkbook
 from ..shared.scratch import ScratchFileManager
-from ..shared.sqlalchemy import get_count
+from ..shared.sqlalchemy import get_count, iterate_in_batches
 from ..shared.timer import Timer
 from ..shared.utils import get_current_year
 from ..shared.workflow_logging import log_db_commit
@@ -5099,16 +5099,15 @@ def register_matching_tasks(celery):
 
             size = source_path.stat().st_size
 
-            with open(source_path, "rb") as f:
-                with AssetUploadManager(
-                    asset,
-                    data=BytesIO(f.read()),
-                    storage=object_store,
-                    audit_data=f"matching._export_matching_as_excel (matching attempt #{record.id})",
-                    length=size,
-                    mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                ) as upload_mgr:
-                    pass
+            with AssetUploadManager(
+                asset,
+                data=source_path.read_bytes(),
+                storage=object_store,
+                audit_data=f"matching._export_matching_as_excel (matching attempt #{record.id})",
+                length=size,
+                mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            ) as upload_mgr:
+                pass
 
             asset.grant_user(user)
             db.session.add(asset)
@@ -5126,83 +5125,136 @@ def register_matching_tasks(celery):
 
             return asset
 
-        with ScratchFileManager(suffix=".xlsx") as mgr:
-            records = []
-
-            for item in record.records:
-                item: MatchingRecord
-                sel: SelectingStudent = item.selector
-                sd: StudentData = sel.student
-                su: User = sd.user
-                programme: DegreeProgramme = sd.programme
-                proj: LiveProject = item.project
-                group: ResearchGroup = None if proj is None else proj.group
-                config: ProjectClassConfig = sel.config
-                ofd: FacultyData = proj.owner
-                ou: User = None if ofd is None else ofd.user
-
-                data = {
-                    "selector_last": su.last_name,
-                    "selector_first": su.first_name,
-                    "selector_full_name": su.name,
-                    "selector_email": su.email,
-                    "programme": programme.short_name,
-                    "project_class": config.abbreviation,
-                    "submission_period": item.submission_period,
-                    "cohort": sd.cohort,
-                    "academic_year": sd.academic_year,
-                    "intermitting": sd.intermitting,
-                    "bookmarks": sel.number_bookmarks,
-                    "selections": sel.number_selections,
-                    "custom_offers": sel.number_custom_offers(),
-                    "custom_offers_accepted": sel.number_offers_accepted(),
-                    "custom_offers_declined": sel.number_offers_declined(),
-                    "custom_offers_pending": sel.number_offers_pending(),
-                    "is_optional": sel.is_optional,
-                    "is_valid_selection": sel.is_valid_selection[0],
-                    "allocated_project": proj.name,
-                    "research_group": None if group is None else group.abbreviation,
-                    "use_supervisor_pool": proj.use_supervisor_pool,
-                    "owner_last": None if ou is None else ou.last_name,
-                    "owner_first": None if ou is None else ou.first_name,
-                    "owner_full_name": None if ou is None else ou.name,
-                    "owner_email": None if ou is None else ou.email,
-                    "rank": item.rank,
-                    "is_alternative": item.alternative,
-                    "priority": None if not item.alternative else item.priority,
-                }
+        # the role columns must be known before the first row is streamed, so find the largest number of
+        # each role type attached to any record in this matching attempt
+        role_counts = (
+            db.session.query(MatchingRole.role, func.count(MatchingRole.id))
+            .join(MatchingRole.role_for)
+            .filter(MatchingRecord.matching_id == record.id)
+            .group_by(MatchingRecord.id, MatchingRole.role)
+            .all()
+        )
+        max_roles = {}
+        for role, count in role_counts:
+            max_roles[role] = max(max_roles.get(role, 0), count)
+
+        columns = [
+            "selector_last",
+            "selector_first",
+            "selector_full_name",
+            "selector_email",
+            "programme",
+            "project_class",
+            "submission_period",
+            "cohort",
+            "academic_year",
+            "intermitting",
+            "bookmarks",
+            "selections",
+            "custom_offers",
+            "custom_offers_accepted",
+            "custom_offers_declined",
+            "custom_offers_pending",
+            "is_optional",
+            "is_valid_selection",
+            "allocated_project",
+            "research_group",
+            "use_supervisor_pool",
+            "owner_last",
+            "owner_first",
+            "owner_full_name",
+            "owner_email",
+            "rank",
+            "is_alternative",
+            "priority",
+        ]
+        for role in sorted(max_roles):
+            label = MatchingRole._role_id.get(role, "unknown")
+            for num in range(1, max_roles[role] + 1):
+                columns.extend([f"{label}_{num}_last", f"{label}_{num}_first", f"{label}_{num}_full_name", f"{label}_{num}_email"])
 
-                label_numbers = {}
-                for role in item.roles.order_by(MatchingRole.role):
-                    role: MatchingRole
-                    ud: User = role.user
-
-                    label: str = role.roleid_as_str
-                    if label not in label_numbers:
-                        label_numbers[label] = 0
-
-                    label_numbers[label] += 1
-                    num = label_numbers[label]
-
-                    data.update(
-                        {
-                            f"{label}_{num}_last": ud.last_name,
-                            f"{label}_{num}_first": ud.first_name,
-                            f"{label}_{num}_full_name": ud.name,
-                            f"{label}_{num}_email": ud.email,
-                        }
-                    )
+        with ScratchFileManager(suffix=".xlsx") as mgr:
+            output_path = mgr.path
 
-                records.append(data)
+            # add_sheet() validates the sheet name for Excel
+            # it can't be longer than 31 chars, and there are special characters that it can't contain
+            with StreamingWorkbook(output_path) as book:
+                sheet = book.add_sheet(f'Matching "{record.name}"', columns)
+
+                # read MatchingRecords in batches; rows are written to disk as they are built, so neither the
+                # records nor the rows are held in memory all at once
+                items = iterate_in_batches(
+                    record.records.options(joinedload(MatchingRecord.selector), joinedload(MatchingRecord.project)),
+                    MatchingRecord.id,
+                    batch_size=200,
+                )
 
-            df = DataFrame.from_records(records)
+                for item in items:
+                    item: MatchingRecord
+                    sel: SelectingStudent = item.selector
+                    sd: StudentData = sel.student
+                    su: User = sd.user
+                    programme: DegreeProgramme = sd.programme
+                    proj: LiveProject = item.project
+                    group: ResearchGroup = None if proj is None else proj.group
+                    config: ProjectClassConfig = sel.config
+                    ofd: FacultyData = proj.owner
+                    ou: User = None if ofd is None else ofd.user
+
+                    data = {
+                        "selector_last": su.last_name,
+                        "selector_first": su.first_name,
+                        "selector_full_name": su.name,
+                        "selector_email": su.email,
+                        "programme": programme.short_name,
+                        "project_class": config.abbreviation,
+                        "submission_period": item.submission_period,
+                        "cohort": sd.cohort,
+                        "academic_year": sd.academic_year,
+                        "intermitting": sd.intermitting,
+                        "bookmarks": sel.number_bookmarks,
+                        "selections": sel.number_selections,
+                        "custom_offers": sel.number_custom_offers(),
+                        "custom_offers_accepted": sel.number_offers_accepted(),
+                        "custom_offers_declined": sel.number_offers_declined(),
+                        "custom_offers_pending": sel.number_offers_pending(),
+                        "is_optional": sel.is_optional,
+                        "is_valid_selection": sel.is_valid_selection[0],
+                        "allocated_project": proj.name,
+                        "research_group": None if group is None else group.abbreviation,
+                        "use_supervisor_pool": proj.use_supervisor_pool,
+                        "owner_last": None if ou is None else ou.last_name,
+                        "owner_first": None if ou is None else ou.first_name,
+                        "owner_full_name": None if ou is None else ou.name,
+                        "owner_email": None if ou is None else ou.email,
+                        "rank": item.rank,
+                        "is_alternative": item.alternative,
+                        "priority": None if not item.alternative else item.priority,
+                    }
+
+                    label_numbers = {}
+                    for role in item.roles.order_by(MatchingRole.role):
+                        role: MatchingRole
+                        ud: User = role.user
+
+                        label: str = role.roleid_as_str
+                        if label not in label_numbers:
+                            label_numbers[label] = 0
+
+                        label_numbers[label] += 1
+                        num = label_numbers[label]
+
+                        data.update(
+                            {
+                                f"{label}_{num}_last": ud.last_name,
+                                f"{label}_{num}_first": ud.first_name,
+                                f"{label}_{num}_full_name": ud.name,
+                                f"{label}_{num}_email": ud.email,
+                            }
+                        )
 
-            output_path = mgr.path
-            sheet_name = _normalize_excel_sheet_name(f'Matching "{record.name}"')
+                    sheet.append_dict(data)
 
-            # validate sheet name for Excel
-            # it can't be longer than 31 chars, and there are special characters that it can't contain
-            df.to_excel(output_path, sheet_name=sheet_name, index=False)
             xlsx_asset = make_asset(
                 output_path,
                 f"Matching_{record.name}-{now.strftime('%Y-%m-%d_%H:%M:%S')}",
@@ -0,0 +1,374 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+"""
+Durable per-stage pipeline metrics.
+
+The step-tracking hashes written by pipeline_tracking describe a single record and are deleted once the record's
+workflow has been finalized.  When that happens, the steps of the workflow are folded into an hourly time series
+held in Redis, so that stage throughput and latency can be examined over a run lasting days or weeks.
+
+There is one Redis hash per hour, keyed by the hour in which each step started.  Its fields are counters for a
+series, identified by (stage, model, tenant), and are updated with HINCRBY:
+
+    n               number of step executions
+    err             number of executions that recorded an error
+    lat_ms          total latency
+    lat:<b>         latency histogram; <b> is a log-spaced bucket index (see latency_bucket)
+    qw_n, qw_ms     number and total of queue-wait observations
+    qw:<b>          queue-wait histogram
+    llm_calls       successful LLM requests
+    llm_request_ms  total wall-clock time of those requests
+    llm_decode_ms   total time from first streamed token to end of response
+    llm_pt, llm_ct  prompt and completion tokens reported by Ollama
+    llm_cpt         prompt tokens served from the server's prompt cache
+    llm_cpt_of      prompt tokens of the requests for which the server reported llm_cpt
+
+The model is the LLM used by the step, or empty for steps that make no LLM requests.  Queue wait is the time from
+the end of the preceding step (or from dispatch, for the first step) to the start of this one, and so measures
+the time a record spent waiting for a free Celery worker.
+
+Histograms have _BUCKETS_PER_OCTAVE buckets per doubling, so percentiles derived from them are accurate to about
+9%.  Hashes expire after PIPELINE_METRICS_RETENTION_DAYS.
+"""
+
+import math
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from flask import current_app
+
+from .pipeline_tracking import PIPELINE_STEPS, step_key
+
+_METRICS_KEY_PREFIX = "pipeline_metrics"
+_DEFAULT_RETENTION_DAYS = 35
+
+_BUCKETS_PER_OCTAVE = 4
+
+# field set on the step-tracking hash once its steps have been recorded, so that a retried finalization
+# does not count them twice
+_RECORDED_FIELD = "_metrics_recorded"
+
+_FIELD_SEPARATOR = "|"
+
+SeriesKey = Tuple[str, str, Optional[int]]
+
+
+def hour_key(ts: datetime) -> str:
+    return f"{_METRICS_KEY_PREFIX}:{ts:%Y%m%d%H}"
+
+
+def latency_bucket(ms: float) -> int:
+    """Return the histogram bucket index for a duration of *ms* milliseconds."""
+    return int(math.floor(math.log2(max(ms, 1.0)) * _BUCKETS_PER_OCTAVE))
+
+
+def bucket_value(bucket: int) -> float:
+    """Return the representative duration (geometric midpoint, in milliseconds) of histogram *bucket*."""
+    return 2.0 ** ((bucket + 0.5) / _BUCKETS_PER_OCTAVE)
+
+
+def _field(stage: str, model: str, tenant_id: Optional[int], name: str) -> str:
+    tenant = "" if tenant_id is None else str(tenant_id)
+    return _FIELD_SEPARATOR.join((stage, model, tenant, name))
+
+
+def _parse_ts(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+
+def record_workflow_metrics(redis_client, entry: dict, tenant_id: Optional[int]) -> bool:
+    """
+    Fold the steps of the workflow-summary *entry* (as returned by pipeline_tracking.read_workflow_entry)
+    into the hourly time series, attributed to *tenant_id*.
+
+    Each record is counted at most once: a marker is set on its step-tracking hash, which is deleted with
+    the hash.  The increments are applied in a single transaction; if it fails, the marker is removed again so
+    that a later call can record the steps.  Returns True if the steps were recorded.  Best-effort; Redis errors
+    are logged and swallowed.
+    """
+    if redis_client is None or not entry.get("steps"):
+        return False
+
+    claimed = False
+    try:
+        if not redis_client.hsetnx(step_key(entry["record_id"]), _RECORDED_FIELD, 1):
+            return False
+        claimed = True
+
+        retention_s = int(current_app.config.get("PIPELINE_METRICS_RETENTION_DAYS", _DEFAULT_RETENTION_DAYS) * 86400)
+
+        pipe = redis_client.pipeline(transaction=True)
+        keys = set()
+
+        previous_end = _parse_ts(entry.get("dispatched_at"))
+        for step in entry["steps"]:
+            started = _parse_ts(step.get("started_at"))
+            elapsed_ms = step.get("elapsed_ms")
+            if started is None or elapsed_ms is None:
+                # step did not finish (e.g. the worker was lost); it cannot anchor the next queue wait either
+                previous_end = None
+                continue
+
+            key = hour_key(started)
+            keys.add(key)
+
+            stage = step["name"]
+            model = step.get("llm_model") or ""
+
+            def incr(name: str, amount: int = 1) -> None:
+                pipe.hincrby(key, _field(stage, model, tenant_id, name), amount)
+
+            incr("n")
+            incr("lat_ms", elapsed_ms)
+            incr(f"lat:{latency_bucket(elapsed_ms)}")
+            if step.get("error"):
+                incr("err")
+
+            if previous_end is not None:
+                wait_ms = max(int((started - previous_end).total_seconds() * 1000), 0)
+                incr("qw_n")
+                incr("qw_ms", wait_ms)
+                incr(f"qw:{latency_bucket(wait_ms)}")
+
+            if step.get("llm_calls"):
+                incr("llm_calls", step["llm_calls"])
+                incr("llm_request_ms", step.get("llm_request_ms") or 0)
+                incr("llm_decode_ms", step.get("llm_decode_ms") or 0)
+                incr("llm_pt", step.get("llm_prompt_tokens") or 0)
+                incr("llm_ct", step.get("llm_completion_tokens") or 0)
+                if step.get("llm_cache_reported_prompt_tokens"):
+                    incr("llm_cpt", step.get("llm_cached_prompt_tokens") or 0)
+                    incr("llm_cpt_of", step["llm_cache_reported_prompt_tokens"])
+
+            previous_end = started + timedelta(milliseconds=elapsed_ms)
+
+        for key in keys:
+            pipe.expire(key, retention_s)
+        pipe.execute()
+        return True
+
+    except Exception as exc:
+        current_app.logger.warning(f"pipeline_metrics.record_workflow_metrics: failed for record #{entry.get('record_id')}: {exc}")
+        if claimed:
+            try:
+                redis_client.hdel(step_key(entry["record_id"]), _RECORDED_FIELD)
+            except Exception:
+                pass
+        return False
+
+
+# ---------------------------------------------------------------------------
+# Reading and aggregation
+# ---------------------------------------------------------------------------
+
+
+def _empty_series() -> dict:
+    return {
+        "n": 0,
+        "err": 0,
+        "lat_ms": 0,
+        "lat": {},
+        "qw_n": 0,
+        "qw_ms": 0,
+        "qw": {},
+        "llm_calls": 0,
+        "llm_request_ms": 0,
+        "llm_decode_ms": 0,
+        "llm_pt": 0,
+        "llm_ct": 0,
+        "llm_cpt": 0,
+        "llm_cpt_of": 0,
+    }
+
+
+def _add_counter(series: dict, name: str, value: int) -> None:
+    if ":" in name:
+        histogram, bucket = name.split(":", 1)
+        counts = series[histogram]
+        counts[int(bucket)] = counts.get(int(bucket), 0) + value
+    elif name in series:
+        series[name] += value
+
+
+def load_hourly_metrics(redis_client, start: datetime, end: datetime) -> Dict[datetime, Dict[SeriesKey, dict]]:
+    """
+    Read the hourly hashes covering [start, end] and return {hour: {(stage, model, tenant_id): counters}}.
+    """
+    hours = []
+    hour = start.replace(minute=0, second=0, microsecond=0)
+    while hour <= end:
+        hours.append(hour)
+        hour += timedelta(hours=1)
+
+    pipe = redis_client.pipeline(transaction=False)
+    for hour in hours:
+        pipe.hgetall(hour_key(hour))
+    raw_hashes = pipe.execute()
+
+    result: Dict[datetime, Dict[SeriesKey, dict]] = {}
+    for hour, raw in zip(hours, raw_hashes):
+        if not raw:
+            continue
+
+        by_series: Dict[SeriesKey, dict] = {}
+        for k, v in raw.items():
+            k = k.decode() if isinstance(k, bytes) else k
+            parts = k.split(_FIELD_SEPARATOR)
+            if len(parts) != 4:
+                continue
+            stage, model, tenant, name = parts
+            series_key = (stage, model, int(tenant) if tenant else None)
+            _add_counter(by_series.setdefault(series_key, _empty_series()), name, int(v))
+
+        result[hour] = by_series
+
+    return result
+
+
+def _merge_series(target: dict, source: dict) -> None:
+    for name, value in source.items():
+        if isinstance(value, dict):
+            counts = target[name]
+            for bucket, n in value.items():
+                counts[bucket] = counts.get(bucket, 0) + n
+        else:
+            target[name] += value
+
+
+def histogram_percentiles(counts: Dict[int, int], percentiles: Iterable[float] = (50, 95, 99)) -> Dict[str, Optional[float]]:
+    """Return {"p50": ms, ...} from a bucketed histogram, using nearest-rank on the bucket counts."""
+    total = sum(counts.values())
+    if total == 0:
+        return {f"p{p:g}": None for p in percentiles}
+
+    ordered = sorted(counts.items())
+    result = {}
+    for p in percentiles:
+        rank = max(1, math.ceil(total * p / 100.0))
+        cumulative = 0
+        for bucket, n in ordered:
+            cumulative += n
+            if cumulative >= rank:
+                result[f"p{p:g}"] = round(bucket_value(bucket), 1)
+                break
+    return result
+
+
+def _summarise_series(counters: dict, window_hours: float) -> dict:
+    n = counters["n"]
+    summary = {
+        "count": n,
+        "errors": counters["err"],
+        "throughput_per_hour": round(n / window_hours, 2) if window_hours > 0 else None,
+        "latency_ms": {
+            "mean": round(counters["lat_ms"] / n, 1) if n else None,
+            **histogram_percentiles(counters["lat"]),
+        },
+        "queue_wait_ms": {
+            "count": counters["qw_n"],
+            "mean": round(counters["qw_ms"] / counters["qw_n"], 1) if counters["qw_n"] else None,
+            **histogram_percentiles(counters["qw"]),
+        },
+        "latency_histogram": [[round(bucket_value(b), 1), c] for b, c in sorted(counters["lat"].items())],
+    }
+
+    if counters["llm_calls"]:
+        prompt_ms = counters["llm_request_ms"] - counters["llm_decode_ms"]
+        summary["llm"] = {
+            "calls": counters["llm_calls"],
+            "prompt_tokens": counters["llm_pt"],
+            "completion_tokens": counters["llm_ct"],
+            "generation_tokens_per_s": round(counters["llm_ct"] / (counters["llm_decode_ms"] / 1000.0), 1) if counters["llm_decode_ms"] else None,
+            "prompt_tokens_per_s": round(counters["llm_pt"] / (prompt_ms / 1000.0), 1) if prompt_ms > 0 else None,
+            "mean_request_s": round(counters["llm_request_ms"] / counters["llm_calls"] / 1000.0, 1),
+            "cached_prompt_tokens": counters["llm_cpt"] if counters["llm_cpt_of"] else None,
+            "prompt_cache_hit_rate": round(counters["llm_cpt"] / counters["llm_cpt_of"], 3) if counters["llm_cpt_of"] else None,
+        }
+
+    return summary
+
+
+def summarise_pipeline_metrics(
+    redis_client,
+    hours: int = 168,
+    tenant_ids: Optional[Iterable[int]] = None,
+    stage: Optional[str] = None,
+    model: Optional[str] = None,
+    by_tenant: bool = True,
+    now: Optional[datetime] = None,
+) -> dict:
+    """
+    Aggregate the last *hours* hours of pipeline metrics into one summary per (stage, model, tenant) series,
+    optionally restricted to the given tenants, stage and model.  If *by_tenant* is False, series for
+    different tenants are combined.
+
+    Returns a dict with keys "window" (start, end, hours), "series" (list of summaries, in pipeline order)
+    and "hourly" (per-hour execution counts and p95 latency for each stage).
+    """
+    now = now or datetime.now()
+    start = now - timedelta(hours=hours)
+    tenant_filter = set(tenant_ids) if tenant_ids is not None else None
+
+    hourly_raw = load_hourly_metrics(redis_client, start, now)
+
+    totals: Dict[SeriesKey, dict] = {}
+    hourly_by_stage: Dict[datetime, Dict[str, dict]] = {}
+
+    for hour, by_series in hourly_raw.items():
+        for (s_stage, s_model, s_tenant), counters in by_series.items():
+            if tenant_filter is not None and s_tenant not in tenant_filter:
+                continue
+            if stage is not None and s_stage != stage:
+                continue
+            if model is not None and s_model != model:
+                continue
+
+            key = (s_stage, s_model, s_tenant if by_tenant else None)
+            _merge_series(totals.setdefault(key, _empty_series()), counters)
+            _merge_series(hourly_by_stage.setdefault(hour, {}).setdefault(s_stage, _empty_series()), counters)
+
+    def _order(key: SeriesKey):
+        s_stage, s_model, s_tenant = key
+        position = PIPELINE_STEPS.index(s_stage) if s_stage in PIPELINE_STEPS else len(PIPELINE_STEPS)
+        return position, s_model, s_tenant if s_tenant is not None else -1
+
+    series = []
+    for key in sorted(totals, key=_order):
+        s_stage, s_model, s_tenant = key
+        series.append({"stage": s_stage, "model": s_model or None, "tenant_id": s_tenant, **_summarise_series(totals[key], hours)})
+
+    hourly = []
+    for hour in sorted(hourly_by_stage):
+        hourly.append(
+            {
+                "hour": hour.isoformat(timespec="minutes"),
+                "stages": {
+                    s: {"count": c["n"], "errors": c["err"], "p95_ms": histogram_percentiles(c["lat"], (95,))["p95"]}
+                    for s, c in hourly_by_stage[hour].items()
+                },
+            }
+        )
+
+    return {
+        "window": {"start": start.isoformat(timespec="minutes"), "end": now.isoformat(timespec="minutes"), "hours": hours},
+        "series": series,
+        "hourly": hourly,
+    }
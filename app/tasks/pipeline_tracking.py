@@ -15,6 +15,8 @@ from datetime import datetime
 import redis as redis_lib
 from flask import current_app
 
+from ..shared.llm_services import reset_llm_usage, take_llm_usage
+
 logger = logging.getLogger(__name__)
 
 
@@ -42,6 +44,23 @@ def step_key(record_id: int) -> str:
     return f"{_STEP_KEY_PREFIX}:{record_id}"
 
 
+def record_dispatch(redis_client, record_id: int) -> None:
+    """
+    Mark *record_id* as dispatched to the Celery queues.  The time between dispatch and the start of the
+    first step is reported as the queue wait of that step.
+
+    If *redis_client* is ``None`` the call is a silent no-op.
+    """
+    if redis_client is None:
+        return
+    try:
+        ts = datetime.now().isoformat(timespec="milliseconds")
+        redis_client.hset(step_key(record_id), "_record_dispatched_at", ts)
+        redis_client.expire(step_key(record_id), _STEP_TTL)
+    except Exception:
+        pass
+
+
 def record_step_start(redis_client, record_id: int, step: str) -> float:
     """
     Mark *step* as started for *record_id*.
@@ -55,6 +74,7 @@ def record_step_start(redis_client, record_id: int, step: str) -> float:
     is best-effort and must never block task execution).
     """
     t0 = time.monotonic()
+    reset_llm_usage()
     if redis_client is None:
         return t0
     try:
@@ -86,7 +106,11 @@ def record_step_end(
     Optional *meta* dict: each key-value pair is stored as a ``{step}:{key}``
     field in the Redis hash.  None values are skipped.  Redis errors writing
     meta fields are logged as warnings and do not propagate.
+
+    Usage totals for the LLM requests made since :func:`record_step_start`
+    are stored as ``{step}:llm_*`` fields.
     """
+    llm_usage = take_llm_usage()
     if redis_client is None:
         return
     elapsed_ms = int((time.monotonic() - t0) * 1000)
@@ -96,6 +120,8 @@ def record_step_end(
             redis_client.hset(step_key(record_id), f"{step}:error", error)
     except Exception:
         pass
+    if llm_usage:
+        meta = {**(meta or {}), **{f"llm_{k}": v for k, v in llm_usage.items()}}
     if meta:
         try:
             for k, v in meta.items():
@@ -133,11 +159,13 @@ def read_workflow_entry(redis_client, record_id: int) -> dict:
     The returned dict has the shape::
 
         {
-          "record_id":   int,
-          "started_at":  str | None,   # ISO timestamp of first step
+          "record_id":     int,
+          "dispatched_at": str | None,   # ISO timestamp of dispatch to Celery
+          "started_at":    str | None,   # ISO timestamp of first step
           "steps": [
             {"name": str, "started_at": str | None,
-             "elapsed_ms": int | None, "error": str | None},
+             "elapsed_ms": int | None, "error": str | None,
+             "llm_model": str | None, "llm_calls": int | None, ...},
             ...
           ]
         }
@@ -146,7 +174,7 @@ def read_workflow_entry(redis_client, record_id: int) -> dict:
     """
     raw: dict = redis_client.hgetall(step_key(record_id))
     if not raw:
-        return {"record_id": record_id, "started_at": None, "steps": []}
+        return {"record_id": record_id, "dispatched_at": None, "started_at": None, "steps": []}
 
     def _decode(v) -> str:
         return v.decode() if isinstance(v, bytes) else v
@@ -174,11 +202,20 @@ def read_workflow_entry(redis_client, record_id: int) -> dict:
                 "feedback_word_budget": _to_int(fields.get(f"{name}:feedback_word_budget")),
                 "peak_completion_tokens": _to_int(fields.get(f"{name}:peak_completion_tokens")),
                 "total_completion_tokens": _to_int(fields.get(f"{name}:total_completion_tokens")),
+                "llm_model": fields.get(f"{name}:llm_model"),
+                "llm_calls": _to_int(fields.get(f"{name}:llm_calls")),
+                "llm_request_ms": _to_int(fields.get(f"{name}:llm_request_ms")),
+                "llm_decode_ms": _to_int(fields.get(f"{name}:llm_decode_ms")),
+                "llm_prompt_tokens": _to_int(fields.get(f"{name}:llm_prompt_tokens")),
+                "llm_completion_tokens": _to_int(fields.get(f"{name}:llm_completion_tokens")),
+                "llm_cached_prompt_tokens": _to_int(fields.get(f"{name}:llm_cached_prompt_tokens")),
+                "llm_cache_reported_prompt_tokens": _to_int(fields.get(f"{name}:llm_cache_reported_prompt_tokens")),
             }
         )
 
     return {
         "record_id": record_id,
+        "dispatched_at": fields.get("_record_dispatched_at"),
         "started_at": fields.get("_record_started_at"),
         "steps": steps,
     }
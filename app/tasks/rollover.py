@@ -15,9 +15,11 @@ from typing import List, Optional
 from celery import chord, group
 from dateutil.relativedelta import relativedelta
 from flask import current_app
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, delete, or_, select, update
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import selectinload
 
+from ..cache import cache
 from ..database import db
 from ..models import (
     ConfirmRequest,
@@ -43,6 +45,9 @@ from ..models import (
     User,
     add_notification,
 )
+from ..models.live_projects import _SelectingStudent_is_valid, _SubmittingStudent_is_valid
+from ..models.projects import _Project_is_offerable, _ProjectDescription_is_valid
+from ..models.submissions import _SubmissionRecord_is_valid
 from ..shared.convenor import add_blank_submitter, add_selector
 from ..shared.sqlalchemy import get_count
 from ..shared.tasks import post_task_update_msg
@@ -50,6 +55,9 @@ from ..shared.utils import get_current_year
 from ..shared.workflow_logging import log_db_commit
 from ..task_queue import progress_update
 
+# number of students processed per transaction when auto-attaching selectors and submitters in set-based mode
+ROLLOVER_CHUNK_SIZE = 250
+
 
 def insert_new_pclass_config(self, old_config: ProjectClassConfig, convenor_id: int):
     # get new, rolled-over academic year
@@ -154,6 +162,513 @@ def insert_new_pclass_config(self, old_config: ProjectClassConfig, convenor_id:
     return new_config.id
 
 
+def _use_set_based_rollover():
+    return current_app.config.get("ROLLOVER_SET_BASED", True)
+
+
+def _attach_student_records(
+    config: ProjectClassConfig,
+    student: StudentData,
+    old_config_id: int,
+    current_year: int,
+    has_selector: bool,
+    has_submitter: bool,
+    declined_conversion: bool,
+):
+    """
+    Generate SelectingStudent and/or SubmittingStudent records for a student in the rolled-over
+    configuration, if they meet the auto-enrolment criteria. The caller is responsible for committing.
+    :param config: rolled-over ProjectClassConfig
+    :param student: StudentData instance
+    :param old_config_id: id of the ProjectClassConfig being rolled over
+    :param current_year: new academic year
+    :param has_selector: True if the student already has a live SelectingStudent in the rolled-over config
+    :param has_submitter: True if the student already has a live SubmittingStudent in the rolled-over config
+    :param declined_conversion: True if the student has a SelectingStudent in the previous cycle that is marked
+        not to convert to a submitter
+    :return:
+    """
+    new_config_id = config.id
+
+    # compute current academic year for this student
+    academic_year = student.compute_academic_year(current_year)
+
+    # cache student's programme and programme type (BSc, MPhys, etc.)
+    programme: DegreeProgramme = student.programme
+    programme_type: DegreeType = programme.degree_type
+
+    # if we succeeded in obtaining the academic year, try to auto-enroll selectors and submitters
+    if academic_year is None:
+        msg = "Could not compute academic year (new_config_id={nid}, old_config_id={oid}, sid={sid}, current_year={cyr}".format(
+            nid=new_config_id, oid=old_config_id, sid=student.id, cyr=current_year
+        )
+        current_app.logger.error(msg)
+        print(msg)
+        raise Exception(msg)
+
+    # keep track of the selector id that was generated (if we generate one)
+    # when submission is in the same cycle as selection, we can use this to link the
+    # submitter and selector records
+    generated_selector_id = None
+
+    # enrol selectors if auto-enrolment is enabled
+    if config.auto_enrol_enable:
+        # define a function to test whether a student meets the criteria to attach as a selector
+        def check_attach_selector():
+            # if student is not at the correct level (UG, PGT, PGR), do not attach
+            if programme_type.level != config.student_level:
+                return False
+
+            # do not attach if student's programme is not associated with the project type
+            if not config.selection_open_to_all and programme not in config.programmes:
+                return False
+
+            # does selection occur in the same academic cycle as submission, or the one before?
+            # this determines the first and last years when students are eligible to select
+            first_year = config.start_year
+            last_year = config.start_year + config.extent
+            if config.select_in_previous_cycle:
+                first_year = first_year - 1
+                last_year = last_year - 1
+
+            # if only enrolling in the first year, check whether there is a match
+            if config.auto_enroll_years == ProjectClass.AUTO_ENROLL_FIRST_YEAR:
+                if academic_year != first_year:
+                    return False
+
+            # otherwise, check whether this student falls in the first-to-last window
+            elif config.auto_enroll_years == ProjectClass.AUTO_ENROLL_ALL_YEARS:
+                if academic_year < first_year or academic_year >= last_year:
+                    return False
+
+            else:
+                # should not get here
+                assert False
+
+            return True
+
+        # if this student meets all the criteria, generate a selector for them, unless one has already
+        # been generated (eg. could happen if the task is accidentally run twice)
+        if check_attach_selector() and not has_selector:
+            generated_selector_id = add_selector(
+                student,
+                new_config_id,
+                convert=not config.is_optional,
+                autocommit=False,
+            )
+
+    # define a function to test whether a student meets the criteria to attach as a submitter
+    def check_attach_submitter():
+        # if student is not at the correct level (UG, PGT, PGR), do not attach
+        if programme_type.level != config.student_level:
+            return False
+
+        first_year = config.start_year
+        last_year = config.start_year + config.extent
+
+        # auto-attach only if student's programme is associated with the project type
+        if programme not in config.programmes:
+            return False
+
+        if academic_year < first_year or academic_year >= last_year:
+            return False
+
+        return True
+
+    # if this student meets all the criteria, generate a submitter record *provided* no existing
+    # submitter record exists, e.g., perhaps generated by conversion from a SelectingStudent
+    # record in the previous cycle, and the student has not declined conversion of a SelectingStudent
+    # record from the previous cycle
+    if check_attach_submitter() and not has_submitter and not declined_conversion:
+        selecting_config_id = old_config_id if config.select_in_previous_cycle else new_config_id
+        add_blank_submitter(
+            student,
+            selecting_config_id,
+            new_config_id,
+            autocommit=False,
+            linked_selector_id=generated_selector_id,
+        )
+
+
+def _reenroll_record(record: EnrollmentRecord, current_year: int):
+    """
+    Re-enrol a faculty member in any roles for which their re-enrolment date has arrived.
+    The caller is responsible for committing.
+    """
+    # supervisors re-enroll in the year *before* they come off sabbatical, so they can offer
+    # projects during the selection cycle
+    if record.supervisor_state != EnrollmentRecord.SUPERVISOR_ENROLLED:
+        # supervisors are sometimes re-enrolled one year early, because projects are *offered*
+        # in the academic year before the run
+        renroll_offset = -1 if record.pclass.reenroll_supervisors_early else 0
+
+        if record.supervisor_reenroll is not None and record.supervisor_reenroll + renroll_offset <= current_year:
+            record.supervisor_state = EnrollmentRecord.SUPERVISOR_ENROLLED
+            record.supervisor_reenroll = None
+            record.supervisor_comment = "Automatically re-enrolled during academic year rollover"
+            if record.pclass.uses_supervisor:
+                add_notification(
+                    record.owner,
+                    EmailNotification.FACULTY_REENROLL_SUPERVISOR,
+                    record,
+                    autocommit=False,
+                )
+
+    # re-enrol markers in the year they come off sabbatical
+    if record.marker_state != EnrollmentRecord.MARKER_ENROLLED:
+        if record.marker_reenroll is not None and record.marker_reenroll <= current_year:
+            record.marker_state = EnrollmentRecord.MARKER_ENROLLED
+            record.marker_reenroll = None
+            record.marker_comment = "Automatically re-enrolled during academic year rollover"
+            if record.pclass.uses_marker:
+                add_notification(
+                    record.owner,
+                    EmailNotification.FACULTY_REENROLL_MARKER,
+                    record,
+                    autocommit=False,
+                )
+
+    # re-enrol moderator in the year they come off sabbatical
+    if record.moderator_state != EnrollmentRecord.MODERATOR_ENROLLED:
+        if record.moderator_reenroll is not None and record.moderator_reenroll <= current_year:
+            record.moderator_state = EnrollmentRecord.MODERATOR_ENROLLED
+            record.moderator_reenroll = None
+            record.moderator_comment = "Automatically re-enrolled during academic year rollover"
+            if record.pclass.uses_moderator:
+                add_notification(
+                    record.owner,
+                    EmailNotification.FACULTY_REENROLL_MODERATOR,
+                    record,
+                    autocommit=False,
+                )
+
+    # re-enrol presentation assessors in the year they come off sabbatical
+    if record.presentations_state != EnrollmentRecord.PRESENTATIONS_ENROLLED:
+        if record.presentations_reenroll is not None and record.presentations_reenroll <= current_year:
+            record.presentations_state = EnrollmentRecord.PRESENTATIONS_ENROLLED
+            record.presentations_reenroll = None
+            record.presentations_comment = "Automatically re-enrolled during academic year rollover"
+
+            notify = False
+            for p in record.pclass.periods:
+                p: SubmissionPeriodDefinition
+                if p.has_presentation:
+                    notify = True
+                    break
+            if notify:
+                add_notification(
+                    record.owner,
+                    EmailNotification.FACULTY_REENROLL_PRESENTATIONS,
+                    record,
+                    autocommit=False,
+                )
+
+
+## SET-BASED ROLLOVER
+# When ROLLOVER_SET_BASED is enabled, each phase coordinator performs its work directly using a small number of
+# set-based UPDATE/DELETE statements inside a single transaction, instead of dispatching one Celery task per row.
+# Rows that need custom logic (selector conversion, auto-attachment, faculty re-enrolment) are selected in SQL and
+# processed in-process within the same transaction. Bulk statements bypass the ORM event handlers, so memoized
+# validation data for the affected models is invalidated explicitly afterwards.
+
+
+def bulk_attach_students(self, new_config_id: int, old_config_id: int, student_ids: List[int], current_year: int):
+    try:
+        config: ProjectClassConfig = db.session.get(ProjectClassConfig, new_config_id)
+
+        # look up existing records for all candidate students at once, rather than issuing three count queries per student
+        has_selector = set(
+            row[0]
+            for row in db.session.query(SelectingStudent.student_id).filter(
+                SelectingStudent.config_id == new_config_id, SelectingStudent.retired.is_(False)
+            )
+        )
+        has_submitter = set(
+            row[0]
+            for row in db.session.query(SubmittingStudent.student_id).filter(
+                SubmittingStudent.config_id == new_config_id, SubmittingStudent.retired.is_(False)
+            )
+        )
+        declined_conversion = set()
+        if config.select_in_previous_cycle:
+            declined_conversion = set(
+                row[0]
+                for row in db.session.query(SelectingStudent.student_id).filter(
+                    SelectingStudent.config_id == old_config_id,
+                    SelectingStudent.retired.is_(False),
+                    SelectingStudent.convert_to_submitter.is_(False),
+                )
+            )
+    except SQLAlchemyError as e:
+        current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+        raise self.retry()
+
+    if config is None:
+        print("bulk_attach_students: could not load rolled-over ProjectClassConfig record, new_config_id = {n}".format(n=new_config_id))
+        raise self.retry()
+
+    for i in range(0, len(student_ids), ROLLOVER_CHUNK_SIZE):
+        chunk = student_ids[i : i + ROLLOVER_CHUNK_SIZE]
+
+        try:
+            students = (
+                db.session.query(StudentData)
+                .filter(StudentData.id.in_(chunk))
+                .options(selectinload(StudentData.programme).selectinload(DegreeProgramme.degree_type))
+                .all()
+            )
+
+            for student in students:
+                _attach_student_records(
+                    config,
+                    student,
+                    old_config_id,
+                    current_year,
+                    student.id in has_selector,
+                    student.id in has_submitter,
+                    student.id in declined_conversion,
+                )
+
+            log_db_commit(
+                f"Auto-attached selector/submitter records for {len(students)} candidate student(s) "
+                f"to {config.name} (new config #{new_config_id}, academic year {current_year})",
+                project_classes=config.project_class,
+                endpoint=self.name,
+            )
+
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+            raise self.retry()
+
+
+def bulk_retire_students(self, config: ProjectClassConfig):
+    submitter_ids = select(SubmittingStudent.id).where(SubmittingStudent.config_id == config.id)
+
+    try:
+        num_selectors = db.session.execute(
+            update(SelectingStudent)
+            .where(SelectingStudent.config_id == config.id, SelectingStudent.retired.is_(False))
+            .values(retired=True)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        num_records = db.session.execute(
+            update(SubmissionRecord)
+            .where(SubmissionRecord.owner_id.in_(submitter_ids), SubmissionRecord.retired.is_(False))
+            .values(retired=True)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        num_submitters = db.session.execute(
+            update(SubmittingStudent)
+            .where(SubmittingStudent.config_id == config.id, SubmittingStudent.retired.is_(False))
+            .values(retired=True)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        log_db_commit(
+            f"Retired {num_selectors} SelectingStudent record(s), {num_submitters} SubmittingStudent record(s) "
+            f"and {num_records} SubmissionRecord(s) for {config.name} (config #{config.id})",
+            project_classes=config.project_class,
+            endpoint=self.name,
+        )
+
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+        raise self.retry()
+
+    cache.delete_memoized(_SelectingStudent_is_valid)
+    cache.delete_memoized(_SubmittingStudent_is_valid)
+    cache.delete_memoized(_SubmissionRecord_is_valid)
+
+
+def bulk_reenroll_faculty(self, config: ProjectClassConfig, current_year: int):
+    # select only those records for which some re-enrolment date has arrived; the rest would be no-ops
+    renroll_offset = -1 if config.project_class.reenroll_supervisors_early else 0
+
+    try:
+        records: List[EnrollmentRecord] = (
+            db.session.query(EnrollmentRecord)
+            .join(User, User.id == EnrollmentRecord.owner_id)
+            .filter(
+                EnrollmentRecord.pclass_id == config.pclass_id,
+                User.active.is_(True),
+                or_(
+                    and_(
+                        EnrollmentRecord.supervisor_state != EnrollmentRecord.SUPERVISOR_ENROLLED,
+                        EnrollmentRecord.supervisor_reenroll.isnot(None),
+                        EnrollmentRecord.supervisor_reenroll + renroll_offset <= current_year,
+                    ),
+                    and_(
+                        EnrollmentRecord.marker_state != EnrollmentRecord.MARKER_ENROLLED,
+                        EnrollmentRecord.marker_reenroll.isnot(None),
+                        EnrollmentRecord.marker_reenroll <= current_year,
+                    ),
+                    and_(
+                        EnrollmentRecord.moderator_state != EnrollmentRecord.MODERATOR_ENROLLED,
+                        EnrollmentRecord.moderator_reenroll.isnot(None),
+                        EnrollmentRecord.moderator_reenroll <= current_year,
+                    ),
+                    and_(
+                        EnrollmentRecord.presentations_state != EnrollmentRecord.PRESENTATIONS_ENROLLED,
+                        EnrollmentRecord.presentations_reenroll.isnot(None),
+                        EnrollmentRecord.presentations_reenroll <= current_year,
+                    ),
+                ),
+            )
+            .all()
+        )
+
+        # re-enrolments generate notifications, so these are applied through the ORM
+        for record in records:
+            _reenroll_record(record, current_year)
+
+        log_db_commit(
+            f"Re-enrolled {len(records)} faculty EnrollmentRecord(s) for {config.project_class.name} "
+            f"based on re-enrolment dates for year {current_year}",
+            project_classes=config.project_class,
+            endpoint=self.name,
+        )
+
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+        raise self.retry()
+
+
+def bulk_enrollment_maintenance(self, config: ProjectClassConfig):
+    # only records carrying a CATS override need to be touched; these are cleared through the ORM so that
+    # the EnrollmentRecord cache invalidation handlers fire
+    try:
+        records: List[EnrollmentRecord] = (
+            db.session.query(EnrollmentRecord)
+            .filter(
+                EnrollmentRecord.pclass_id == config.pclass_id,
+                or_(
+                    EnrollmentRecord.CATS_supervision.isnot(None),
+                    EnrollmentRecord.CATS_marking.isnot(None),
+                    EnrollmentRecord.CATS_moderation.isnot(None),
+                    EnrollmentRecord.CATS_presentation.isnot(None),
+                ),
+            )
+            .all()
+        )
+
+        for record in records:
+            record.CATS_supervision = None
+            record.CATS_marking = None
+            record.CATS_moderation = None
+            record.CATS_presentation = None
+
+        log_db_commit(
+            f"Cleared CATS allocations on {len(records)} EnrollmentRecord(s) for {config.project_class.name}",
+            project_classes=config.project_class,
+            endpoint=self.name,
+        )
+
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+        raise self.retry()
+
+
+def bulk_reset_descriptions(self, config: ProjectClassConfig, desc_ids: List[int]):
+    active_projects = select(Project.id).where(Project.active.is_(True))
+
+    QUEUED = ProjectDescription.WORKFLOW_APPROVAL_QUEUED
+    VALIDATED = ProjectDescription.WORKFLOW_APPROVAL_VALIDATED
+
+    def _update(*conditions, **values):
+        return db.session.execute(
+            update(ProjectDescription)
+            .where(ProjectDescription.id.in_(desc_ids), *conditions)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    try:
+        # mark all descriptions as not confirmed
+        _update(confirmed=False)
+
+        # if the parent project is active, then validation information can be carried through;
+        # there will be no need to re-validate this project in the new cycle unless it is edited.
+        # However we *do* enforce that the fields are consistent
+        _update(
+            ProjectDescription.parent_id.in_(active_projects),
+            or_(
+                ProjectDescription.validator_id.is_(None),
+                ProjectDescription.validated_timestamp.is_(None),
+                ProjectDescription.workflow_state.is_(None),
+                ProjectDescription.workflow_state != VALIDATED,
+            ),
+            validator_id=None,
+            validated_timestamp=None,
+        )
+
+        # change projects marked as 'Rejected' back to 'Queued', except that we test for the converse
+        # statement so that we pick up any stray meaningless values for workflow_state
+        _update(
+            ProjectDescription.parent_id.in_(active_projects),
+            or_(
+                ProjectDescription.workflow_state.is_(None),
+                ProjectDescription.workflow_state.notin_([QUEUED, VALIDATED]),
+            ),
+            workflow_state=QUEUED,
+        )
+
+        # if the parent project is not active, force the description to be queued and with no validation data
+        _update(
+            ProjectDescription.parent_id.notin_(active_projects),
+            workflow_state=QUEUED,
+            validator_id=None,
+            validated_timestamp=None,
+        )
+
+        log_db_commit(
+            f"Reset approval lifecycle for {len(desc_ids)} ProjectDescription record(s) attached to {config.project_class.name}",
+            project_classes=config.project_class,
+            endpoint=self.name,
+        )
+
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+        raise self.retry()
+
+    cache.delete_memoized(_ProjectDescription_is_valid)
+    cache.delete_memoized(_Project_is_offerable)
+
+
+def bulk_remove_confirm_requests(self, config: ProjectClassConfig):
+    owner_ids = (
+        select(SelectingStudent.id)
+        .join(ProjectClassConfig, ProjectClassConfig.id == SelectingStudent.config_id)
+        .where(ProjectClassConfig.pclass_id == config.pclass_id)
+    )
+
+    try:
+        num_removed = db.session.execute(
+            delete(ConfirmRequest)
+            .where(ConfirmRequest.owner_id.in_(owner_ids), ConfirmRequest.state == ConfirmRequest.REQUESTED)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        log_db_commit(
+            f"Removed {num_removed} stale ConfirmRequest record(s) for {config.project_class.name} during rollover",
+            project_classes=config.project_class,
+            endpoint=self.name,
+        )
+
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+        raise self.retry()
+
+    cache.delete_memoized(_SelectingStudent_is_valid)
+
+
 def register_rollover_tasks(celery):
     @celery.task(bind=True)
     def prune_matches(self, task_id, current_year, admin_id):
@@ -349,7 +864,13 @@ def register_rollover_tasks(celery):
                     post_task_update_msg(self, task_id, "FAILURE", TaskRecord.FAILURE, 100, msg)
                     raise Exception(msg)
 
-            selector_list = list(config.selecting_students)
+            if _use_set_based_rollover():
+                # selectors that are not marked for conversion need no work, so only dispatch those that are;
+                # conversion itself depends on matching records and carryover logic, so stays per-row
+                selector_list = config.selecting_students.filter(SelectingStudent.convert_to_submitter.is_(True)).all()
+            else:
+                selector_list = list(config.selecting_students)
+
             if selector_list:
                 convert_group = group(
                     convert_selector.si(
@@ -411,9 +932,14 @@ def register_rollover_tasks(celery):
             )
         )
 
-        student_list = students.all()
         next_phase = _rollover_retire_phase.si(task_id, new_config_id, current_id, convenor_id)
 
+        if _use_set_based_rollover():
+            student_ids = [row[0] for row in students.with_entities(StudentData.id).all()]
+            bulk_attach_students(self, new_config_id, current_id, student_ids, year)
+            return self.replace(next_phase)
+
+        student_list = students.all()
         if student_list:
             attach_group = group(attach_selectors_submitters.si(new_config_id, current_id, s.id, year) for s in student_list)
             return self.replace(chord(attach_group, next_phase))
@@ -438,9 +964,14 @@ def register_rollover_tasks(celery):
             current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
             raise self.retry()
 
-        retire_list = [retire_selector.si(s.id) for s in config.selecting_students] + [retire_submitter.si(s.id) for s in config.submitting_students]
         next_phase = _rollover_reenrol_phase.si(task_id, new_config_id, current_id, convenor_id)
 
+        if _use_set_based_rollover():
+            bulk_retire_students(self, config)
+            return self.replace(next_phase)
+
+        retire_list = [retire_selector.si(s.id) for s in config.selecting_students] + [retire_submitter.si(s.id) for s in config.submitting_students]
+
         if retire_list:
             return self.replace(chord(group(retire_list), next_phase))
 
@@ -465,6 +996,11 @@ def register_rollover_tasks(celery):
             raise self.retry()
 
         year = get_current_year()
+        next_phase = _rollover_maintenance_phase.si(task_id, new_config_id, current_id, convenor_id)
+
+        if _use_set_based_rollover():
+            bulk_reenroll_faculty(self, config, year)
+            return self.replace(next_phase)
 
         reenrol_list = (
             db.session.query(EnrollmentRecord.id)
@@ -477,7 +1013,6 @@ def register_rollover_tasks(celery):
             )
             .all()
         )
-        next_phase = _rollover_maintenance_phase.si(task_id, new_config_id, current_id, convenor_id)
 
         if reenrol_list:
             reenrol_group = group(reenroll_faculty.si(rec.id, year) for rec in reenrol_list)
@@ -503,9 +1038,14 @@ def register_rollover_tasks(celery):
             current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
             raise self.retry()
 
-        maintenance_list = db.session.query(EnrollmentRecord.id).filter(EnrollmentRecord.pclass_id == config.pclass_id).all()
         next_phase = _rollover_descriptions_phase.si(task_id, new_config_id, current_id, convenor_id)
 
+        if _use_set_based_rollover():
+            bulk_enrollment_maintenance(self, config)
+            return self.replace(next_phase)
+
+        maintenance_list = db.session.query(EnrollmentRecord.id).filter(EnrollmentRecord.pclass_id == config.pclass_id).all()
+
         if maintenance_list:
             maint_group = group(enrollment_maintenance.si(rec.id) for rec in maintenance_list)
             return self.replace(chord(maint_group, next_phase))
@@ -540,6 +1080,11 @@ def register_rollover_tasks(celery):
 
         next_phase = _rollover_confirm_requests_phase.si(task_id, new_config_id, current_id, convenor_id)
 
+        if _use_set_based_rollover():
+            if project_descs:
+                bulk_reset_descriptions(self, config, list(project_descs))
+            return self.replace(next_phase)
+
         if project_descs:
             descs_group = group(reset_project_description.si(d_id) for d_id in project_descs)
             return self.replace(chord(descs_group, next_phase))
@@ -564,6 +1109,12 @@ def register_rollover_tasks(celery):
             current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
             raise self.retry()
 
+        finalize = rollover_finalize.si(task_id, new_config_id, convenor_id)
+
+        if _use_set_based_rollover():
+            bulk_remove_confirm_requests(self, config)
+            return self.replace(finalize)
+
         confirm_list = (
             db.session.query(ConfirmRequest)
             .join(SelectingStudent, SelectingStudent.id == ConfirmRequest.owner_id)
@@ -574,7 +1125,6 @@ def register_rollover_tasks(celery):
             )
             .all()
         )
-        finalize = rollover_finalize.si(task_id, new_config_id, convenor_id)
 
         if confirm_list:
             confirm_group = group(remove_confirm_request.si(rec.id) for rec in confirm_list)
@@ -1078,124 +1628,34 @@ def register_rollover_tasks(celery):
             print("attach_selectors_submittres: could not load StudentData record, new_config_id = {n}".format(n=new_config_id))
             raise self.retry()
 
-        # compute current academic year for this student
-        academic_year = student.compute_academic_year(current_year)
-
-        # cache student's programme and programme type (BSc, MPhys, etc.)
-        programme: DegreeProgramme = student.programme
-        programme_type: DegreeType = programme.degree_type
-
-        # if we succeeded in obtaining the academic year, try to auto-enroll selectors and submitters
-        if academic_year is None:
-            msg = "Could not compute academic year (new_config_id={nid}, old_config_id={oid}, sid={sid}, current_year={cyr}".format(
-                nid=new_config_id, oid=old_config_id, sid=sid, cyr=current_year
-            )
-            current_app.logger.error(msg)
-            print(msg)
-            raise Exception(msg)
-
-        # keep track of the selector id that was generated (if we generate one)
-        # when submission is in the same cycle as selection, we can use this to link the
-        # submitter and selector records
-        generated_selector_id = None
-
         try:
-            # enrol selectors if auto-enrolment is enabled
-            if config.auto_enrol_enable:
-                # define a function to test whether a student meets the criteria to attach as a selector
-                def check_attach_selector():
-                    # if student is not at the correct level (UG, PGT, PGR), do not attach
-                    if programme_type.level != config.student_level:
-                        return False
-
-                    # do not attach if student's programme is not associated with the project type
-                    if not config.selection_open_to_all and programme not in config.programmes:
-                        return False
-
-                    # does selection occur in the same academic cycle as submission, or the one before?
-                    # this determines the first and last years when students are eligible to select
-                    first_year = config.start_year
-                    last_year = config.start_year + config.extent
-                    if config.select_in_previous_cycle:
-                        first_year = first_year - 1
-                        last_year = last_year - 1
-
-                    # if only enrolling in the first year, check whether there is a match
-                    if config.auto_enroll_years == ProjectClass.AUTO_ENROLL_FIRST_YEAR:
-                        if academic_year != first_year:
-                            return False
-
-                    # otherwise, check whether this student falls in the first-to-last window
-                    elif config.auto_enroll_years == ProjectClass.AUTO_ENROLL_ALL_YEARS:
-                        if academic_year < first_year or academic_year >= last_year:
-                            return False
-
-                    else:
-                        # should not get here
-                        assert False
-
-                    return True
-
-                # if this student meets all the criteria, generate a selector for them
-                if check_attach_selector():
-                    # check whether a SelectingStudent has already been generated for this student
-                    # (eg. could happen if the task is accidentally run twice)
-                    count = get_count(student.selecting.filter_by(retired=False, config_id=new_config_id))
-                    if count == 0:
-                        generated_selector_id = add_selector(
-                            student,
-                            new_config_id,
-                            convert=not config.is_optional,
-                            autocommit=False,
-                        )
-
-            # define a function to test whether a student meets the criteria to attach as a submitter
-            def check_attach_submitter():
-                # if student is not at the correct level (UG, PGT, PGR), do not attach
-                if programme_type.level != config.student_level:
-                    return False
-
-                first_year = config.start_year
-                last_year = config.start_year + config.extent
-
-                # auto-attach only if student's programme is associated with the project type
-                if programme not in config.programmes:
-                    return False
-
-                if academic_year < first_year or academic_year >= last_year:
-                    return False
-
-                return True
-
-            # if this student meets all the criteria, generate a submitter record *provided* no existing
-            # submitter record exists, e.g., perhaps generated by conversion from a SelectingStudent
-            # record in the previous cycle
-            if check_attach_submitter():
-                # check whether a SubmittingStudent has already been generated for this student
-                count_sub = get_count(student.submitting.filter_by(retired=False, config_id=new_config_id))
-
-                # check whether there is a SelectingStudent record from a previous cycle that has been marked
-                # as disabled; if there is, we should not generate the SubmittingStudent instance
-                if config.select_in_previous_cycle:
-                    count_disable = get_count(
+            has_selector = get_count(student.selecting.filter_by(retired=False, config_id=new_config_id)) > 0
+            has_submitter = get_count(student.submitting.filter_by(retired=False, config_id=new_config_id)) > 0
+
+            # check whether there is a SelectingStudent record from a previous cycle that has been marked
+            # as disabled; if there is, we should not generate the SubmittingStudent instance
+            declined_conversion = False
+            if config.select_in_previous_cycle:
+                declined_conversion = (
+                    get_count(
                         student.selecting.filter_by(
                             retired=False,
                             config_id=old_config_id,
                             convert_to_submitter=False,
                         )
                     )
-                else:
-                    count_disable = 0
+                    > 0
+                )
 
-                if count_sub == 0 and count_disable == 0:
-                    selecting_config_id = old_config_id if config.select_in_previous_cycle else new_config_id
-                    add_blank_submitter(
-                        student,
-                        selecting_config_id,
-                        new_config_id,
-                        autocommit=False,
-                        linked_selector_id=generated_selector_id,
-                    )
+            _attach_student_records(
+                config,
+                student,
+                old_config_id,
+                current_year,
+                has_selector,
+                has_submitter,
+                declined_conversion,
+            )
 
             log_db_commit(
                 f"Auto-attached selector/submitter records for student {student.user.name} "
@@ -1258,65 +1718,7 @@ def register_rollover_tasks(celery):
         if not record.owner.user.active:
             return
 
-        # supervisors re-enroll in the year *before* they come off sabbatical, so they can offer
-        # projects during the selection cycle
-        if record.supervisor_state != EnrollmentRecord.SUPERVISOR_ENROLLED:
-            # supervisors are sometimes re-enrolled one year early, because projects are *offered*
-            # in the academic year before the run
-            renroll_offset = -1 if record.pclass.reenroll_supervisors_early else 0
-
-            if record.supervisor_reenroll is not None and record.supervisor_reenroll + renroll_offset <= current_year:
-                record.supervisor_state = EnrollmentRecord.SUPERVISOR_ENROLLED
-                record.supervisor_reenroll = None
-                record.supervisor_comment = "Automatically re-enrolled during academic year rollover"
-                if record.pclass.uses_supervisor:
-                    add_notification(
-                        record.owner,
-                        EmailNotification.FACULTY_REENROLL_SUPERVISOR,
-                        record,
-                    )
-
-        # re-enrol markers in the year they come off sabbatical
-        if record.marker_state != EnrollmentRecord.MARKER_ENROLLED:
-            if record.marker_reenroll is not None and record.marker_reenroll <= current_year:
-                record.marker_state = EnrollmentRecord.MARKER_ENROLLED
-                record.marker_reenroll = None
-                record.marker_comment = "Automatically re-enrolled during academic year rollover"
-                if record.pclass.uses_marker:
-                    add_notification(record.owner, EmailNotification.FACULTY_REENROLL_MARKER, record)
-
-        # re-enrol moderator in the year they come off sabbatical
-        if record.moderator_state != EnrollmentRecord.MODERATOR_ENROLLED:
-            if record.moderator_reenroll is not None and record.moderator_reenroll <= current_year:
-                record.moderator_state = EnrollmentRecord.MODERATOR_ENROLLED
-                record.moderator_reenroll = None
-                record.moderator_comment = "Automatically re-enrolled during academic year rollover"
-                if record.pclass.uses_moderator:
-                    add_notification(
-                        record.owner,
-                        EmailNotification.FACULTY_REENROLL_MODERATOR,
-                        record,
-                    )
-
-        # re-enrol presentation assessors in the year they come off sabbatical
-        if record.presentations_state != EnrollmentRecord.PRESENTATIONS_ENROLLED:
-            if record.presentations_reenroll is not None and record.presentations_reenroll <= current_year:
-                record.presentations_state = EnrollmentRecord.PRESENTATIONS_ENROLLED
-                record.presentations_reenroll = None
-                record.presentations_comment = "Automatically re-enrolled during academic year rollover"
-
-                notify = False
-                for p in record.pclass.periods:
-                    p: SubmissionPeriodDefinition
-                    if p.has_presentation:
-                        notify = True
-                        break
-                if notify:
-                    add_notification(
-                        record.owner,
-                        EmailNotification.FACULTY_REENROLL_PRESENTATIONS,
-                        record,
-                    )
+        _reenroll_record(record, current_year)
 
         try:
             log_db_commit(
@@ -1356,7 +1758,7 @@ def register_rollover_tasks(celery):
                 or record.validated_timestamp is None
                 or record.workflow_state != ProjectDescription.WORKFLOW_APPROVAL_VALIDATED
             ):
-                record.validated_id = None
+                record.validator_id = None
                 record.validated_timestamp = None
 
             # change projects marked as 'Rejected' back to 'Queued', except that we
@@ -1372,7 +1774,7 @@ def register_rollover_tasks(celery):
             # if the parent project is not active, force the description to be queued and with
             # no validation data
             record.workflow_state = ProjectDescription.WORKFLOW_APPROVAL_QUEUED
-            record.validated_id = None
+            record.validator_id = None
             record.validated_timestamp = None
 
         try:
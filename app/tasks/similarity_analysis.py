@@ -26,6 +26,7 @@ from ..shared.llm_services import _call_llm
 from ..shared.scraped_text_store import (
     get_scraped_text,
     get_similarity_chunks,
+    get_similarity_chunks_bulk,
     store_embeddings,
     store_minhash_signatures,
     store_similarity_chunks,
@@ -139,6 +140,306 @@ def _build_heading_classification_schema(headings: list[str]) -> dict:
     }
 
 
+# ---------------------------------------------------------------------------
+# Stage computations
+#
+# These carry out the work of each task without touching the SQL database, so that they can also be driven
+# directly by the pipeline benchmark harness (pipeline-benchmark/pipeline_benchmark.py).
+# ---------------------------------------------------------------------------
+
+
+def _classify_document_sections(raw_text: str, base_url: str, model: str, context_size: int, record_id: int) -> tuple[dict | None, str, int]:
+    """
+    Detect the top-level sections of *raw_text*, classify their headings into CHUNK_TYPES with the LLM, and
+    merge the section texts by classification.
+
+    Returns (sections, heading_style, num_sections), where sections maps chunk_type -> {"text", "present"}.
+    If no top-level sections are detected, every chunk is marked absent without calling the LLM.
+    sections is None if the LLM classification fails.
+    """
+    # Phase 1 — CPU heading detection
+    _core, _references, _appendices = _split_document(raw_text)
+    clean_core = _strip_math_lines(_core)
+    clean_core = _strip_code_blocks(clean_core)
+    clean_core = _strip_toc_block(clean_core)
+    top_level_sections, heading_style = _detect_top_level_sections(clean_core)
+
+    if not top_level_sections:
+        current_app.logger.warning(
+            f"extract_chunks: no top-level sections detected for SubmissionRecord #{record_id} "
+            f"(heading_style=none) — storing all chunks as absent"
+        )
+        return {ct: {"text": "", "present": False} for ct in CHUNK_TYPES}, "none", 0
+
+    # Phase 2 — LLM heading classification
+    heading_strings = [s["heading"] for s in top_level_sections]
+    parsed_result, _accumulated, _last_exc, _est_tok, _ = _call_llm(
+        base_url=base_url,
+        model=model,
+        system_prompt=_build_heading_classification_system_prompt(),
+        user_prompt=_build_heading_classification_user_prompt(heading_strings),
+        schema=_build_heading_classification_schema(heading_strings),
+        options={"num_ctx": context_size},
+        label=f"extract_chunks/classify_headings (record #{record_id})",
+    )
+
+    if parsed_result is None:
+        return None, heading_style, len(top_level_sections)
+
+    # Phase 3 — CPU merge
+    chunk_texts: dict[str, list[str]] = {ct: [] for ct in CHUNK_TYPES}
+    for section in top_level_sections:
+        heading = section["heading"]
+        assigned_type = parsed_result.get(heading)
+        if assigned_type and assigned_type in CHUNK_TYPES:
+            if len(section["full_text"].split()) < MIN_CHUNK_WORDS:
+                current_app.logger.debug(
+                    f"extract_chunks: section '{heading}' for record #{record_id} has fewer than {MIN_CHUNK_WORDS} words — treating as absent"
+                )
+                continue
+            chunk_texts[assigned_type].append(section["full_text"])
+
+    sections_out = {
+        ct: {
+            "text": "\n\n".join(chunk_texts[ct]),
+            "present": bool(chunk_texts[ct]),
+        }
+        for ct in CHUNK_TYPES
+    }
+
+    return sections_out, heading_style, len(top_level_sections)
+
+
+def _minhash_signatures(sections: dict, record_id: int) -> dict[str, list[int]]:
+    """
+    Compute MinHash signatures (word 3-shingles) for each present chunk in *sections*.
+    Returns a dict mapping chunk_type -> list of hash values.
+    """
+    from datasketch import MinHash
+
+    signatures: dict[str, list[int]] = {}
+
+    for chunk_type in CHUNK_TYPES:
+        section = sections.get(chunk_type, {})
+        if not section.get("present", False):
+            continue
+        text = section.get("text", "")
+        if not text:
+            continue
+        try:
+            words = text.lower().split()
+            if len(words) < MIN_CHUNK_WORDS:
+                current_app.logger.debug(
+                    f"compute_minhash: chunk '{chunk_type}' for record #{record_id} has fewer than {MIN_CHUNK_WORDS} words — skipping MinHash"
+                )
+                continue
+            shingles = set()
+            for i in range(len(words) - 2):
+                shingles.add(tuple(words[i : i + 3]))
+
+            mh = MinHash(num_perm=MINHASH_NUM_PERM)
+            for shingle in shingles:
+                mh.update(" ".join(shingle).encode("utf-8"))
+
+            signatures[chunk_type] = mh.hashvalues.tolist()
+        except Exception as exc:
+            current_app.logger.warning(f"compute_minhash: failed for chunk '{chunk_type}' of record #{record_id}: {exc}")
+
+    return signatures
+
+
+def _embedding_vectors(sections: dict, st_model, record_id: int) -> dict[str, list[float]]:
+    """
+    Compute sentence-transformer embeddings with *st_model* for each present chunk in *sections*.
+    Returns a dict mapping chunk_type -> embedding vector.
+    """
+    embedding_vectors: dict[str, list[float]] = {}
+
+    for chunk_type in CHUNK_TYPES:
+        section = sections.get(chunk_type, {})
+        if not section.get("present", False):
+            continue
+        text = section.get("text", "")
+        if not text:
+            continue
+        if len(text.split()) < MIN_CHUNK_WORDS:
+            current_app.logger.debug(
+                f"compute_minhash: chunk '{chunk_type}' for record #{record_id} has fewer than {MIN_CHUNK_WORDS} words — skipping embedding"
+            )
+            continue
+        try:
+            vec = st_model.encode(text, convert_to_numpy=True)
+            embedding_vectors[chunk_type] = vec.tolist()
+        except Exception as exc:
+            current_app.logger.warning(f"compute_minhash: embedding failed for chunk '{chunk_type}' of record #{record_id}: {exc}")
+
+    return embedding_vectors
+
+
+def _find_similarity_concerns(record_id: int, chunks: dict, other_docs: list[dict], active_model_name: str) -> list[dict]:
+    """
+    Compare the similarity_chunks subdocument *chunks* of *record_id* against *other_docs* (a list of
+    {"submission_record_id", "similarity_chunks"} dicts), by MinHash Jaccard and by embedding cosine.
+
+    Returns a list of concern dicts, one per (record pair, chunk type) for which either metric exceeds its
+    threshold.
+    """
+    import numpy as np
+    from datasketch import MinHash
+
+    current_sections = chunks.get("sections", {})
+    current_sigs: dict[str, list[int]] = chunks.get("minhash_signatures") or {}
+    current_embeddings: dict[str, list[float]] = chunks.get("embedding_vectors") or {}
+    current_embedding_model: str = chunks.get("embedding_model", "")
+
+    # ------------------------------------------------------------------
+    # Build per-pair trigger flags across all chunk types
+    # pair_key -> {"record_a_id", "record_b_id", "chunk_type",
+    #              "minhash_jaccard", "transformer_cosine",
+    #              "jaccard_triggered", "cosine_triggered", "embedding_model"}
+    # ------------------------------------------------------------------
+    pair_concerns: dict[tuple, dict] = {}
+    doc_map = {d["submission_record_id"]: d for d in other_docs}
+
+    for chunk_type in CHUNK_TYPES:
+        current_section = current_sections.get(chunk_type, {})
+        if not current_section.get("present", False):
+            continue
+        if len(current_section.get("text", "").split()) < MIN_CHUNK_WORDS:
+            continue
+
+        # ---- Jaccard phase: exact MinHash Jaccard for all other records ----
+        if chunk_type in current_sigs:
+            current_mh = MinHash(num_perm=MINHASH_NUM_PERM)
+            current_mh.hashvalues[:] = current_sigs[chunk_type]
+
+            for doc in other_docs:
+                other_id = doc["submission_record_id"]
+                other_sigs = doc.get("similarity_chunks", {}).get("minhash_signatures", {})
+                if chunk_type not in other_sigs:
+                    continue
+                try:
+                    other_mh = MinHash(num_perm=MINHASH_NUM_PERM)
+                    other_mh.hashvalues[:] = other_sigs[chunk_type]
+                    jaccard = float(current_mh.jaccard(other_mh))
+                except Exception as exc:
+                    current_app.logger.debug(f"run_similarity_check: Jaccard failed for records #{record_id}/#{other_id} chunk '{chunk_type}': {exc}")
+                    continue
+
+                if jaccard < MINHASH_JACCARD_CONCERN_THRESHOLD:
+                    continue
+
+                a_id, b_id = min(record_id, other_id), max(record_id, other_id)
+                key = (a_id, b_id, chunk_type)
+                entry = pair_concerns.setdefault(
+                    key,
+                    {
+                        "record_a_id": a_id,
+                        "record_b_id": b_id,
+                        "chunk_type": chunk_type,
+                        "minhash_jaccard": None,
+                        "transformer_cosine": None,
+                        "jaccard_triggered": False,
+                        "cosine_triggered": False,
+                        "embedding_model": None,
+                    },
+                )
+                entry["minhash_jaccard"] = jaccard
+                entry["jaccard_triggered"] = True
+
+        # ---- Cosine phase: batch similarity using cached embeddings ----
+        current_emb_vec = current_embeddings.get(chunk_type)
+        if current_emb_vec is None or current_embedding_model != active_model_name:
+            if chunk_type in current_sigs:  # only warn when MinHash exists (chunk is present)
+                current_app.logger.debug(
+                    f"run_similarity_check: no current-model embedding for chunk '{chunk_type}' "
+                    f"of record #{record_id} — skipping cosine phase for this chunk"
+                )
+            continue
+
+        current_vec = np.array(current_emb_vec, dtype=np.float32)
+        current_norm = np.linalg.norm(current_vec)
+        if current_norm == 0:
+            continue
+
+        cosine_threshold = CHUNK_SIMILARITY_THRESHOLD.get(chunk_type, 0.80)
+
+        # Collect other records that have a matching-model embedding for this chunk
+        other_ids_with_emb: list[int] = []
+        other_vecs: list[np.ndarray] = []
+
+        for doc in other_docs:
+            other_id = doc["submission_record_id"]
+            sc = doc.get("similarity_chunks", {})
+            if sc.get("embedding_model") != active_model_name:
+                continue
+            other_emb = (sc.get("embedding_vectors") or {}).get(chunk_type)
+            if other_emb is None:
+                continue
+            other_text = (sc.get("sections") or {}).get(chunk_type, {}).get("text", "")
+            if len(other_text.split()) < MIN_CHUNK_WORDS:
+                continue
+            other_ids_with_emb.append(other_id)
+            other_vecs.append(np.array(other_emb, dtype=np.float32))
+
+        if not other_vecs:
+            continue
+
+        other_matrix = np.stack(other_vecs)  # (n, dim)
+        other_norms = np.linalg.norm(other_matrix, axis=1)
+        nonzero = other_norms != 0
+        cosines = np.zeros(len(other_ids_with_emb), dtype=np.float32)
+        cosines[nonzero] = (other_matrix[nonzero] @ current_vec) / (other_norms[nonzero] * current_norm)
+
+        for i, other_id in enumerate(other_ids_with_emb):
+            cosine = float(cosines[i])
+            if cosine < cosine_threshold:
+                continue
+
+            a_id, b_id = min(record_id, other_id), max(record_id, other_id)
+            key = (a_id, b_id, chunk_type)
+
+            # Also retrieve Jaccard if not already computed for this pair
+            jaccard = None
+            if key in pair_concerns:
+                jaccard = pair_concerns[key].get("minhash_jaccard")
+            elif chunk_type in current_sigs:
+                # Compute Jaccard on demand for cosine-only pairs
+                other_doc = doc_map.get(other_id)
+                if other_doc is not None:
+                    other_sigs = other_doc.get("similarity_chunks", {}).get("minhash_signatures", {})
+                    if chunk_type in other_sigs:
+                        try:
+                            current_mh = MinHash(num_perm=MINHASH_NUM_PERM)
+                            current_mh.hashvalues[:] = current_sigs[chunk_type]
+                            other_mh = MinHash(num_perm=MINHASH_NUM_PERM)
+                            other_mh.hashvalues[:] = other_sigs[chunk_type]
+                            jaccard = float(current_mh.jaccard(other_mh))
+                        except Exception:
+                            pass
+
+            entry = pair_concerns.setdefault(
+                key,
+                {
+                    "record_a_id": a_id,
+                    "record_b_id": b_id,
+                    "chunk_type": chunk_type,
+                    "minhash_jaccard": None,
+                    "transformer_cosine": None,
+                    "jaccard_triggered": False,
+                    "cosine_triggered": False,
+                    "embedding_model": None,
+                },
+            )
+            if jaccard is not None:
+                entry["minhash_jaccard"] = jaccard
+            entry["transformer_cosine"] = cosine
+            entry["cosine_triggered"] = True
+            entry["embedding_model"] = active_model_name
+
+    return list(pair_concerns.values())
+
+
 # ---------------------------------------------------------------------------
 # Task registration
 # ---------------------------------------------------------------------------
@@ -166,8 +467,6 @@ def register_similarity_analysis_tasks(celery):
 
         Result stored in MongoDB similarity_chunks subdocument.
         """
-        from billiard.exceptions import SoftTimeLimitExceeded
-
         _r = None
         try:
             _r = get_pipeline_redis()
@@ -239,63 +538,16 @@ def register_similarity_analysis_tasks(celery):
             current_app.logger.warning(f"extract_chunks: empty scraped text for SubmissionRecord #{record_id} — skipping")
             return
 
-        # ------------------------------------------------------------------
-        # Phase 1 — CPU heading detection
-        # ------------------------------------------------------------------
-        _core, _references, _appendices = _split_document(raw_text)
-        clean_core = _strip_math_lines(_core)
-        clean_core = _strip_code_blocks(clean_core)
-        clean_core = _strip_toc_block(clean_core)
-        top_level_sections, heading_style = _detect_top_level_sections(clean_core)
-
         context_size: int = current_app.config.get(_CHUNK_EXTRACTION_CTX_KEY, _CHUNK_EXTRACTION_CTX_DEFAULT)
         base_url: str = current_app.config.get("OLLAMA_BASE_URL", "http://localhost:11434")
         model: str = current_app.config.get("OLLAMA_MODEL", "llama3.1:70b")
 
-        _empty_sections = {ct: {"text": "", "present": False} for ct in CHUNK_TYPES}
-
-        if not top_level_sections:
-            current_app.logger.warning(
-                f"extract_chunks: no top-level sections detected for SubmissionRecord #{record_id} "
-                f"(heading_style=none) — storing all chunks as absent"
-            )
-            store_similarity_chunks(record_id, _empty_sections, model, CHUNK_EXTRACTION_PROMPT_VERSION, "none", 0)
-            try:
-                record = db.session.get(SubmissionRecord, record_id)
-                if record is not None:
-                    record.chunks_present = True
-                    record.chunks_prompt_version = CHUNK_EXTRACTION_PROMPT_VERSION
-                    db.session.commit()
-            except SQLAlchemyError as exc:
-                db.session.rollback()
-                current_app.logger.warning(f"extract_chunks: could not set chunks_present for record #{record_id}: {exc}")
-            record_step_end(_r, record_id, "extract_chunks", _t0)
-            return
-
-        # ------------------------------------------------------------------
-        # Phase 2 — LLM heading classification
-        # ------------------------------------------------------------------
-        heading_strings = [s["heading"] for s in top_level_sections]
-        system_prompt = _build_heading_classification_system_prompt()
-        user_prompt = _build_heading_classification_user_prompt(heading_strings)
-        schema = _build_heading_classification_schema(heading_strings)
-
+        # release the DB connection before the (possibly long) LLM classification call
         db.session.close()
 
-        try:
-            parsed_result, _accumulated, last_exc, _est_tok, _ = _call_llm(
-                base_url=base_url,
-                model=model,
-                system_prompt=system_prompt,
-                user_prompt=user_prompt,
-                schema=schema,
-                options={"num_ctx": context_size},
-                label=f"extract_chunks/classify_headings (record #{record_id})",
-            )
-        except SoftTimeLimitExceeded:
-            raise
+        sections_out, heading_style, num_sections = _classify_document_sections(raw_text, base_url, model, context_size, record_id)
 
-        if parsed_result is None:
+        if sections_out is None:
             current_app.logger.error(f"extract_chunks: LLM classification failed for SubmissionRecord #{record_id}")
             try:
                 rec = db.session.get(SubmissionRecord, record_id)
@@ -311,29 +563,6 @@ def register_similarity_analysis_tasks(celery):
             record_step_end(_r, record_id, "extract_chunks", _t0, error="LLM heading classification returned no result")
             return
 
-        # ------------------------------------------------------------------
-        # Phase 3 — CPU merge
-        # ------------------------------------------------------------------
-        chunk_texts: dict[str, list[str]] = {ct: [] for ct in CHUNK_TYPES}
-        for section in top_level_sections:
-            heading = section["heading"]
-            assigned_type = parsed_result.get(heading)
-            if assigned_type and assigned_type in CHUNK_TYPES:
-                if len(section["full_text"].split()) < MIN_CHUNK_WORDS:
-                    current_app.logger.debug(
-                        f"extract_chunks: section '{heading}' for record #{record_id} has fewer than {MIN_CHUNK_WORDS} words — treating as absent"
-                    )
-                    continue
-                chunk_texts[assigned_type].append(section["full_text"])
-
-        sections_out = {
-            ct: {
-                "text": "\n\n".join(chunk_texts[ct]),
-                "present": bool(chunk_texts[ct]),
-            }
-            for ct in CHUNK_TYPES
-        }
-
         # ------------------------------------------------------------------
         # Persist and finish
         # ------------------------------------------------------------------
@@ -343,7 +572,7 @@ def register_similarity_analysis_tasks(celery):
             model,
             CHUNK_EXTRACTION_PROMPT_VERSION,
             heading_style,
-            len(top_level_sections),
+            num_sections,
         )
 
         try:
@@ -357,9 +586,7 @@ def register_similarity_analysis_tasks(celery):
             db.session.rollback()
             raise self.retry(exc=exc)
 
-        current_app.logger.info(
-            f"extract_chunks: completed for SubmissionRecord #{record_id} (style={heading_style}, sections={len(top_level_sections)})"
-        )
+        current_app.logger.info(f"extract_chunks: completed for SubmissionRecord #{record_id} (style={heading_style}, sections={num_sections})")
 
         record_step_end(_r, record_id, "extract_chunks", _t0)
 
@@ -378,8 +605,6 @@ def register_similarity_analysis_tasks(celery):
         MinHash and embedding steps are independently idempotent: each checks its
         own freshness guard so only the stale one is recomputed.
         """
-        from datasketch import MinHash
-
         _r = None
         try:
             _r = get_pipeline_redis()
@@ -409,33 +634,7 @@ def register_similarity_analysis_tasks(celery):
         if minhash_current:
             current_app.logger.info(f"compute_minhash: signatures already current for SubmissionRecord #{record_id} — skipping")
         else:
-            signatures: dict[str, list[int]] = {}
-
-            for chunk_type in CHUNK_TYPES:
-                section = sections.get(chunk_type, {})
-                if not section.get("present", False):
-                    continue
-                text = section.get("text", "")
-                if not text:
-                    continue
-                try:
-                    words = text.lower().split()
-                    if len(words) < MIN_CHUNK_WORDS:
-                        current_app.logger.debug(
-                            f"compute_minhash: chunk '{chunk_type}' for record #{record_id} has fewer than {MIN_CHUNK_WORDS} words — skipping MinHash"
-                        )
-                        continue
-                    shingles = set()
-                    for i in range(len(words) - 2):
-                        shingles.add(tuple(words[i : i + 3]))
-
-                    mh = MinHash(num_perm=MINHASH_NUM_PERM)
-                    for shingle in shingles:
-                        mh.update(" ".join(shingle).encode("utf-8"))
-
-                    signatures[chunk_type] = mh.hashvalues.tolist()
-                except Exception as exc:
-                    current_app.logger.warning(f"compute_minhash: failed for chunk '{chunk_type}' of record #{record_id}: {exc}")
+            signatures = _minhash_signatures(sections, record_id)
 
             if signatures:
                 store_minhash_signatures(record_id, signatures)
@@ -459,25 +658,7 @@ def register_similarity_analysis_tasks(celery):
         if embedding_current:
             current_app.logger.info(f"compute_minhash: embeddings already current for SubmissionRecord #{record_id} (model={model_name}) — skipping")
         else:
-            embedding_vectors: dict[str, list[float]] = {}
-
-            for chunk_type in CHUNK_TYPES:
-                section = sections.get(chunk_type, {})
-                if not section.get("present", False):
-                    continue
-                text = section.get("text", "")
-                if not text:
-                    continue
-                if len(text.split()) < MIN_CHUNK_WORDS:
-                    current_app.logger.debug(
-                        f"compute_minhash: chunk '{chunk_type}' for record #{record_id} has fewer than {MIN_CHUNK_WORDS} words — skipping embedding"
-                    )
-                    continue
-                try:
-                    vec = st_model.encode(text, convert_to_numpy=True)
-                    embedding_vectors[chunk_type] = vec.tolist()
-                except Exception as exc:
-                    current_app.logger.warning(f"compute_minhash: embedding failed for chunk '{chunk_type}' of record #{record_id}: {exc}")
+            embedding_vectors = _embedding_vectors(sections, st_model, record_id)
 
             if embedding_vectors:
                 store_embeddings(record_id, embedding_vectors, model_name)
@@ -504,11 +685,6 @@ def register_similarity_analysis_tasks(celery):
           - Jaccard >= MINHASH_JACCARD_CONCERN_THRESHOLD
           - cosine  >= CHUNK_SIMILARITY_THRESHOLD[chunk_type]
         """
-        import numpy as np
-        from datasketch import MinHash
-
-        from ..shared.scraped_text_store import _get_collection
-
         _r = None
         try:
             _r = get_pipeline_redis()
@@ -522,11 +698,6 @@ def register_similarity_analysis_tasks(celery):
             record_step_end(_r, record_id, "run_similarity_check", _t0, error="No minhash signatures — skipped")
             return
 
-        current_sections = chunks.get("sections", {})
-        current_sigs: dict[str, list[int]] = chunks["minhash_signatures"]
-        current_embeddings: dict[str, list[float]] = chunks.get("embedding_vectors") or {}
-        current_embedding_model: str = chunks.get("embedding_model", "")
-
         # Resolve the active ST model name (used to match cached embeddings)
         _, active_model_name = _get_st_model()
 
@@ -572,178 +743,18 @@ def register_similarity_analysis_tasks(celery):
         # ------------------------------------------------------------------
         # Load other same-tenant records from MongoDB (signatures + embeddings)
         # ------------------------------------------------------------------
-        client, collection = _get_collection()
-        if collection is None:
-            current_app.logger.warning(f"run_similarity_check: MongoDB not configured — skipping for record #{record_id}")
+        other_chunks = get_similarity_chunks_bulk(same_tenant_ids, require_signatures=True)
+        if other_chunks is None:
+            current_app.logger.warning(f"run_similarity_check: MongoDB unavailable — skipping for record #{record_id}")
             return
 
-        try:
-            cursor = collection.find(
-                {
-                    "submission_record_id": {"$in": same_tenant_ids},
-                    "similarity_chunks.minhash_signatures": {"$exists": True},
-                },
-                projection={"submission_record_id": 1, "similarity_chunks": 1, "_id": 0},
-            )
-            other_docs = list(cursor)
-        except Exception as exc:
-            current_app.logger.warning(f"run_similarity_check: MongoDB query failed for record #{record_id}: {exc}")
-            return
-        finally:
-            client.close()
+        other_docs = [{"submission_record_id": rid, "similarity_chunks": sc} for rid, sc in other_chunks.items()]
 
         if not other_docs:
             current_app.logger.info(f"run_similarity_check: no other records with signatures — skipping for record #{record_id}")
             return
 
-        # ------------------------------------------------------------------
-        # Build per-pair trigger flags across all chunk types
-        # pair_key -> {"record_a_id", "record_b_id", "chunk_type",
-        #              "minhash_jaccard", "transformer_cosine",
-        #              "jaccard_triggered", "cosine_triggered", "embedding_model"}
-        # ------------------------------------------------------------------
-        pair_concerns: dict[tuple, dict] = {}
-
-        for chunk_type in CHUNK_TYPES:
-            current_section = current_sections.get(chunk_type, {})
-            if not current_section.get("present", False):
-                continue
-            if len(current_section.get("text", "").split()) < MIN_CHUNK_WORDS:
-                continue
-
-            # ---- Jaccard phase: exact MinHash Jaccard for all other records ----
-            if chunk_type in current_sigs:
-                current_mh = MinHash(num_perm=MINHASH_NUM_PERM)
-                current_mh.hashvalues[:] = current_sigs[chunk_type]
-
-                for doc in other_docs:
-                    other_id = doc["submission_record_id"]
-                    other_sigs = doc.get("similarity_chunks", {}).get("minhash_signatures", {})
-                    if chunk_type not in other_sigs:
-                        continue
-                    try:
-                        other_mh = MinHash(num_perm=MINHASH_NUM_PERM)
-                        other_mh.hashvalues[:] = other_sigs[chunk_type]
-                        jaccard = float(current_mh.jaccard(other_mh))
-                    except Exception as exc:
-                        current_app.logger.debug(
-                            f"run_similarity_check: Jaccard failed for records #{record_id}/#{other_id} chunk '{chunk_type}': {exc}"
-                        )
-                        continue
-
-                    if jaccard < MINHASH_JACCARD_CONCERN_THRESHOLD:
-                        continue
-
-                    a_id, b_id = min(record_id, other_id), max(record_id, other_id)
-                    key = (a_id, b_id, chunk_type)
-                    entry = pair_concerns.setdefault(
-                        key,
-                        {
-                            "record_a_id": a_id,
-                            "record_b_id": b_id,
-                            "chunk_type": chunk_type,
-                            "minhash_jaccard": None,
-                            "transformer_cosine": None,
-                            "jaccard_triggered": False,
-                            "cosine_triggered": False,
-                            "embedding_model": None,
-                        },
-                    )
-                    entry["minhash_jaccard"] = jaccard
-                    entry["jaccard_triggered"] = True
-
-            # ---- Cosine phase: batch similarity using cached embeddings ----
-            current_emb_vec = current_embeddings.get(chunk_type)
-            if current_emb_vec is None or current_embedding_model != active_model_name:
-                if chunk_type in current_sigs:  # only warn when MinHash exists (chunk is present)
-                    current_app.logger.debug(
-                        f"run_similarity_check: no current-model embedding for chunk '{chunk_type}' "
-                        f"of record #{record_id} — skipping cosine phase for this chunk"
-                    )
-                continue
-
-            current_vec = np.array(current_emb_vec, dtype=np.float32)
-            current_norm = np.linalg.norm(current_vec)
-            if current_norm == 0:
-                continue
-
-            cosine_threshold = CHUNK_SIMILARITY_THRESHOLD.get(chunk_type, 0.80)
-
-            # Collect other records that have a matching-model embedding for this chunk
-            other_ids_with_emb: list[int] = []
-            other_vecs: list[np.ndarray] = []
-
-            for doc in other_docs:
-                other_id = doc["submission_record_id"]
-                sc = doc.get("similarity_chunks", {})
-                if sc.get("embedding_model") != active_model_name:
-                    continue
-                other_emb = (sc.get("embedding_vectors") or {}).get(chunk_type)
-                if other_emb is None:
-                    continue
-                other_text = (sc.get("sections") or {}).get(chunk_type, {}).get("text", "")
-                if len(other_text.split()) < MIN_CHUNK_WORDS:
-                    continue
-                other_ids_with_emb.append(other_id)
-                other_vecs.append(np.array(other_emb, dtype=np.float32))
-
-            if not other_vecs:
-                continue
-
-            other_matrix = np.stack(other_vecs)  # (n, dim)
-            other_norms = np.linalg.norm(other_matrix, axis=1)
-            nonzero = other_norms != 0
-            cosines = np.zeros(len(other_ids_with_emb), dtype=np.float32)
-            cosines[nonzero] = (other_matrix[nonzero] @ current_vec) / (other_norms[nonzero] * current_norm)
-
-            for i, other_id in enumerate(other_ids_with_emb):
-                cosine = float(cosines[i])
-                if cosine < cosine_threshold:
-                    continue
-
-                a_id, b_id = min(record_id, other_id), max(record_id, other_id)
-                key = (a_id, b_id, chunk_type)
-
-                # Also retrieve Jaccard if not already computed for this pair
-                jaccard = None
-                if key in pair_concerns:
-                    jaccard = pair_concerns[key].get("minhash_jaccard")
-                elif chunk_type in current_sigs:
-                    # Compute Jaccard on demand for cosine-only pairs
-                    doc_map = {d["submission_record_id"]: d for d in other_docs}
-                    other_doc = doc_map.get(other_id)
-                    if other_doc is not None:
-                        other_sigs = other_doc.get("similarity_chunks", {}).get("minhash_signatures", {})
-                        if chunk_type in other_sigs:
-                            try:
-                                current_mh = MinHash(num_perm=MINHASH_NUM_PERM)
-                                current_mh.hashvalues[:] = current_sigs[chunk_type]
-                                other_mh = MinHash(num_perm=MINHASH_NUM_PERM)
-                                other_mh.hashvalues[:] = other_sigs[chunk_type]
-                                jaccard = float(current_mh.jaccard(other_mh))
-                            except Exception:
-                                pass
-
-                entry = pair_concerns.setdefault(
-                    key,
-                    {
-                        "record_a_id": a_id,
-                        "record_b_id": b_id,
-                        "chunk_type": chunk_type,
-                        "minhash_jaccard": None,
-                        "transformer_cosine": None,
-                        "jaccard_triggered": False,
-                        "cosine_triggered": False,
-                        "embedding_model": None,
-                    },
-                )
-                if jaccard is not None:
-                    entry["minhash_jaccard"] = jaccard
-                entry["transformer_cosine"] = cosine
-                entry["cosine_triggered"] = True
-                entry["embedding_model"] = active_model_name
-
-        concerns_to_upsert = list(pair_concerns.values())
+        concerns_to_upsert = _find_similarity_concerns(record_id, chunks, other_docs, active_model_name)
 
         # ------------------------------------------------------------------
         # Persist concerns: delete stale unreviewed rows first, then upsert
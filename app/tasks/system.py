@@ -26,6 +26,7 @@ from ..models import (
     User,
 )
 from ..shared.internal_redis import get_redis
+from ..shared.notification_stream import clear_all_task_progress
 from ..shared.workflow_logging import log_db_commit
 
 
@@ -70,6 +71,9 @@ def register_system_tasks(celery):
             current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
             raise self.retry()
 
+        # in-flight task progress is held only in Redis
+        clear_all_task_progress()
+
         self.update_state(state="FINISHED")
 
     @celery.task(bind=True, default_retry_delay=30)
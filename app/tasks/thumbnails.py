@@ -8,8 +8,13 @@
 # Contributors: David Seery <D.Seery@sussex.ac.uk>
 #
 
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from io import BytesIO
 from pathlib import Path
+from typing import Dict, List, Tuple
 
 from flask import current_app
 from sqlalchemy.exc import SQLAlchemyError
@@ -27,6 +32,228 @@ _ASSET_TYPES = {
     "SubmittedAsset": SubmittedAsset,
 }
 
+# thumbnail sizes as (name, width, height), largest first: the source is rendered once at the largest size,
+# and the smaller sizes are derived from that rendering by downscaling
+_THUMBNAIL_SIZES = [
+    ("medium", 400, 400),
+    ("small", 200, 200),
+]
+
+_JPEG_QUALITY = 85
+
+# shared pool for object store uploads and deletes, created lazily in each worker process
+_io_executor = None
+_io_executor_pid = None
+_io_executor_lock = threading.Lock()
+
+
+def _get_io_executor() -> ThreadPoolExecutor:
+    global _io_executor, _io_executor_pid
+
+    with _io_executor_lock:
+        if _io_executor is None or _io_executor_pid != os.getpid():
+            _io_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="thumbnail-io")
+            _io_executor_pid = os.getpid()
+
+        return _io_executor
+
+
+class _ThumbnailRenderer:
+    """
+    Renders JPEG thumbnails at every size in _THUMBNAIL_SIZES from a single rendering of the source.
+
+    The underlying PreviewManager (and its cache folder) is created once and reused for every source
+    rendered by this instance, so a batch of assets pays its start-up cost only once. Rendered previews are
+    removed from the cache folder as soon as they have been read, so the folder does not grow during a batch.
+    Use as a context manager.
+    """
+
+    def __init__(self):
+        self._cache_dir = None
+        self._manager = None
+
+    def __enter__(self):
+        from preview_generator.manager import PreviewManager
+
+        self._cache_dir = ScratchFolderManager()
+        self._manager = PreviewManager(str(self._cache_dir.path), create_folder=False)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._manager = None
+        self._cache_dir.__exit__(exc_type, exc_val, exc_tb)
+        return False
+
+    def render(self, source_path: Path) -> Dict[str, bytes]:
+        """
+        Return JPEG data for each named thumbnail size.
+        """
+        from PIL import Image
+
+        largest_name, largest_width, largest_height = _THUMBNAIL_SIZES[0]
+        preview_path = Path(self._manager.get_jpeg_preview(str(source_path), width=largest_width, height=largest_height))
+
+        try:
+            rendered = {largest_name: preview_path.read_bytes()}
+
+            with Image.open(preview_path) as image:
+                image.load()
+
+                for name, width, height in _THUMBNAIL_SIZES[1:]:
+                    scaled = image.copy()
+                    scaled.thumbnail((width, height), Image.Resampling.LANCZOS)
+
+                    buf = BytesIO()
+                    scaled.convert("RGB").save(buf, format="JPEG", quality=_JPEG_QUALITY, optimize=True)
+                    rendered[name] = buf.getvalue()
+        finally:
+            preview_path.unlink(missing_ok=True)
+
+        return rendered
+
+
+def _upload_thumbnails(thumbnails_store, rendered: Dict[str, bytes], audit_label: str) -> Dict[str, ThumbnailAsset]:
+    """
+    Upload rendered thumbnails to the thumbnails bucket in parallel, returning a new (unflushed) ThumbnailAsset
+    for each size. On failure, any thumbnails that were uploaded are removed again before the exception is raised.
+    """
+    now = datetime.now()
+    thumbnails = {name: ThumbnailAsset(timestamp=now) for name in rendered}
+
+    def _upload(name: str) -> None:
+        with AssetUploadManager(
+            thumbnails[name],
+            data=rendered[name],
+            storage=thumbnails_store,
+            audit_data=f"generate_thumbnails {name}: {audit_label}",
+            mimetype="image/jpeg",
+        ):
+            pass
+
+    executor = _get_io_executor()
+    futures = {name: executor.submit(_upload, name) for name in rendered}
+
+    errors = []
+    for name, future in futures.items():
+        try:
+            future.result()
+        except Exception as e:
+            errors.append(e)
+
+    if errors:
+        uploaded = [thumbnails[name] for name, future in futures.items() if future.exception() is None]
+        _delete_thumbnail_objects(thumbnails_store, uploaded, audit_label)
+        raise errors[0]
+
+    return thumbnails
+
+
+def _delete_thumbnail_objects(store, thumbnails: List[ThumbnailAsset], audit_label: str) -> None:
+    """
+    Delete the physical objects for a list of thumbnails from *store* in parallel. Missing objects are ignored.
+    """
+
+    def _delete(unique_name: str) -> None:
+        try:
+            store.delete(unique_name, audit_data=f"generate_thumbnails: replace thumbnail for {audit_label}")
+        except FileNotFoundError:
+            pass
+
+    executor = _get_io_executor()
+    futures = [executor.submit(_delete, thumbnail.unique_name) for thumbnail in thumbnails if thumbnail.unique_name is not None]
+    for future in futures:
+        try:
+            future.result()
+        except Exception as e:
+            current_app.logger.warning(f"generate_thumbnails: could not delete old thumbnail object ({e})")
+
+
+def _generate_asset_thumbnails(asset, asset_type: str, renderer: _ThumbnailRenderer, bucket_map, thumbnails_store) -> None:
+    """
+    Render, upload and attach thumbnails for a single asset, replacing any existing thumbnails.
+    Commits the session. Raises on any error; the caller is responsible for recording it.
+    """
+    audit_label = f"{asset_type} id #{asset.id}"
+
+    source_store = bucket_map.get(asset.bucket)
+    if source_store is None:
+        raise RuntimeError(f"No object store configured for bucket {asset.bucket}")
+
+    adapter = AssetCloudAdapter(
+        asset,
+        source_store,
+        audit_data=f"generate_thumbnails: {audit_label}",
+    )
+
+    with adapter.download_to_scratch() as scratch_file:
+        rendered = renderer.render(scratch_file.path)
+
+    thumbnails = _upload_thumbnails(thumbnails_store, rendered, audit_label)
+
+    try:
+        # stash references to any old thumbnails so we can clean them up after commit
+        old_small = asset.small_thumbnail
+        old_medium = asset.medium_thumbnail
+
+        # clear FKs before deleting old records to avoid FK constraint violations
+        asset.small_thumbnail_id = None
+        asset.medium_thumbnail_id = None
+
+        db.session.add(thumbnails["small"])
+        db.session.add(thumbnails["medium"])
+        db.session.flush()
+
+        asset.small_thumbnail = thumbnails["small"]
+        asset.medium_thumbnail = thumbnails["medium"]
+        asset.thumbnail_error = False
+        asset.thumbnail_error_message = None
+
+        old_thumbnails = [t for t in (old_small, old_medium) if t is not None]
+        old_objects = [(bucket_map.get(t.bucket), t) for t in old_thumbnails]
+
+        for old_asset in old_thumbnails:
+            db.session.delete(old_asset)
+
+        db.session.commit()
+
+    except Exception:
+        db.session.rollback()
+        _delete_thumbnail_objects(thumbnails_store, list(thumbnails.values()), audit_label)
+        raise
+
+    # delete the physical objects for the old thumbnails only once the new ones are committed
+    by_store = {}
+    for store, thumbnail in old_objects:
+        if store is not None:
+            by_store.setdefault(id(store), (store, []))[1].append(thumbnail)
+
+    for store, store_thumbnails in by_store.values():
+        _delete_thumbnail_objects(store, store_thumbnails, audit_label)
+
+
+def dispatch_thumbnail_backfill(items: List[Tuple[str, int]], batch_size: int = None) -> int:
+    """
+    Dispatch generate_thumbnails_batch tasks covering *items*, a list of (asset_type, asset_id) pairs,
+    with up to *batch_size* assets per task. Returns the number of tasks dispatched.
+    """
+    if batch_size is None:
+        batch_size = current_app.config.get("THUMBNAIL_BACKFILL_BATCH_SIZE", 25)
+    batch_size = max(int(batch_size), 1)
+
+    items = [list(item) for item in items]
+    if not items:
+        return 0
+
+    celery = current_app.extensions["celery"]
+    task = celery.tasks["app.tasks.thumbnails.generate_thumbnails_batch"]
+
+    count = 0
+    for i in range(0, len(items), batch_size):
+        task.apply_async(args=[items[i : i + batch_size]])
+        count += 1
+
+    return count
+
 
 def dispatch_thumbnail_task(asset) -> None:
     """
@@ -146,7 +373,6 @@ def register_thumbnail_tasks(celery):
 
         bucket_map = current_app.config.get("OBJECT_STORAGE_BUCKETS")
         thumbnails_store = bucket_map.get(buckets.THUMBNAILS_BUCKET)
-        source_store = bucket_map.get(asset.bucket)
 
         if thumbnails_store is None:
             current_app.logger.error("generate_thumbnails: no ObjectStore for THUMBNAILS_BUCKET")
@@ -154,85 +380,9 @@ def register_thumbnail_tasks(celery):
             self.update_state(state="FINISHED")
             return
 
-        if source_store is None:
-            current_app.logger.error(f"generate_thumbnails: no ObjectStore for bucket {asset.bucket}")
-            _set_thumbnail_error(asset, f"No object store configured for bucket {asset.bucket}")
-            self.update_state(state="FINISHED")
-            return
-
         try:
-            from preview_generator.manager import PreviewManager
-
-            adapter = AssetCloudAdapter(
-                asset,
-                source_store,
-                audit_data=f"generate_thumbnails: {asset_type} id #{asset_id}",
-            )
-
-            with adapter.download_to_scratch() as scratch_file:
-                with ScratchFolderManager() as cache_dir:
-                    manager = PreviewManager(str(cache_dir.path), create_folder=False)
-
-                    small_preview_path = Path(manager.get_jpeg_preview(str(scratch_file.path), width=200, height=200))
-                    medium_preview_path = Path(manager.get_jpeg_preview(str(scratch_file.path), width=400, height=400))
-
-                    small_data = small_preview_path.read_bytes()
-                    medium_data = medium_preview_path.read_bytes()
-
-            # upload small thumbnail
-            small_asset = ThumbnailAsset(timestamp=datetime.now())
-            with AssetUploadManager(
-                small_asset,
-                data=small_data,
-                storage=thumbnails_store,
-                audit_data=f"generate_thumbnails small: {asset_type} id #{asset_id}",
-                mimetype="image/jpeg",
-            ):
-                pass
-
-            # upload medium thumbnail
-            medium_asset = ThumbnailAsset(timestamp=datetime.now())
-            with AssetUploadManager(
-                medium_asset,
-                data=medium_data,
-                storage=thumbnails_store,
-                audit_data=f"generate_thumbnails medium: {asset_type} id #{asset_id}",
-                mimetype="image/jpeg",
-            ):
-                pass
-
-            # stash references to any old thumbnails so we can clean them up after commit
-            old_small = asset.small_thumbnail
-            old_medium = asset.medium_thumbnail
-
-            # clear FKs before deleting old records to avoid FK constraint violations
-            asset.small_thumbnail_id = None
-            asset.medium_thumbnail_id = None
-
-            db.session.add(small_asset)
-            db.session.add(medium_asset)
-            db.session.flush()
-
-            asset.small_thumbnail = small_asset
-            asset.medium_thumbnail = medium_asset
-            asset.thumbnail_error = False
-            asset.thumbnail_error_message = None
-
-            # delete old thumbnail records and their physical assets
-            for old_asset in (old_small, old_medium):
-                if old_asset is not None:
-                    old_store = bucket_map.get(old_asset.bucket)
-                    if old_store is not None:
-                        try:
-                            old_store.delete(
-                                old_asset.unique_name,
-                                audit_data=f"generate_thumbnails: replace thumbnail for {asset_type} id #{asset_id}",
-                            )
-                        except FileNotFoundError:
-                            pass
-                    db.session.delete(old_asset)
-
-            db.session.commit()
+            with _ThumbnailRenderer() as renderer:
+                _generate_asset_thumbnails(asset, asset_type, renderer, bucket_map, thumbnails_store)
 
         except Exception as e:
             db.session.rollback()
@@ -244,6 +394,65 @@ def register_thumbnail_tasks(celery):
 
         self.update_state(state="FINISHED")
 
+    @celery.task(bind=True, default_retry_delay=30)
+    def generate_thumbnails_batch(self, items: List[Tuple[str, int]]):
+        """
+        Generate thumbnails for many assets in one worker invocation, used for bulk backfills.
+        *items* is a list of (asset_type, asset_id) pairs. A single renderer is kept warm for the whole batch.
+        Errors for individual assets are recorded on the asset and do not stop the batch.
+        """
+        self.update_state(state="STARTED", meta={"msg": f"Generating thumbnails for {len(items)} assets"})
+
+        bucket_map = current_app.config.get("OBJECT_STORAGE_BUCKETS")
+        thumbnails_store = bucket_map.get(buckets.THUMBNAILS_BUCKET)
+
+        if thumbnails_store is None:
+            current_app.logger.error("generate_thumbnails_batch: no ObjectStore for THUMBNAILS_BUCKET")
+            self.update_state(state="FINISHED")
+            return {"generated": 0, "failed": 0, "skipped": len(items)}
+
+        generated = 0
+        failed = 0
+        skipped = 0
+
+        with _ThumbnailRenderer() as renderer:
+            for asset_type, asset_id in items:
+                model_class = _ASSET_TYPES.get(asset_type)
+                if model_class is None:
+                    current_app.logger.error(f"generate_thumbnails_batch: unknown asset type '{asset_type}'")
+                    skipped += 1
+                    continue
+
+                try:
+                    asset = db.session.query(model_class).filter_by(id=asset_id).first()
+                except SQLAlchemyError as e:
+                    db.session.rollback()
+                    current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+                    skipped += 1
+                    continue
+
+                # assets may have been deleted, or may have had their thumbnails marked as failed, since
+                # the batch was queued
+                if asset is None or asset.thumbnail_error:
+                    skipped += 1
+                    continue
+
+                try:
+                    _generate_asset_thumbnails(asset, asset_type, renderer, bucket_map, thumbnails_store)
+                    generated += 1
+
+                except Exception as e:
+                    db.session.rollback()
+                    current_app.logger.exception(
+                        f"generate_thumbnails_batch: error generating thumbnails for {asset_type} id #{asset_id}",
+                        exc_info=e,
+                    )
+                    _set_thumbnail_error(asset, str(e))
+                    failed += 1
+
+        self.update_state(state="FINISHED")
+        return {"generated": generated, "failed": failed, "skipped": skipped}
+
 
 def _set_thumbnail_error(asset, message: str) -> None:
     """Set thumbnail_error flag and message on an asset, committing to the database."""
@@ -0,0 +1,42 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+from typing import List, Optional
+
+from celery import states
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..database import db
+from ..shared.workload import refresh_faculty_workload
+
+
+def register_workload_tasks(celery):
+    @celery.task(bind=True, default_retry_delay=30)
+    def recompute_faculty_workload(self, faculty_ids: Optional[List[int]] = None, config_ids: Optional[List[int]] = None):
+        """
+        Rebuild the precomputed FacultyWorkload aggregates, either for the given faculty members and/or
+        ProjectClassConfigs, or for every faculty member if neither is specified.
+        These rows are normally maintained incrementally; a full rebuild picks up changes made with bulk SQL
+        statements, which bypass the ORM event handlers.
+        """
+        self.update_state(state=states.STARTED, meta={"msg": "Recomputing faculty workload aggregates"})
+
+        try:
+            written = refresh_faculty_workload(db.session.connection(), faculty_ids=faculty_ids, config_ids=config_ids)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.exception("SQLAlchemyError exception", exc_info=e)
+            raise self.retry()
+
+        msg = {"msg": f"Wrote {written} faculty workload record(s)"}
+        self.update_state(state=states.SUCCESS, meta=msg)
+        return msg
@@ -0,0 +1,103 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+"""
+Download the font files used by the feedback report templates into a folder, at image build time.
+
+Feedback PDFs are rendered offline (app/shared/pdf_rendering.py), so the fonts must be present in the worker
+image. The files are named Family-Variant.ttf (e.g. Inter-SemiBold.ttf, LibreBaskerville-Italic.ttf), which is
+the convention that pdf_rendering.parse_font_filename() expects. The script exits with a non-zero status if any
+family could not be downloaded, so that a broken download fails the image build rather than silently producing
+PDFs set in fallback fonts.
+
+Usage: python3 fetch_feedback_fonts.py <destination folder>
+"""
+
+import re
+import sys
+import urllib.request
+from pathlib import Path
+
+# the same families, weights and styles that the feedback templates previously requested from Google Fonts
+FONTS_CSS_URL = "https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&family=Libre+Baskerville:ital,wght@0,400;0,700;1,400"
+
+# without a browser user agent, Google Fonts serves one complete TrueType file per face
+USER_AGENT = "Mozilla/5.0"
+
+WEIGHT_NAMES = {
+    100: "Thin",
+    200: "ExtraLight",
+    300: "Light",
+    400: "Regular",
+    500: "Medium",
+    600: "SemiBold",
+    700: "Bold",
+    800: "ExtraBold",
+    900: "Black",
+}
+
+_FONT_FACE = re.compile(r"@font-face\s*{(?P<body>[^}]*)}")
+_PROPERTY = re.compile(r"(?P<name>font-family|font-style|font-weight|src)\s*:\s*(?P<value>[^;]+);")
+_URL = re.compile(r"url\((?P<url>[^)]+)\)")
+
+
+def _fetch(url: str) -> bytes:
+    request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return response.read()
+
+
+def _file_name(family: str, weight: int, style: str) -> str:
+    variant = WEIGHT_NAMES[weight]
+    if style == "italic":
+        variant = "Italic" if weight == 400 else f"{variant}Italic"
+
+    return f"{family.replace(' ', '')}-{variant}.ttf"
+
+
+def main(destination: str) -> int:
+    folder = Path(destination)
+    folder.mkdir(parents=True, exist_ok=True)
+
+    css = _fetch(FONTS_CSS_URL).decode("utf-8")
+
+    written = {}
+    for match in _FONT_FACE.finditer(css):
+        properties = {m.group("name"): m.group("value").strip() for m in _PROPERTY.finditer(match.group("body"))}
+        url = _URL.search(properties.get("src", ""))
+        if url is None:
+            continue
+
+        family = properties["font-family"].strip("'\"")
+        name = _file_name(family, int(properties.get("font-weight", "400")), properties.get("font-style", "normal"))
+        if name in written:
+            # a second file for the same face would be a unicode-range subset; the first is kept
+            print(f"fetch_feedback_fonts: skipping additional file for {name}")
+            continue
+
+        path = folder / name
+        path.write_bytes(_fetch(url.group("url").strip("'\"")))
+        written[name] = family
+        print(f"fetch_feedback_fonts: wrote {path}")
+
+    missing = {"Inter", "Libre Baskerville"} - set(written.values())
+    if missing:
+        print(f"fetch_feedback_fonts: no font files were downloaded for {', '.join(sorted(missing))}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python3 fetch_feedback_fonts.py <destination folder>", file=sys.stderr)
+        sys.exit(2)
+
+    sys.exit(main(sys.argv[1]))
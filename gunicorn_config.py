@@ -11,7 +11,8 @@
 import os
 
 workers = int(os.environ.get("GUNICORN_PROCESSES", "2"))
-threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+# up to NOTIFICATIONS_MAX_LONG_POLLS threads per worker may be held by live-notification long-polls
+threads = int(os.environ.get("GUNICORN_THREADS", "12"))
 
 bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
 
@@ -44,7 +44,11 @@ Both functions return None gracefully if spaCy is not installed.
 
 from __future__ import annotations
 
+import importlib
+import os
 import re
+import sys
+from pathlib import Path
 
 import numpy as np
 
@@ -259,24 +263,38 @@ def _get_nlp():
 # ---------------------------------------------------------------------------
 
 
-def extract_pdf_text(path: str) -> tuple[str, int]:
+# The extraction engine is not mirrored: app/shared/pdf_text_extraction.py has no
+# Flask dependencies, so it is imported directly from the production tree (without
+# importing the app package) and both pipelines always extract identical text.
+_PDF_TEXT_EXTRACTION_DIR = Path(__file__).resolve().parent.parent / "app" / "shared"
+_pdf_text_extraction = None
+
+
+def _load_pdf_text_extraction():
+    global _pdf_text_extraction
+
+    if _pdf_text_extraction is None:
+        # imported by name from sys.path, rather than from a file location, so that the extraction worker
+        # processes (which are spawned, not forked) can import the module in the same way
+        if str(_PDF_TEXT_EXTRACTION_DIR) not in sys.path:
+            sys.path.append(str(_PDF_TEXT_EXTRACTION_DIR))
+        _pdf_text_extraction = importlib.import_module("pdf_text_extraction")
+
+    return _pdf_text_extraction
+
+
+def extract_pdf_text(path: str, workers: int | None = None) -> tuple[str, int]:
     """Extract body text and page count from a PDF using PyMuPDF (fitz).
 
     Header/footer strips (top 8 % and bottom 8 % of each page) and non-text
-    blocks are discarded, matching the production pipeline behaviour.
+    blocks are discarded, using the production extraction engine.  Long
+    documents are split into page ranges extracted by up to *workers*
+    processes (default: the number of CPUs).
     """
-    import fitz  # noqa: PLC0415
-
-    doc = fitz.open(path)
-    pages = []
-    for page in doc:
-        page_height = page.rect.height
-        blocks = page.get_text("blocks")
-        body_blocks = [b[4] for b in blocks if b[1] > page_height * 0.08 and b[3] < page_height * 0.92 and b[6] == 0]
-        pages.append("\n".join(body_blocks))
-    page_count = len(doc)
-    doc.close()
-    return "\n\n".join(pages), page_count
+    engine = _load_pdf_text_extraction()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return engine.extract_pdf_text(path, workers=workers)
 
 
 def get_pymupdf_version() -> str:
@@ -0,0 +1,128 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+"""add faculty_workload table
+
+Revision ID: b7d1e3f5a9c2
+Revises: e4a7c2d9b1f3
+Create Date: 2026-10-19
+
+Adds a table of precomputed CATS workload aggregates, one row per faculty member per ProjectClassConfig
+(app/models/faculty.py FacultyWorkload), so that the workload report can read a single indexed table rather
+than walking SubmissionRole records for every faculty member. Rows are maintained by app/shared/workload.py;
+this migration backfills them for existing assignments using the same rules as FacultyData.CATS_assignment().
+"""
+
+from datetime import datetime
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "b7d1e3f5a9c2"
+down_revision = "e4a7c2d9b1f3"
+branch_labels = None
+depends_on = None
+
+
+# SubmissionRole role constants (app/models/model_mixins.py SubmissionRoleTypesMixin)
+_ROLE_SUPERVISOR = 0
+_ROLE_MARKER = 1
+_ROLE_PRESENTATION_ASSESSOR = 2
+_ROLE_MODERATOR = 3
+_ROLE_RESPONSIBLE_SUPERVISOR = 6
+
+
+_BACKFILL = """
+INSERT INTO faculty_workload (faculty_id, config_id, pclass_id, year,
+                              supervising_CATS, marking_CATS, moderation_CATS, presentation_CATS,
+                              num_supervising, num_marking, num_moderating, num_presentations,
+                              updated_at)
+SELECT sr.user_id, sc.id, sc.pclass_id, sc.year,
+       SUM(CASE WHEN sr.role IN (:supv, :resp) AND sc.uses_supervisor = 1
+                     AND pc.uses_supervisor = 1 AND pc.CATS_supervision > 0 THEN pc.CATS_supervision ELSE 0 END),
+       SUM(CASE WHEN sr.role = :mark AND sc.uses_marker = 1
+                     AND pc.uses_marker = 1 AND pc.CATS_marking > 0 THEN pc.CATS_marking ELSE 0 END),
+       SUM(CASE WHEN sr.role = :mod AND sc.uses_moderator = 1
+                     AND pc.uses_moderator = 1 AND pc.CATS_moderation > 0 THEN pc.CATS_moderation ELSE 0 END),
+       SUM(CASE WHEN sr.role = :pres AND sc.uses_presentations = 1
+                     AND pc.uses_presentations = 1 AND pc.CATS_presentation > 0 THEN pc.CATS_presentation ELSE 0 END),
+       SUM(CASE WHEN sr.role IN (:supv, :resp) AND sc.uses_supervisor = 1 THEN 1 ELSE 0 END),
+       SUM(CASE WHEN sr.role = :mark AND sc.uses_marker = 1 THEN 1 ELSE 0 END),
+       SUM(CASE WHEN sr.role = :mod AND sc.uses_moderator = 1 THEN 1 ELSE 0 END),
+       SUM(CASE WHEN sr.role = :pres AND sc.uses_presentations = 1 THEN 1 ELSE 0 END),
+       :now
+FROM submission_roles sr
+JOIN faculty_data fd ON fd.id = sr.user_id
+JOIN submission_records rec ON rec.id = sr.submission_id
+JOIN submitting_students ss ON ss.id = rec.owner_id
+JOIN project_class_config sc ON sc.id = ss.config_id
+LEFT JOIN live_projects lp ON lp.id = rec.project_id
+LEFT JOIN project_class_config pc ON pc.id = lp.config_id
+WHERE sr.role IN (:supv, :resp, :mark, :mod, :pres)
+  AND rec.retired = 0
+GROUP BY sr.user_id, sc.id
+"""
+
+
+def upgrade():
+    op.create_table(
+        "faculty_workload",
+        sa.Column("faculty_id", sa.Integer(), nullable=False),
+        sa.Column("config_id", sa.Integer(), nullable=False),
+        sa.Column("pclass_id", sa.Integer(), nullable=True),
+        sa.Column("year", sa.Integer(), nullable=True),
+        sa.Column("supervising_CATS", sa.Integer(), nullable=False),
+        sa.Column("marking_CATS", sa.Integer(), nullable=False),
+        sa.Column("moderation_CATS", sa.Integer(), nullable=False),
+        sa.Column("presentation_CATS", sa.Integer(), nullable=False),
+        sa.Column("num_supervising", sa.Integer(), nullable=False),
+        sa.Column("num_marking", sa.Integer(), nullable=False),
+        sa.Column("num_moderating", sa.Integer(), nullable=False),
+        sa.Column("num_presentations", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["faculty_id"],
+            ["faculty_data.id"],
+            name=op.f("fk_faculty_workload_faculty_id_faculty_data"),
+        ),
+        sa.ForeignKeyConstraint(
+            ["config_id"],
+            ["project_class_config.id"],
+            name=op.f("fk_faculty_workload_config_id_project_class_config"),
+        ),
+        sa.ForeignKeyConstraint(
+            ["pclass_id"],
+            ["project_classes.id"],
+            name=op.f("fk_faculty_workload_pclass_id_project_classes"),
+        ),
+        sa.PrimaryKeyConstraint("faculty_id", "config_id", name=op.f("pk_faculty_workload")),
+    )
+    op.create_index(op.f("ix_faculty_workload_pclass_id"), "faculty_workload", ["pclass_id"], unique=False)
+    op.create_index(op.f("ix_faculty_workload_year"), "faculty_workload", ["year"], unique=False)
+    op.create_index("ix_faculty_workload_faculty_id_year", "faculty_workload", ["faculty_id", "year"], unique=False)
+
+    op.get_bind().execute(
+        sa.text(_BACKFILL),
+        {
+            "supv": _ROLE_SUPERVISOR,
+            "resp": _ROLE_RESPONSIBLE_SUPERVISOR,
+            "mark": _ROLE_MARKER,
+            "mod": _ROLE_MODERATOR,
+            "pres": _ROLE_PRESENTATION_ASSESSOR,
+            "now": datetime.now(),
+        },
+    )
+
+
+def downgrade():
+    op.drop_index("ix_faculty_workload_faculty_id_year", table_name="faculty_workload")
+    op.drop_index(op.f("ix_faculty_workload_year"), table_name="faculty_workload")
+    op.drop_index(op.f("ix_faculty_workload_pclass_id"), table_name="faculty_workload")
+    op.drop_table("faculty_workload")
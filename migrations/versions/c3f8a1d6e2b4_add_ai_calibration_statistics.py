@@ -0,0 +1,190 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+"""add ai_calibration_statistics table
+
+Revision ID: c3f8a1d6e2b4
+Revises: b7d1e3f5a9c2
+Create Date: 2026-10-19
+
+Adds typed mean_nll and nll_cv columns to submission_language_metrics, and a table of per-(project class, year,
+feature set) sufficient statistics (app/models/ai_calibration.py AICalibrationStatistics) from which
+TenantAICalibration centroids are assembled without re-reading the language_analysis blobs. Both are backfilled
+for existing records; afterwards they are maintained by SubmissionRecord.update_language_metrics() and
+app/shared/ai_calibration_statistics.py.
+"""
+
+import json
+from datetime import datetime
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "c3f8a1d6e2b4"
+down_revision = "b7d1e3f5a9c2"
+branch_labels = None
+depends_on = None
+
+_BATCH_SIZE = 500
+
+_FEATURE_COLUMNS = {
+    "lexical": ("mattr", "mtld", "sentence_cv"),
+    "full": ("mattr", "mtld", "sentence_cv", "mean_nll", "nll_cv"),
+}
+
+
+def _as_float(value):
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _loads(blob):
+    if blob is None:
+        return {}
+    try:
+        return json.loads(blob)
+    except (json.JSONDecodeError, TypeError):
+        return {}
+
+
+def upgrade():
+    op.add_column("submission_language_metrics", sa.Column("mean_nll", sa.Float(), nullable=True))
+    op.add_column("submission_language_metrics", sa.Column("nll_cv", sa.Float(), nullable=True))
+
+    stats_table = op.create_table(
+        "ai_calibration_statistics",
+        sa.Column("pclass_id", sa.Integer(), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("feature_set", sa.String(length=32, collation="utf8_bin"), nullable=False),
+        sa.Column("n_samples", sa.Integer(), nullable=False),
+        sa.Column("sum_x", sa.Text(collation="utf8_bin"), nullable=False),
+        sa.Column("sum_xx", sa.Text(collation="utf8_bin"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["pclass_id"],
+            ["project_classes.id"],
+            name=op.f("fk_ai_calibration_statistics_pclass_id_project_classes"),
+        ),
+        sa.PrimaryKeyConstraint("pclass_id", "year", "feature_set", name=op.f("pk_ai_calibration_statistics")),
+    )
+
+    conn = op.get_bind()
+
+    # backfill the NLL metrics from the language_analysis blobs, walking the metrics rows in primary-key order
+    metrics = sa.table(
+        "submission_language_metrics",
+        sa.column("record_id", sa.Integer()),
+        sa.column("mattr", sa.Float()),
+        sa.column("mtld", sa.Float()),
+        sa.column("sentence_cv", sa.Float()),
+        sa.column("mean_nll", sa.Float()),
+        sa.column("nll_cv", sa.Float()),
+    )
+    records = sa.table(
+        "submission_records",
+        sa.column("id", sa.Integer()),
+        sa.column("period_id", sa.Integer()),
+        sa.column("language_analysis", sa.Text()),
+        sa.column("language_analysis_complete", sa.Boolean()),
+    )
+
+    update_nll = (
+        metrics.update()
+        .where(metrics.c.record_id == sa.bindparam("b_record_id"))
+        .values(mean_nll=sa.bindparam("b_mean_nll"), nll_cv=sa.bindparam("b_nll_cv"))
+    )
+
+    last_id = 0
+    while True:
+        batch = conn.execute(
+            sa.select(records.c.id, records.c.language_analysis)
+            .select_from(records.join(metrics, metrics.c.record_id == records.c.id))
+            .where(records.c.id > last_id)
+            .order_by(records.c.id)
+            .limit(_BATCH_SIZE)
+        ).fetchall()
+
+        if not batch:
+            break
+
+        rows = []
+        for record_id, language_analysis in batch:
+            la_metrics = _loads(language_analysis).get("metrics", {})
+            mean_nll = _as_float(la_metrics.get("mean_nll"))
+            nll_cv = _as_float(la_metrics.get("nll_cv"))
+            if mean_nll is None and nll_cv is None:
+                continue
+            rows.append({"b_record_id": record_id, "b_mean_nll": mean_nll, "b_nll_cv": nll_cv})
+
+        if rows:
+            conn.execute(update_nll, rows)
+
+        last_id = batch[-1][0]
+
+    # backfill the sufficient statistics, one grouped aggregate per feature set
+    periods = sa.table("submission_periods", sa.column("id", sa.Integer()), sa.column("config_id", sa.Integer()))
+    configs = sa.table("project_class_config", sa.column("id", sa.Integer()), sa.column("pclass_id", sa.Integer()), sa.column("year", sa.Integer()))
+
+    now = datetime.now()
+    for feature_set, names in _FEATURE_COLUMNS.items():
+        columns = [metrics.c[name] for name in names]
+        d = len(columns)
+        pairs = [(i, j) for i in range(d) for j in range(i, d)]
+
+        result = conn.execute(
+            sa.select(
+                configs.c.pclass_id,
+                configs.c.year,
+                sa.func.count(),
+                *[sa.func.sum(c) for c in columns],
+                *[sa.func.sum(columns[i] * columns[j]) for i, j in pairs],
+            )
+            .select_from(
+                metrics.join(records, records.c.id == metrics.c.record_id)
+                .join(periods, periods.c.id == records.c.period_id)
+                .join(configs, configs.c.id == periods.c.config_id)
+            )
+            .where(records.c.language_analysis_complete == sa.true(), *[c.isnot(None) for c in columns])
+            .group_by(configs.c.pclass_id, configs.c.year)
+        )
+
+        rows = []
+        for pclass_id, year, n_samples, *sums in result:
+            if pclass_id is None or year is None or not n_samples:
+                continue
+
+            sum_xx = [[0.0] * d for _ in range(d)]
+            for (i, j), value in zip(pairs, sums[d:]):
+                sum_xx[i][j] = sum_xx[j][i] = float(value)
+
+            rows.append(
+                {
+                    "pclass_id": pclass_id,
+                    "year": year,
+                    "feature_set": feature_set,
+                    "n_samples": int(n_samples),
+                    "sum_x": json.dumps([float(v) for v in sums[:d]]),
+                    "sum_xx": json.dumps(sum_xx),
+                    "updated_at": now,
+                }
+            )
+
+        for i in range(0, len(rows), _BATCH_SIZE):
+            conn.execute(stats_table.insert(), rows[i : i + _BATCH_SIZE])
+
+
+def downgrade():
+    op.drop_table("ai_calibration_statistics")
+    op.drop_column("submission_language_metrics", "nll_cv")
+    op.drop_column("submission_language_metrics", "mean_nll")
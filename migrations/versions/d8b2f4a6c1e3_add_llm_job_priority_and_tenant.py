@@ -0,0 +1,67 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+"""add priority and tenant_id to llm_orchestration_job
+
+Revision ID: d8b2f4a6c1e3
+Revises: c3f8a1d6e2b4
+Create Date: 2026-10-19
+
+priority and tenant_id are used by the orchestration coordinator to serve jobs in priority order, and to share
+capacity fairly between tenants within a priority level (app/tasks/llm_scheduling.py). Existing cycle-wide and
+global jobs are given the bulk priority (0); all other existing jobs get the normal priority (10).
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "d8b2f4a6c1e3"
+down_revision = "c3f8a1d6e2b4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "llm_orchestration_job",
+        sa.Column("priority", sa.Integer(), nullable=False, server_default="10"),
+    )
+    op.execute("UPDATE llm_orchestration_job SET priority = 0 WHERE scope IN ('cycle', 'global')")
+    op.alter_column("llm_orchestration_job", "priority", existing_type=sa.Integer(), server_default=None)
+    op.create_index(
+        op.f("ix_llm_orchestration_job_priority"),
+        "llm_orchestration_job",
+        ["priority"],
+        unique=False,
+    )
+
+    op.add_column("llm_orchestration_job", sa.Column("tenant_id", sa.Integer(), nullable=True))
+    op.create_index(
+        op.f("ix_llm_orchestration_job_tenant_id"),
+        "llm_orchestration_job",
+        ["tenant_id"],
+        unique=False,
+    )
+    op.create_foreign_key(
+        op.f("fk_llm_orchestration_job_tenant_id_tenants"),
+        "llm_orchestration_job",
+        "tenants",
+        ["tenant_id"],
+        ["id"],
+    )
+
+
+def downgrade():
+    op.drop_constraint(op.f("fk_llm_orchestration_job_tenant_id_tenants"), "llm_orchestration_job", type_="foreignkey")
+    op.drop_index(op.f("ix_llm_orchestration_job_tenant_id"), table_name="llm_orchestration_job")
+    op.drop_column("llm_orchestration_job", "tenant_id")
+
+    op.drop_index(op.f("ix_llm_orchestration_job_priority"), table_name="llm_orchestration_job")
+    op.drop_column("llm_orchestration_job", "priority")
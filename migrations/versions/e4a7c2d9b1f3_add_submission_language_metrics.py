@@ -0,0 +1,150 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+"""add submission_language_metrics table
+
+Revision ID: e4a7c2d9b1f3
+Revises: 9f2a8b1c4d6e
+Create Date: 2026-10-19
+
+Adds a narrow table holding typed copies of the headline language-analysis metrics for each
+SubmissionRecord (app/models/submissions.py SubmissionLanguageMetrics), so that the AI data dashboard
+can aggregate across periods in SQL without deserialising the language_analysis MEDIUMTEXT blob.
+Rows are maintained by SubmissionRecord.update_language_metrics(); this migration backfills them for
+existing records.
+"""
+
+import json
+from datetime import datetime
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "e4a7c2d9b1f3"
+down_revision = "9f2a8b1c4d6e"
+branch_labels = None
+depends_on = None
+
+_METRIC_KEYS = ["mattr", "mtld", "burstiness", "sentence_cv", "word_count", "reference_count"]
+
+_BATCH_SIZE = 500
+
+
+def _as_float(value):
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _loads(blob):
+    if blob is None:
+        return {}
+    try:
+        return json.loads(blob)
+    except (json.JSONDecodeError, TypeError):
+        return {}
+
+
+def upgrade():
+    metrics_table = op.create_table(
+        "submission_language_metrics",
+        sa.Column("record_id", sa.Integer(), nullable=False),
+        sa.Column("period_id", sa.Integer(), nullable=True),
+        sa.Column("mattr", sa.Float(), nullable=True),
+        sa.Column("mtld", sa.Float(), nullable=True),
+        sa.Column("burstiness", sa.Float(), nullable=True),
+        sa.Column("sentence_cv", sa.Float(), nullable=True),
+        sa.Column("word_count", sa.Float(), nullable=True),
+        sa.Column("reference_count", sa.Float(), nullable=True),
+        sa.Column("page_count", sa.Float(), nullable=True),
+        sa.Column("ai_use_flagged", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["record_id"],
+            ["submission_records.id"],
+            name=op.f("fk_submission_language_metrics_record_id_submission_records"),
+        ),
+        sa.ForeignKeyConstraint(
+            ["period_id"],
+            ["submission_periods.id"],
+            name=op.f("fk_submission_language_metrics_period_id_submission_periods"),
+        ),
+        sa.PrimaryKeyConstraint("record_id", name=op.f("pk_submission_language_metrics")),
+    )
+    op.create_index(
+        op.f("ix_submission_language_metrics_period_id"),
+        "submission_language_metrics",
+        ["period_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_submission_language_metrics_updated_at"),
+        "submission_language_metrics",
+        ["updated_at"],
+        unique=False,
+    )
+
+    # backfill from existing language_analysis and risk_factors blobs, walking the records in primary-key order
+    conn = op.get_bind()
+    records = sa.table(
+        "submission_records",
+        sa.column("id", sa.Integer()),
+        sa.column("period_id", sa.Integer()),
+        sa.column("language_analysis", sa.Text()),
+        sa.column("risk_factors", sa.Text()),
+    )
+
+    now = datetime.now()
+    last_id = 0
+    while True:
+        batch = conn.execute(
+            sa.select(records.c.id, records.c.period_id, records.c.language_analysis, records.c.risk_factors)
+            .where(
+                records.c.id > last_id,
+                sa.or_(records.c.language_analysis.isnot(None), records.c.risk_factors.isnot(None)),
+            )
+            .order_by(records.c.id)
+            .limit(_BATCH_SIZE)
+        ).fetchall()
+
+        if not batch:
+            break
+
+        rows = []
+        for record_id, period_id, language_analysis, risk_factors in batch:
+            la = _loads(language_analysis)
+            rf = _loads(risk_factors)
+            if not la and not rf:
+                continue
+
+            metrics = la.get("metrics", {})
+            row = {key: _as_float(metrics.get(key)) for key in _METRIC_KEYS}
+            row.update(
+                record_id=record_id,
+                period_id=period_id,
+                page_count=_as_float(la.get("_page_count")),
+                ai_use_flagged=bool(rf.get("ai_use", {}).get("present", False)),
+                updated_at=now,
+            )
+            rows.append(row)
+
+        if rows:
+            conn.execute(metrics_table.insert(), rows)
+
+        last_id = batch[-1][0]
+
+
+def downgrade():
+    op.drop_index(op.f("ix_submission_language_metrics_updated_at"), table_name="submission_language_metrics")
+    op.drop_index(op.f("ix_submission_language_metrics_period_id"), table_name="submission_language_metrics")
+    op.drop_table("submission_language_metrics")
@@ -0,0 +1,673 @@
+#!/usr/bin/env python3
+"""
+pipeline_benchmark.py — Reproducible benchmark of the language and similarity pipeline stages.
+
+Role
+----
+The production pipeline runs, per SubmissionRecord,
+
+    download_and_extract → compute_statistics → submit_to_llm
+        → extract_chunks → compute_minhash → run_similarity_check
+
+as Celery tasks.  pipeline_tracking.record_step_start/record_step_end keep
+per-record timings in Redis for 24 hours, which is useful for watching a live
+run but not for catching regressions.  This script runs each stage over a fixed
+local corpus of PDFs and reports, per stage,
+
+    throughput      records per second of wall-clock time
+    latency         p50 / p90 / p95 / p99 / max per record, in milliseconds
+    peak RSS        high-water resident set size of this process during the
+                    stage, and of any worker processes it started
+
+and compares the result against a stored baseline, so that regressions show
+up before deployment.
+
+What is exercised
+-----------------
+Each stage calls the same module-level functions that the Celery task uses
+(app/tasks/language_analysis.py, app/tasks/similarity_analysis.py,
+app/shared/scraped_text_store.py), inside a minimal Flask application context.
+SQL bookkeeping (loading the SubmissionRecord, idempotency flags, commits) is
+not exercised, so no MySQL database is needed:
+
+  download_and_extract   hash + text extraction (_extract_document_text) and
+                         the scraped-text cache write.  Text is stored without
+                         its content hash, so every pass really extracts.
+  compute_statistics     _compute_text_statistics() + _statistics_flags()
+  submit_to_llm          _grade_document(): metadata extraction, then
+                         single-pass grading or the chunked map/synthesis
+                         calls, against the rubric given by --rubric.  Chunk
+                         state is not persisted between passes.
+  extract_chunks         _classify_document_sections() + chunk cache write
+  compute_minhash        _minhash_signatures(), and _embedding_vectors() unless
+                         --no-embeddings is given
+  run_similarity_check   bulk signature load + _find_similarity_concerns()
+                         against every other record in the corpus
+
+LLM calls go to a stub Ollama server (stub_ollama.py) started on a free port,
+unless --ollama-url points at a real server.  Scraped text is written to a
+fresh collection in a local MongoDB, which is dropped afterwards unless
+--keep-collection is given.
+
+Stages always run in pipeline order, because each one consumes the output of
+its predecessor.  --stages selects which stages are reported; earlier stages
+that are needed as setup are still run once, untimed.
+
+Baselines
+---------
+  --save-baseline PATH   write this run's results as the baseline
+  --baseline PATH        compare against a stored baseline; exits with status 1
+                         if any reported stage regresses by more than the
+                         tolerances (--throughput-tolerance, --latency-tolerance,
+                         --rss-tolerance; fractions, e.g. 0.15 = 15%)
+
+Baselines are only meaningful on the same machine and corpus.  The corpus
+fingerprint (SHA-256 over the file hashes) is stored with each result, and a
+comparison against a baseline taken on a different corpus is refused.
+
+Usage
+-----
+  python pipeline-benchmark/pipeline_benchmark.py \\
+      --corpus lexical-pipeline-validation/arxiv_pdf_cache \\
+      --mongo mongodb://localhost:27017 \\
+      --baseline pipeline-benchmark/baseline.json
+
+The default corpus is the arXiv PDF cache populated by
+lexical-pipeline-validation/arxiv_control_analysis.py (--pdf-cache).
+
+Run from a virtualenv with the application requirements installed
+(requirements.txt), plus the spaCy model used by compute_statistics.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+from stub_ollama import StubOllamaServer
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+STAGES = [
+    "download_and_extract",
+    "compute_statistics",
+    "submit_to_llm",
+    "extract_chunks",
+    "compute_minhash",
+    "run_similarity_check",
+]
+
+RESULT_FORMAT_VERSION = 1
+
+_PERCENTILES = (50, 90, 95, 99)
+
+# used when --rubric is not given: 3 bands of 4 criteria, comparable in size to a production rubric
+_DEFAULT_RUBRIC = {
+    "label": "Benchmark rubric",
+    "bands": [
+        {
+            "label": "Excellent",
+            "criteria": [
+                {"text": "Demonstrates a thorough understanding of the underlying physics", "tag": None},
+                {"text": "Analysis is rigorous, complete and correctly executed", "tag": None},
+                {"text": "Places the work clearly in the context of the research literature", "tag": None},
+                {"text": "Writing is precise, well structured and well referenced", "tag": None},
+            ],
+        },
+        {
+            "label": "Good",
+            "criteria": [
+                {"text": "Demonstrates a sound understanding of the underlying physics", "tag": None},
+                {"text": "Analysis is largely correct, with minor omissions", "tag": "positive_floor"},
+                {"text": "Refers to relevant literature", "tag": None},
+                {"text": "Writing is clear and mostly well structured", "tag": None},
+            ],
+        },
+        {
+            "label": "Weak",
+            "criteria": [
+                {"text": "Significant misunderstandings of the underlying physics", "tag": "negative"},
+                {"text": "Analysis is incomplete or contains substantial errors", "tag": "negative"},
+                {"text": "Little or no engagement with the literature", "tag": "negative"},
+                {"text": "Writing is unclear or poorly organised", "tag": "negative"},
+            ],
+        },
+    ],
+}
+
+
+# ---------------------------------------------------------------------------
+# Measurement helpers
+# ---------------------------------------------------------------------------
+
+
+def _current_rss_bytes() -> int | None:
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _maxrss_bytes(who) -> int:
+    value = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    return value if sys.platform == "darwin" else value * 1024
+
+
+class PeakRSSSampler:
+    """
+    Track the peak resident set size of this process over an interval, by sampling /proc/self/status.
+    Falls back to the process high-water mark where /proc is not available.
+    """
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _sample(self) -> None:
+        rss = _current_rss_bytes()
+        if rss is not None and rss > self.peak:
+            self.peak = rss
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> "PeakRSSSampler":
+        self._sample()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        if self.peak == 0:
+            self.peak = _maxrss_bytes(resource.RUSAGE_SELF)
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarise_stage(latencies_s: list[float], wall_s: float, peak_rss: int, peak_child_rss: int, failures: int) -> dict:
+    latencies_ms = sorted(x * 1000.0 for x in latencies_s)
+    summary = {
+        "records": len(latencies_ms),
+        "failures": failures,
+        "wall_s": round(wall_s, 3),
+        "throughput_per_s": round(len(latencies_ms) / wall_s, 3) if wall_s > 0 else None,
+        "peak_rss_mb": round(peak_rss / 2**20, 1),
+        "peak_child_rss_mb": round(peak_child_rss / 2**20, 1),
+    }
+    if latencies_ms:
+        for p in _PERCENTILES:
+            summary[f"p{p}_ms"] = round(percentile(latencies_ms, p), 2)
+        summary["max_ms"] = round(latencies_ms[-1], 2)
+        summary["mean_ms"] = round(sum(latencies_ms) / len(latencies_ms), 2)
+    return summary
+
+
+# ---------------------------------------------------------------------------
+# Corpus
+# ---------------------------------------------------------------------------
+
+
+def load_corpus(folder: Path, limit: int | None) -> list[dict]:
+    paths = sorted(p for p in folder.rglob("*") if p.is_file() and p.suffix.lower() in (".pdf", ".docx"))
+    if limit:
+        paths = paths[:limit]
+
+    corpus = []
+    for record_id, path in enumerate(paths, start=1):
+        mimetype = "application/pdf" if path.suffix.lower() == ".pdf" else "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        corpus.append({"record_id": record_id, "path": path, "mimetype": mimetype})
+    return corpus
+
+
+def corpus_fingerprint(corpus: list[dict], file_content_hash) -> str:
+    digest = hashlib.sha256()
+    for item in corpus:
+        digest.update(file_content_hash(str(item["path"])).encode("ascii"))
+    return digest.hexdigest()
+
+
+def load_rubric(path: str | None, rubric_snapshot_cls):
+    data = _DEFAULT_RUBRIC
+    if path:
+        with open(path, "r") as f:
+            data = json.load(f)
+
+    # _RubricSnapshot reads the same attributes from the ORM objects
+    bands = [
+        SimpleNamespace(
+            id=band_idx,
+            label=band["label"],
+            criteria=[SimpleNamespace(id=crit_idx, text=c["text"], tag=c.get("tag")) for crit_idx, c in enumerate(band["criteria"], start=1)],
+        )
+        for band_idx, band in enumerate(data["bands"], start=1)
+    ]
+    return rubric_snapshot_cls(SimpleNamespace(id=0, label=data.get("label", "rubric"), bands=bands))
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Stage runners
+# ---------------------------------------------------------------------------
+
+
+class PipelineStages:
+    """
+    One method per pipeline stage, each processing a single corpus item.  Must be used inside an application
+    context whose configuration points at the stub LLM and the benchmark MongoDB collection.
+    """
+
+    def __init__(self, app, rubric, embeddings: bool):
+        from app.shared import scraped_text_store
+        from app.tasks import language_analysis, similarity_analysis
+
+        self.app = app
+        self.la = language_analysis
+        self.sa = similarity_analysis
+        self.store = scraped_text_store
+        self.rubric = rubric
+        self.embeddings = embeddings
+        self.record_ids: list[int] = []
+
+    def _scraped_text(self, record_id: int) -> str:
+        cached = self.store.get_scraped_text(record_id)
+        if not cached or not cached.get("scraped_text"):
+            raise RuntimeError(f"no scraped text for record #{record_id}")
+        return cached["scraped_text"]
+
+    def download_and_extract(self, item: dict) -> None:
+        record_id = item["record_id"]
+        raw_text, page_count, _content_hash = self.la._extract_document_text(str(item["path"]), item["mimetype"], record_id)
+        # stored without the content hash, so that repeated passes re-extract rather than hitting the cache
+        self.store.store_scraped_text(record_id, record_id, item["mimetype"], raw_text, page_count)
+
+    def compute_statistics(self, item: dict) -> None:
+        raw_text = self._scraped_text(item["record_id"])
+        errors: list = []
+        metrics, _references, _patterns, _timings = self.la._compute_text_statistics(raw_text, errors)
+        self.la._statistics_flags(metrics, [])
+
+    def submit_to_llm(self, item: dict) -> None:
+        la = self.la
+        record_id = item["record_id"]
+        config = self.app.config
+
+        grading = la._grade_document(
+            la._grading_text(self._scraped_text(record_id)),
+            self.rubric,
+            config["OLLAMA_BASE_URL"],
+            config["OLLAMA_MODEL"],
+            config["OLLAMA_CONTEXT_SIZE"],
+            record_id,
+            label_prefix="benchmark",
+        )
+        if grading["chunk_failure_reason"] is not None:
+            raise RuntimeError(grading["chunk_failure_reason"])
+        if grading["parsed_result"] is None:
+            raise RuntimeError(f"grading failed: {grading['last_exc']}")
+
+    def extract_chunks(self, item: dict) -> None:
+        sa = self.sa
+        record_id = item["record_id"]
+        raw_text = self._scraped_text(record_id)
+
+        config = self.app.config
+        context_size = config.get(sa._CHUNK_EXTRACTION_CTX_KEY, sa._CHUNK_EXTRACTION_CTX_DEFAULT)
+        sections, heading_style, num_sections = sa._classify_document_sections(
+            raw_text, config["OLLAMA_BASE_URL"], config["OLLAMA_MODEL"], context_size, record_id
+        )
+        if sections is None:
+            raise RuntimeError("heading classification failed")
+
+        self.store.store_similarity_chunks(
+            record_id, sections, config["OLLAMA_MODEL"], sa.CHUNK_EXTRACTION_PROMPT_VERSION, heading_style, num_sections
+        )
+
+    def compute_minhash(self, item: dict) -> None:
+        sa = self.sa
+        record_id = item["record_id"]
+        chunks = self.store.get_similarity_chunks(record_id)
+        if chunks is None:
+            raise RuntimeError(f"no similarity chunks for record #{record_id}")
+
+        sections = chunks.get("sections", {})
+        signatures = sa._minhash_signatures(sections, record_id)
+        if signatures:
+            self.store.store_minhash_signatures(record_id, signatures)
+
+        if self.embeddings:
+            st_model, model_name = sa._get_st_model()
+            vectors = sa._embedding_vectors(sections, st_model, record_id)
+            if vectors:
+                self.store.store_embeddings(record_id, vectors, model_name)
+
+    def run_similarity_check(self, item: dict) -> None:
+        sa = self.sa
+        record_id = item["record_id"]
+        chunks = self.store.get_similarity_chunks(record_id)
+        if chunks is None or not chunks.get("minhash_signatures"):
+            # a record without any chunk long enough to sign is skipped by the task too
+            return
+
+        active_model_name = self.app.config.get(sa.ST_MODEL_CONFIG_KEY, sa.ST_MODEL_DEFAULT)
+        other_ids = [rid for rid in self.record_ids if rid != record_id]
+        other_chunks = self.store.get_similarity_chunks_bulk(other_ids, require_signatures=True)
+        if other_chunks is None:
+            raise RuntimeError("MongoDB unavailable")
+
+        other_docs = [{"submission_record_id": rid, "similarity_chunks": sc} for rid, sc in other_chunks.items()]
+        sa._find_similarity_concerns(record_id, chunks, other_docs, active_model_name)
+
+
+def run_stage(stages: PipelineStages, stage: str, corpus: list[dict], verbose: bool) -> dict:
+    runner = getattr(stages, stage)
+    latencies: list[float] = []
+    failures = 0
+
+    with PeakRSSSampler() as sampler:
+        t_start = time.perf_counter()
+        for item in corpus:
+            t0 = time.perf_counter()
+            try:
+                runner(item)
+            except Exception as exc:
+                failures += 1
+                print(f"  !! {stage}: record #{item['record_id']} ({item['path'].name}) failed: {type(exc).__name__}: {exc}", file=sys.stderr)
+                continue
+            elapsed = time.perf_counter() - t0
+            latencies.append(elapsed)
+            if verbose:
+                print(f"  {stage}: {item['path'].name} {elapsed * 1000.0:.1f} ms")
+        wall = time.perf_counter() - t_start
+
+    return summarise_stage(latencies, wall, sampler.peak, _maxrss_bytes(resource.RUSAGE_CHILDREN), failures)
+
+
+def merge_passes(passes: list[dict]) -> dict:
+    """Combine the summaries of repeated passes: best throughput, median-pass latencies, worst RSS."""
+    if len(passes) == 1:
+        return passes[0]
+
+    by_throughput = sorted(passes, key=lambda s: s.get("throughput_per_s") or 0.0)
+    median_pass = by_throughput[len(by_throughput) // 2]
+
+    merged = dict(median_pass)
+    merged["throughput_per_s"] = by_throughput[-1].get("throughput_per_s")
+    merged["peak_rss_mb"] = max(s["peak_rss_mb"] for s in passes)
+    merged["peak_child_rss_mb"] = max(s["peak_child_rss_mb"] for s in passes)
+    merged["failures"] = sum(s["failures"] for s in passes)
+    merged["passes"] = len(passes)
+    return merged
+
+
+# ---------------------------------------------------------------------------
+# Baseline comparison
+# ---------------------------------------------------------------------------
+
+
+def compare(result: dict, baseline: dict, throughput_tol: float, latency_tol: float, rss_tol: float) -> list[str]:
+    """
+    Return a list of human-readable regressions of *result* relative to *baseline*.
+    """
+    regressions = []
+
+    for stage, current in result["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        if base is None:
+            continue
+
+        if base.get("throughput_per_s") and current.get("throughput_per_s") is not None:
+            if current["throughput_per_s"] < base["throughput_per_s"] * (1.0 - throughput_tol):
+                regressions.append(f"{stage}: throughput {current['throughput_per_s']:.3g}/s < baseline {base['throughput_per_s']:.3g}/s")
+
+        for key in ("p50_ms", "p95_ms"):
+            if base.get(key) and current.get(key) is not None:
+                if current[key] > base[key] * (1.0 + latency_tol):
+                    regressions.append(f"{stage}: {key} {current[key]:.1f} ms > baseline {base[key]:.1f} ms")
+
+        for key in ("peak_rss_mb", "peak_child_rss_mb"):
+            if base.get(key) and current.get(key) is not None:
+                if current[key] > base[key] * (1.0 + rss_tol):
+                    regressions.append(f"{stage}: {key} {current[key]:.1f} MB > baseline {base[key]:.1f} MB")
+
+        if current.get("failures", 0) > base.get("failures", 0):
+            regressions.append(f"{stage}: {current['failures']} failure(s), baseline had {base.get('failures', 0)}")
+
+    return regressions
+
+
+def print_table(result: dict, baseline: dict | None) -> None:
+    header = f"{'stage':<22} {'rec/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'RSS MB':>8} {'child MB':>9} {'fail':>5}"
+    print(header)
+    print("-" * len(header))
+    for stage, s in result["stages"].items():
+        print(
+            f"{stage:<22} {s.get('throughput_per_s') or 0:>9.3f} {s.get('p50_ms', 0):>9.1f} {s.get('p95_ms', 0):>9.1f} "
+            f"{s.get('p99_ms', 0):>9.1f} {s['peak_rss_mb']:>8.1f} {s['peak_child_rss_mb']:>9.1f} {s['failures']:>5d}"
+        )
+        base = (baseline or {}).get("stages", {}).get(stage)
+        if base:
+            print(
+                f"{'  baseline':<22} {base.get('throughput_per_s') or 0:>9.3f} {base.get('p50_ms', 0):>9.1f} {base.get('p95_ms', 0):>9.1f} "
+                f"{base.get('p99_ms', 0):>9.1f} {base.get('peak_rss_mb', 0):>8.1f} {base.get('peak_child_rss_mb', 0):>9.1f} {base.get('failures', 0):>5d}"
+            )
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+
+def make_app(args, ollama_url: str, collection: str):
+    from flask import Flask
+
+    app = Flask("pipeline_benchmark")
+    app.config.update(
+        OLLAMA_BASE_URL=ollama_url,
+        OLLAMA_MODEL=args.model,
+        OLLAMA_CONTEXT_SIZE=args.context_size,
+        OLLAMA_CHUNK_EXTRACTION_CONTEXT_SIZE=args.context_size,
+        LANGUAGE_ANALYSIS_MONGO_URL=args.mongo,
+        LANGUAGE_ANALYSIS_DATABASE=args.mongo_db,
+        LANGUAGE_ANALYSIS_SCRAPED_TEXT_COLLECTION=collection,
+        PDF_EXTRACTION_WORKERS=args.pdf_workers,
+        PDF_EXTRACTION_PAGES_PER_RANGE=args.pages_per_range,
+    )
+    if args.st_model:
+        app.config["SIMILARITY_ST_MODEL"] = args.st_model
+    return app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the language and similarity pipeline stages against a local corpus.")
+    parser.add_argument(
+        "--corpus",
+        default=str(REPO_ROOT / "lexical-pipeline-validation" / "arxiv_pdf_cache"),
+        help="Folder of PDF/DOCX files  [default: lexical-pipeline-validation/arxiv_pdf_cache]",
+    )
+    parser.add_argument("--limit", type=int, default=None, help="Use only the first N files (sorted by path)")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma-separated stages to report  [default: all of {', '.join(STAGES)}]")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes per stage  [default: 3]")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed warm-up passes per stage (model loading, caches)  [default: 1]")
+    parser.add_argument("--mongo", default="mongodb://localhost:27017", help="MongoDB URL  [default: mongodb://localhost:27017]")
+    parser.add_argument("--mongo-db", default="pipeline_benchmark", help="MongoDB database  [default: pipeline_benchmark]")
+    parser.add_argument("--keep-collection", action="store_true", help="Do not drop the scratch collection afterwards")
+    parser.add_argument("--ollama-url", default=None, help="Use this Ollama server instead of the built-in stub")
+    parser.add_argument("--model", default="benchmark-stub", help="Model name sent to the LLM server  [default: benchmark-stub]")
+    parser.add_argument("--context-size", type=int, default=18432, help="num_ctx for LLM calls  [default: 18432]")
+    parser.add_argument("--ttft", type=float, default=0.0, help="Stub: seconds before first token  [default: 0]")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Stub: decode rate, 0 = instant  [default: 0]")
+    parser.add_argument("--pdf-workers", type=int, default=4, help="PDF_EXTRACTION_WORKERS  [default: 4]")
+    parser.add_argument("--pages-per-range", type=int, default=16, help="PDF_EXTRACTION_PAGES_PER_RANGE  [default: 16]")
+    parser.add_argument("--rubric", default=None, help="JSON rubric {label, bands: [{label, criteria: [{text, tag}]}]}")
+    parser.add_argument("--no-embeddings", action="store_true", help="Skip sentence-transformer embeddings in compute_minhash")
+    parser.add_argument("--st-model", default=None, help="Sentence-transformer model (SIMILARITY_ST_MODEL)")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path")
+    parser.add_argument("--baseline", default=None, help="Compare against this baseline JSON")
+    parser.add_argument("--save-baseline", default=None, help="Write results as a new baseline to this path")
+    parser.add_argument("--throughput-tolerance", type=float, default=0.15, help="Allowed fractional throughput drop  [default: 0.15]")
+    parser.add_argument("--latency-tolerance", type=float, default=0.20, help="Allowed fractional latency increase  [default: 0.20]")
+    parser.add_argument("--rss-tolerance", type=float, default=0.20, help="Allowed fractional peak RSS increase  [default: 0.20]")
+    parser.add_argument("--verbose", action="store_true", help="Print per-record latencies")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    selected = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in selected if s not in STAGES]
+    if unknown:
+        print(f"unknown stage(s): {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    last = max(STAGES.index(s) for s in selected)
+    to_run = STAGES[: last + 1]
+
+    corpus = load_corpus(Path(args.corpus), args.limit)
+    if not corpus:
+        print(f"no PDF or DOCX files found in {args.corpus}", file=sys.stderr)
+        return 2
+
+    sys.path.insert(0, str(REPO_ROOT))
+    from app.shared.pdf_text_extraction import EXTRACTOR_VERSION, file_content_hash
+    from app.tasks.language_analysis import _RubricSnapshot
+
+    fingerprint = corpus_fingerprint(corpus, file_content_hash)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if baseline.get("corpus_fingerprint") != fingerprint:
+            print(f"baseline {args.baseline} was taken on a different corpus; refusing to compare", file=sys.stderr)
+            return 2
+
+    stub = None
+    ollama_url = args.ollama_url
+    if ollama_url is None:
+        stub = StubOllamaServer(ttft=args.ttft, tokens_per_second=args.tokens_per_second).start()
+        ollama_url = stub.url
+
+    collection = f"benchmark_{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}"
+    app = make_app(args, ollama_url, collection)
+
+    result = {
+        "format_version": RESULT_FORMAT_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "corpus": str(Path(args.corpus).resolve()),
+        "corpus_files": len(corpus),
+        "corpus_fingerprint": fingerprint,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "settings": {
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+            "ollama": "stub" if stub is not None else ollama_url,
+            "ttft": args.ttft,
+            "tokens_per_second": args.tokens_per_second,
+            "context_size": args.context_size,
+            "pdf_workers": args.pdf_workers,
+            "pages_per_range": args.pages_per_range,
+            "embeddings": not args.no_embeddings,
+            "extractor_version": EXTRACTOR_VERSION,
+        },
+        "stages": {},
+    }
+
+    try:
+        with app.app_context():
+            from app.shared import scraped_text_store
+
+            stages = PipelineStages(app, load_rubric(args.rubric, _RubricSnapshot), embeddings=not args.no_embeddings)
+            stages.record_ids = [item["record_id"] for item in corpus]
+
+            try:
+                for stage in to_run:
+                    if stage not in selected:
+                        print(f"-- {stage}: setup pass (not reported)")
+                        run_stage(stages, stage, corpus, verbose=False)
+                        continue
+
+                    for i in range(args.warmup):
+                        print(f"-- {stage}: warm-up pass {i + 1}/{args.warmup}")
+                        run_stage(stages, stage, corpus, verbose=False)
+
+                    passes = []
+                    for i in range(args.repeat):
+                        print(f"-- {stage}: timed pass {i + 1}/{args.repeat}")
+                        passes.append(run_stage(stages, stage, corpus, verbose=args.verbose))
+                    result["stages"][stage] = merge_passes(passes)
+
+            finally:
+                if not args.keep_collection:
+                    collection_obj = scraped_text_store._get_collection()
+                    if collection_obj is not None:
+                        collection_obj.drop()
+                scraped_text_store.close_scraped_text_clients()
+
+    finally:
+        if stub is not None:
+            result["settings"]["llm_requests"] = stub.stats()
+            stub.stop()
+
+    print()
+    print_table(result, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nbaseline written to {args.save_baseline}")
+
+    if baseline is not None:
+        regressions = compare(result, baseline, args.throughput_tolerance, args.latency_tolerance, args.rss_tolerance)
+        if regressions:
+            print("\nREGRESSIONS relative to baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nno regressions relative to baseline")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
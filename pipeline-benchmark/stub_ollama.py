@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+stub_ollama.py — Deterministic stand-in for the Ollama OpenAI-compatible API.
+
+Role in the benchmark
+---------------------
+The production pipeline talks to Ollama through app/shared/llm_services._call_llm(),
+which POSTs to /v1/chat/completions with a JSON-schema response_format and reads
+the reply as a server-sent-event stream.  This server implements exactly that
+endpoint, so that pipeline_benchmark.py can exercise every LLM-bound stage
+without a GPU and with reproducible timings.
+
+Replies are generated from the requested JSON schema:
+
+  object   every declared property is emitted
+  array    max(minItems, 1) items, capped at maxItems
+  enum     a value chosen by a stable hash of the property path, so repeated
+           runs always give the same answer but different keys get different
+           values (e.g. heading classifications are spread across chunk types)
+  string   short filler text, truncated to maxLength; a "criterion_code" is
+           given a rubric code of the form "band.criterion" instead, so that
+           map-phase evidence survives _merge_chunk_evidence()
+  integer / number / boolean   0 / 0.0 / false
+
+The reply is streamed in small content deltas, followed by a usage chunk and
+the [DONE] marker.  The usage chunk reports prompt_tokens_details.cached_tokens
+for the longest word prefix that the prompt shares with the previous request,
+emulating the single-slot prompt cache of an inference server, so that the
+benchmark can measure how much of each prompt could be reused.  Inference cost can be emulated with --ttft (seconds before
+the first delta) and --tokens-per-second (decode rate); both default to zero,
+so that the benchmark measures the pipeline rather than the stub.
+
+Usage
+-----
+  python stub_ollama.py [--host 127.0.0.1] [--port 11434] [--ttft 0.0] [--tokens-per-second 0]
+
+pipeline_benchmark.py starts its own instance on a free port unless
+--ollama-url is given.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# approximate tokens per word and characters per token, used for the usage report
+_TOKENS_PER_WORD = 1.4
+_CHARS_PER_TOKEN = 4
+
+# characters per streamed content delta
+_DELTA_CHARS = 16
+
+# criterion codes are drawn from a band x criterion grid of this size; codes outside the rubric are ignored
+_CODE_BANDS = 3
+_CODE_CRITERIA = 4
+
+_FILLER = "Stub response generated from the requested schema for benchmarking purposes."
+
+
+def _choose(options: list, path: str):
+    return options[zlib.crc32(path.encode("utf-8")) % len(options)]
+
+
+def instance_from_schema(schema: dict, path: str = "$"):
+    """
+    Return a deterministic value that conforms to the (subset of) JSON schema used by the pipeline.
+    """
+    if "enum" in schema:
+        return _choose(list(schema["enum"]), path)
+
+    schema_type = schema.get("type", "object")
+    if isinstance(schema_type, list):
+        non_null = [t for t in schema_type if t != "null"]
+        schema_type = non_null[0] if non_null else "null"
+
+    if schema_type == "object":
+        properties = schema.get("properties", {})
+        return {key: instance_from_schema(sub, f"{path}.{key}") for key, sub in properties.items()}
+
+    if schema_type == "array":
+        count = max(schema.get("minItems", 0), 1)
+        if "maxItems" in schema:
+            count = min(count, schema["maxItems"])
+        items = schema.get("items", {"type": "string"})
+        return [instance_from_schema(items, f"{path}[{i}]") for i in range(count)]
+
+    if schema_type == "string":
+        if path.endswith(".criterion_code"):
+            h = zlib.crc32(path.encode("utf-8"))
+            return f"{1 + h % _CODE_BANDS}.{1 + (h // _CODE_BANDS) % _CODE_CRITERIA}"
+        return _FILLER[: schema.get("maxLength", len(_FILLER))]
+
+    if schema_type == "integer":
+        return 0
+
+    if schema_type == "number":
+        return 0.0
+
+    if schema_type == "boolean":
+        return False
+
+    return None
+
+
+class _StubOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        # keep benchmark output clean
+        pass
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_event(self, payload) -> None:
+        data = payload if isinstance(payload, str) else json.dumps(payload)
+        chunk = f"data: {data}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip("/") in ("", "/api/version"):
+            self._send_json(200, {"version": "stub"})
+        elif self.path.rstrip("/") in ("/api/tags", "/api/ps"):
+            self._send_json(200, {"models": []})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": "invalid JSON body"})
+            return
+
+        schema = (request.get("response_format") or {}).get("json_schema", {}).get("schema", {"type": "object"})
+        content = json.dumps(instance_from_schema(schema))
+
+        words = [w for m in request.get("messages", []) for w in [f"<{m.get('role')}>"] + str(m.get("content", "")).split()]
+        prompt_tokens = int(len(words) * _TOKENS_PER_WORD)
+        completion_tokens = max(1, len(content) // _CHARS_PER_TOKEN)
+
+        server: StubOllamaServer = self.server
+        cached_tokens = min(int(server.cached_prefix_words(words) * _TOKENS_PER_WORD), prompt_tokens)
+        server.record_request(prompt_tokens, completion_tokens, cached_tokens)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        }
+
+        if not request.get("stream", False):
+            self._send_json(
+                200,
+                {
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": usage,
+                },
+            )
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        if server.ttft > 0:
+            time.sleep(server.ttft)
+
+        delay = (_DELTA_CHARS / _CHARS_PER_TOKEN) / server.tokens_per_second if server.tokens_per_second > 0 else 0.0
+        for i in range(0, len(content), _DELTA_CHARS):
+            self._send_event({"choices": [{"index": 0, "delta": {"content": content[i : i + _DELTA_CHARS]}, "finish_reason": None}]})
+            if delay:
+                time.sleep(delay)
+
+        self._send_event({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        self._send_event(
+            {
+                "choices": [],
+                "usage": usage,
+            }
+        )
+        self._send_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class StubOllamaServer(ThreadingHTTPServer):
+    """
+    Threaded stub server.  Use start()/stop() to run it in a background thread.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, ttft: float = 0.0, tokens_per_second: float = 0.0):
+        super().__init__((host, port), _StubOllamaHandler)
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_prompt_tokens = 0
+        self._previous_prompt: list[str] = []
+
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def cached_prefix_words(self, words: list[str]) -> int:
+        """Return the length of the word prefix shared with the previous prompt, and remember *words*."""
+        with self._stats_lock:
+            previous = self._previous_prompt
+            self._previous_prompt = words
+        n = 0
+        for a, b in zip(previous, words):
+            if a != b:
+                break
+            n += 1
+        return n
+
+    def record_request(self, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> None:
+        with self._stats_lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cached_prompt_tokens += cached_tokens
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "requests": self.requests,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cached_prompt_tokens": self.cached_prompt_tokens,
+                "prompt_cache_hit_rate": round(self.cached_prompt_tokens / self.prompt_tokens, 3) if self.prompt_tokens else None,
+            }
+
+    def start(self) -> "StubOllamaServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="stub-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Deterministic stub of the Ollama /v1/chat/completions endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--ttft", type=float, default=0.0, help="Seconds before the first streamed delta  [default: 0]")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Emulated decode rate; 0 = no delay  [default: 0]")
+    args = parser.parse_args()
+
+    server = StubOllamaServer(args.host, args.port, ttft=args.ttft, tokens_per_second=args.tokens_per_second)
+    print(f"stub Ollama listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@
 # Contributors: David Seery <D.Seery@sussex.ac.uk>
 #
 
+import os
 from importlib import import_module
 
 from flask_security import current_user
@@ -82,4 +83,5 @@ with app.app_context():
 
 
 if __name__ == "__main__":
-    serve(app, port=5000)
+    # up to NOTIFICATIONS_MAX_LONG_POLLS threads may be held by live-notification long-polls, so leave plenty spare
+    serve(app, port=5000, threads=int(os.environ.get("WEB_SERVER_THREADS", "12")))
@@ -0,0 +1,172 @@
+#
+# Created by David Seery on 19/10/2026.
+# Copyright (c) 2026 University of Sussex. All rights reserved.
+#
+# This file is part of the MPS-Project platform developed in
+# the School of Mathematics & Physical Sciences, University of Sussex.
+#
+# Contributors: David Seery <D.Seery@sussex.ac.uk>
+#
+
+"""
+Tests for the Canvas synchronisation engine and the batched report pull, run against the local Canvas stand-in
+server in app/shared/canvas_stub.py. No real Canvas instance, database or Redis server is needed.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from celery import Celery
+from flask import Flask
+
+from app.shared.canvas_api import build_api_url
+from app.shared.canvas_stub import CanvasStubServer
+from app.shared.canvas_sync import CanvasSyncEngine, CanvasSyncState
+from app.tasks import canvas as canvas_tasks
+
+TOKEN = "test-token"
+COURSE_ID = 101
+ASSIGNMENT_ID = 7
+
+
+@pytest.fixture
+def canvas():
+    with CanvasStubServer(token=TOKEN) as server:
+        yield server
+
+
+def _submissions_url(canvas: CanvasStubServer) -> str:
+    return build_api_url(canvas.api_root, f"courses/{COURSE_ID}/assignments/{ASSIGNMENT_ID}/submissions")
+
+
+def _submitted(user_id: int, attachment=None) -> dict:
+    return {"user_id": user_id, "workflow_state": "submitted", "attachments": [attachment] if attachment is not None else []}
+
+
+def test_single_page_collection_is_revalidated_with_etag(canvas):
+    canvas.add_submission(COURSE_ID, ASSIGNMENT_ID, _submitted(1))
+    url = _submissions_url(canvas)
+
+    with CanvasSyncEngine(TOKEN, state=CanvasSyncState()) as engine:
+        first = engine.fetch_collection(url, key="submissions")
+        assert first.changed
+        assert [item["user_id"] for item in first.items] == [1]
+        engine.mark_synced(first, "local")
+
+        # unchanged on Canvas and locally: answered with 304, nothing to do
+        second = engine.fetch_collection(url, key="submissions")
+        assert second.items is None
+        assert engine.is_unchanged(second, "local")
+
+        # local state has moved: the caller must re-read the collection unconditionally
+        assert not engine.is_unchanged(second, "local-changed")
+        forced = engine.fetch_collection(url, key="submissions", conditional=False)
+        assert [item["user_id"] for item in forced.items] == [1]
+
+        # a new submission on Canvas invalidates the stored ETag
+        canvas.add_submission(COURSE_ID, ASSIGNMENT_ID, _submitted(2))
+        third = engine.fetch_collection(url, key="submissions")
+        assert third.changed
+        assert [item["user_id"] for item in third.items] == [1, 2]
+
+
+@pytest.mark.parametrize("bookmark_pagination", [False, True])
+def test_multi_page_collection_is_compared_by_fingerprint(bookmark_pagination):
+    with CanvasStubServer(token=TOKEN, bookmark_pagination=bookmark_pagination) as canvas:
+        for user_id in range(1, 8):
+            canvas.add_submission(COURSE_ID, ASSIGNMENT_ID, _submitted(user_id))
+        url = _submissions_url(canvas)
+
+        with CanvasSyncEngine(TOKEN, max_workers=3, per_page=2, state=CanvasSyncState()) as engine:
+            first = engine.fetch_collection(url, key="submissions")
+            assert first.pages == 4
+            assert [item["user_id"] for item in first.items] == list(range(1, 8))
+            engine.mark_synced(first)
+
+            # multi-page collections are always re-read, but reported unchanged if the content is identical
+            second = engine.fetch_collection(url, key="submissions")
+            assert second.items is not None
+            assert not second.changed
+            assert engine.is_unchanged(second)
+
+        # every page was fetched exactly once per pass
+        assert canvas.requests[f"/api/v1/courses/{COURSE_ID}/assignments/{ASSIGNMENT_ID}/submissions"] == 8
+
+
+def test_iter_downloads_reports_missing_files(canvas):
+    attachment = canvas.add_file(b"%PDF-1.4 report")
+    missing = dict(attachment, url=canvas.base_url + "files/999/download")
+
+    with CanvasSyncEngine(TOKEN) as engine:
+        results = {tag: (content, error) for tag, content, error in engine.iter_downloads([("a", attachment["url"]), ("b", missing["url"])])}
+
+    assert results["a"] == (b"%PDF-1.4 report", None)
+    assert results["b"][0] is None
+    assert results["b"][1].status_code == 404
+
+
+def test_pull_reports_batch(canvas, monkeypatch):
+    report = canvas.add_file(b"%PDF-1.4 report for student 11")
+    canvas.add_submission(COURSE_ID, ASSIGNMENT_ID, _submitted(11, report))
+    canvas.add_submission(COURSE_ID, ASSIGNMENT_ID, {"user_id": 12, "workflow_state": "unsubmitted", "attachments": []})
+    canvas.add_submission(COURSE_ID, ASSIGNMENT_ID, _submitted(13, dict(report, id=999, url=canvas.base_url + "files/999/download")))
+
+    def _record(record_id, canvas_user_id, name):
+        student = SimpleNamespace(user=SimpleNamespace(name=name))
+        return SimpleNamespace(id=record_id, report=None, owner=SimpleNamespace(canvas_user_id=canvas_user_id, student=student))
+
+    records = [_record(1, 11, "Submitted Student"), _record(2, 12, "Unsubmitted Student"), _record(3, 13, "Missing File Student")]
+    period = SimpleNamespace(
+        id=5,
+        closed=False,
+        canvas_enabled=True,
+        canvas_module_id=COURSE_ID,
+        canvas_assignment_id=ASSIGNMENT_ID,
+        config=SimpleNamespace(name="Test module", canvas_login=SimpleNamespace(canvas_API_token=TOKEN)),
+    )
+    user = SimpleNamespace(id=99)
+
+    class _Query:
+        def __init__(self, rows):
+            self._rows = rows
+
+        def filter_by(self, **kwargs):
+            return _Query([row for row in self._rows if all(getattr(row, k) == v for k, v in kwargs.items())])
+
+        def filter(self, *args):
+            return self
+
+        def first(self):
+            return self._rows[0] if self._rows else None
+
+        def all(self):
+            return list(self._rows)
+
+    tables = {canvas_tasks.SubmissionPeriodRecord: [period], canvas_tasks.SubmissionRecord: records, canvas_tasks.User: [user]}
+    session = SimpleNamespace(query=lambda model: _Query(tables[model]), rollback=lambda: None)
+
+    stored = {}
+    errors = []
+
+    def _store(record, attachment, content, submission, user_id, endpoint=None):
+        stored[record.id] = content
+        return {"asset_id": record.id}
+
+    monkeypatch.setattr(canvas_tasks, "db", SimpleNamespace(session=session))
+    monkeypatch.setattr(canvas_tasks, "get_main_config", lambda: SimpleNamespace(canvas_root_API=canvas.api_root))
+    monkeypatch.setattr(canvas_tasks, "_canvas_sync_engine", lambda token: CanvasSyncEngine(token, max_workers=2, per_page=2))
+    monkeypatch.setattr(canvas_tasks, "_store_report_attachment", _store)
+    monkeypatch.setattr(canvas_tasks, "_finalize_report_attachment", lambda data, rid, user_id, endpoint=None: rid)
+    monkeypatch.setattr(canvas_tasks, "_post_pull_report_error", lambda u, record: errors.append((u.id, record.id)))
+
+    celery = Celery("test_canvas_sync")
+    canvas_tasks.register_canvas_tasks(celery)
+    pull_reports_batch = celery.tasks["app.tasks.canvas.pull_reports_batch"]
+
+    with Flask("test_canvas_sync").app_context():
+        results = pull_reports_batch(period.id, [r.id for r in records], user.id)
+
+    assert sorted(r for r in results if r is not None) == [1]
+    assert results.count(None) == 2
+    assert stored == {1: b"%PDF-1.4 report for student 11"}
+    assert sorted(errors) == [(99, 2), (99, 3)]